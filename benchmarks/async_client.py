@@ -0,0 +1,228 @@
+"""
+Throughput of the asyncio client against the sync beaker ApplicationClient.
+
+Both clients drive the same campaign lifecycle on a LedgerServer (the local
+ledger behind algod's REST API) with a simulated network latency and block
+time: every backer opts in and funds, then the creator claims the funds,
+submits milestone 1, a backer approves it through the campaign and the creator
+settles the vote.
+The sync client runs the calls one after the other, the async client runs
+all the calls of a phase concurrently.
+
+    python -m benchmarks.async_client
+    python -m benchmarks.async_client --campaigns 100 --backers 2 --latency 0.05 --block-time 1
+"""
+import argparse
+import asyncio
+import sys
+import time
+from dataclasses import dataclass
+
+from algosdk import account
+from algosdk.atomic_transaction_composer import AccountTransactionSigner, TransactionWithSigner
+from algosdk.future import transaction
+from algosdk.v2client.algod import AlgodClient
+from beaker import consts
+from beaker.client import ApplicationClient
+
+from client.async_client import AsyncAlgod, AsyncCampaignClient, AsyncMilestoneClient
+from contracts.compile_cache import default_cache
+from contracts.crowdfunding.crowdfundingCampaign import CrowdfundingCampaignApp
+from contracts.crowdfunding.milestoneApproval import MilestoneApprovalApp
+from localnet.algod import LocalAlgodClient, get_accounts
+from localnet.ledger import Ledger
+from localnet.server import LedgerServer
+
+FUNDING_WINDOW = 3600 # seconds of virtual time
+VOTE_WINDOW = 3600
+
+
+@dataclass
+class Campaign:
+    app_id: int
+    backers: list[AccountTransactionSigner]
+    milestone_app_id: int = 0
+
+
+def setup(client: LocalAlgodClient, creator, num_campaigns: int, num_backers: int) -> list[Campaign]:
+    """Deploy `num_campaigns` campaigns of `creator` directly on the ledger of `client`."""
+    ledger = client.ledger
+    app = CrowdfundingCampaignApp()
+    app_client = default_cache().application_client(client, app, signer=creator.signer)
+    now = ledger.clock.now()
+    campaigns = []
+    for _ in range(num_campaigns):
+        app_client.app_id = 0
+        app_id, _, _ = app_client.create(
+            campaign_goal=num_backers * 10 * consts.algo,
+            funds_receiver=creator.address,
+            fund_start_date=now,
+            fund_end_date=now + FUNDING_WINDOW,
+            reward_metadata="ipfs:/metadata/CID",
+            total_milestones=2,
+            funds_per_milestone=[num_backers * 7 * consts.algo, num_backers * 3 * consts.algo],
+        )
+        ledger.fund(app_client.app_addr, consts.algo) # min balance of the app account
+        backers = []
+        for _ in range(num_backers):
+            private_key, address = account.generate_account()
+            ledger.fund(address, 11 * consts.algo)
+            backers.append(AccountTransactionSigner(private_key))
+        campaigns.append(Campaign(app_id, backers))
+    return campaigns
+
+
+def run_sync(server: LedgerServer, creator, campaigns: list[Campaign]) -> dict[str, tuple[int, float]]:
+    """Lifecycle of every campaign with blocking ApplicationClient calls, returns {phase: (calls, seconds)}."""
+    client = AlgodClient("", server.url)
+    app = CrowdfundingCampaignApp()
+    phases = {}
+
+    def phase(name, calls):
+        start = time.perf_counter()
+        for call in calls:
+            call()
+        phases[name] = (len(calls), time.perf_counter() - start)
+
+    def fund(app_client: ApplicationClient, signer):
+        backer_client = app_client.prepare(signer=signer)
+        backer_client.opt_in()
+        sp = client.suggested_params()
+        backer_client.call(
+            CrowdfundingCampaignApp.fund,
+            funding=TransactionWithSigner(
+                txn=transaction.PaymentTxn(backer_client.get_sender(), sp, app_client.app_addr, 10 * consts.algo),
+                signer=signer,
+            ),
+        )
+
+    def inner_fee_params():
+        sp = client.suggested_params()
+        sp.fee = sp.min_fee * 2
+        sp.flat_fee = True
+        return sp
+
+    def submit(app_client: ApplicationClient, campaign: Campaign):
+        result = app_client.call(
+            CrowdfundingCampaignApp.submit_milestone,
+            milestone_to_approve=1,
+            milestone_metadata="ipfs:/milestone_1_metadata/CID",
+            vote_end_date=server.ledger.clock.now() + VOTE_WINDOW,
+            suggested_params=inner_fee_params(),
+        )
+        campaign.milestone_app_id = result.return_value
+
+    app_clients = [ApplicationClient(client, app, app_id=cp.app_id, signer=creator.signer) for cp in campaigns]
+
+    phase("opt_in + fund", [lambda c=c, s=s: fund(c, s) for c, cp in zip(app_clients, campaigns) for s in cp.backers])
+    advance(server, FUNDING_WINDOW + 1)
+    phase("claim_funds", [
+        lambda c=c: c.call(CrowdfundingCampaignApp.claim_funds, accounts=[creator.address], suggested_params=inner_fee_params())
+        for c in app_clients
+    ])
+    phase("submit_milestone", [lambda c=c, cp=cp: submit(c, cp) for c, cp in zip(app_clients, campaigns)])
+    milestone_app = MilestoneApprovalApp()
+    milestone_clients = [ApplicationClient(client, milestone_app, app_id=cp.milestone_app_id, signer=creator.signer) for cp in campaigns]
+    phase("vote", [
+        lambda c=c, cp=cp: c.prepare(signer=cp.backers[0]).call(
+            CrowdfundingCampaignApp.vote, milestone_app=cp.milestone_app_id, vote=1, suggested_params=inner_fee_params()
+        )
+        for c, cp in zip(app_clients, campaigns)
+    ])
+    advance(server, VOTE_WINDOW + 1)
+    phase("vote_settling", [lambda m=m: m.call(MilestoneApprovalApp.vote_settling) for m in milestone_clients])
+    return phases
+
+
+async def run_async(
+    server: LedgerServer, creator, campaigns: list[Campaign], max_in_flight: int
+) -> dict[str, tuple[int, float]]:
+    """Same lifecycle as run_sync, the calls of a phase running concurrently on one pooled session."""
+    phases = {}
+
+    async def phase(name, calls):
+        start = time.perf_counter()
+        await asyncio.gather(*calls)
+        phases[name] = (len(calls), time.perf_counter() - start)
+
+    async def fund(campaign: AsyncCampaignClient, signer):
+        backer = campaign.prepare(signer)
+        await backer.opt_in()
+        await backer.back(10 * consts.algo)
+
+    async def submit(campaign: AsyncCampaignClient, cp: Campaign):
+        result = await campaign.submit_milestone(1, "ipfs:/milestone_1_metadata/CID", server.ledger.clock.now() + VOTE_WINDOW)
+        cp.milestone_app_id = result.return_value
+
+    async with AsyncAlgod(server.url, max_in_flight=max_in_flight) as algod:
+        # the sync client is only used to compose transactions, it sends nothing
+        client = AlgodClient("", server.url)
+        app = CrowdfundingCampaignApp()
+        clients = [
+            AsyncCampaignClient(algod, ApplicationClient(client, app, app_id=cp.app_id, signer=creator.signer))
+            for cp in campaigns
+        ]
+
+        await phase("opt_in + fund", [fund(c, s) for c, cp in zip(clients, campaigns) for s in cp.backers])
+        advance(server, FUNDING_WINDOW + 1)
+        await phase("claim_funds", [c.claim_funds([creator.address]) for c in clients])
+        await phase("submit_milestone", [submit(c, cp) for c, cp in zip(clients, campaigns)])
+        milestone_app = MilestoneApprovalApp()
+        milestones = [
+            AsyncMilestoneClient(algod, ApplicationClient(client, milestone_app, app_id=cp.milestone_app_id, signer=creator.signer))
+            for cp in campaigns
+        ]
+        await phase("vote", [c.prepare(cp.backers[0]).vote(cp.milestone_app_id, True) for c, cp in zip(clients, campaigns)])
+        advance(server, VOTE_WINDOW + 1)
+        await phase("vote_settling", [m.vote_settling() for m in milestones])
+    return phases
+
+
+def advance(server: LedgerServer, seconds: int):
+    """Move the virtual clock of the served ledger, e.g. past the funding window."""
+    with server.lock:
+        server.ledger.clock.advance(seconds)
+
+
+def serve(args: argparse.Namespace, run) -> dict[str, tuple[int, float]]:
+    """Deploy the campaigns on a fresh ledger, serve it and `run` the lifecycle against it."""
+    ledger = Ledger()
+    client = LocalAlgodClient(ledger)
+    (creator,) = get_accounts(client, 1, 1_000_000 * consts.algo)
+    campaigns = setup(client, creator, args.campaigns, args.backers)
+    with LedgerServer(("127.0.0.1", 0), ledger, latency=args.latency, block_time=args.block_time) as server:
+        return run(server, creator, campaigns)
+
+
+def report(sync: dict[str, tuple[int, float]], concurrent: dict[str, tuple[int, float]]):
+    print(f"{'phase':<20}{'calls':>7}{'sync ops/s':>13}{'async ops/s':>13}{'speedup':>10}")
+    total_calls = total_sync = total_async = 0
+    for name, (calls, sync_time) in sync.items():
+        async_time = concurrent[name][1]
+        total_calls += calls
+        total_sync += sync_time
+        total_async += async_time
+        print(f"{name:<20}{calls:>7}{calls / sync_time:>13.1f}{calls / async_time:>13.1f}{sync_time / async_time:>9.1f}x")
+    print(f"{'total':<20}{total_calls:>7}{total_calls / total_sync:>13.1f}{total_calls / total_async:>13.1f}"
+          f"{total_sync / total_async:>9.1f}x")
+
+
+def main(argv: list[str] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--campaigns", type=int, default=10, help="campaigns driven by each client")
+    parser.add_argument("--backers", type=int, default=2, help="backers per campaign")
+    parser.add_argument("--latency", type=float, default=0.02, help="seconds added to every algod request")
+    parser.add_argument("--block-time", type=float, default=0.5, help="seconds between blocks")
+    parser.add_argument("--max-in-flight", type=int, default=64, help="concurrent requests of the async client")
+    args = parser.parse_args(argv)
+
+    print(f"{args.campaigns} campaigns x {args.backers} backers, "
+          f"latency {args.latency * 1000:.0f}ms, block time {args.block_time}s\n")
+    sync = serve(args, run_sync)
+    concurrent = serve(args, lambda *run_args: asyncio.run(run_async(*run_args, args.max_in_flight)))
+    report(sync, concurrent)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,163 @@
+"""
+Backer reconciliation throughput: one get_account_state call per backer against BackerExporter.
+
+Onboards `backers` backers into a campaign, then reads the local state of
+every backer on a LedgerServer (the local ledger behind algod's REST API,
+with simulated latency):
+- per backer: ApplicationClient.get_account_state(account=...) for each
+  backer address, one request after the other (addresses known up front);
+- export: BackerExporter, the backers found from the opt-in calls in the
+  blocks and their local state fetched concurrently, written to CSV;
+- resumed export: the same export interrupted after one page and resumed
+  from the saved token.
+Reports backers per second and requests, and checks that each export holds
+every backer once and adds up to the collected funds of the campaign.
+
+    python -m benchmarks.backer_export
+    python -m benchmarks.backer_export --backers 10000 --latency 0.05 --max-in-flight 64
+"""
+import argparse
+import asyncio
+import csv
+import os
+import sys
+import tempfile
+import time
+from dataclasses import dataclass
+
+from algosdk import account
+from algosdk.atomic_transaction_composer import AccountTransactionSigner
+from algosdk.v2client.algod import AlgodClient
+from beaker import consts
+from beaker.client import ApplicationClient
+
+from client.async_client import AsyncAlgod
+from client.backer_export import BackerExporter
+from client.bulk_funding import Backer, BulkFunder
+from contracts.compile_cache import default_cache
+from contracts.crowdfunding.crowdfundingCampaign import CrowdfundingCampaignApp
+from localnet.algod import LocalAlgodClient, get_accounts
+from localnet.ledger import Ledger
+from localnet.server import LedgerServer
+
+AMOUNT_BACKED = 10 * consts.algo
+
+
+@dataclass
+class ExportRun:
+    name: str
+    backers: int
+    seconds: float
+    requests: int
+
+    @property
+    def rate(self) -> float:
+        return self.backers / self.seconds
+
+
+def setup(ledger: Ledger, num_backers: int) -> tuple[int, int, list[Backer]]:
+    """Campaign backed by `num_backers` backers, returns (app_id, round of its creation, backers)."""
+    client = LocalAlgodClient(ledger)
+    (creator,) = get_accounts(client, 1, 1_000 * consts.algo)
+    app_client = default_cache().application_client(client, CrowdfundingCampaignApp(), signer=creator.signer)
+    created_round = ledger.round
+    now = ledger.clock.now()
+    app_client.create(
+        campaign_goal=4 * num_backers * AMOUNT_BACKED,
+        funds_receiver=creator.address,
+        fund_start_date=now,
+        fund_end_date=now + 3600,
+        reward_metadata="ipfs:/metadata/CID",
+        total_milestones=2,
+        funds_per_milestone=[2 * num_backers * AMOUNT_BACKED, 2 * num_backers * AMOUNT_BACKED],
+    )
+    app_client.fund(consts.algo) # min balance of the app account
+    backers = []
+    for i in range(num_backers):
+        private_key, address = account.generate_account()
+        ledger.fund(address, AMOUNT_BACKED + i + consts.algo)
+        # different amounts, so that a missing or repeated row changes the total
+        backers.append(Backer(address, AccountTransactionSigner(private_key), AMOUNT_BACKED + i))
+    results = BulkFunder(app_client).fund(backers)
+    assert all(r.ok for r in results), [r.error for r in results if not r.ok]
+    return app_client.app_id, created_round, backers
+
+
+def read_per_backer(client: AlgodClient, app_id: int, backers: list[Backer]) -> ExportRun:
+    app_client = ApplicationClient(client, CrowdfundingCampaignApp(), app_id=app_id)
+    start = time.perf_counter()
+    for backer in backers:
+        app_client.get_account_state(account=backer.address)["amount_backed"]
+    return ExportRun("per backer", len(backers), time.perf_counter() - start, len(backers))
+
+
+async def export(url: str, app_id: int, created_round: int, path: str, max_in_flight: int, page_size: int,
+                 interrupt: bool = False) -> ExportRun:
+    token_path = path + ".token"
+    async with AsyncAlgod(url, max_in_flight=max_in_flight) as algod:
+        exporter = BackerExporter(algod, app_id, page_size=page_size)
+        start = time.perf_counter()
+        results = []
+        if interrupt:
+            results.append(await exporter.export(path, token_path, created_round, max_pages=1))
+        results.append(await exporter.export(path, token_path, created_round))
+        elapsed = time.perf_counter() - start
+    assert results[-1].complete
+    rows = sum(r.rows for r in results)
+    # status + one request per block scanned, per backer, then per export call
+    requests = sum(r.blocks_read + 1 for r in results) + rows
+    return ExportRun("resumed" if interrupt else "export", rows, elapsed, requests)
+
+
+def check(path: str, app_id: int, ledger: Ledger, backers: list[Backer]) -> list[str]:
+    """Differences between the exported rows and the campaign state."""
+    with open(path, newline="") as f:
+        rows = list(csv.DictReader(f))
+    errors = []
+    addresses = [row["address"] for row in rows]
+    if sorted(addresses) != sorted(b.address for b in backers):
+        errors.append(f"{os.path.basename(path)}: {len(rows)} rows ({len(set(addresses))} distinct), {len(backers)} backers")
+    state = ApplicationClient(LocalAlgodClient(ledger), CrowdfundingCampaignApp(), app_id=app_id).get_application_state()
+    total = sum(int(row["amount_backed"]) for row in rows)
+    if total != state["collected_funds"]:
+        errors.append(f"{os.path.basename(path)}: amount_backed adds up to {total}, collected_funds {state['collected_funds']}")
+    return errors
+
+
+def report(runs: list[ExportRun]):
+    print(f"{'path':<12}{'backers':>9}{'seconds':>10}{'backers/s':>11}{'requests':>10}")
+    for run in runs:
+        print(f"{run.name:<12}{run.backers:>9}{run.seconds:>10.2f}{run.rate:>11.1f}{run.requests:>10}")
+
+
+def main(argv: list[str] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--backers", type=int, default=1000, help="backers of the campaign")
+    parser.add_argument("--latency", type=float, default=0.02, help="seconds added to every algod request")
+    parser.add_argument("--max-in-flight", type=int, default=32, help="concurrent requests of the export")
+    parser.add_argument("--page-size", type=int, default=250, help="rows between two saved tokens")
+    args = parser.parse_args(argv)
+
+    ledger = Ledger()
+    app_id, created_round, backers = setup(ledger, args.backers)
+    errors = []
+    with tempfile.TemporaryDirectory() as tmp, \
+            LedgerServer(("127.0.0.1", 0), ledger, latency=args.latency) as server:
+        print(f"{args.backers} backers, {ledger.round - created_round} rounds, latency {args.latency * 1000:.0f}ms, "
+              f"{args.max_in_flight} requests in flight\n")
+        runs = [read_per_backer(AlgodClient("", server.url), app_id, backers)]
+        for interrupt in (False, True):
+            path = os.path.join(tmp, f"backers_{interrupt}.csv")
+            runs.append(asyncio.run(
+                export(server.url, app_id, created_round, path, args.max_in_flight, args.page_size, interrupt)
+            ))
+            errors += check(path, app_id, ledger, backers)
+    report(runs)
+    for error in errors[:10]:
+        print(f"  {error}")
+    print(f"\nall backers exported: {'ok' if not errors else 'FAILED'}")
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
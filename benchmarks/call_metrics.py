@@ -0,0 +1,143 @@
+"""
+Where the time of each contract call goes: encode, sign, send and confirm, recorded by CallMetrics.
+
+Runs a campaign lifecycle with the client/artifacts.py clients on a
+LedgerServer (the local ledger behind algod's REST API, with simulated
+latency and block time), every call recorded by one CallMetrics: create,
+set_payout_split, opt_in and fund of each backer, claim_funds, then
+`milestones` milestones submitted, voted, settled and claimed. Reports the
+mean time of every phase, the algod requests and confirmation rounds per
+call by method, and the cost of the recording itself, timed without any
+request. The Prometheus text dump is written with --dump.
+
+    python -m benchmarks.call_metrics
+    python -m benchmarks.call_metrics --backers 50 --latency 0.05 --block-time 1 --dump build/metrics.prom
+"""
+import argparse
+import sys
+import time
+from dataclasses import dataclass
+
+from algosdk import account
+from algosdk.atomic_transaction_composer import AccountTransactionSigner
+from algosdk.v2client.algod import AlgodClient
+from beaker import consts
+
+from client.artifacts import CampaignClient, MilestoneClient
+from client.metrics import PHASES, CallMetrics
+from localnet.algod import LocalAlgodClient, get_accounts
+from localnet.ledger import Ledger
+from localnet.server import LedgerServer
+
+AMOUNT_BACKED = 10 * consts.algo
+FUND_WINDOW = 60
+VOTE_WINDOW = 60
+
+
+@dataclass
+class Overhead:
+    calls: int
+    seconds: float
+
+    @property
+    def per_call(self) -> float:
+        return self.seconds / self.calls
+
+
+def lifecycle(client: AlgodClient, ledger: Ledger, metrics: CallMetrics, num_backers: int, num_milestones: int) -> list[str]:
+    """Run the campaign through every milestone, returns the differences with the expected final state."""
+    (creator,) = get_accounts(LocalAlgodClient(ledger), 1, 1_000 * consts.algo)
+    campaign = CampaignClient.load(client, signer=creator.signer, metrics=metrics)
+    clock = ledger.clock
+    now = clock.now()
+    tranche = num_backers * AMOUNT_BACKED // (num_milestones + 1)
+    campaign.create(
+        campaign_goal=num_backers * AMOUNT_BACKED,
+        funds_receiver=creator.address,
+        fund_start_date=now,
+        fund_end_date=now + FUND_WINDOW,
+        reward_metadata="ipfs:/metadata/CID",
+        total_milestones=num_milestones + 1,
+        funds_per_milestone=[tranche] * (num_milestones + 1),
+    )
+    campaign.fund((1 + num_milestones) * consts.algo) # min balance of the app and milestone app accounts
+    campaign.set_payout_split([creator.address], [10_000])
+
+    backers = []
+    for _ in range(num_backers):
+        private_key, address = account.generate_account()
+        ledger.fund(address, AMOUNT_BACKED + consts.algo)
+        backer = campaign.prepare(AccountTransactionSigner(private_key))
+        backer.opt_in()
+        backer.back(AMOUNT_BACKED)
+        backers.append(backer)
+
+    clock.advance(FUND_WINDOW + 1)
+    campaign.claim_funds([creator.address])
+    for milestone in range(1, num_milestones + 1):
+        milestone_app_id = campaign.submit_milestone(
+            milestone, f"ipfs:/milestone_{milestone}_metadata/CID", clock.now() + VOTE_WINDOW
+        ).return_value
+        for backer in backers:
+            backer.vote(milestone_app_id, approve=True)
+        clock.advance(VOTE_WINDOW + 1)
+        MilestoneClient.load(client, milestone_app_id, signer=creator.signer, metrics=metrics).vote_settling()
+        campaign.claim_funds([creator.address], milestone_app_id)
+
+    state = campaign.get_application_state()
+    if state["campaign_state"] != 3 or state["reached_milestone"] != num_milestones:
+        return [f"campaign_state {state['campaign_state']}, reached_milestone {state['reached_milestone']}"]
+    return []
+
+
+def recording_overhead(calls: int) -> Overhead:
+    """Time of recording `calls` calls (start, every phase, finish) without executing anything."""
+    metrics = CallMetrics()
+    start = time.perf_counter()
+    for _ in range(calls):
+        record = metrics.start("fund")
+        for phase in PHASES:
+            metrics.phase(record, phase)
+        metrics.finish(record, rounds=1)
+    return Overhead(calls, time.perf_counter() - start)
+
+
+def report(metrics: CallMetrics, overhead: Overhead):
+    print(f"{'method':<26}{'calls':>6}" + "".join(f"{phase + ' ms':>12}" for phase in PHASES)
+          + f"{'total ms':>10}{'requests':>10}{'rounds':>8}")
+    for method in metrics.methods():
+        phases = [metrics.phases.get((method, phase)) for phase in PHASES]
+        means = [h.mean * 1000 if h is not None else 0.0 for h in phases]
+        calls = sum(n for (m, _), n in metrics.calls.items() if m == method)
+        print(f"{method:<26}{calls:>6}" + "".join(f"{mean:>12.2f}" for mean in means)
+              + f"{sum(means):>10.2f}{metrics.requests[method].mean:>10.1f}{metrics.rounds[method].mean:>8.2f}")
+    print(f"\nrecording: {overhead.per_call * 1e6:.1f}us per call ({overhead.calls} calls, no request)")
+
+
+def main(argv: list[str] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--backers", type=int, default=20, help="backers funding and voting")
+    parser.add_argument("--milestones", type=int, default=2, help="milestones voted and claimed after milestone 0")
+    parser.add_argument("--latency", type=float, default=0.02, help="seconds added to every algod request")
+    parser.add_argument("--block-time", type=float, default=0.2, help="seconds between blocks")
+    parser.add_argument("--dump", help="write the metrics in Prometheus text format to this file")
+    args = parser.parse_args(argv)
+
+    ledger = Ledger()
+    metrics = CallMetrics()
+    with LedgerServer(("127.0.0.1", 0), ledger, latency=args.latency, block_time=args.block_time) as server:
+        print(f"{args.backers} backers, {args.milestones + 1} milestones, latency {args.latency * 1000:.0f}ms, "
+              f"block time {args.block_time}s\n")
+        errors = lifecycle(AlgodClient("", server.url), ledger, metrics, args.backers, args.milestones)
+    report(metrics, recording_overhead(100_000))
+    if args.dump:
+        metrics.dump(args.dump)
+        print(f"metrics written to {args.dump}")
+    for error in errors:
+        print(f"  {error}")
+    print(f"\nlifecycle: {'ok' if not errors else 'FAILED'}")
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
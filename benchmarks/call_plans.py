@@ -0,0 +1,281 @@
+"""
+Building hot contract calls: ApplicationClient and the artifacts client against CallPlans.
+
+Builds (without signing or sending) `calls` calls of the hot methods in
+turn: fund (payment and app call) and the opt-in free vote of a backer on
+CrowdfundingCampaignApp, claim_funds and vote_settling of the creator, through:
+- ApplicationClient: beaker's add_method_call, fresh suggested params for
+  every call and pooled fees (FeePlanner), like main_crowdfunding.py;
+- artifacts client: ArtifactAppClient.add_method_call (client/artifacts.py),
+  fresh suggested params for every call;
+- call plans: CallPlans (client/call_plans.py), suggested params from a
+  SuggestedParamsCache.
+Each path runs against the in-process ledger and against the ledger served
+over HTTP with `latency` seconds per request. Reports calls and transactions
+built per second and the suggested params requests, and checks that the
+call plans build the same transactions as ATC.add_method_call.
+
+    python -m benchmarks.call_plans
+    python -m benchmarks.call_plans --calls 5000 --latency 0.002
+"""
+import argparse
+import sys
+import time
+from dataclasses import dataclass
+from typing import Callable
+
+from algosdk import encoding
+from algosdk.atomic_transaction_composer import AtomicTransactionComposer, TransactionWithSigner
+from algosdk.future import transaction
+from algosdk.v2client.algod import AlgodClient
+from beaker import consts
+
+from client.artifacts import CampaignClient, MilestoneClient
+from client.call_plans import CallPlans, SuggestedParamsCache
+from client.fees import pooled_params
+from contracts.compile_cache import default_cache
+from contracts.crowdfunding.crowdfundingCampaign import CrowdfundingCampaignApp
+from contracts.crowdfunding.milestoneApproval import MilestoneApprovalApp
+from localnet.algod import LocalAlgodClient, get_accounts
+from localnet.ledger import Ledger
+from localnet.server import LedgerServer
+
+AMOUNT_BACKED = 10 * consts.algo
+HOT_CALLS = ["fund", "vote", "claim_funds", "vote_settling"]
+
+
+@dataclass
+class BuildRun:
+    algod: str
+    path: str
+    calls: int
+    txns: int
+    seconds: float
+    params_requests: int
+
+    @property
+    def rate(self) -> float:
+        return self.calls / self.seconds
+
+
+@dataclass
+class Apps:
+    campaign_id: int
+    milestone_app_id: int
+    creator: object
+    backer: object
+
+
+class CountingAlgodClient(AlgodClient):
+    """AlgodClient counting its suggested params requests."""
+
+    def __init__(self, client: AlgodClient):
+        super().__init__(client.algod_token, client.algod_address)
+        self.inner = client
+        self.params_requests = 0
+
+    def algod_request(self, *args, **kwargs):
+        return self.inner.algod_request(*args, **kwargs)
+
+    def suggested_params(self, **kwargs):
+        self.params_requests += 1
+        return super().suggested_params(**kwargs)
+
+
+def setup(ledger: Ledger) -> Apps:
+    """Campaign with milestone 1 under validation, the calls are only built so its state does not matter."""
+    client = LocalAlgodClient(ledger)
+    creator, backer = get_accounts(client, 2)
+    campaign = CampaignClient.load(client, signer=creator.signer)
+    now = ledger.clock.now()
+    campaign.create(
+        campaign_goal=AMOUNT_BACKED,
+        funds_receiver=creator.address,
+        fund_start_date=now,
+        fund_end_date=now + 60,
+        reward_metadata="ipfs:/metadata/CID",
+        total_milestones=2,
+        funds_per_milestone=[AMOUNT_BACKED // 2, AMOUNT_BACKED // 2],
+    )
+    campaign.fund(2 * consts.algo)
+    backer_campaign = campaign.prepare(backer.signer)
+    backer_campaign.opt_in()
+    backer_campaign.back(AMOUNT_BACKED)
+    ledger.clock.advance(61)
+    campaign.claim_funds([creator.address])
+    milestone_app_id = campaign.submit_milestone(1, "ipfs:/milestone_1_metadata/CID", ledger.clock.now() + 3600).return_value
+    return Apps(campaign.app_id, milestone_app_id, creator, backer)
+
+
+def application_client_path(client: AlgodClient, apps: Apps) -> Callable[[str], AtomicTransactionComposer]:
+    cache = default_cache()
+    campaign = cache.application_client(client, CrowdfundingCampaignApp(), app_id=apps.campaign_id, signer=apps.creator.signer)
+    milestone = cache.application_client(client, MilestoneApprovalApp(), app_id=apps.milestone_app_id, signer=apps.creator.signer)
+    backer_campaign = campaign.prepare(signer=apps.backer.signer)
+    creator = apps.creator.address
+
+    def build(call: str) -> AtomicTransactionComposer:
+        atc = AtomicTransactionComposer()
+        sp = client.suggested_params()
+        match call:
+            case "fund":
+                funding = TransactionWithSigner(
+                    transaction.PaymentTxn(apps.backer.address, sp, campaign.app_addr, AMOUNT_BACKED), apps.backer.signer
+                )
+                backer_campaign.add_method_call(atc, CrowdfundingCampaignApp.fund, suggested_params=sp, funding=funding)
+            case "vote":
+                backer_campaign.add_method_call(
+                    atc, CrowdfundingCampaignApp.vote, suggested_params=pooled_params(sp, 1),
+                    milestone_app=apps.milestone_app_id, vote=1,
+                )
+            case "claim_funds":
+                campaign.add_method_call(
+                    atc, CrowdfundingCampaignApp.claim_funds, suggested_params=pooled_params(sp, 1), accounts=[creator],
+                    foreign_apps=[apps.milestone_app_id],
+                )
+            case "vote_settling":
+                milestone.add_method_call(atc, MilestoneApprovalApp.vote_settling, suggested_params=sp)
+        return atc
+
+    return build
+
+
+def artifacts_client_path(client: AlgodClient, apps: Apps) -> Callable[[str], AtomicTransactionComposer]:
+    campaign = CampaignClient.load(client, apps.campaign_id, apps.creator.signer)
+    milestone = MilestoneClient.load(client, apps.milestone_app_id, apps.creator.signer)
+    backer_campaign = campaign.prepare(apps.backer.signer)
+    creator = apps.creator.address
+
+    def build(call: str) -> AtomicTransactionComposer:
+        atc = AtomicTransactionComposer()
+        match call:
+            case "fund":
+                sp = client.suggested_params()
+                funding = TransactionWithSigner(
+                    transaction.PaymentTxn(apps.backer.address, sp, campaign.app_addr, AMOUNT_BACKED), apps.backer.signer
+                )
+                backer_campaign.add_method_call(atc, "fund", suggested_params=sp, funding=funding)
+            case "vote":
+                backer_campaign.add_method_call(atc, "vote", milestone_app=apps.milestone_app_id, vote=1)
+            case "claim_funds":
+                campaign.add_method_call(
+                    atc, "claim_funds", suggested_params=pooled_params(client.suggested_params(), 1),
+                    accounts=[creator], foreign_apps=[apps.milestone_app_id],
+                )
+            case "vote_settling":
+                milestone.add_method_call(atc, "vote_settling")
+        return atc
+
+    return build
+
+
+def call_plans_path(client: AlgodClient, apps: Apps) -> Callable[[str], AtomicTransactionComposer]:
+    params = SuggestedParamsCache(client)
+    campaign = CallPlans.from_client(CampaignClient.load(client, apps.campaign_id, apps.creator.signer), params)
+    milestone = CallPlans.from_client(MilestoneClient.load(client, apps.milestone_app_id, apps.creator.signer), params)
+    backer_campaign = campaign.prepare(apps.backer.signer)
+    creator = apps.creator.address
+
+    def build(call: str) -> AtomicTransactionComposer:
+        atc = AtomicTransactionComposer()
+        match call:
+            case "fund":
+                backer_campaign.add(atc, "fund", funding=backer_campaign.payment(AMOUNT_BACKED))
+            case "vote":
+                backer_campaign.add(atc, "vote", milestone_app=apps.milestone_app_id, vote=1)
+            case "claim_funds":
+                campaign.add(atc, "claim_funds", accounts=[creator], foreign_apps=[apps.milestone_app_id], inner_txns=1)
+            case "vote_settling":
+                milestone.add(atc, "vote_settling")
+        return atc
+
+    return build
+
+
+PATHS = {
+    "ApplicationClient": application_client_path,
+    "artifacts client": artifacts_client_path,
+    "call plans": call_plans_path,
+}
+
+
+def measure(algod: str, client: AlgodClient, apps: Apps, calls: int) -> list[BuildRun]:
+    runs = []
+    for path, make in PATHS.items():
+        counting = CountingAlgodClient(client)
+        build = make(counting, apps)
+        counting.params_requests = 0
+        txns = 0
+        start = time.perf_counter()
+        for i in range(calls):
+            txns += len(build(HOT_CALLS[i % len(HOT_CALLS)]).txn_list)
+        runs.append(BuildRun(algod, path, calls, txns, time.perf_counter() - start, counting.params_requests))
+    return runs
+
+
+def check(client: AlgodClient, apps: Apps) -> list[str]:
+    """Differences between the transactions of the call plans and of ATC.add_method_call, from the same params."""
+    sp = SuggestedParamsCache(client).get()
+    campaign = CampaignClient.load(client, apps.campaign_id, apps.creator.signer)
+    milestone = MilestoneClient.load(client, apps.milestone_app_id, apps.creator.signer)
+    backer_campaign = campaign.prepare(apps.backer.signer)
+
+    def funding():
+        return TransactionWithSigner(
+            transaction.PaymentTxn(apps.backer.address, sp, campaign.app_addr, AMOUNT_BACKED), apps.backer.signer
+        )
+
+    # (reference client, method, arguments, inner transactions paid)
+    cases = [
+        (backer_campaign, "fund", lambda: {"funding": funding()}, 0),
+        (backer_campaign, "vote", lambda: {"milestone_app": apps.milestone_app_id, "vote": 1}, 1),
+        (campaign, "claim_funds", lambda: {"accounts": [apps.creator.address], "foreign_apps": [apps.milestone_app_id]}, 1),
+        (milestone, "vote_settling", lambda: {}, 0),
+    ]
+    errors = []
+    for app_client, method, kwargs, inner_txns in cases:
+        expected = app_client.add_method_call(
+            AtomicTransactionComposer(), method, suggested_params=pooled_params(sp, inner_txns), **kwargs()
+        ).build_group()
+        plans = CallPlans.from_client(app_client)
+        actual = plans.add(AtomicTransactionComposer(), method, sp=sp, inner_txns=inner_txns, **kwargs()).build_group()
+        if len(expected) != len(actual):
+            errors.append(f"{method}: {len(expected)} transactions, {len(actual)} with the call plans")
+        for want, got in zip(expected, actual):
+            if encoding.msgpack_encode(want.txn) != encoding.msgpack_encode(got.txn):
+                errors.append(f"{method}: {want.txn.dictify()} != {got.txn.dictify()}")
+    return errors
+
+
+def report(runs: list[BuildRun]):
+    print(f"{'algod':<12}{'path':<20}{'calls/s':>10}{'txns/s':>10}{'speedup':>9}{'params requests':>17}")
+    baseline = {}
+    for run in runs:
+        baseline.setdefault(run.algod, run.rate)
+        print(f"{run.algod:<12}{run.path:<20}{run.rate:>10.0f}{run.txns / run.seconds:>10.0f}"
+              f"{run.rate / baseline[run.algod]:>8.1f}x{run.params_requests:>17}")
+
+
+def main(argv: list[str] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--calls", type=int, default=2000, help="calls built per path")
+    parser.add_argument("--latency", type=float, default=0.001, help="seconds added to every request over HTTP")
+    args = parser.parse_args(argv)
+
+    ledger = Ledger()
+    apps = setup(ledger)
+    local = LocalAlgodClient(ledger)
+    errors = check(local, apps)
+    runs = measure("in-process", local, apps, args.calls)
+    with LedgerServer(("127.0.0.1", 0), ledger, latency=args.latency) as server:
+        runs += measure("http", AlgodClient("", server.url), apps, args.calls)
+    print(f"{args.calls} calls per path ({', '.join(HOT_CALLS)} in turn), latency over HTTP {args.latency * 1000:.1f}ms\n")
+    report(runs)
+    for error in errors[:10]:
+        print(f"  {error}")
+    print(f"\nsame transactions as ATC.add_method_call: {'ok' if not errors else 'FAILED'}")
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,119 @@
+"""
+Campaign deployment throughput: direct create transactions against CampaignFactoryApp.
+
+Deploys `campaigns` campaigns on a LedgerServer (the local ledger behind
+algod's REST API, with simulated latency and block time) twice:
+- direct: one ApplicationClient.create per campaign, as main_crowdfunding.py does
+  (programs from the compile cache, each create waits for its confirmation);
+- factory: CampaignDeployer, 8 create_campaign calls per atomic group, groups
+  submitted back to back.
+Reports campaigns per second, transactions, bytes submitted and fees per campaign.
+
+    python -m benchmarks.campaign_deploy
+    python -m benchmarks.campaign_deploy --campaigns 64 --latency 0.05 --block-time 1
+"""
+import argparse
+import base64
+import sys
+import time
+from dataclasses import dataclass
+
+from algosdk import encoding
+from algosdk.v2client.algod import AlgodClient
+from beaker import consts
+
+from client.campaign_factory import CampaignDeployer, CampaignSpec
+from contracts.compile_cache import default_cache
+from contracts.crowdfunding.campaignFactory import CampaignFactoryApp
+from contracts.crowdfunding.crowdfundingCampaign import CrowdfundingCampaignApp
+from localnet.algod import LocalAlgodClient, get_accounts
+from localnet.ledger import Ledger, MIN_BALANCE
+from localnet.server import LedgerServer
+
+
+@dataclass
+class DeployRun:
+    name: str
+    campaigns: int
+    seconds: float
+    txids: list[str]
+
+    @property
+    def rate(self) -> float:
+        return self.campaigns / self.seconds
+
+
+def specs(creator: str, now: int, n: int) -> list[CampaignSpec]:
+    return [
+        CampaignSpec(10 * consts.algo, creator, now, now + 3600, f"ipfs:/metadata/CID{i}", [7 * consts.algo, 3 * consts.algo])
+        for i in range(n)
+    ]
+
+
+def deploy_direct(client: AlgodClient, creator, campaign_specs: list[CampaignSpec]) -> DeployRun:
+    app_client = default_cache().application_client(client, CrowdfundingCampaignApp(), signer=creator.signer)
+    txids = []
+    start = time.perf_counter()
+    for spec in campaign_specs:
+        app_client.app_id = 0
+        _, _, txid = app_client.create(**spec.create_args())
+        txids.append(txid)
+    return DeployRun("direct", len(campaign_specs), time.perf_counter() - start, txids)
+
+
+def deploy_factory(client: AlgodClient, creator, campaign_specs: list[CampaignSpec]) -> DeployRun:
+    factory_client = default_cache().application_client(client, CampaignFactoryApp(), signer=creator.signer)
+    factory_client.create()
+    factory_client.fund(MIN_BALANCE)
+    factory_client.opt_in()
+    deployer = CampaignDeployer(factory_client)
+
+    start = time.perf_counter()
+    results = deployer.deploy(campaign_specs)
+    elapsed = time.perf_counter() - start
+    errors = [r.error for r in results if not r.ok]
+    if errors:
+        raise RuntimeError(f"factory deploy failed: {errors[0]}")
+    assert deployer.campaigns_of(creator.address) == [app_id for r in results for app_id in r.app_ids]
+    txids = [txid for r in results for txid in r.txids]
+    return DeployRun("factory", len(campaign_specs), elapsed, txids)
+
+
+def report(runs: list[DeployRun], ledger: Ledger):
+    print(f"{'path':<10}{'campaigns':>11}{'seconds':>10}{'campaigns/s':>13}{'txns':>7}{'bytes':>9}{'fees (Algo)':>13}")
+    for run in runs:
+        calls = [ledger.txns[txid] for txid in run.txids]
+        # the deposit payments are in the groups of the create_campaign calls
+        groups = {txn.group for txn in calls if txn.group}
+        txns = calls + [txn for txn in ledger.txns.values() if txn.group in groups and txn.type == "pay"]
+        size = sum(len(base64.b64decode(encoding.msgpack_encode(txn.signed))) for txn in txns)
+        fees = sum(txn.fee for txn in txns)
+        per = run.campaigns
+        print(f"{run.name:<10}{run.campaigns:>11}{run.seconds:>10.2f}{run.rate:>13.1f}{len(txns) / per:>7.1f}"
+              f"{size / per:>9.0f}{fees / per / consts.algo:>13.4f}")
+    print("\n(txns, bytes and fees per campaign)")
+
+
+def main(argv: list[str] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--campaigns", type=int, default=32, help="campaigns deployed by each path")
+    parser.add_argument("--latency", type=float, default=0.02, help="seconds added to every algod request")
+    parser.add_argument("--block-time", type=float, default=0.5, help="seconds between blocks")
+    args = parser.parse_args(argv)
+
+    ledger = Ledger()
+    (creator,) = get_accounts(LocalAlgodClient(ledger), 1, 1_000_000 * consts.algo)
+    now = ledger.clock.now()
+    with LedgerServer(("127.0.0.1", 0), ledger, latency=args.latency, block_time=args.block_time) as server:
+        print(f"{args.campaigns} campaigns per path, latency {args.latency * 1000:.0f}ms, block time {args.block_time}s\n")
+        client = AlgodClient("", server.url)
+        runs = [
+            deploy_direct(client, creator, specs(creator.address, now, args.campaigns)),
+            deploy_factory(client, creator, specs(creator.address, now, args.campaigns)),
+        ]
+    report(runs, ledger)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
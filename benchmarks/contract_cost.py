@@ -0,0 +1,289 @@
+"""
+Opcode cost and program size benchmark of the crowdfunding contracts.
+
+Runs the campaign and milestone approval flows on the in-process ledger
+(no sandbox needed) and records, for every method, the opcodes executed on
+representative inputs, together with the approval/clear program sizes and the
+declared state schemas. The measurements are compared against a JSON baseline
+in build/ and the run fails if any metric grows by more than `threshold`.
+
+    python -m benchmarks.contract_cost              # compare with the baseline
+    python -m benchmarks.contract_cost --update     # (re)write the baseline
+    python -m benchmarks.contract_cost --threshold 0.1
+"""
+import argparse
+import json
+import os
+import sys
+from typing import Any
+
+from algosdk.atomic_transaction_composer import TransactionWithSigner
+from algosdk.future import transaction
+from beaker import consts
+from beaker.client import ApplicationClient
+
+from contracts.compile_cache import CompileCache, default_cache
+from contracts.crowdfunding.crowdfundingCampaign import CrowdfundingCampaignApp, MAX_REFUNDS_PER_CALL
+from contracts.crowdfunding.milestoneApproval import MilestoneApprovalApp
+from localnet.algod import LocalAlgodClient, get_accounts
+from localnet.ledger import APP_BUDGET, MAX_APP_PROGRAM_LEN
+
+DEFAULT_BASELINE = "./build/contract_cost.json"
+DEFAULT_THRESHOLD = 0.05 # 5%
+
+
+def measure(cache: CompileCache = None, campaign_app: type = CrowdfundingCampaignApp) -> dict[str, Any]:
+    """
+    Run the contract flows on a fresh local ledger and collect the metrics.
+
+    `campaign_app`: CrowdfundingCampaignApp or a subclass with the same methods (PackedCrowdfundingCampaignApp),
+    its costs are reported under CrowdfundingCampaignApp.<method>.
+    """
+    cache = cache if cache is not None else default_cache()
+    client = LocalAlgodClient()
+    clock = client.clock
+    creator, backer, voter = get_accounts(client, 3)
+
+    costs: dict[str, int] = {}
+
+    def cost(txid: str) -> int:
+        return client.ledger.txns[txid].cost
+
+    # ---- CrowdfundingCampaignApp
+    app_client = cache.application_client(client, campaign_app(), signer=creator.signer)
+    now = clock.now()
+    _, app_addr, txid = app_client.create(
+        campaign_goal=10 * consts.algo,
+        funds_receiver=creator.address,
+        fund_start_date=now,
+        fund_end_date=now + 60,
+        reward_metadata="ipfs:/metadata/CID",
+        total_milestones=4,
+        funds_per_milestone=[4 * consts.algo, 3 * consts.algo, 2 * consts.algo, 1 * consts.algo],
+    )
+    # milestone payouts split between the creator and the voter account
+    payout_receivers = [creator.address, voter.address]
+    result = app_client.call(CrowdfundingCampaignApp.set_payout_split, receivers=payout_receivers, shares=[7000, 3000])
+    costs["CrowdfundingCampaignApp.set_payout_split"] = cost(result.tx_id)
+    costs["CrowdfundingCampaignApp.create"] = cost(txid)
+
+    backer_client = app_client.prepare(signer=backer.signer)
+    costs["CrowdfundingCampaignApp.opt_in"] = cost(backer_client.opt_in())
+
+    sp = client.suggested_params()
+    result = backer_client.call(
+        CrowdfundingCampaignApp.fund,
+        funding=TransactionWithSigner(
+            txn=transaction.PaymentTxn(backer.address, sp, app_addr, 15 * consts.algo),
+            signer=backer.signer,
+        ),
+    )
+    costs["CrowdfundingCampaignApp.fund"] = cost(result.tx_id)
+
+    # claim_funds and submit_milestone pay the fee of their inner transactions (one per payout receiver)
+    sp = client.suggested_params()
+    sp.fee = sp.min_fee * (1 + len(payout_receivers))
+    sp.flat_fee = True
+
+    clock.advance(61)
+    result = app_client.call(CrowdfundingCampaignApp.claim_funds, accounts=payout_receivers, suggested_params=sp)
+    costs["CrowdfundingCampaignApp.claim_funds"] = cost(result.tx_id)
+
+    # read-only: evaluated with dryrun, nothing is committed
+    result = app_client.call(CrowdfundingCampaignApp.get_milestone_funds, milestone=1)
+    costs["CrowdfundingCampaignApp.get_milestone_funds"] = result.tx_info["budget-consumed"]
+
+    result = app_client.call(
+        CrowdfundingCampaignApp.submit_milestone,
+        milestone_to_approve=1,
+        milestone_metadata="ipfs:/milestone_1_metadata/CID",
+        vote_end_date=clock.now() + 60,
+        suggested_params=sp,
+    )
+    txn = client.ledger.txns[result.tx_id]
+    costs["CrowdfundingCampaignApp.submit_milestone"] = txn.cost
+    # the milestone app is created by the inner transaction of submit_milestone
+    costs["MilestoneApprovalApp.create"] = txn.inner_txns[0].cost
+
+    # ---- MilestoneApprovalApp
+    milestone_client = ApplicationClient(client, MilestoneApprovalApp(), app_id=result.return_value, signer=creator.signer)
+    # opt-in free vote of a backer, forwarded to the milestone app by an inner call
+    result = backer_client.call(CrowdfundingCampaignApp.vote, milestone_app=milestone_client.app_id, vote=1, suggested_params=sp)
+    txn = client.ledger.txns[result.tx_id]
+    costs["CrowdfundingCampaignApp.vote"] = txn.cost
+    costs["MilestoneApprovalApp.cast_vote"] = txn.inner_txns[0].cost
+    clock.advance(61)
+    result = milestone_client.call(MilestoneApprovalApp.vote_settling)
+    costs["MilestoneApprovalApp.vote_settling"] = cost(result.tx_id)
+
+    def inner_fee_params(inner_txns: int = 1) -> transaction.SuggestedParams:
+        # fresh for every call, the same call twice would be the same transaction
+        sp = client.suggested_params()
+        sp.fee = sp.min_fee * (1 + inner_txns)
+        sp.flat_fee = True
+        return sp
+
+    # approved milestone: its tranche is paid to the receivers
+    result = app_client.call(
+        CrowdfundingCampaignApp.claim_funds,
+        accounts=payout_receivers,
+        foreign_apps=[milestone_client.app_id],
+        suggested_params=inner_fee_params(len(payout_receivers)),
+    )
+    costs["CrowdfundingCampaignApp.claim_funds milestone"] = cost(result.tx_id)
+
+    # reusable milestone app: created once, reset by the next submit_milestone
+    result = app_client.call(CrowdfundingCampaignApp.create_reusable_milestone_app, suggested_params=inner_fee_params())
+    costs["CrowdfundingCampaignApp.create_reusable_milestone_app"] = cost(result.tx_id)
+    reusable_app_id = result.return_value
+    result = app_client.call(
+        CrowdfundingCampaignApp.submit_milestone,
+        milestone_to_approve=2,
+        milestone_metadata="ipfs:/milestone_2_metadata/CID",
+        vote_end_date=clock.now() + 60,
+        foreign_apps=[reusable_app_id],
+        suggested_params=inner_fee_params(),
+    )
+    costs["MilestoneApprovalApp.reset"] = client.ledger.txns[result.tx_id].inner_txns[0].cost
+    # the votes of the milestone apps owned by the campaign are cast through it
+    backer_client.call(CrowdfundingCampaignApp.vote, milestone_app=reusable_app_id, vote=1, suggested_params=inner_fee_params())
+    milestone_client.app_id = reusable_app_id
+    clock.advance(61)
+    milestone_client.call(MilestoneApprovalApp.vote_settling)
+    app_client.call(
+        CrowdfundingCampaignApp.claim_funds,
+        accounts=payout_receivers,
+        foreign_apps=[reusable_app_id],
+        suggested_params=inner_fee_params(len(payout_receivers)),
+    )
+
+    # standalone milestone app, created by its creator: its votes are opt_in ballots
+    standalone_client = ApplicationClient(client, MilestoneApprovalApp(), signer=creator.signer)
+    standalone_client.create(
+        creator=creator.address,
+        crowdfunding_address=app_addr,
+        milestone_to_approve=1,
+        vote_end_date=clock.now() + 60,
+        milestone_metadata="ipfs:/milestone_1_metadata/CID",
+    )
+    costs["MilestoneApprovalApp.opt_in"] = cost(standalone_client.prepare(signer=voter.signer).opt_in(vote=1))
+
+    # refund of 4 backers (the max per call) by anyone, after a campaign missing its goal
+    refund_backers = get_accounts(client, MAX_REFUNDS_PER_CALL)
+    app_client = cache.application_client(client, campaign_app(), signer=creator.signer)
+    now = clock.now()
+    _, app_addr, _ = app_client.create(
+        campaign_goal=100 * consts.algo,
+        funds_receiver=creator.address,
+        fund_start_date=now,
+        fund_end_date=now + 60,
+        reward_metadata="ipfs:/metadata/CID",
+        total_milestones=2,
+        funds_per_milestone=[70 * consts.algo, 30 * consts.algo],
+    )
+    app_client.fund(consts.algo)
+    for refund_backer in refund_backers:
+        refund_client = app_client.prepare(signer=refund_backer.signer)
+        refund_client.opt_in()
+        sp = client.suggested_params()
+        refund_client.call(
+            CrowdfundingCampaignApp.fund,
+            funding=TransactionWithSigner(
+                txn=transaction.PaymentTxn(refund_backer.address, sp, app_addr, 10 * consts.algo),
+                signer=refund_backer.signer,
+            ),
+        )
+    clock.advance(61)
+    sp = client.suggested_params()
+    sp.fee = sp.min_fee * (1 + MAX_REFUNDS_PER_CALL)
+    sp.flat_fee = True
+    result = app_client.call(
+        CrowdfundingCampaignApp.refund, accounts=[b.address for b in refund_backers], suggested_params=sp
+    )
+    costs["CrowdfundingCampaignApp.refund"] = cost(result.tx_id)
+
+    programs = {}
+    for app in (campaign_app(), MilestoneApprovalApp()):
+        compiled = cache.build(app, client)
+        programs[type(app).__name__] = {
+            "approval_size": len(compiled.approval.binary),
+            "clear_size": len(compiled.clear.binary),
+            "global_num_uints": app.app_state.schema().num_uints,
+            "global_num_byte_slices": app.app_state.schema().num_byte_slices,
+            "local_num_uints": app.acct_state.schema().num_uints,
+            "local_num_byte_slices": app.acct_state.schema().num_byte_slices,
+        }
+
+    return {"costs": costs, "programs": programs}
+
+
+def flatten(metrics: dict[str, Any]) -> dict[str, int]:
+    """{"costs": {"A.m": 1}, "programs": {"A": {"x": 2}}} -> {"cost A.m": 1, "A x": 2}"""
+    flat = {f"cost {name}": value for name, value in metrics["costs"].items()}
+    for app, values in metrics["programs"].items():
+        for name, value in values.items():
+            flat[f"{app} {name}"] = value
+    return flat
+
+
+def compare(baseline: dict[str, Any], current: dict[str, Any], threshold: float) -> list[str]:
+    """Metrics of `current` that exceed the baseline value by more than `threshold` (relative)."""
+    old, new = flatten(baseline), flatten(current)
+    regressions = []
+    for name, value in new.items():
+        if name not in old:
+            continue
+        limit = old[name] * (1 + threshold)
+        if value > limit and value > old[name]:
+            regressions.append(f"{name}: {old[name]} -> {value} (+{value - old[name]})")
+    return regressions
+
+
+def report(metrics: dict[str, Any], baseline: dict[str, Any] = None):
+    old = flatten(baseline) if baseline else {}
+    print(f"{'method':<50}{'opcodes':>8}{'budget %':>10}{'baseline':>10}")
+    for name, value in metrics["costs"].items():
+        print(f"{name:<50}{value:>8}{100 * value / APP_BUDGET:>9.1f}%{old.get('cost ' + name, '-'):>10}")
+    print()
+    print(f"{'program':<50}{'value':>8}{'limit %':>10}{'baseline':>10}")
+    for app, values in metrics["programs"].items():
+        for name, value in values.items():
+            key = f"{app} {name}"
+            pct = f"{100 * value / MAX_APP_PROGRAM_LEN:>9.1f}%" if name.endswith("_size") else f"{'':>10}"
+            print(f"{key:<50}{value:>8}{pct}{old.get(key, '-'):>10}")
+
+
+def main(argv: list[str] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="baseline JSON file")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="allowed relative increase (0.05 = 5%%)")
+    parser.add_argument("--update", action="store_true", help="write the current measurements as the new baseline")
+    args = parser.parse_args(argv)
+
+    metrics = measure()
+    baseline = None
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    report(metrics, baseline)
+
+    if baseline is None or args.update:
+        os.makedirs(os.path.dirname(os.path.abspath(args.baseline)), exist_ok=True)
+        with open(args.baseline, "w") as f:
+            json.dump(metrics, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"\nBaseline written to {args.baseline}")
+        return 0
+
+    regressions = compare(baseline, metrics, args.threshold)
+    if regressions:
+        print(f"\nRegressions over {args.threshold:.0%}:")
+        for line in regressions:
+            print(f"  {line}")
+        return 1
+    print(f"\nNo regression over {args.threshold:.0%}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
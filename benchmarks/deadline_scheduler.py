@@ -0,0 +1,285 @@
+"""
+Deadline scheduler: claim_funds and vote_settling fired by DeadlineScheduler, against polling every campaign.
+
+On the in-process ledger, a block is committed every `block_time` seconds of
+the virtual clock. One creator runs `campaigns` campaigns of 2 milestones,
+half created before the scheduler starts, half through CampaignFactoryApp
+while it runs (indexed from their CampaignCreated event). Their funding
+windows end `stagger` seconds apart, one in `fail_every` is not funded to
+its goal. Once the first milestone of a campaign is paid, the creator submits
+the second and a backer approves it. DeadlineScheduler (client/
+deadline_scheduler.py) ticks after every block and fires every claim_funds
+and vote_settling; once the factory campaigns are indexed, it is restarted
+from its saved cursor alone (without the campaign and factory ids). A
+polling scheduler would read the state of every live campaign (and of its
+milestone app under vote) each round, the reads driving the creator here.
+
+Checks that every campaign ends across the restart, that every call is fired
+by the first tick reading the block making it valid and confirmed in the next
+block, and reports the algod requests per round of both schedulers.
+
+    python -m benchmarks.deadline_scheduler
+    python -m benchmarks.deadline_scheduler --campaigns 80 --block-time 5 --stagger 1
+"""
+import argparse
+import bisect
+import os
+import sys
+import tempfile
+import time
+from collections import Counter
+from dataclasses import dataclass
+
+from algosdk import account
+from algosdk.atomic_transaction_composer import AccountTransactionSigner
+from beaker import consts
+
+from client.artifacts import AppArtifacts, CampaignClient
+from client.campaign_factory import CampaignDeployer, CampaignSpec
+from client.deadline_scheduler import Deadline, DeadlineScheduler, ScheduledCall, SchedulerStats
+from client.event_stream import Cursor
+from contracts.compile_cache import default_cache
+from contracts.crowdfunding.campaignFactory import CampaignFactoryApp
+from localnet.algod import LocalAlgodClient, get_accounts
+from localnet.clock import VirtualClock
+from localnet.ledger import Ledger, MIN_BALANCE
+
+AMOUNT_BACKED = 10 * consts.algo
+FUND_WINDOW = 60
+VOTE_WINDOW = 30
+FACTORY_ROUND = 3 # round of the scheduler at which the factory campaigns are created
+RESTART_ROUND = FACTORY_ROUND + 2 # from this round, the scheduler is restarted once no call is in flight
+
+
+class CountingAlgodClient(LocalAlgodClient):
+    """LocalAlgodClient counting its algod requests."""
+
+    def __init__(self, ledger: Ledger):
+        super().__init__(ledger)
+        self.requests = 0
+
+    def algod_request(self, *args, **kwargs):
+        self.requests += 1
+        return super().algod_request(*args, **kwargs)
+
+
+@dataclass
+class SchedulerRun:
+    campaigns: int
+    rounds: int
+    seconds: float
+    calls: list[ScheduledCall]
+    lags: list[int] # ticks reading a block in which the call is valid, up to the one firing it
+    stats: SchedulerStats
+    failures: list[tuple[Deadline, str]]
+    scheduler_requests: int
+    polling_requests: int
+    unfinished: list[int] # campaigns not ended
+    restart_round: int # 0 if the scheduler was never restarted
+
+
+class Campaigns:
+    """The creator and backers of the campaigns: creates, backs, submits the second milestone and approves it."""
+
+    def __init__(self, client: LocalAlgodClient, creator, fail_every: int):
+        self.client = client
+        self.ledger = client.ledger
+        self.creator = creator
+        self.fail_every = fail_every
+        self.artifacts = AppArtifacts.load(CampaignClient.ARTIFACTS, client=client)
+        self.backers: dict[int, CampaignClient] = {}
+        self.created = 0
+
+    def spec(self, fund_end_date: int) -> CampaignSpec:
+        return CampaignSpec(
+            campaign_goal=2 * AMOUNT_BACKED,
+            funds_receiver=self.creator.address,
+            fund_start_date=self.ledger.clock.now(),
+            fund_end_date=fund_end_date,
+            reward_metadata="ipfs:/metadata/CID",
+            funds_per_milestone=[AMOUNT_BACKED, AMOUNT_BACKED],
+        )
+
+    def create(self, specs: list[CampaignSpec]) -> list[int]:
+        app_ids = []
+        for spec in specs:
+            campaign = CampaignClient(self.client, self.artifacts, signer=self.creator.signer)
+            campaign.create(**spec.create_args())
+            app_ids.append(campaign.app_id)
+        return self.back(app_ids)
+
+    def deploy(self, deployer: CampaignDeployer, specs: list[CampaignSpec]) -> list[int]:
+        results = deployer.deploy(specs)
+        errors = [r.error for r in results if not r.ok]
+        if errors:
+            raise RuntimeError(f"factory deploy failed: {errors[0]}")
+        return self.back([app_id for r in results for app_id in r.app_ids])
+
+    def back(self, app_ids: list[int]) -> list[int]:
+        """Fund the app accounts (min balance of the milestone app) and back each campaign, short of its goal if failing."""
+        for app_id in app_ids:
+            CampaignClient(self.client, self.artifacts, app_id, self.creator.signer).fund(2 * consts.algo)
+            self.created += 1
+            amount = AMOUNT_BACKED if self.created % self.fail_every == 0 else 2 * AMOUNT_BACKED
+            private_key, address = account.generate_account()
+            self.ledger.fund(address, amount + consts.algo)
+            backer = CampaignClient(self.client, self.artifacts, app_id, AccountTransactionSigner(private_key))
+            backer.opt_in()
+            backer.back(amount)
+            self.backers[app_id] = backer
+        return app_ids
+
+    def submit_and_approve(self, app_id: int):
+        """Submit milestone 1, approved by the backer."""
+        campaign = CampaignClient(self.client, self.artifacts, app_id, self.creator.signer)
+        milestone_app_id = campaign.submit_milestone(
+            1, "ipfs:/milestone_1_metadata/CID", self.ledger.clock.now() + VOTE_WINDOW
+        ).return_value
+        self.backers[app_id].vote(milestone_app_id, approve=True)
+
+
+def poll(client: CountingAlgodClient, artifacts: AppArtifacts, live: set[int]) -> dict[int, int]:
+    """What a polling scheduler reads every round: campaign_state of every live campaign, and its milestone app under vote."""
+    client.status()
+    states = {}
+    for app_id in live:
+        state = CampaignClient(client, artifacts, app_id).get_application_state()
+        states[app_id] = state["campaign_state"]
+        if state["campaign_state"] == 2:
+            client.application_info(state["milestone_approval_app_id"])
+    return states
+
+
+def restart(scheduler: DeadlineScheduler, signers: dict) -> DeadlineScheduler:
+    """New scheduler resuming from the cursor saved by `scheduler`, its stats and failures carried on."""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "scheduler.cursor")
+        scheduler.stream.cursor.save(path)
+        restarted = DeadlineScheduler(scheduler.client, signers, cursor=Cursor.load(path))
+    restarted.stats = scheduler.stats
+    restarted.failures = scheduler.failures
+    return restarted
+
+
+def trigger_round(timestamps: list[int], call: ScheduledCall) -> int:
+    """First block in which the call is valid: its triggering event, or the first block past its due timestamp."""
+    if call.deadline.trigger_round:
+        return call.deadline.trigger_round
+    return bisect.bisect_right(timestamps, call.deadline.due)
+
+
+def run(num_campaigns: int, block_time: int, stagger: int, fail_every: int, max_rounds: int) -> SchedulerRun:
+    ledger = Ledger(VirtualClock())
+    client = LocalAlgodClient(ledger)
+    (creator,) = get_accounts(client, 1, 10_000 * consts.algo)
+    campaigns = Campaigns(client, creator, fail_every)
+
+    factory_client = default_cache().application_client(client, CampaignFactoryApp(), signer=creator.signer)
+    factory_client.create()
+    factory_client.fund(MIN_BALANCE)
+    factory_client.opt_in()
+    deployer = CampaignDeployer(factory_client)
+
+    direct = num_campaigns // 2
+    first_end = ledger.clock.now() + FUND_WINDOW
+    live = set(campaigns.create([campaigns.spec(first_end + i * stagger) for i in range(direct)]))
+
+    ledger.auto_commit = False # blocks committed every block_time from now on, not per group
+    scheduler_client = CountingAlgodClient(ledger)
+    polling_client = CountingAlgodClient(ledger)
+    start = time.perf_counter()
+    signers = {creator.address: creator.signer}
+    scheduler = DeadlineScheduler(scheduler_client, signers, live, factory_ids=[factory_client.app_id])
+    restart_round = 0
+    calls = []
+    ticks = [] # last round read by each tick
+    submitted = set()
+    rounds = 0
+    while rounds < max_rounds and (live or scheduler.pending):
+        rounds += 1
+        ledger.clock.advance(block_time)
+        client.status_after_block(ledger.round) # commits the calls sent at the previous tick
+        calls += scheduler.tick()
+        ticks.append(scheduler.round)
+        scheduler_client.requests += 1 # the status after block request of DeadlineScheduler.run
+        if not restart_round and rounds >= RESTART_ROUND and scheduler.pending == len(scheduler.queue):
+            scheduler = restart(scheduler, signers)
+            restart_round = scheduler.round
+
+        if rounds == FACTORY_ROUND:
+            end = ledger.clock.now() + FUND_WINDOW
+            live |= set(campaigns.deploy(
+                deployer, [campaigns.spec(end + i * stagger) for i in range(num_campaigns - direct)]
+            ))
+        for app_id, state in poll(polling_client, campaigns.artifacts, live).items():
+            if state == 3:
+                live.discard(app_id)
+            elif state == 1 and app_id not in submitted:
+                submitted.add(app_id)
+                campaigns.submit_and_approve(app_id)
+    elapsed = time.perf_counter() - start
+
+    timestamps = [block.timestamp for block in ledger.blocks]
+    lags = [
+        bisect.bisect_right(ticks, call.fired_round) - bisect.bisect_left(ticks, trigger_round(timestamps, call))
+        for call in calls
+    ]
+    # the polling scheduler sends the same calls: a suggested params request per firing round, a request per call
+    polling_requests = polling_client.requests + len({call.fired_round for call in calls}) + scheduler.stats.fired
+    return SchedulerRun(
+        num_campaigns, rounds, elapsed, calls, lags, scheduler.stats, scheduler.failures,
+        scheduler_client.requests, polling_requests, sorted(live), restart_round,
+    )
+
+
+def report(result: SchedulerRun, block_time: int):
+    stats = result.stats
+    per_action = Counter(call.deadline.action for call in result.calls)
+    per_round = Counter(call.fired_round for call in result.calls)
+    print(f"{result.campaigns} campaigns, {result.rounds} rounds of {block_time}s, {result.seconds:.2f}s")
+    print(f"scheduler restarted from its cursor at round {result.restart_round}\n")
+    print(f"{'calls confirmed':<36}{stats.confirmed:>10}")
+    for action, count in sorted(per_action.items()):
+        print(f"{'  ' + action:<36}{count:>10}")
+    print(f"{'calls refired':<36}{stats.refired:>10}")
+    print(f"{'calls failed':<36}{stats.failed:>10}")
+    print(f"{'rounds firing calls':<36}{len(per_round):>10}")
+    print(f"{'calls per firing round (max)':<36}{max(per_round.values(), default=0):>10}")
+    print(f"{'ticks from valid to fired (max)':<36}{max(result.lags, default=0):>10}")
+    print(f"{'rounds from fired to confirmed (max)':<36}{max(c.confirmed_round - c.fired_round for c in result.calls):>10}")
+    print()
+    print(f"{'scheduler':<36}{'requests':>10}{'per round':>12}")
+    for name, requests in (("deadline scheduler", result.scheduler_requests), ("polling every campaign", result.polling_requests)):
+        print(f"{name:<36}{requests:>10}{requests / result.rounds:>12.1f}")
+    print(f"\nof which global state reads of the deadline scheduler: {stats.state_reads}")
+
+
+def main(argv: list[str] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--campaigns", type=int, default=40, help="campaigns, half of them created through the factory (an account creates 50 apps at most)")
+    parser.add_argument("--block-time", type=int, default=5, help="seconds of the virtual clock between blocks")
+    parser.add_argument("--stagger", type=int, default=2, help="seconds between the fund_end_date of the campaigns")
+    parser.add_argument("--fail-every", type=int, default=4, help="campaigns not reaching their goal, one in every")
+    parser.add_argument("--max-rounds", type=int, default=1000, help="rounds before giving up")
+    args = parser.parse_args(argv)
+
+    result = run(args.campaigns, args.block_time, args.stagger, args.fail_every, args.max_rounds)
+    report(result, args.block_time)
+    errors = [f"campaign {app_id} not ended" for app_id in result.unfinished]
+    if not result.restart_round:
+        errors.append("scheduler never restarted: a call was always in flight")
+    errors += [
+        f"{call.deadline.action} of app {call.deadline.app_id} fired at round {call.fired_round}, tick {lag} "
+        f"since it was valid, confirmed at round {call.confirmed_round}"
+        for call, lag in zip(result.calls, result.lags) if lag != 1 or call.confirmed_round != call.fired_round + 1
+    ]
+    errors += [f"{deadline.action} of app {deadline.app_id} failed: {error}" for deadline, error in result.failures]
+    for error in errors[:10]:
+        print(f"  {error}")
+    print(f"\nevery campaign ended across the restart, every call fired at once and confirmed in the next block: "
+          f"{'ok' if not errors else 'FAILED'}")
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
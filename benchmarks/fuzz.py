@@ -0,0 +1,593 @@
+"""
+Property-based fuzzer of the CrowdfundingCampaignApp state machine.
+
+Generates random sequences of fund, claim_funds, submit_milestone, votes,
+vote settlements, refunds and time jumps against random campaigns (goal,
+milestone schedule, payout split, backers), and runs them on the in-process
+ledger, straight through Ledger.evaluate (no signatures, no msgpack, no
+algod client). Every run starts from a snapshot of the funded accounts.
+After every accepted step the invariants below are checked against the
+ledger, rejected steps are expected and only counted:
+- funds conservation: the app balance is its reserve plus the funds backed
+  minus the payouts and refunds, the backers' amounts plus the refunds are
+  the collected funds;
+- payouts match milestones: the payouts are the tranches of the milestones
+  reached, only after a successful funding, refunds only after an
+  unsuccessful one;
+- monotonic milestones: reached_milestone never decreases, moves by at most
+  one milestone per call, and campaign_state only takes the transitions of
+  the state machine;
+- no double funding: a backer funds once, total_backers counts the backers;
+- vote weights: the votes of a milestone do not exceed the collected funds.
+
+With --packed the sequences run on PackedCrowdfundingCampaignApp, its
+packed global state unpacked into the same fields before every check.
+
+The seeds are split across a process pool. A failing sequence is shrunk
+(steps removed, then simplified) while it still breaks the same invariant,
+and printed with the seed reproducing it.
+
+    python -m benchmarks.fuzz
+    python -m benchmarks.fuzz --sequences 100000 --workers 8 --length 32
+    python -m benchmarks.fuzz --replay 1234
+    python -m benchmarks.fuzz --packed
+"""
+import argparse
+import base64
+import functools
+import hashlib
+import multiprocessing
+import os
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Optional
+
+from algosdk import abi, encoding
+from algosdk.future.transaction import OnComplete
+from algosdk.logic import get_application_address
+from beaker import consts
+
+from contracts.compile_cache import default_cache
+from contracts.crowdfunding.crowdfundingCampaign import (
+    CrowdfundingCampaignApp,
+    MAX_PAYOUT_RECEIVERS,
+    MAX_REFUNDS_PER_CALL,
+    SHARES_DENOMINATOR,
+)
+from contracts.crowdfunding.milestoneApproval import MilestoneApprovalApp
+from contracts.crowdfunding.packed_state import packed_layouts, unpack
+from contracts.crowdfunding.packedCrowdfundingCampaign import PackedCrowdfundingCampaignApp
+from localnet.algod import LocalAlgodClient
+from localnet.clock import VirtualClock
+from localnet.ledger import Ledger, LedgerError, LedgerSnapshot, MIN_TXN_FEE, Txn
+
+START = 1_700_000_000
+FUND_WINDOW = 600
+VOTE_WINDOW = 300
+MAX_BACKERS = 6
+MAX_CO_RECEIVERS = MAX_PAYOUT_RECEIVERS - 1
+AMOUNTS = (5, 10, 25) # Algos, below the 10 Algos minimum of fund too
+TIME_JUMPS = (1, 60, FUND_WINDOW // 2, FUND_WINDOW + 1, VOTE_WINDOW + 1)
+RESERVE = 5 * consts.algo # app account: min balance and the milestone apps it creates
+FEE = MIN_TXN_FEE * (1 + MAX_PAYOUT_RECEIVERS) # covers the inner transactions of every method
+NO_MILESTONE = 0xFFFFFFFFFFFFFFFF # reached_milestone before the funding succeeds
+GOALS = (20, 30, 50) # Algos
+# payout splits in basis points, creator first (rounding remainders on the last receiver)
+SPLITS = ([SHARES_DENOMINATOR], [5_000, 5_000], [SHARES_DENOMINATOR - 1, 1], [3_333, 3_333, 3_334], [7_000, 2_000, 1_000], [2_500] * 4)
+DEFAULT_LENGTH = 24
+DEFAULT_CHUNK = 200
+MAX_SETUPS = 1024 # ledger snapshots of set up campaigns kept per harness
+SETUP_TXIDS = 1_000 # txids below are used by the setup of a campaign
+# campaign_state: funding 0, waiting_for_next_milestone 1, milestone_validation 2, ended 3
+TRANSITIONS = {(0, 0), (0, 1), (0, 3), (1, 1), (1, 2), (2, 2), (2, 1), (2, 3), (3, 3)}
+# step kind -> weight in the generated sequences
+STEP_WEIGHTS = {
+    "advance": 15, "fund": 25, "claim": 12, "submit": 12, "vote": 20, "settle": 8, "refund": 5, "reusable": 3,
+}
+
+
+@dataclass
+class CampaignSpec:
+    goal: int # microAlgos
+    schedule: list[int] # funds per milestone, adding up to the goal
+    shares: list[int] # payout split in basis points: creator first, then the co-receivers (SPLITS)
+    backers: int
+
+
+@dataclass
+class Trace:
+    """A campaign and the steps run against it, steps are tuples: (kind, *args)."""
+
+    spec: CampaignSpec
+    steps: list[tuple]
+
+
+@dataclass
+class Failure:
+    step: int # index of the step after which the invariant broke
+    invariant: str
+    detail: str
+
+
+@dataclass
+class RunResult:
+    steps: int = 0
+    accepted: int = 0
+    failure: Optional[Failure] = None
+
+
+@dataclass
+class ChunkResult:
+    """Outcome of a range of seeds run by a worker."""
+
+    sequences: int = 0
+    steps: int = 0
+    accepted: int = 0
+    seconds: float = 0.0
+    failures: list[tuple[int, Failure]] = field(default_factory=list) # (seed, failure)
+
+
+class InvariantError(Exception):
+    def __init__(self, invariant: str, detail: str):
+        super().__init__(f"{invariant}: {detail}")
+        self.invariant = invariant
+        self.detail = detail
+
+
+def generate(seed: int, length: int = DEFAULT_LENGTH) -> Trace:
+    """Random campaign and `length` steps, the same for the same seed."""
+    rng = random.Random(seed)
+    # few distinct campaigns: the harness sets each one up once and restores it afterwards
+    goal = rng.choice(GOALS) * consts.algo
+    milestones = rng.randint(1, 4)
+    first = goal // 2 if milestones > 1 and rng.random() < 0.5 else goal // milestones # front-loaded or even
+    rest = [(goal - first) // (milestones - 1)] * (milestones - 1) if milestones > 1 else []
+    schedule = [first] + rest[:-1] + [goal - first - sum(rest[:-1])] if rest else [goal]
+    spec = CampaignSpec(goal, schedule, list(rng.choice(SPLITS)), rng.randint(2, MAX_BACKERS))
+
+    kinds, weights = zip(*STEP_WEIGHTS.items())
+    steps = []
+    for kind in rng.choices(kinds, weights, k=length):
+        backer = rng.randrange(spec.backers)
+        if kind == "advance":
+            steps.append((kind, rng.choice(TIME_JUMPS)))
+        elif kind == "fund":
+            steps.append((kind, backer, rng.choice(AMOUNTS)))
+        elif kind == "claim":
+            steps.append((kind, "creator" if rng.random() < 0.9 else backer))
+        elif kind == "submit":
+            steps.append((kind, rng.choice((1, 1, 1, 0, 2)))) # milestone: reached_milestone + offset
+        elif kind == "vote":
+            steps.append((kind, backer, rng.random() < 0.7))
+        elif kind == "refund":
+            steps.append((kind, tuple(sorted(rng.sample(range(spec.backers), min(MAX_REFUNDS_PER_CALL, spec.backers))))))
+        else:
+            steps.append((kind,))
+    return Trace(spec, steps)
+
+
+class Harness:
+    """
+    Runs traces on an in-process ledger and checks the invariants after each accepted step.
+
+    The programs come from the compile cache, the ledger holds the funded accounts of the
+    creator, the co-receivers and MAX_BACKERS backers, restored from a snapshot by every run.
+    """
+
+    def __init__(self, app_cls: type = CrowdfundingCampaignApp):
+        client = LocalAlgodClient(Ledger(VirtualClock(START), verify_signatures=False))
+        self.ledger = client.ledger
+        app = app_cls()
+        self.layouts = {key.encode(): fields for key, fields in packed_layouts(app_cls).items()}
+        compiled = default_cache().build(app, client)
+        self.approval = compiled.approval.binary
+        self.clear = compiled.clear.binary
+        self.global_schema = app.app_state.schema()
+        self.local_schema = app.acct_state.schema()
+        # method name -> (method, selector)
+        self.methods = _methods(compiled.contract)
+        self.milestone_methods = _methods(default_cache().build(MilestoneApprovalApp, client).contract)
+
+        self.creator = _address("creator")
+        self.co_receivers = [_address(f"receiver{i}") for i in range(MAX_CO_RECEIVERS)]
+        self.backers = [_address(f"backer{i}") for i in range(MAX_BACKERS)]
+        for address in [self.creator] + self.backers:
+            self.ledger.fund(address, 1_000 * consts.algo)
+        for address in self.co_receivers:
+            self.ledger.fund(address, consts.algo) # min balance
+        self.base = self.ledger.snapshot()
+        # (goal, schedule, shares, backers) -> (snapshot, app id) of the campaign set up
+        self._setups: dict[tuple, tuple[LedgerSnapshot, int]] = {}
+        self._txids = 0
+
+    # ------------------------------------------------------------ runs
+
+    def run(self, trace: Trace) -> RunResult:
+        """Run `trace` from the snapshot of its campaign, stops at the first broken invariant."""
+        spec = trace.spec
+        result = RunResult()
+        key = (spec.goal, tuple(spec.schedule), tuple(spec.shares), spec.backers)
+        setup = self._setups.get(key)
+        if setup is None:
+            self.ledger.restore(self.base)
+            self._txids = 0
+            try:
+                app_id = self._setup(spec)
+            except LedgerError as e:
+                result.failure = Failure(-1, "setup", e.msg)
+                return result
+            if len(self._setups) >= MAX_SETUPS:
+                self._setups.clear()
+            setup = self._setups[key] = (self.ledger.snapshot(), app_id)
+        else:
+            self.ledger.restore(setup[0])
+        self._start(spec, setup[1])
+        for i, step in enumerate(trace.steps):
+            result.steps += 1
+            try:
+                accepted = self._step(step)
+                if accepted:
+                    result.accepted += 1
+                    self._check(trace.spec, step)
+            except InvariantError as e:
+                result.failure = Failure(i, e.invariant, e.detail)
+                break
+            except Exception as e: # evaluator crash, reported like a broken invariant
+                result.failure = Failure(i, "evaluation", f"{type(e).__name__}: {e}")
+                break
+        return result
+
+    def _setup(self, spec: CampaignSpec) -> int:
+        """Create the campaign of `spec`, set its payout split, fund its reserve and opt in the backers."""
+        self.app_id = 0
+        create = self._call(
+            self.creator, "create",
+            [spec.goal, self.creator, START, START + FUND_WINDOW, "ipfs:/metadata/CID", len(spec.schedule), spec.schedule],
+        )
+        app_id = self.app_id = create.created_app_id
+        receivers = [self.creator] + self.co_receivers[:len(spec.shares) - 1]
+        if len(receivers) > 1:
+            self._call(self.creator, "set_payout_split", [receivers, spec.shares])
+        self.ledger.fund(get_application_address(app_id), RESERVE)
+        for backer in self.backers[:spec.backers]:
+            self.ledger.evaluate([self._txn(backer, "appl", app_id=app_id, on_complete=int(OnComplete.OptInOC))])
+        return app_id
+
+    def _start(self, spec: CampaignSpec, app_id: int):
+        self.app_id = app_id
+        self.app_address = get_application_address(app_id)
+        self.receivers = [self.creator] + self.co_receivers[:len(spec.shares) - 1]
+        self._txids = SETUP_TXIDS
+        self.milestone_app_id = 0 # last submitted
+        self.reusable_app_id = 0
+        # model of the funds moved by the accepted steps
+        self.funded: dict[str, int] = {}
+        self.paid_out = 0
+        self.refunded = 0
+        self.state = self._global()
+
+    def _step(self, step: tuple) -> bool:
+        """Execute `step`, False if the ledger rejected it."""
+        kind, *args = step
+        try:
+            if kind == "advance":
+                self.ledger.clock.advance(args[0])
+            elif kind == "fund":
+                backer, amount = self.backers[args[0]], args[1] * consts.algo
+                payment = self._txn(backer, "pay", receiver=self.app_address, amount=amount, fee=MIN_TXN_FEE)
+                call = self._call(backer, "fund", [None], before=[payment])
+                if backer in self.funded:
+                    raise InvariantError("no double funding", f"{backer} funded twice")
+                self.funded[backer] = amount
+            elif kind == "claim":
+                sender = self.creator if args[0] == "creator" else self.backers[args[0]]
+                call = self._call(
+                    sender, "claim_funds", accounts=self.receivers,
+                    foreign_apps=[self.milestone_app_id] if self.milestone_app_id else [],
+                )
+                self.paid_out += self._paid(call)
+            elif kind == "submit":
+                milestone = max(self._milestone(self.state) + args[0], 0)
+                call = self._call(
+                    self.creator, "submit_milestone",
+                    [milestone, f"ipfs:/milestone_{milestone}_metadata/CID", self.ledger.clock.now() + VOTE_WINDOW],
+                    foreign_apps=[self.reusable_app_id] if self.reusable_app_id else [],
+                )
+                self.milestone_app_id = _return_uint(call)
+            elif kind == "vote":
+                self._call(self.backers[args[0]], "vote", [self.milestone_app_id, int(args[1])])
+            elif kind == "settle":
+                if not self.milestone_app_id:
+                    return False
+                self._call(self.creator, "vote_settling", app_id=self.milestone_app_id, methods=self.milestone_methods)
+            elif kind == "refund":
+                call = self._call(self.backers[0], "refund", accounts=[self.backers[i] for i in args[0]])
+                self.refunded += self._paid(call)
+            elif kind == "reusable":
+                self.reusable_app_id = _return_uint(self._call(self.creator, "create_reusable_milestone_app"))
+            else:
+                raise ValueError(f"unknown step {step}")
+        except LedgerError:
+            return False
+        return True
+
+    # ------------------------------------------------------------ invariants
+
+    def _check(self, spec: CampaignSpec, step: tuple):
+        state = self._global()
+        previous, self.state = self.state, state
+        collected = state[b"collected_funds"]
+        backed = sum(self.ledger.local_get(b, self.app_id, b"amount_backed") for b in self.backers[:spec.backers])
+        balance = self.ledger.balance(self.app_address)
+
+        expected = RESERVE + sum(self.funded.values()) - self.paid_out - self.refunded
+        if balance != expected:
+            raise InvariantError("funds conservation", f"app balance {balance}, expected {expected}")
+        if collected != sum(self.funded.values()) or backed + self.refunded != collected:
+            raise InvariantError(
+                "funds conservation",
+                f"collected_funds {collected}, funded {sum(self.funded.values())}, backed {backed} + refunded {self.refunded}",
+            )
+        if state[b"total_backers"] != len(self.funded):
+            raise InvariantError("no double funding", f"total_backers {state[b'total_backers']}, {len(self.funded)} backers")
+
+        reached = self._milestone(state)
+        tranches = sum(spec.schedule[:reached + 1])
+        if self.paid_out != tranches:
+            raise InvariantError("payouts match milestones", f"paid {self.paid_out}, milestones 0..{reached}: {tranches}")
+        if self.paid_out and collected < spec.goal:
+            raise InvariantError("payouts match milestones", f"paid {self.paid_out} with {collected} collected of {spec.goal}")
+        if self.refunded and collected >= spec.goal:
+            raise InvariantError("payouts match milestones", f"refunded {self.refunded} of a successful campaign")
+
+        before = self._milestone(previous)
+        if not before <= reached <= before + 1 or reached >= len(spec.schedule):
+            raise InvariantError("monotonic milestones", f"reached_milestone {before} -> {reached} ({step})")
+        transition = (previous[b"campaign_state"], state[b"campaign_state"])
+        if transition not in TRANSITIONS:
+            raise InvariantError("monotonic milestones", f"campaign_state {transition[0]} -> {transition[1]} ({step})")
+
+        if self.milestone_app_id in self.ledger.apps:
+            votes = self.ledger.global_get(self.milestone_app_id, b"approve_votes") + \
+                self.ledger.global_get(self.milestone_app_id, b"reject_votes")
+            if votes > collected:
+                raise InvariantError("vote weights", f"{votes} votes with {collected} collected")
+
+    # ------------------------------------------------------------ transactions
+
+    def _call(
+        self, sender: str, method_name: str, args: list = (), accounts: list[str] = (), foreign_apps: list[int] = (),
+        app_id: int = None, methods: dict[str, tuple[abi.Method, bytes]] = None,
+        before: list[Txn] = (),
+    ) -> Txn:
+        """Evaluate an ABI method call (after the transactions `before`), returns the app call."""
+        method, selector = (methods or self.methods)[method_name]
+        foreign_apps = list(foreign_apps)
+        app_args = [selector]
+        for arg, value in zip(method.args, args):
+            if arg.type == abi.ABIReferenceType.APPLICATION:
+                foreign_apps.append(value)
+                app_args.append(bytes([len(foreign_apps)]))
+            elif not abi.is_abi_transaction_type(arg.type):
+                app_args.append(arg.type.encode(value))
+        call = self._txn(
+            sender, "appl", app_id=self.app_id if app_id is None else app_id, app_args=app_args, accounts=list(accounts), foreign_apps=foreign_apps,
+        )
+        if call.app_id == 0:
+            call.approval_program = self.approval
+            call.clear_program = self.clear
+            call.global_num_uints = self.global_schema.num_uints
+            call.global_num_byte_slices = self.global_schema.num_byte_slices
+            call.local_num_uints = self.local_schema.num_uints
+            call.local_num_byte_slices = self.local_schema.num_byte_slices
+            call.extra_pages = (len(self.approval) + len(self.clear) - 1) // 2048
+        self.ledger.evaluate(list(before) + [call])
+        return call
+
+    def _txn(self, sender: str, txn_type: str, fee: int = FEE, **fields) -> Txn:
+        self._txids += 1
+        return Txn(type=txn_type, sender=sender, fee=fee, first_valid=self.ledger.round, last_valid=self.ledger.round + 1000,
+                   txid=_txid(self._txids), **fields)
+
+    def _global(self) -> dict[bytes, Any]:
+        state = dict(self.ledger.apps[self.app_id].global_state)
+        for key, fields in self.layouts.items():
+            if key in state:
+                state.update((name.encode(), value) for name, value in unpack(state.pop(key), fields).items())
+        return state
+
+    def _paid(self, call: Txn) -> int:
+        """Algos sent by the app in the inner transactions of `call`, with their fees."""
+        return sum(t.amount + t.fee for t in call.inner_txns if t.sender == self.app_address)
+
+    @staticmethod
+    def _milestone(state: dict[bytes, Any]) -> int:
+        reached = state[b"reached_milestone"]
+        return -1 if reached == NO_MILESTONE else reached
+
+
+def shrink(harness: Harness, trace: Trace, failure: Failure, max_runs: int = 2000) -> tuple[Trace, Failure, int]:
+    """Smallest trace found (steps removed, then simplified) still breaking `failure.invariant`, with the runs made."""
+    runs = 0
+
+    def fails(steps: list[tuple]) -> Optional[Failure]:
+        nonlocal runs
+        runs += 1
+        f = harness.run(Trace(trace.spec, steps)).failure
+        return f if f is not None and f.invariant == failure.invariant else None
+
+    steps = trace.steps[:failure.step + 1]
+    changed = True
+    while changed and runs < max_runs:
+        changed = False
+        chunk = max(len(steps) // 2, 1)
+        while chunk >= 1 and runs < max_runs:
+            i = 0
+            while i < len(steps) and runs < max_runs:
+                candidate = steps[:i] + steps[i + chunk:]
+                f = fails(candidate) if candidate else None
+                if f is not None:
+                    steps, failure, changed = candidate[:f.step + 1], f, True
+                else:
+                    i += chunk
+            chunk //= 2
+        for i in range(len(steps)):
+            for simpler in _simpler(steps[i]):
+                if runs >= max_runs:
+                    break
+                candidate = steps[:i] + [simpler] + steps[i + 1:]
+                f = fails(candidate)
+                if f is not None:
+                    steps, failure, changed = candidate[:f.step + 1], f, True
+                    break
+            if i >= len(steps) - 1:
+                break
+    return Trace(trace.spec, steps), failure, runs
+
+
+def _simpler(step: tuple) -> list[tuple]:
+    kind, *args = step
+    if kind == "advance":
+        return [(kind, s) for s in TIME_JUMPS if s < args[0]]
+    if kind == "fund" and args[1] != 10:
+        return [(kind, args[0], 10)]
+    if kind == "refund" and len(args[0]) > 1:
+        return [(kind, args[0][:n]) for n in range(1, len(args[0]))]
+    if kind == "claim" and args[0] != "creator":
+        return [(kind, "creator")]
+    return []
+
+
+# ------------------------------------------------------------ process pool
+
+_harness: Optional[Harness] = None
+
+
+def _worker_harness(app_cls: type = CrowdfundingCampaignApp) -> Harness:
+    global _harness
+    if _harness is None:
+        _harness = Harness(app_cls)
+    return _harness
+
+
+def run_seeds(first_seed: int, count: int, length: int) -> ChunkResult:
+    """Run the traces of seeds first_seed .. first_seed + count - 1 (in a worker process)."""
+    harness = _worker_harness()
+    result = ChunkResult()
+    start = time.perf_counter()
+    for seed in range(first_seed, first_seed + count):
+        run = harness.run(generate(seed, length))
+        result.sequences += 1
+        result.steps += run.steps
+        result.accepted += run.accepted
+        if run.failure is not None:
+            result.failures.append((seed, run.failure))
+    result.seconds = time.perf_counter() - start
+    return result
+
+
+def fuzz(
+    sequences: int,
+    length: int,
+    workers: int,
+    seed: int = 0,
+    chunk: int = DEFAULT_CHUNK,
+    app_cls: type = CrowdfundingCampaignApp,
+) -> ChunkResult:
+    """Run `sequences` traces of `app_cls` from `seed` on, in chunks of seeds spread over `workers` processes."""
+    total = ChunkResult()
+    chunks = [(s, min(chunk, seed + sequences - s), length) for s in range(seed, seed + sequences, chunk)]
+    with ProcessPoolExecutor(
+        workers, mp_context=multiprocessing.get_context("spawn"), initializer=_worker_harness, initargs=(app_cls,)
+    ) as pool:
+        start = time.perf_counter() # the workers are started (and their harness built) on the first submit
+        for result in pool.map(run_seeds, *zip(*chunks)):
+            total.sequences += result.sequences
+            total.steps += result.steps
+            total.accepted += result.accepted
+            total.failures += result.failures
+    total.seconds = time.perf_counter() - start
+    total.failures.sort()
+    return total
+
+
+def report(total: ChunkResult, workers: int):
+    print(f"{total.sequences} sequences, {total.steps} steps ({total.accepted / max(total.steps, 1):.0%} accepted) "
+          f"in {total.seconds:.2f}s with {workers} workers")
+    print(f"{total.sequences / total.seconds:.0f} sequences/s, {total.steps / total.seconds:.0f} steps/s")
+    by_invariant: dict[str, int] = {}
+    for _, failure in total.failures:
+        by_invariant[failure.invariant] = by_invariant.get(failure.invariant, 0) + 1
+    for invariant, count in sorted(by_invariant.items()):
+        print(f"  {invariant}: {count} failing sequences")
+
+
+def print_trace(seed: int, trace: Trace, failure: Failure):
+    spec = trace.spec
+    print(f"\nseed {seed}, {failure.invariant}: {failure.detail}")
+    print(f"  campaign: goal {spec.goal}, schedule {spec.schedule}, shares {spec.shares}, {spec.backers} backers")
+    for i, step in enumerate(trace.steps):
+        print(f"  {i:>3} {step}")
+
+
+def main(argv: list[str] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--sequences", type=int, default=20_000, help="random sequences to run")
+    parser.add_argument("--length", type=int, default=DEFAULT_LENGTH, help="steps per sequence")
+    parser.add_argument("--workers", type=int, default=None, help="fuzzing processes (default: CPU count)")
+    parser.add_argument("--seed", type=int, default=0, help="first seed")
+    parser.add_argument("--shrink", type=int, default=3, help="failing seeds shrunk and printed (first ones)")
+    parser.add_argument("--replay", type=int, default=None, help="run the sequence of one seed in process and shrink it")
+    parser.add_argument("--packed", action="store_true", help="fuzz PackedCrowdfundingCampaignApp")
+    args = parser.parse_args(argv)
+    app_cls = PackedCrowdfundingCampaignApp if args.packed else CrowdfundingCampaignApp
+
+    if args.replay is not None:
+        harness = Harness(app_cls)
+        trace = generate(args.replay, args.length)
+        failure = harness.run(trace).failure
+        if failure is None:
+            print(f"seed {args.replay}: no invariant broken in {len(trace.steps)} steps")
+            return 0
+        print_trace(args.replay, *shrink(harness, trace, failure)[:2])
+        return 1
+
+    workers = args.workers or os.cpu_count() or 1
+    total = fuzz(args.sequences, args.length, workers, args.seed, app_cls=app_cls)
+    report(total, workers)
+    if total.failures:
+        harness = Harness(app_cls)
+        shrunk = set()
+        for seed, failure in total.failures:
+            if failure.invariant in shrunk or len(shrunk) >= args.shrink:
+                continue
+            shrunk.add(failure.invariant)
+            trace, failure, runs = shrink(harness, generate(seed, args.length), failure)
+            print_trace(seed, trace, failure)
+            print(f"  (shrunk in {runs} runs)")
+    print(f"\ninvariants: {'ok' if not total.failures else 'BROKEN'}")
+    return 1 if total.failures else 0
+
+
+def _methods(contract: dict[str, Any]) -> dict[str, tuple[abi.Method, bytes]]:
+    return {m.name: (m, m.get_selector()) for m in abi.Contract.undictify(contract).methods}
+
+
+def _address(name: str) -> str:
+    return encoding.encode_address(hashlib.sha256(f"fuzz:{name}".encode()).digest())
+
+
+@functools.lru_cache(maxsize=4096)
+def _txid(n: int) -> str:
+    return base64.b32encode(n.to_bytes(32, "big")).decode().strip("=")
+
+
+def _return_uint(call: Txn) -> int:
+    return int.from_bytes(call.logs[-1][4:], "big")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
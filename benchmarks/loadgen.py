@@ -0,0 +1,376 @@
+"""
+Load generation: the full campaign lifecycle driven by thousands of synthetic accounts.
+
+Creates `backers` accounts and runs create -> opt_in + fund (every backer)
+-> claim_funds -> submit_milestone -> vote (every backer) -> vote_settling
+against a target: by default a LedgerServer (the local ledger behind algod's
+REST API, with simulated latency and block time), or a real algod with
+--algod (the creator and the funder of the backers is the first kmd account,
+e.g. the sandbox). The backers are split across worker processes, each one
+running its accounts concurrently with the asyncio client.
+
+Reports the throughput of every phase, the p50/p95/p99 latency (submission to
+confirmation) and the rejected calls of every method, and checks the final
+collected_funds/total_backers and vote counters against the confirmed calls.
+
+    python -m benchmarks.loadgen
+    python -m benchmarks.loadgen --backers 5000 --workers 8 --latency 0.05 --block-time 1
+    python -m benchmarks.loadgen --algod http://localhost:4001 --backers 200
+"""
+import argparse
+import asyncio
+import multiprocessing
+import sys
+import time
+from collections import defaultdict
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Optional
+
+from algosdk import account
+from algosdk.atomic_transaction_composer import AccountTransactionSigner
+from algosdk.future import transaction
+from algosdk.v2client.algod import AlgodClient
+from beaker import consts, sandbox
+from beaker.client import ApplicationClient
+
+from client.async_client import AsyncAlgod, AsyncCampaignClient
+from contracts.compile_cache import default_cache
+from contracts.crowdfunding.crowdfundingCampaign import CrowdfundingCampaignApp
+from contracts.crowdfunding.milestoneApproval import MilestoneApprovalApp
+from localnet.algod import LocalAlgodClient, get_accounts
+from localnet.ledger import Ledger, MAX_GROUP_SIZE
+from localnet.server import LedgerServer
+
+FUND_AMOUNT = 10 * consts.algo # minimum accepted by CrowdfundingCampaignApp.fund
+BACKER_FEES = consts.algo # opt_in, fund and vote fees, min balance of the opt-ins
+REJECT_EVERY = 4 # every 4th backer rejects the milestone
+
+
+@dataclass
+class PhaseStats:
+    """Latencies (seconds) and rejections per method, and what the confirmed calls should have changed."""
+
+    latencies: dict[str, list[float]] = field(default_factory=lambda: defaultdict(list))
+    rejected: dict[str, int] = field(default_factory=lambda: defaultdict(int))
+    errors: dict[str, str] = field(default_factory=dict) # first error of every method
+    backers: int = 0
+    funds: int = 0
+    approve_votes: int = 0
+    reject_votes: int = 0
+
+    async def timed(self, method: str, call: Awaitable) -> Optional[Any]:
+        """Await `call`, recording its latency, or its rejection (None is returned)."""
+        start = time.perf_counter()
+        try:
+            result = await call
+        except Exception as e:
+            self.rejected[method] += 1
+            self.errors.setdefault(method, str(e).splitlines()[0][:200])
+            return None
+        self.latencies[method].append(time.perf_counter() - start)
+        return result
+
+    def merge(self, other: "PhaseStats"):
+        for method, latencies in other.latencies.items():
+            self.latencies[method] += latencies
+        for method, count in other.rejected.items():
+            self.rejected[method] += count
+        for method, message in other.errors.items():
+            self.errors.setdefault(method, message)
+        self.backers += other.backers
+        self.funds += other.funds
+        self.approve_votes += other.approve_votes
+        self.reject_votes += other.reject_votes
+
+
+@dataclass
+class PhaseTask:
+    """Slice of the backers run by one worker process."""
+
+    phase: str # "fund" or "vote"
+    url: str
+    token: str
+    app_id: int
+    private_keys: list[str]
+    first: int # index of the first backer of the slice
+    milestone_app_id: int = 0
+    max_in_flight: int = 64
+    wait_rounds: int = 10
+
+
+def run_phase(task: PhaseTask) -> PhaseStats:
+    """Entry point of the worker processes."""
+    return asyncio.run(_run_phase(task))
+
+
+async def _run_phase(task: PhaseTask) -> PhaseStats:
+    stats = PhaseStats()
+    # the sync client only composes the transactions, it sends nothing
+    client = AlgodClient(task.token, task.url)
+    async with AsyncAlgod(task.url, task.token, max_in_flight=task.max_in_flight) as algod:
+        campaign = AsyncCampaignClient(
+            algod, ApplicationClient(client, CrowdfundingCampaignApp(), app_id=task.app_id), task.wait_rounds
+        )
+
+        async def fund(signer: AccountTransactionSigner):
+            backer = campaign.prepare(signer)
+            if await stats.timed("opt_in", backer.opt_in()) is None:
+                return
+            if await stats.timed("fund", backer.back(FUND_AMOUNT)) is not None:
+                stats.backers += 1
+                stats.funds += FUND_AMOUNT
+
+        async def vote(signer: AccountTransactionSigner, approve: bool):
+            # the milestone app of the campaign only counts the votes cast through it, weighted by the amount backed
+            result = await stats.timed("vote", campaign.prepare(signer).vote(task.milestone_app_id, approve))
+            if result is not None and approve:
+                stats.approve_votes += FUND_AMOUNT
+            elif result is not None:
+                stats.reject_votes += FUND_AMOUNT
+
+        signers = [AccountTransactionSigner(key) for key in task.private_keys]
+        if task.phase == "fund":
+            await asyncio.gather(*(fund(s) for s in signers))
+        else:
+            await asyncio.gather(*(
+                vote(s, (task.first + i) % REJECT_EVERY != REJECT_EVERY - 1) for i, s in enumerate(signers)
+            ))
+    return stats
+
+
+class LocalTarget:
+    """LedgerServer on a fresh ledger, deadlines are reached by advancing its virtual clock."""
+
+    def __init__(self, latency: float, block_time: float):
+        ledger = Ledger()
+        (self.creator,) = get_accounts(LocalAlgodClient(ledger), 1, 1_000_000 * consts.algo)
+        self.server = LedgerServer(("127.0.0.1", 0), ledger, latency=latency, block_time=block_time)
+        self.server.start()
+        self.url = self.server.url
+        self.token = ""
+        self.client = AlgodClient(self.token, self.url)
+
+    def now(self) -> int:
+        with self.server.lock:
+            return self.server.ledger.clock.now()
+
+    def wait_until(self, timestamp: int):
+        with self.server.lock:
+            self.server.ledger.clock.advance(max(0, timestamp + 1 - self.server.ledger.clock.now()))
+
+    def fund_accounts(self, addresses: list[str], amount: int):
+        with self.server.lock:
+            for address in addresses:
+                self.server.ledger.fund(address, amount)
+
+    def close(self):
+        self.server.stop()
+
+
+class AlgodTarget:
+    """Real algod, the first kmd account creates the campaign and funds the backers."""
+
+    def __init__(self, url: str, token: str, kmd_url: str, kmd_token: str):
+        self.url = url
+        self.token = token
+        self.client = AlgodClient(token, url)
+        self.creator = sandbox.get_accounts(kmd_url, kmd_token)[0]
+
+    def now(self) -> int:
+        last_round = self.client.status()["last-round"]
+        return self.client.block_info(last_round)["block"]["ts"]
+
+    def wait_until(self, timestamp: int):
+        while self.now() <= timestamp:
+            time.sleep(1)
+            # a dev mode network only makes a block (with a new timestamp) when a transaction comes in
+            sp = self.client.suggested_params()
+            self.client.send_transaction(
+                transaction.PaymentTxn(self.creator.address, sp, self.creator.address, 0).sign(self.creator.private_key)
+            )
+
+    def fund_accounts(self, addresses: list[str], amount: int):
+        sp = self.client.suggested_params()
+        txid = None
+        for i in range(0, len(addresses), MAX_GROUP_SIZE):
+            txns = [
+                transaction.PaymentTxn(self.creator.address, sp, address, amount)
+                for address in addresses[i:i + MAX_GROUP_SIZE]
+            ]
+            transaction.assign_group_id(txns)
+            txid = self.client.send_transactions([t.sign(self.creator.private_key) for t in txns])
+        if txid is not None:
+            transaction.wait_for_confirmation(self.client, txid, 10)
+
+    def close(self):
+        pass
+
+
+class LoadGenerator:
+    """
+    Runs the lifecycle of one campaign on `target` with `num_backers` backers split across `workers` processes.
+
+    The single-account steps (create, claim_funds, submit_milestone, vote_settling)
+    are run by the creator in this process.
+    """
+
+    def __init__(self, target, num_backers: int, workers: int, args: argparse.Namespace):
+        self.target = target
+        self.num_backers = num_backers
+        self.workers = workers
+        self.args = args
+        self.stats = PhaseStats()
+        self.phases: dict[str, tuple[int, float]] = {} # phase -> (calls, seconds)
+        self.checks: list[tuple[str, int, int]] = [] # (counter, expected, on chain)
+
+    def run(self):
+        target, creator = self.target, self.target.creator
+        keys = [account.generate_account()[0] for _ in range(self.num_backers)]
+        target.fund_accounts([account.address_from_private_key(k) for k in keys], FUND_AMOUNT + BACKER_FEES)
+
+        app_client = default_cache().application_client(target.client, CrowdfundingCampaignApp(), signer=creator.signer)
+        now = target.now()
+        fund_end_date = now + self.args.fund_window
+        self._single("create", lambda: app_client.create(
+            campaign_goal=self.num_backers * FUND_AMOUNT,
+            funds_receiver=creator.address,
+            fund_start_date=now,
+            fund_end_date=fund_end_date,
+            reward_metadata="ipfs:/metadata/CID",
+            total_milestones=2,
+            funds_per_milestone=[self.num_backers * 7 * consts.algo, self.num_backers * 3 * consts.algo],
+        ))
+        app_client.fund(consts.algo) # min balance of the app account
+
+        ctx = multiprocessing.get_context("spawn")
+        with ctx.Pool(self.workers) as pool:
+            funded = self._parallel(pool, "opt_in + fund", self._tasks("fund", keys, app_client.app_id))
+            state = app_client.get_application_state()
+            self.checks += [
+                ("collected_funds", funded.funds, state["collected_funds"]),
+                ("total_backers", funded.backers, state["total_backers"]),
+            ]
+
+            target.wait_until(fund_end_date)
+            self._single("claim_funds", lambda: app_client.call(
+                CrowdfundingCampaignApp.claim_funds, accounts=[creator.address], suggested_params=self._inner_fee_params()
+            ))
+            vote_end_date = target.now() + self.args.vote_window
+            submitted = self._single("submit_milestone", lambda: app_client.call(
+                CrowdfundingCampaignApp.submit_milestone,
+                milestone_to_approve=1,
+                milestone_metadata="ipfs:/milestone_1_metadata/CID",
+                vote_end_date=vote_end_date,
+                suggested_params=self._inner_fee_params(),
+            ))
+            if submitted is None:
+                return
+            milestone_app_id = submitted.return_value
+            voted = self._parallel(pool, "vote", self._tasks("vote", keys, app_client.app_id, milestone_app_id))
+
+        milestone_client = ApplicationClient(target.client, MilestoneApprovalApp(), milestone_app_id, signer=creator.signer)
+        state = milestone_client.get_application_state()
+        self.checks += [
+            ("approve_votes", voted.approve_votes, state["approve_votes"]),
+            ("reject_votes", voted.reject_votes, state["reject_votes"]),
+        ]
+        target.wait_until(vote_end_date)
+        self._single("vote_settling", lambda: milestone_client.call(MilestoneApprovalApp.vote_settling))
+
+    def _tasks(self, phase: str, keys: list[str], app_id: int, milestone_app_id: int = 0) -> list[PhaseTask]:
+        size = -(-len(keys) // self.workers)
+        return [
+            PhaseTask(
+                phase, self.target.url, self.target.token, app_id, keys[first:first + size], first,
+                milestone_app_id, self.args.max_in_flight,
+            )
+            for first in range(0, len(keys), size)
+        ]
+
+    def _parallel(self, pool, phase: str, tasks: list[PhaseTask]) -> PhaseStats:
+        start = time.perf_counter()
+        stats = PhaseStats()
+        for worker_stats in pool.map(run_phase, tasks):
+            stats.merge(worker_stats)
+        calls = sum(len(latencies) for latencies in stats.latencies.values())
+        self.phases[phase] = (calls, time.perf_counter() - start)
+        self.stats.merge(stats)
+        return stats
+
+    def _single(self, method: str, call) -> Optional[Any]:
+        async def run():
+            return call()
+
+        start = time.perf_counter()
+        result = asyncio.run(self.stats.timed(method, run()))
+        self.phases[method] = (1 if result is not None else 0, time.perf_counter() - start)
+        return result
+
+    def _inner_fee_params(self) -> transaction.SuggestedParams:
+        # claim_funds and submit_milestone pay the fee of their inner transaction
+        sp = self.target.client.suggested_params()
+        sp.fee = sp.min_fee * 2
+        sp.flat_fee = True
+        return sp
+
+    def report(self):
+        print(f"{'phase':<20}{'calls':>8}{'seconds':>10}{'calls/s':>10}")
+        total_calls = total_time = 0
+        for phase, (calls, seconds) in self.phases.items():
+            total_calls += calls
+            total_time += seconds
+            print(f"{phase:<20}{calls:>8}{seconds:>10.2f}{calls / seconds:>10.1f}")
+        print(f"{'total':<20}{total_calls:>8}{total_time:>10.2f}{total_calls / total_time:>10.1f}")
+
+        print(f"\n{'method':<20}{'ok':>8}{'rejected':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+        for method in list(self.stats.latencies) + [m for m in self.stats.rejected if m not in self.stats.latencies]:
+            latencies = sorted(self.stats.latencies.get(method, []))
+            p = [f"{percentile(latencies, q) * 1000:>10.0f}" if latencies else f"{'-':>10}" for q in (50, 95, 99)]
+            print(f"{method:<20}{len(latencies):>8}{self.stats.rejected.get(method, 0):>10}{''.join(p)}")
+        for method, message in self.stats.errors.items():
+            print(f"  {method}: {message}")
+
+        print(f"\n{'counter':<20}{'expected':>16}{'on chain':>16}")
+        for counter, expected, actual in self.checks:
+            print(f"{counter:<20}{expected:>16}{actual:>16}  {'ok' if expected == actual else 'MISMATCH'}")
+
+
+def percentile(sorted_values: list[float], q: float) -> float:
+    """Nearest-rank percentile of a sorted, non empty list."""
+    rank = max(1, -(-len(sorted_values) * q // 100))
+    return sorted_values[int(rank) - 1]
+
+
+def main(argv: list[str] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--backers", type=int, default=1000, help="synthetic backers (and voters)")
+    parser.add_argument("--workers", type=int, default=4, help="worker processes the backers are split across")
+    parser.add_argument("--max-in-flight", type=int, default=64, help="concurrent algod requests of each worker")
+    parser.add_argument("--fund-window", type=int, default=30, help="seconds from create to the end of the funding")
+    parser.add_argument("--vote-window", type=int, default=120, help="seconds from submit_milestone to the end of the vote")
+    parser.add_argument("--algod", help="algod URL, a local ledger is served if omitted")
+    parser.add_argument("--token", default="a" * 64, help="algod API token")
+    parser.add_argument("--kmd", default="http://localhost:4002", help="kmd URL of the creator account")
+    parser.add_argument("--kmd-token", default="a" * 64, help="kmd API token")
+    parser.add_argument("--latency", type=float, default=0.02, help="local ledger: seconds added to every request")
+    parser.add_argument("--block-time", type=float, default=0.5, help="local ledger: seconds between blocks")
+    args = parser.parse_args(argv)
+
+    if args.algod:
+        target = AlgodTarget(args.algod, args.token, args.kmd, args.kmd_token)
+        print(f"{args.backers} backers on {args.algod}, {args.workers} workers\n")
+    else:
+        target = LocalTarget(args.latency, args.block_time)
+        print(f"{args.backers} backers on the local ledger, {args.workers} workers, "
+              f"latency {args.latency * 1000:.0f}ms, block time {args.block_time}s\n")
+    generator = LoadGenerator(target, args.backers, args.workers, args)
+    try:
+        generator.run()
+    finally:
+        target.close()
+    generator.report()
+    return 0 if all(expected == actual for _, expected, actual in generator.checks) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,172 @@
+"""
+Cost of the milestone votes of a campaign: a new MilestoneApprovalApp per milestone against a reusable one.
+
+Runs a `milestones` milestone campaign on the in-process ledger twice:
+- new app: every submit_milestone creates a MilestoneApprovalApp;
+- reusable: create_reusable_milestone_app creates one app, every submit_milestone
+  resets it.
+Every milestone is submitted, voted by `voters` backers through the campaign
+(CrowdfundingCampaignApp.vote, the only votes a milestone app owned by the
+campaign counts), settled and claimed.
+Reports the transactions, fees and min balance of the creator (and campaign
+account) and of the voters, from the first claim_funds to the last one.
+
+    python -m benchmarks.milestone_reuse
+    python -m benchmarks.milestone_reuse --milestones 20 --voters 50
+"""
+import argparse
+import sys
+from dataclasses import dataclass
+
+from algosdk import account
+from algosdk.atomic_transaction_composer import AccountTransactionSigner
+from algosdk.future import transaction
+from beaker import consts
+from beaker.client import ApplicationClient
+
+from client.bulk_funding import Backer, BulkFunder
+from contracts.compile_cache import default_cache
+from contracts.crowdfunding.crowdfundingCampaign import CrowdfundingCampaignApp
+from contracts.crowdfunding.milestoneApproval import MilestoneApprovalApp
+from localnet.algod import LocalAlgodClient, get_accounts
+
+VOTE_WINDOW = 3600
+
+
+@dataclass
+class MilestoneCost:
+    """Totals over all the milestones of one mode."""
+
+    mode: str
+    apps_created: int = 0
+    program_bytes: int = 0 # approval + clear programs uploaded by the inner creates
+    creator_txns: int = 0
+    creator_fees: int = 0 # microAlgos
+    campaign_min_balance: int = 0 # microAlgos locked in the campaign account by the milestone apps
+    voter_txns: int = 0
+    voter_fees: int = 0
+    voter_min_balance: int = 0 # microAlgos still locked by the voters in the milestone apps
+
+
+def measure(reusable: bool, num_milestones: int, num_voters: int) -> MilestoneCost:
+    client = LocalAlgodClient()
+    clock = client.clock
+    ledger = client.ledger
+    (creator,) = get_accounts(client, 1, 1_000_000 * consts.algo)
+
+    app_client = default_cache().application_client(client, CrowdfundingCampaignApp(), signer=creator.signer)
+    now = clock.now()
+    app_client.create(
+        campaign_goal=num_voters * 10 * consts.algo,
+        funds_receiver=creator.address,
+        fund_start_date=now,
+        fund_end_date=now + 60,
+        reward_metadata="ipfs:/metadata/CID",
+        # milestone 0 is paid by the first claim_funds, the next `num_milestones` ones after a vote
+        total_milestones=num_milestones + 1,
+        funds_per_milestone=[num_voters * 10 * consts.algo // (num_milestones + 1)] * (num_milestones + 1),
+    )
+    # min balance of the app account and of the milestone apps it creates
+    app_client.fund((1 + num_milestones) * consts.algo)
+
+    voters = []
+    for _ in range(num_voters):
+        private_key, address = account.generate_account()
+        ledger.fund(address, (11 + num_milestones) * consts.algo)
+        voters.append(Backer(address, AccountTransactionSigner(private_key), 10 * consts.algo))
+    results = BulkFunder(app_client).fund(voters)
+    assert all(r.ok for r in results), [r.error for r in results if not r.ok]
+
+    def params(inner_txns: int = 0) -> transaction.SuggestedParams:
+        # fresh for every transaction: each one is confirmed in its own block
+        sp = client.suggested_params()
+        sp.fee = sp.min_fee * (1 + inner_txns)
+        sp.flat_fee = True
+        return sp
+
+    clock.advance(61)
+    app_client.call(CrowdfundingCampaignApp.claim_funds, accounts=[creator.address], suggested_params=params(1))
+
+    cost = MilestoneCost("reusable" if reusable else "new app")
+    first_txn = len(ledger.txns)
+    campaign_min_balance = ledger.min_balance(app_client.app_addr)
+    voter_min_balance = sum(ledger.min_balance(v.address) for v in voters)
+    reusable_app_id = 0
+    if reusable:
+        reusable_app_id = app_client.call(
+            CrowdfundingCampaignApp.create_reusable_milestone_app, suggested_params=params(1)
+        ).return_value
+
+    for milestone in range(1, num_milestones + 1):
+        milestone_app_id = app_client.call(
+            CrowdfundingCampaignApp.submit_milestone,
+            milestone_to_approve=milestone,
+            milestone_metadata=f"ipfs:/milestone_{milestone}_metadata/CID",
+            vote_end_date=clock.now() + VOTE_WINDOW,
+            foreign_apps=[reusable_app_id] if reusable else None,
+            suggested_params=params(1),
+        ).return_value
+        milestone_client = ApplicationClient(client, MilestoneApprovalApp(), app_id=milestone_app_id, signer=creator.signer)
+        for voter in voters:
+            app_client.prepare(signer=voter.signer).call(
+                CrowdfundingCampaignApp.vote, milestone_app=milestone_app_id, vote=1, suggested_params=params(1)
+            )
+        clock.advance(VOTE_WINDOW + 1)
+        milestone_client.call(MilestoneApprovalApp.vote_settling, suggested_params=params())
+        app_client.call(
+            CrowdfundingCampaignApp.claim_funds,
+            accounts=[creator.address],
+            foreign_apps=[milestone_app_id],
+            suggested_params=params(1),
+        )
+
+    voter_addresses = {v.address for v in voters}
+    for txn in list(ledger.txns.values())[first_txn:]:
+        if txn.sender in voter_addresses:
+            cost.voter_txns += 1
+            cost.voter_fees += txn.fee
+        else:
+            cost.creator_txns += 1
+            cost.creator_fees += txn.fee
+        for inner in txn.inner_txns:
+            if inner.type == "appl" and inner.app_id == 0:
+                cost.apps_created += 1
+                cost.program_bytes += len(inner.approval_program) + len(inner.clear_program)
+    cost.campaign_min_balance = ledger.min_balance(app_client.app_addr) - campaign_min_balance
+    cost.voter_min_balance = sum(ledger.min_balance(v.address) for v in voters) - voter_min_balance
+    return cost
+
+
+def report(new: MilestoneCost, reused: MilestoneCost, num_milestones: int, num_voters: int):
+    algo = consts.algo
+    rows = [
+        ("milestone apps created", lambda c: f"{c.apps_created}"),
+        ("program bytes uploaded", lambda c: f"{c.program_bytes}"),
+        ("creator txns", lambda c: f"{c.creator_txns}"),
+        ("creator fees (Algo)", lambda c: f"{c.creator_fees / algo:.3f}"),
+        ("campaign min balance (Algo)", lambda c: f"{c.campaign_min_balance / algo:.3f}"),
+        ("voter txns", lambda c: f"{c.voter_txns}"),
+        ("voter fees (Algo)", lambda c: f"{c.voter_fees / algo:.3f}"),
+        ("voter min balance (Algo)", lambda c: f"{c.voter_min_balance / algo:.3f}"),
+    ]
+    print(f"{num_milestones} milestones, {num_voters} voters voting through the campaign\n")
+    print(f"{'':<30}{'new app':>12}{'reusable':>12}")
+    for name, fmt in rows:
+        print(f"{name:<30}{fmt(new):>12}{fmt(reused):>12}")
+    locked = lambda c: c.creator_fees + c.campaign_min_balance + c.voter_fees + c.voter_min_balance
+    print(f"\nfees + min balance locked: {locked(new) / algo:.3f} -> {locked(reused) / algo:.3f} Algo")
+
+
+def main(argv: list[str] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--milestones", type=int, default=10, help="milestones of the campaign")
+    parser.add_argument("--voters", type=int, default=20, help="backers voting on every milestone")
+    args = parser.parse_args(argv)
+    new = measure(False, args.milestones, args.voters)
+    reused = measure(True, args.milestones, args.voters)
+    report(new, reused, args.milestones, args.voters)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
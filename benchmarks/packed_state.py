@@ -0,0 +1,165 @@
+"""
+Packed global state of the campaign: opcode cost and app min balance of CrowdfundingCampaignApp
+against PackedCrowdfundingCampaignApp.
+
+Runs the contract_cost flows (in-process ledger) on both apps and reports
+the opcodes of every campaign method, the program sizes, and the min balance
+a campaign locks on its creator's account (app pages and global schema).
+Then runs a campaign through create, fund and the first claim_funds with the
+client/artifacts.py clients of both apps, built in a temporary directory,
+and checks that their global states decode to the same fields, as do the
+StateCache snapshots.
+
+    python -m benchmarks.packed_state
+"""
+import argparse
+import sys
+import tempfile
+from dataclasses import dataclass
+
+from algosdk import account
+from algosdk.atomic_transaction_composer import AccountTransactionSigner
+from beaker import consts
+
+from benchmarks.contract_cost import measure
+from client.artifacts import CampaignClient, PackedCampaignClient
+from client.state_cache import StateCache
+from contracts.compile_cache import default_cache
+from contracts.crowdfunding.crowdfundingCampaign import CrowdfundingCampaignApp
+from contracts.crowdfunding.packedCrowdfundingCampaign import PackedCrowdfundingCampaignApp
+from localnet.algod import LocalAlgodClient, get_accounts
+from localnet.clock import VirtualClock
+from localnet.ledger import Ledger
+
+AMOUNT_BACKED = 10 * consts.algo
+FUND_WINDOW = 60
+PER_CAMPAIGNS = 1000
+
+
+@dataclass
+class Layout:
+    app: str
+    costs: dict[str, int]
+    approval_size: int
+    global_num_uints: int
+    global_num_byte_slices: int
+    min_balance: int # microAlgos locked on the creator's account by one campaign
+
+
+def layout(app_cls: type) -> Layout:
+    metrics = measure(campaign_app=app_cls)
+    programs = metrics["programs"][app_cls.__name__]
+    costs = {
+        name.split(".", 1)[1]: cost for name, cost in metrics["costs"].items() if name.startswith("CrowdfundingCampaignApp.")
+    }
+
+    client = LocalAlgodClient()
+    ledger = client.ledger
+    (creator,) = get_accounts(client, 1)
+    before = ledger.min_balance(creator.address)
+    app_client = default_cache().application_client(client, app_cls(), signer=creator.signer)
+    now = client.clock.now()
+    app_client.create(
+        campaign_goal=10 * consts.algo,
+        funds_receiver=creator.address,
+        fund_start_date=now,
+        fund_end_date=now + FUND_WINDOW,
+        reward_metadata="ipfs:/metadata/CID",
+        total_milestones=2,
+        funds_per_milestone=[5 * consts.algo, 5 * consts.algo],
+    )
+    return Layout(
+        app_cls.__name__,
+        costs,
+        programs["approval_size"],
+        programs["global_num_uints"],
+        programs["global_num_byte_slices"],
+        ledger.min_balance(creator.address) - before,
+    )
+
+
+def campaign_state(client_cls: type, build_dir: str, creator_key: str, start: int) -> tuple[dict, dict]:
+    """
+    Global state of a funded campaign after its first claim_funds, created by `creator_key` at `start` on a
+    fresh ledger: (artifacts client, StateCache snapshot).
+    """
+    ledger = Ledger(VirtualClock(start))
+    client = LocalAlgodClient(ledger)
+    creator = account.address_from_private_key(creator_key)
+    ledger.fund(creator, 1_000 * consts.algo)
+    campaign = client_cls.load(client, signer=AccountTransactionSigner(creator_key), build_dir=build_dir)
+    now = ledger.clock.now()
+    campaign.create(
+        campaign_goal=3 * AMOUNT_BACKED,
+        funds_receiver=creator,
+        fund_start_date=now,
+        fund_end_date=now + FUND_WINDOW,
+        reward_metadata="ipfs:/metadata/CID",
+        total_milestones=3,
+        funds_per_milestone=[AMOUNT_BACKED] * 3,
+    )
+    campaign.fund(consts.algo)
+    for _ in range(3):
+        private_key, address = account.generate_account()
+        ledger.fund(address, AMOUNT_BACKED + consts.algo)
+        backer = campaign.prepare(AccountTransactionSigner(private_key))
+        backer.opt_in()
+        backer.back(AMOUNT_BACKED)
+    ledger.clock.advance(FUND_WINDOW + 1)
+    campaign.claim_funds([creator])
+
+    cache = StateCache(client, round_interval=0)
+    cache.register(campaign.app_id, campaign.artifacts)
+    return campaign.get_application_state(), cache.snapshot(campaign.app_id).state
+
+
+def check(build_dir: str) -> list[str]:
+    """Differences between the decoded global states of the same campaign run on both apps."""
+    creator_key, _ = account.generate_account()
+    start = VirtualClock().now()
+    errors = []
+    (plain, plain_cached), (packed, packed_cached) = (
+        campaign_state(client_cls, build_dir, creator_key, start) for client_cls in (CampaignClient, PackedCampaignClient)
+    )
+    for name, expected, actual in (("artifacts client", plain, packed), ("StateCache", plain_cached, packed_cached)):
+        for key in sorted(set(expected) | set(actual)):
+            if expected.get(key) != actual.get(key):
+                errors.append(f"{name}: {key} {expected.get(key)!r} unpacked, {actual.get(key)!r} packed")
+    return errors
+
+
+def report(before: Layout, after: Layout):
+    print(f"{'method':<34}{'opcodes':>9}{'packed':>9}{'change':>9}")
+    for name, cost in before.costs.items():
+        packed = after.costs[name]
+        print(f"{name:<34}{cost:>9}{packed:>9}{packed - cost:>+9}")
+    print()
+    print(f"{'':<34}{'unpacked':>12}{'packed':>12}")
+    rows = [
+        ("approval program bytes", before.approval_size, after.approval_size),
+        ("global uints", before.global_num_uints, after.global_num_uints),
+        ("global byte slices", before.global_num_byte_slices, after.global_num_byte_slices),
+        ("app min balance (microAlgos)", before.min_balance, after.min_balance),
+    ]
+    for name, old, new in rows:
+        print(f"{name:<34}{old:>12}{new:>12}")
+    saved = before.min_balance - after.min_balance
+    print(f"\nmin balance saved: {saved / consts.algo:.4f} Algos per campaign, "
+          f"{saved * PER_CAMPAIGNS / consts.algo:.1f} Algos per {PER_CAMPAIGNS} campaigns")
+
+
+def main(argv: list[str] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.parse_args(argv)
+
+    report(layout(CrowdfundingCampaignApp), layout(PackedCrowdfundingCampaignApp))
+    with tempfile.TemporaryDirectory() as build_dir:
+        errors = check(build_dir)
+    for error in errors:
+        print(f"  {error}")
+    print(f"\nsame decoded state: {'ok' if not errors else 'FAILED'}")
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,192 @@
+"""
+Opcode cost and fee of the milestone payouts of claim_funds, by number of payout receivers.
+
+For 1 to 4 receivers (funds_receiver and its co-receivers, see
+CrowdfundingCampaignApp.set_payout_split), runs a campaign on the in-process
+ledger: funding, claim of milestone 0, then `milestones` milestones submitted,
+approved by the backers (CrowdfundingCampaignApp.vote), settled and claimed.
+Every claim pays its tranche in one group of inner payments, one per receiver,
+its fee priced by FeePlanner (client/fees.py) from a dryrun of the call.
+Reports the opcodes and fee of a claim, per claim and per receiver, and checks
+that every receiver got its share of each tranche and that every claim pooled
+the fees of its receivers only.
+
+    python -m benchmarks.payouts
+    python -m benchmarks.payouts --milestones 10 --backers 20
+    python -m benchmarks.payouts --amount-backed 4000000000000000 # tranche * share past 64 bits
+"""
+import argparse
+import sys
+from dataclasses import dataclass, field
+
+from algosdk import account
+from algosdk.atomic_transaction_composer import AccountTransactionSigner
+from beaker import consts
+from beaker.client import ApplicationClient
+
+from client.bulk_funding import Backer, BulkFunder
+from client.fees import FeePlanner, pooled_params
+from contracts.compile_cache import default_cache
+from contracts.crowdfunding.crowdfundingCampaign import (
+    CrowdfundingCampaignApp,
+    MAX_PAYOUT_RECEIVERS,
+    SHARES_DENOMINATOR,
+)
+from contracts.crowdfunding.milestoneApproval import MilestoneApprovalApp
+from localnet.algod import LocalAlgodClient, get_accounts
+
+AMOUNT_BACKED = 10 * consts.algo
+VOTE_WINDOW = 3600
+
+
+@dataclass
+class PayoutCost:
+    """claim_funds calls paying a milestone to `receivers` receivers."""
+
+    receivers: int
+    claims: int = 0
+    opcodes: list[int] = field(default_factory=list) # per claim
+    fees: int = 0 # microAlgos, all the claims
+    errors: list[str] = field(default_factory=list)
+
+    @property
+    def fee_per_claim(self) -> float:
+        return self.fees / self.claims
+
+    @property
+    def opcodes_per_claim(self) -> float:
+        return sum(self.opcodes) / self.claims
+
+
+def shares(receivers: int) -> list[int]:
+    """Equal shares in basis points, the first receiver gets the rounding remainder."""
+    share = SHARES_DENOMINATOR // receivers
+    return [SHARES_DENOMINATOR - share * (receivers - 1)] + [share] * (receivers - 1)
+
+
+def expected_payouts(amount: int, split: list[int]) -> list[int]:
+    """Amounts paid by the contract: share / 10000 of `amount` each, the last receiver gets the remainder."""
+    paid = [amount * share // SHARES_DENOMINATOR for share in split[:-1]]
+    return paid + [amount - sum(paid)]
+
+
+def measure(num_receivers: int, num_milestones: int, num_backers: int, amount_backed: int = AMOUNT_BACKED) -> PayoutCost:
+    client = LocalAlgodClient()
+    clock = client.clock
+    ledger = client.ledger
+    (creator,) = get_accounts(client, 1, 1_000 * consts.algo)
+    receivers = [creator.address] + [account.generate_account()[1] for _ in range(num_receivers - 1)]
+    for receiver in receivers[1:]:
+        ledger.fund(receiver, consts.algo) # min balance
+
+    app_client = default_cache().application_client(client, CrowdfundingCampaignApp(), signer=creator.signer)
+    now = clock.now()
+    tranche = num_backers * amount_backed // (num_milestones + 1)
+    schedule = [tranche] * (num_milestones + 1) # milestone 0 paid when the funding succeeds
+    app_client.create(
+        campaign_goal=num_backers * amount_backed,
+        funds_receiver=creator.address,
+        fund_start_date=now,
+        fund_end_date=now + 60,
+        reward_metadata="ipfs:/metadata/CID",
+        total_milestones=len(schedule),
+        funds_per_milestone=schedule,
+    )
+    # min balance of the app account and of the milestone apps it creates
+    app_client.fund((1 + num_milestones) * consts.algo)
+    split = shares(num_receivers)
+    app_client.call(CrowdfundingCampaignApp.set_payout_split, receivers=receivers, shares=split)
+
+    backers = []
+    for _ in range(num_backers):
+        private_key, address = account.generate_account()
+        ledger.fund(address, amount_backed + consts.algo)
+        backers.append(Backer(address, AccountTransactionSigner(private_key), amount_backed))
+    results = BulkFunder(app_client).fund(backers)
+    assert all(r.ok for r in results), [r.error for r in results if not r.ok]
+
+    cost = PayoutCost(num_receivers)
+    received = {r: 0 for r in receivers}
+    fees = FeePlanner(client)
+
+    def claim(milestone_app_id: int = 0):
+        # fresh params for every transaction: each one is confirmed in its own block
+        result = fees.call(
+            app_client,
+            CrowdfundingCampaignApp.claim_funds,
+            accounts=receivers,
+            foreign_apps=[milestone_app_id] if milestone_app_id else None,
+        )
+        txn = ledger.txns[result.tx_id]
+        cost.claims += 1
+        cost.opcodes.append(txn.cost)
+        cost.fees += txn.fee
+        expected_fee = (1 + len(txn.inner_txns)) * client.suggested_params().min_fee
+        if txn.fee != expected_fee:
+            cost.errors.append(f"{num_receivers} receivers: claim paid {txn.fee}, {expected_fee} for its inner payments")
+        for inner in txn.inner_txns:
+            received[inner.receiver] += inner.amount
+
+    clock.advance(61)
+    claim()
+    for milestone in range(1, num_milestones + 1):
+        milestone_app_id = app_client.call(
+            CrowdfundingCampaignApp.submit_milestone,
+            milestone_to_approve=milestone,
+            milestone_metadata=f"ipfs:/milestone_{milestone}_metadata/CID",
+            vote_end_date=clock.now() + VOTE_WINDOW,
+            suggested_params=pooled_params(client.suggested_params(), 1),
+        ).return_value
+        for backer in backers:
+            app_client.prepare(signer=backer.signer).call(
+                CrowdfundingCampaignApp.vote,
+                milestone_app=milestone_app_id,
+                vote=1,
+                suggested_params=pooled_params(client.suggested_params(), 1),
+            )
+        clock.advance(VOTE_WINDOW + 1)
+        ApplicationClient(client, MilestoneApprovalApp(), app_id=milestone_app_id, signer=creator.signer).call(
+            MilestoneApprovalApp.vote_settling
+        )
+        claim(milestone_app_id)
+
+    expected = [amount * len(schedule) for amount in expected_payouts(tranche, split)]
+    for receiver, amount in zip(receivers, expected):
+        if received[receiver] != amount:
+            cost.errors.append(f"{num_receivers} receivers: {receiver} got {received[receiver]}, expected {amount}")
+    state = app_client.get_application_state()
+    if state["campaign_state"] != 3 or state["reached_milestone"] != num_milestones:
+        cost.errors.append(
+            f"{num_receivers} receivers: campaign_state {state['campaign_state']}, reached_milestone {state['reached_milestone']}"
+        )
+    return cost
+
+
+def report(costs: list[PayoutCost]):
+    algo = consts.algo
+    print(f"{'receivers':>9}{'claims':>8}{'opcodes/claim':>15}{'opcodes/receiver':>18}"
+          f"{'fee/claim (Algo)':>18}{'fee/receiver (Algo)':>21}")
+    for c in costs:
+        print(f"{c.receivers:>9}{c.claims:>8}{c.opcodes_per_claim:>15.1f}{c.opcodes_per_claim / c.receivers:>18.1f}"
+              f"{c.fee_per_claim / algo:>18.4f}{c.fee_per_claim / c.receivers / algo:>21.4f}")
+
+
+def main(argv: list[str] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--milestones", type=int, default=3, help="milestones voted and claimed after milestone 0")
+    parser.add_argument("--backers", type=int, default=5, help="backers funding and voting")
+    parser.add_argument("--amount-backed", type=int, default=AMOUNT_BACKED, help="microAlgos backed by each backer")
+    args = parser.parse_args(argv)
+
+    costs = [measure(n, args.milestones, args.backers, args.amount_backed) for n in range(1, MAX_PAYOUT_RECEIVERS + 1)]
+    print(f"{args.milestones + 1} claims per run, {args.backers} backers\n")
+    report(costs)
+    errors = [e for c in costs for e in c.errors]
+    for error in errors[:10]:
+        print(f"  {error}")
+    print(f"\nall tranches paid, each claim paying the fees of its receivers: {'ok' if not errors else 'FAILED'}")
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
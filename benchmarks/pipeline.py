@@ -0,0 +1,191 @@
+"""
+Milestone vote throughput: one blocking call per vote against SubmissionPipeline.
+
+Onboards `backers` backers into three campaigns with a milestone under
+validation, then every backer votes on a LedgerServer (the local ledger
+behind algod's REST API, with simulated latency and block time):
+- blocking: ApplicationClient.call per vote, each waiting for its confirmation;
+- pipelined: SubmissionPipeline, the votes sent back to back and confirmed by
+  the block watcher;
+- pipelined, lossy: the same through a node silently dropping every
+  `drop_every`-th group at its first submission, with groups valid for
+  `validity` rounds: the dropped votes expire and are resubmitted.
+Reports votes per second, resubmissions and rounds watched, and checks that
+every vote was counted exactly once.
+
+    python -m benchmarks.pipeline
+    python -m benchmarks.pipeline --backers 1000 --latency 0.05 --block-time 1
+"""
+import argparse
+import sys
+import time
+from dataclasses import dataclass
+
+from algosdk import account
+from algosdk.atomic_transaction_composer import AccountTransactionSigner
+from algosdk.v2client.algod import AlgodClient
+from beaker import consts
+from beaker.client import ApplicationClient
+
+from client.bulk_funding import Backer, BulkFunder
+from client.fees import FeePlanner
+from client.pipeline import SubmissionPipeline
+from contracts.compile_cache import default_cache
+from contracts.crowdfunding.crowdfundingCampaign import CrowdfundingCampaignApp
+from contracts.crowdfunding.milestoneApproval import MilestoneApprovalApp
+from localnet.algod import LocalAlgodClient, get_accounts
+from localnet.ledger import Ledger
+from localnet.server import LedgerServer
+
+AMOUNT_BACKED = 10 * consts.algo
+FUND_WINDOW = 60
+VOTE_WINDOW = 3600
+
+
+@dataclass
+class VoteRun:
+    name: str
+    votes: int
+    seconds: float
+    resubmitted: int = 0
+    rounds_watched: int = 0
+
+    @property
+    def rate(self) -> float:
+        return self.votes / self.seconds
+
+
+class LossyAlgodClient(AlgodClient):
+    """AlgodClient losing every `drop_every`-th group sent, once per group: algod never receives it."""
+
+    def __init__(self, address: str, drop_every: int):
+        super().__init__("", address)
+        self.drop_every = drop_every
+        self.sent = 0
+        self.dropped: set[str] = set()
+
+    def send_transactions(self, txns, **kwargs):
+        self.sent += 1
+        txid = txns[0].get_txid()
+        if self.sent % self.drop_every == 0:
+            self.dropped.add(txid)
+            return txid
+        return super().send_transactions(txns, **kwargs)
+
+
+def setup(ledger: Ledger, creator, backers: list[Backer]) -> tuple[int, int]:
+    """Campaign funded by every backer with milestone 1 under validation, returns (app_id, milestone_app_id)."""
+    client = LocalAlgodClient(ledger)
+    app_client = default_cache().application_client(client, CrowdfundingCampaignApp(), signer=creator.signer)
+    now = ledger.clock.now()
+    total = len(backers) * AMOUNT_BACKED
+    app_client.create(
+        campaign_goal=total,
+        funds_receiver=creator.address,
+        fund_start_date=now,
+        fund_end_date=now + FUND_WINDOW,
+        reward_metadata="ipfs:/metadata/CID",
+        total_milestones=2,
+        funds_per_milestone=[total // 2, total - total // 2],
+    )
+    app_client.fund(2 * consts.algo) # min balance of the app and milestone app accounts
+    results = BulkFunder(app_client).fund(backers)
+    assert all(r.ok for r in results), [r.error for r in results if not r.ok]
+    ledger.clock.advance(FUND_WINDOW + 1)
+    fees = FeePlanner(client) # pays the inner transactions of claim_funds and submit_milestone
+    fees.call(app_client, CrowdfundingCampaignApp.claim_funds, accounts=[creator.address])
+    milestone_app_id = fees.call(
+        app_client,
+        CrowdfundingCampaignApp.submit_milestone,
+        milestone_to_approve=1,
+        milestone_metadata="ipfs:/milestone_1_metadata/CID",
+        vote_end_date=ledger.clock.now() + VOTE_WINDOW,
+    ).return_value
+    return app_client.app_id, milestone_app_id
+
+
+def vote_blocking(client: AlgodClient, app_id: int, milestone_app_id: int, backers: list[Backer]) -> VoteRun:
+    app_client = ApplicationClient(client, CrowdfundingCampaignApp(), app_id=app_id)
+    fees = FeePlanner(client) # the vote is counted by an inner call of the milestone app
+    start = time.perf_counter()
+    for backer in backers:
+        fees.call(app_client.prepare(signer=backer.signer), CrowdfundingCampaignApp.vote, milestone_app=milestone_app_id, vote=1)
+    return VoteRun("blocking", len(backers), time.perf_counter() - start)
+
+
+def vote_pipelined(
+    name: str, client: AlgodClient, app_id: int, milestone_app_id: int, backers: list[Backer], validity: int
+) -> VoteRun:
+    app_client = ApplicationClient(client, CrowdfundingCampaignApp(), app_id=app_id)
+    start = time.perf_counter()
+    with SubmissionPipeline(client, validity=validity) as pipeline:
+        futures = [
+            pipeline.call(app_client.prepare(signer=b.signer), CrowdfundingCampaignApp.vote, milestone_app=milestone_app_id, vote=1)
+            for b in backers
+        ]
+    elapsed = time.perf_counter() - start
+    errors = [f.exception() for f in futures if f.exception() is not None]
+    if errors:
+        raise RuntimeError(f"{name}: {len(errors)} votes failed: {errors[0]}")
+    return VoteRun(name, len(backers), elapsed, pipeline.resubmitted, pipeline.rounds_watched)
+
+
+def check(ledger: Ledger, milestone_app_id: int, backers: list[Backer]) -> list[str]:
+    """Differences between the votes counted by the milestone app and one approval per backer."""
+    app_client = ApplicationClient(LocalAlgodClient(ledger), MilestoneApprovalApp(), app_id=milestone_app_id)
+    approve_votes = app_client.get_application_state()["approve_votes"]
+    expected = sum(b.amount for b in backers)
+    if approve_votes != expected:
+        return [f"milestone app {milestone_app_id}: approve_votes {approve_votes}, expected {expected}"]
+    return []
+
+
+def report(runs: list[VoteRun]):
+    print(f"{'path':<18}{'votes':>7}{'seconds':>10}{'votes/s':>10}{'resubmitted':>13}{'rounds watched':>16}")
+    for run in runs:
+        print(f"{run.name:<18}{run.votes:>7}{run.seconds:>10.2f}{run.rate:>10.1f}{run.resubmitted:>13}{run.rounds_watched:>16}")
+
+
+def main(argv: list[str] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--backers", type=int, default=100, help="backers voting in each campaign")
+    parser.add_argument("--latency", type=float, default=0.02, help="seconds added to every algod request")
+    parser.add_argument("--block-time", type=float, default=0.5, help="seconds between blocks")
+    parser.add_argument("--drop-every", type=int, default=10, help="groups lost by the lossy node, one in every")
+    parser.add_argument("--validity", type=int, default=3, help="rounds a group stays valid on the lossy node")
+    args = parser.parse_args(argv)
+
+    ledger = Ledger()
+    (creator,) = get_accounts(LocalAlgodClient(ledger), 1, 1_000 * consts.algo)
+    campaigns = []
+    for _ in range(3):
+        backers = []
+        for _ in range(args.backers):
+            private_key, address = account.generate_account()
+            ledger.fund(address, AMOUNT_BACKED + consts.algo)
+            backers.append(Backer(address, AccountTransactionSigner(private_key), AMOUNT_BACKED))
+        campaigns.append((*setup(ledger, creator, backers), backers))
+
+    with LedgerServer(("127.0.0.1", 0), ledger, latency=args.latency, block_time=args.block_time) as server:
+        print(f"{args.backers} votes per path, latency {args.latency * 1000:.0f}ms, block time {args.block_time}s, "
+              f"lossy node dropping 1 group in {args.drop_every}\n")
+        (blocking_id, blocking_app, blocking_backers), (piped_id, piped_app, piped_backers), \
+            (lossy_id, lossy_app, lossy_backers) = campaigns
+        runs = [
+            vote_blocking(AlgodClient("", server.url), blocking_id, blocking_app, blocking_backers),
+            vote_pipelined("pipelined", AlgodClient("", server.url), piped_id, piped_app, piped_backers, 1000),
+            vote_pipelined("pipelined, lossy", LossyAlgodClient(server.url, args.drop_every), lossy_id, lossy_app,
+                           lossy_backers, args.validity),
+        ]
+    report(runs)
+    errors = []
+    for _, milestone_app_id, backers in campaigns:
+        errors += check(ledger, milestone_app_id, backers)
+    for error in errors[:10]:
+        print(f"  {error}")
+    print(f"\nevery vote counted once: {'ok' if not errors else 'FAILED'}")
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
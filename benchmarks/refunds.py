@@ -0,0 +1,168 @@
+"""
+Refund throughput of an unsuccessful campaign: one refund call per backer against RefundDriver.
+
+Onboards `backers` backers into two campaigns that miss their goal, then
+refunds every backer of each campaign on a LedgerServer (the local ledger
+behind algod's REST API, with simulated latency and block time):
+- per backer: every backer sends its own refund call (accounts=[backer]),
+  all submitted back to back;
+- batch: RefundDriver, 4 backers per refund call and 16 calls per atomic
+  group, the backers read from the Fund events, the cursor saved per group.
+Reports refunds per second, calls, groups and fees per backer, and checks that
+every backer got its amount back.
+
+    python -m benchmarks.refunds
+    python -m benchmarks.refunds --backers 10000 --latency 0.05 --block-time 1
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from dataclasses import dataclass
+
+from algosdk import account
+from algosdk.atomic_transaction_composer import AccountTransactionSigner, AtomicTransactionComposer
+from algosdk.future import transaction
+from algosdk.v2client.algod import AlgodClient
+from beaker import consts
+from beaker.client import ApplicationClient
+
+from client.bulk_funding import Backer, BulkFunder
+from client.event_stream import Cursor
+from client.fees import pooled_params
+from client.refunds import RefundDriver
+from contracts.compile_cache import default_cache
+from contracts.crowdfunding.crowdfundingCampaign import CrowdfundingCampaignApp
+from localnet.algod import LocalAlgodClient, get_accounts
+from localnet.ledger import Ledger
+from localnet.server import LedgerServer
+
+AMOUNT_BACKED = 10 * consts.algo
+FUND_WINDOW = 3600
+
+
+@dataclass
+class RefundRun:
+    name: str
+    backers: int
+    seconds: float
+    txids: list[str] # refund calls
+    groups: int
+
+    @property
+    def rate(self) -> float:
+        return self.backers / self.seconds
+
+
+def setup(ledger: Ledger, creator, backers: list[Backer]) -> tuple[int, int]:
+    """Campaign backed by every backer and missing its goal, returns (app_id, round before its creation)."""
+    client = LocalAlgodClient(ledger)
+    app_client = default_cache().application_client(client, CrowdfundingCampaignApp(), signer=creator.signer)
+    created_round = ledger.round
+    now = ledger.clock.now()
+    app_client.create(
+        campaign_goal=2 * len(backers) * AMOUNT_BACKED, # never reached
+        funds_receiver=creator.address,
+        fund_start_date=now,
+        fund_end_date=now + FUND_WINDOW,
+        reward_metadata="ipfs:/metadata/CID",
+        total_milestones=2,
+        funds_per_milestone=[len(backers) * AMOUNT_BACKED, len(backers) * AMOUNT_BACKED],
+    )
+    app_client.fund(consts.algo) # min balance of the app account
+    results = BulkFunder(app_client).fund(backers)
+    assert all(r.ok for r in results), [r.error for r in results if not r.ok]
+    return app_client.app_id, created_round
+
+
+def refund_per_backer(client: AlgodClient, app_id: int, backers: list[Backer]) -> RefundRun:
+    app_client = ApplicationClient(client, CrowdfundingCampaignApp(), app_id=app_id)
+    sp = pooled_params(client.suggested_params(), 1)
+    txids = []
+    start = time.perf_counter()
+    for backer in backers:
+        atc = AtomicTransactionComposer()
+        app_client.add_method_call(
+            atc, CrowdfundingCampaignApp.refund, sender=backer.address, signer=backer.signer,
+            suggested_params=sp, accounts=[backer.address],
+        )
+        client.send_transactions(atc.gather_signatures())
+        txids.append(atc.tx_ids[0])
+    transaction.wait_for_confirmation(client, txids[-1], 10)
+    return RefundRun("per backer", len(backers), time.perf_counter() - start, txids, len(txids))
+
+
+def refund_batch(client: AlgodClient, app_id: int, created_round: int, creator, cursor_path: str) -> RefundRun:
+    app_client = ApplicationClient(client, CrowdfundingCampaignApp(), app_id=app_id, signer=creator.signer)
+    driver = RefundDriver(app_client, cursor_path=cursor_path)
+    start = time.perf_counter()
+    results = driver.refund(start=Cursor(created_round))
+    elapsed = time.perf_counter() - start
+    errors = [r.error for r in results if not r.ok]
+    if errors:
+        raise RuntimeError(f"batch refund failed: {errors[0]}")
+    assert Cursor.load(cursor_path) == results[-1].cursor
+    txids = [txid for r in results for txid in r.txids]
+    return RefundRun("batch", sum(len(r.backers) for r in results), elapsed, txids, len(results))
+
+
+def check(ledger: Ledger, app_id: int, backers: list[Backer]) -> list[str]:
+    """Backers of `app_id` that were not refunded."""
+    app_client = ApplicationClient(LocalAlgodClient(ledger), CrowdfundingCampaignApp(), app_id=app_id)
+    errors = []
+    state = app_client.get_application_state()
+    if state["refunded_backers"] != len(backers) or state["campaign_state"] != 3:
+        errors.append(f"app {app_id}: refunded_backers {state['refunded_backers']}, campaign_state {state['campaign_state']}")
+    for backer in backers:
+        if app_client.get_account_state(backer.address)["amount_backed"] != 0:
+            errors.append(f"app {app_id}: {backer.address} not refunded")
+    return errors
+
+
+def report(runs: list[RefundRun], ledger: Ledger):
+    print(f"{'path':<12}{'backers':>9}{'seconds':>10}{'refunds/s':>11}{'calls':>8}{'groups':>8}{'fees/backer (Algo)':>20}")
+    for run in runs:
+        fees = sum(ledger.txns[txid].fee for txid in run.txids)
+        print(f"{run.name:<12}{run.backers:>9}{run.seconds:>10.2f}{run.rate:>11.1f}{len(run.txids):>8}{run.groups:>8}"
+              f"{fees / run.backers / consts.algo:>20.5f}")
+
+
+def main(argv: list[str] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--backers", type=int, default=1000, help="backers refunded by each path")
+    parser.add_argument("--latency", type=float, default=0.02, help="seconds added to every algod request")
+    parser.add_argument("--block-time", type=float, default=0.5, help="seconds between blocks")
+    args = parser.parse_args(argv)
+
+    ledger = Ledger()
+    (creator,) = get_accounts(LocalAlgodClient(ledger), 1, 1_000 * consts.algo)
+    campaigns = []
+    for _ in range(2):
+        backers = []
+        for _ in range(args.backers):
+            private_key, address = account.generate_account()
+            ledger.fund(address, AMOUNT_BACKED + consts.algo)
+            backers.append(Backer(address, AccountTransactionSigner(private_key), AMOUNT_BACKED))
+        campaigns.append((*setup(ledger, creator, backers), backers))
+    ledger.clock.advance(FUND_WINDOW + 1)
+
+    (single_id, _, single_backers), (batch_id, batch_round, batch_backers) = campaigns
+    with tempfile.TemporaryDirectory() as tmp, \
+            LedgerServer(("127.0.0.1", 0), ledger, latency=args.latency, block_time=args.block_time) as server:
+        print(f"{args.backers} backers per path, latency {args.latency * 1000:.0f}ms, block time {args.block_time}s\n")
+        client = AlgodClient("", server.url)
+        runs = [
+            refund_per_backer(client, single_id, single_backers),
+            refund_batch(client, batch_id, batch_round, creator, os.path.join(tmp, "refunds.cursor")),
+        ]
+    report(runs, ledger)
+    errors = check(ledger, single_id, single_backers) + check(ledger, batch_id, batch_backers)
+    for error in errors[:10]:
+        print(f"  {error}")
+    print(f"\nall backers refunded: {'ok' if not errors else 'FAILED'}")
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
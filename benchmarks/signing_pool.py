@@ -0,0 +1,190 @@
+"""
+Signing throughput: algosdk's signing against SigningPool, by number of worker processes.
+
+Signs `groups` groups shaped like BulkFunder's (opt-in, payment and fund call
+of 5 backers, 15 transactions), sent by `accounts` accounts:
+- algosdk: assign_group_id, txn.sign and the msgpack encoding of the signed
+  transactions that send_transactions does, what BulkFunder's thread pool runs
+  under the GIL;
+- SigningPool (client/signing_pool.py) signing in the calling process, then
+  with each number of worker processes of `processes`.
+Reports the transactions signed per second and the speedup per process
+count (bounded by the cores of the machine, see `cores`), checks that the
+pool's signed bytes and txids are algosdk's, and that BulkFunder funds a
+campaign with its groups signed by the pool.
+
+    python -m benchmarks.signing_pool
+    python -m benchmarks.signing_pool --groups 4000 --processes 1 2 4 8
+"""
+import argparse
+import base64
+import os
+import sys
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+from algosdk import abi, account, encoding
+from algosdk.atomic_transaction_composer import AccountTransactionSigner
+from algosdk.future import transaction
+from algosdk.logic import get_application_address
+from beaker import consts
+
+from client.bulk_funding import Backer, BulkFunder
+from client.signing_pool import SignedItem, SigningPool
+from contracts.compile_cache import default_cache
+from contracts.crowdfunding.crowdfundingCampaign import CrowdfundingCampaignApp
+from localnet.algod import LocalAlgodClient, get_accounts
+
+AMOUNT_BACKED = 10 * consts.algo
+BACKERS_PER_GROUP = 5
+APP_ID = 1234
+FUND_WINDOW = 60
+
+
+@dataclass
+class SigningRun:
+    name: str
+    processes: Optional[int] # None for algosdk, 0 for the pool in the calling process
+    txns: int
+    seconds: float
+    startup: float = 0.0 # seconds starting the workers, not counted in `seconds`
+    signed: list[bytes] = None
+
+    @property
+    def rate(self) -> float:
+        return self.txns / self.seconds
+
+
+def make_groups(keys: list[str], num_groups: int) -> list[list[transaction.Transaction]]:
+    """Groups of BACKERS_PER_GROUP backers, each an opt-in, a payment to the app and an app call, without group id."""
+    sp = transaction.SuggestedParams(1000, 1000, 2000, base64.b64encode(bytes(32)).decode(), "localnet", flat_fee=True)
+    app_addr = get_application_address(APP_ID)
+    selector = abi.Method.from_signature("fund(pay)void").get_selector()
+    senders = [account.address_from_private_key(key) for key in keys]
+    groups = []
+    for i in range(num_groups):
+        group = []
+        for j in range(BACKERS_PER_GROUP):
+            sender = senders[(i * BACKERS_PER_GROUP + j) % len(senders)]
+            group += [
+                transaction.ApplicationOptInTxn(sender, sp, APP_ID),
+                transaction.PaymentTxn(sender, sp, app_addr, AMOUNT_BACKED + i),
+                transaction.ApplicationCallTxn(sender, sp, APP_ID, transaction.OnComplete.NoOpOC, app_args=[selector]),
+            ]
+        groups.append(group)
+    return groups
+
+
+def sign_algosdk(keys: list[str], groups: list[list[transaction.Transaction]]) -> SigningRun:
+    by_sender = {account.address_from_private_key(key): key for key in keys}
+    groups = [[transaction.Transaction.undictify(txn.dictify()) for txn in group] for group in groups] # assigned in place
+    start = time.perf_counter()
+    signed = []
+    for group in groups:
+        transaction.assign_group_id(group)
+        signed.append(b"".join(
+            base64.b64decode(encoding.msgpack_encode(txn.sign(by_sender[txn.sender]))) for txn in group
+        ))
+    seconds = time.perf_counter() - start
+    return SigningRun("algosdk", None, sum(map(len, groups)), seconds, signed=signed)
+
+
+def sign_pooled(keys: list[str], groups: list[list[transaction.Transaction]], processes: int, chunk_size: int) -> SigningRun:
+    start = time.perf_counter()
+    with SigningPool(keys, processes, chunk_size) as pool:
+        if processes:
+            pool.sign([groups[0][:1]]) # the workers are up
+        startup = time.perf_counter() - start
+        start = time.perf_counter()
+        signed: list[SignedItem] = pool.sign(groups)
+        seconds = time.perf_counter() - start
+    name = f"pool, {processes} processes" if processes else "pool, in process"
+    return SigningRun(name, processes, sum(map(len, groups)), seconds, startup, [item.data for item in signed])
+
+
+def check_txids(keys: list[str], groups: list[list[transaction.Transaction]]) -> list[str]:
+    """The txids of the pool are those of algosdk after assign_group_id."""
+    expected = []
+    for group in groups:
+        group = [transaction.Transaction.undictify(txn.dictify()) for txn in group]
+        transaction.assign_group_id(group)
+        expected.append([txn.get_txid() for txn in group])
+    signed = SigningPool(keys, processes=0).sign(groups)
+    return [f"group {i}: txids {item.txids} != {txids}" for i, (item, txids) in enumerate(zip(signed, expected)) if item.txids != txids]
+
+
+def check_bulk_funding(num_backers: int, processes: int) -> list[str]:
+    """Errors of BulkFunder funding a campaign with `num_backers` backers, its groups signed by a SigningPool."""
+    client = LocalAlgodClient()
+    (creator,) = get_accounts(client, 1)
+    app_client = default_cache().application_client(client, CrowdfundingCampaignApp(), signer=creator.signer)
+    now = client.clock.now()
+    total = num_backers * AMOUNT_BACKED
+    app_client.create(
+        campaign_goal=total,
+        funds_receiver=creator.address,
+        fund_start_date=now,
+        fund_end_date=now + FUND_WINDOW,
+        reward_metadata="ipfs:/metadata/CID",
+        total_milestones=1,
+        funds_per_milestone=[total],
+    )
+    app_client.fund(consts.algo)
+    backers = []
+    for _ in range(num_backers):
+        private_key, address = account.generate_account()
+        client.ledger.fund(address, AMOUNT_BACKED + consts.algo)
+        backers.append(Backer(address, AccountTransactionSigner(private_key), AMOUNT_BACKED))
+    with SigningPool.from_signers((b.signer for b in backers), processes=processes) as pool:
+        results = BulkFunder(app_client, signing_pool=pool).fund(backers)
+    errors = [f"bulk funding: group of {r.backers[0]}: {r.error}" for r in results if not r.ok]
+    raised = app_client.get_application_state()["collected_funds"]
+    if raised != total:
+        errors.append(f"bulk funding: {raised} raised, {total} expected")
+    return errors
+
+
+def report(runs: list[SigningRun], cores: int):
+    baseline = runs[0]
+    one = next((run for run in runs if run.processes == 1), None)
+    print(f"{runs[0].txns} transactions, {cores} cores\n")
+    print(f"{'signer':<24}{'txns/s':>10}{'speedup':>10}{'vs 1 process':>14}{'startup (s)':>13}")
+    for run in runs:
+        scaling = f"{run.rate / one.rate:.2f}x" if one and run.processes else ""
+        startup = f"{run.startup:.2f}" if run.processes else ""
+        print(f"{run.name:<24}{run.rate:>10.0f}{run.rate / baseline.rate:>9.2f}x{scaling:>14}{startup:>13}")
+    if any(run.processes and run.processes > cores for run in runs):
+        print(f"\nprocesses beyond the {cores} cores share them: no speedup past {cores}")
+
+
+def main(argv: list[str] = None) -> int:
+    cores = os.cpu_count()
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--groups", type=int, default=1000, help="groups of 15 transactions to sign")
+    parser.add_argument("--accounts", type=int, default=100, help="accounts sending the transactions")
+    parser.add_argument("--processes", type=int, nargs="+", default=sorted({1, 2, cores}), help="worker process counts to run")
+    parser.add_argument("--chunk-size", type=int, default=64, help="groups per task sent to a worker")
+    parser.add_argument("--backers", type=int, default=40, help="backers of the bulk funding check")
+    args = parser.parse_args(argv)
+
+    keys = [account.generate_account()[0] for _ in range(args.accounts)]
+    groups = make_groups(keys, args.groups)
+    runs = [sign_algosdk(keys, groups), sign_pooled(keys, groups, 0, args.chunk_size)]
+    runs += [sign_pooled(keys, groups, processes, args.chunk_size) for processes in args.processes]
+    report(runs, cores)
+
+    errors = [
+        f"{run.name}: group {i} signed differently"
+        for run in runs[1:] for i, (a, b) in enumerate(zip(runs[0].signed, run.signed)) if a != b
+    ]
+    errors += check_txids(keys, groups[:50])
+    errors += check_bulk_funding(args.backers, max(args.processes))
+    for error in errors[:10]:
+        print(f"  {error}")
+    print(f"\nsame signed bytes and txids as algosdk, bulk funding signed by the pool: {'ok' if not errors else 'FAILED'}")
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,146 @@
+"""
+Startup time of a client process: contract modules (PyTeal, beaker) against the build/ artifacts.
+
+Deploys a campaign on a LedgerServer (the local ledger behind algod's REST
+API) and starts `runs` fresh Python processes for each path, each one
+building a campaign client and reading the campaign (global state and a
+read-only get_milestone_funds call):
+- contracts: imports contracts.crowdfunding.crowdfundingCampaign and builds the
+  ApplicationClient through the compile cache (warm cache, no PyTeal generation);
+- artifacts: client/artifacts.py loading build/crowdfundingCampaign, no PyTeal.
+Reports the median time to import, to get a ready client, to the first
+result and of the whole process, with the modules loaded and the memory of the ready client.
+
+    python -m benchmarks.startup
+    python -m benchmarks.startup --runs 20 --build-dir /tmp/build
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import time
+
+from beaker import consts
+
+from client.artifacts import AppArtifacts
+from contracts.compile_cache import default_cache
+from contracts.crowdfunding.crowdfundingCampaign import CrowdfundingCampaignApp
+from localnet.algod import LocalAlgodClient, get_accounts
+from localnet.ledger import Ledger
+from localnet.server import LedgerServer
+
+CONTRACTS_IMPORT = """
+from contracts.compile_cache import default_cache
+from contracts.crowdfunding.crowdfundingCampaign import CrowdfundingCampaignApp
+"""
+CONTRACTS_CLIENT = """
+campaign = default_cache().application_client(client, CrowdfundingCampaignApp(), app_id=app_id, signer=signer)
+get_milestone_funds = CrowdfundingCampaignApp.get_milestone_funds
+"""
+ARTIFACTS_IMPORT = """
+from client.artifacts import CampaignClient
+"""
+ARTIFACTS_CLIENT = """
+campaign = CampaignClient.load(client, app_id, signer, build_dir=build_dir)
+get_milestone_funds = "get_milestone_funds"
+"""
+READ = """
+state = campaign.get_application_state()
+funds = campaign.call(get_milestone_funds, milestone=1).return_value
+assert funds == state["campaign_goal"] * 3 // 10, funds
+"""
+# timings from inside the process, printed as JSON on the last line
+PROCESS = """
+import time
+start = time.perf_counter()
+{import_}
+imported = time.perf_counter()
+import json, resource, sys
+from algosdk.atomic_transaction_composer import AccountTransactionSigner
+from algosdk.v2client.algod import AlgodClient
+client, app_id, build_dir = AlgodClient("", {url!r}), {app_id}, {build_dir!r}
+signer = AccountTransactionSigner({private_key!r}) # read-only calls are dryrun, never sent
+{client}
+ready = time.perf_counter()
+with open("/proc/self/statm") as f: # ru_maxrss would carry over the peak of the forking benchmark process
+    ready_rss = int(f.read().split()[1]) * resource.getpagesize()
+{read}
+done = time.perf_counter()
+print(json.dumps({{
+    "import": imported - start, "client": ready - start, "first call": done - start,
+    "modules": len(sys.modules), "rss_mb": ready_rss / 2**20,
+}}))
+"""
+PATHS = {
+    "contracts": (CONTRACTS_IMPORT, CONTRACTS_CLIENT),
+    "artifacts": (ARTIFACTS_IMPORT, ARTIFACTS_CLIENT),
+}
+
+
+def deploy(ledger: Ledger, build_dir: str) -> tuple[int, str]:
+    """Campaign to read and private key of its creator, the artifacts are (re)built in `build_dir`."""
+    client = LocalAlgodClient(ledger)
+    (creator,) = get_accounts(client, 1, 1_000 * consts.algo)
+    AppArtifacts.load("crowdfundingCampaign", build_dir, client, rebuild=True)
+    app_client = default_cache().application_client(client, CrowdfundingCampaignApp(), signer=creator.signer)
+    now = ledger.clock.now()
+    app_id, _, _ = app_client.create(
+        campaign_goal=10 * consts.algo,
+        funds_receiver=creator.address,
+        fund_start_date=now,
+        fund_end_date=now + 60,
+        reward_metadata="ipfs:/metadata/CID",
+        total_milestones=2,
+        funds_per_milestone=[7 * consts.algo, 3 * consts.algo],
+    )
+    return app_id, creator.private_key
+
+
+def run(path: str, url: str, app_id: int, private_key: str, build_dir: str) -> dict[str, float]:
+    import_, client = PATHS[path]
+    code = PROCESS.format(
+        import_=import_, client=client, read=READ, url=url, app_id=app_id, private_key=private_key, build_dir=build_dir
+    )
+    start = time.perf_counter()
+    process = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True)
+    if process.returncode != 0:
+        raise RuntimeError(f"{path} process failed:\n{process.stderr}")
+    out = process.stdout
+    timings = json.loads(out.strip().splitlines()[-1])
+    timings["process"] = time.perf_counter() - start
+    return timings
+
+
+def report(results: dict[str, list[dict[str, float]]]):
+    columns = ["import", "client", "first call", "process"]
+    print(f"{'path':<12}" + "".join(f"{c + ' ms':>15}" for c in columns) + f"{'modules':>10}{'RSS MB':>10}")
+    medians = {}
+    for path, runs in results.items():
+        medians[path] = {k: statistics.median(r[k] for r in runs) for k in runs[0]}
+        m = medians[path]
+        print(f"{path:<12}" + "".join(f"{m[c] * 1000:>15.0f}" for c in columns) + f"{m['modules']:>10.0f}{m['rss_mb']:>10.1f}")
+    speedup = medians["contracts"]["first call"] / medians["artifacts"]["first call"]
+    print(f"\ntime to the first result: {speedup:.1f}x faster from the artifacts (medians)")
+
+
+def main(argv: list[str] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--runs", type=int, default=10, help="processes started per path")
+    parser.add_argument("--build-dir", default="./build", help="directory of the artifacts")
+    args = parser.parse_args(argv)
+
+    ledger = Ledger()
+    app_id, private_key = deploy(ledger, args.build_dir)
+    results = {path: [] for path in PATHS}
+    with LedgerServer(("127.0.0.1", 0), ledger) as server:
+        for _ in range(args.runs):
+            for path in PATHS: # interleaved, both paths see the same disk cache conditions
+                results[path].append(run(path, server.url, app_id, private_key, args.build_dir))
+    print(f"{args.runs} processes per path, reading campaign {app_id}\n")
+    report(results)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,212 @@
+"""
+Cost of a milestone vote for the voters: opt-in vote against opt-in free vote.
+
+Onboards `voters` backers into a campaign on the in-process ledger, submits a
+milestone and has every backer vote with both designs:
+- opt_in: MilestoneApprovalApp.opt_in(vote) on a standalone milestone app
+  created by the campaign creator, local state in every milestone app, released
+  afterwards with a ClearState call;
+- vote: CrowdfundingCampaignApp.vote(milestone_app, vote), the campaign records
+  the vote in the local state the backer already has and forwards it with an inner call.
+A milestone app created by the campaign only counts the votes cast through it,
+checked by an opt_in ballot rejected on it. Transactions, fees, min balance and
+opcodes are reported per 1000 voters.
+
+    python -m benchmarks.voting_cost
+    python -m benchmarks.voting_cost --voters 200
+"""
+import argparse
+import sys
+from dataclasses import dataclass
+
+from algosdk import account
+from algosdk.atomic_transaction_composer import AccountTransactionSigner, AtomicTransactionComposer, TransactionWithSigner
+from algosdk.future import transaction
+from beaker import consts
+from beaker.client import ApplicationClient
+
+from client.bulk_funding import Backer, BulkFunder
+from contracts.compile_cache import default_cache
+from contracts.crowdfunding.crowdfundingCampaign import CrowdfundingCampaignApp
+from contracts.crowdfunding.milestoneApproval import MilestoneApprovalApp
+from localnet.algod import LocalAlgodClient, get_accounts
+from localnet.ledger import SCHEMA_UINT_MIN_BALANCE
+
+PER_VOTERS = 1000
+
+
+@dataclass
+class VotingCost:
+    """Totals over all the voters of one design."""
+
+    design: str
+    voters: int
+    txns: int = 0
+    fees: int = 0 # microAlgos
+    min_balance: int = 0 # microAlgos locked by the voters while the vote is open
+    opcodes: int = 0
+    release_txns: int = 0 # transactions needed to unlock the min balance
+    release_fees: int = 0
+
+    def per(self, value: int) -> float:
+        return value * PER_VOTERS / self.voters
+
+
+def measure(num_voters: int) -> tuple[VotingCost, VotingCost, int, list[str]]:
+    """
+    Returns the costs of both designs, the min balance of a backer opting in to a campaign and the
+    opt_in ballots counted by the milestone app of the campaign (it counts the votes cast through it only).
+    """
+    client = LocalAlgodClient()
+    clock = client.clock
+    ledger = client.ledger
+    (creator,) = get_accounts(client, 1, 1_000_000 * consts.algo)
+
+    backers = []
+    for _ in range(num_voters):
+        private_key, address = account.generate_account()
+        ledger.fund(address, 23 * consts.algo)
+        backers.append(Backer(address, AccountTransactionSigner(private_key), 10 * consts.algo))
+    campaign_min_balance = ledger.min_balance(backers[0].address)
+
+    def params(inner_txns: int = 0) -> transaction.SuggestedParams:
+        # fresh for every transaction: each one is confirmed in its own block
+        sp = client.suggested_params()
+        sp.fee = sp.min_fee * (1 + inner_txns)
+        sp.flat_fee = True
+        return sp
+
+    def campaign() -> tuple[ApplicationClient, int]:
+        """Campaign funded by every backer with milestone 1 submitted."""
+        app_client = default_cache().application_client(client, CrowdfundingCampaignApp(), signer=creator.signer)
+        now = clock.now()
+        app_client.create(
+            campaign_goal=10 * consts.algo,
+            funds_receiver=creator.address,
+            fund_start_date=now,
+            fund_end_date=now + 60,
+            reward_metadata="ipfs:/metadata/CID",
+            total_milestones=2,
+            funds_per_milestone=[7 * consts.algo, 3 * consts.algo],
+        )
+        app_client.fund(consts.algo) # min balance of the app account
+        results = BulkFunder(app_client).fund(backers)
+        assert all(r.ok for r in results), [r.error for r in results if not r.ok]
+        clock.advance(61)
+        app_client.call(CrowdfundingCampaignApp.claim_funds, accounts=[creator.address], suggested_params=params(1))
+        milestone_app_id = app_client.call(
+            CrowdfundingCampaignApp.submit_milestone,
+            milestone_to_approve=1,
+            milestone_metadata="ipfs:/milestone_1_metadata/CID",
+            vote_end_date=clock.now() + 3600,
+            suggested_params=params(1),
+        ).return_value
+        return app_client, milestone_app_id
+
+    app_client, milestone_app_id = campaign()
+    campaign_min_balance = ledger.min_balance(backers[0].address) - campaign_min_balance
+    # standalone milestone app of the same milestone, its votes are opt_in ballots
+    standalone_client = default_cache().application_client(client, MilestoneApprovalApp(), signer=creator.signer)
+    opt_in_app_id, _, _ = standalone_client.create(
+        creator=creator.address,
+        crowdfunding_address=app_client.app_addr,
+        milestone_to_approve=1,
+        vote_end_date=clock.now() + 3600,
+        milestone_metadata="ipfs:/milestone_1_metadata/CID",
+    )
+
+    def execute(atc: AtomicTransactionComposer) -> list:
+        tx_ids = atc.execute(client, 4).tx_ids
+        return [ledger.txns[txid] for txid in tx_ids]
+
+    def opt_in_vote(backer: Backer, app_id: int) -> list:
+        atc = AtomicTransactionComposer()
+        ApplicationClient(client, MilestoneApprovalApp(), app_id=app_id, signer=backer.signer).add_method_call(
+            atc, MilestoneApprovalApp.opt_in, on_complete=transaction.OnComplete.OptInOC, suggested_params=params(), vote=1
+        )
+        return execute(atc)
+
+    def campaign_vote(backer: Backer, campaign_client: ApplicationClient, app_id: int) -> list:
+        atc = AtomicTransactionComposer()
+        campaign_client.prepare(signer=backer.signer).add_method_call(
+            atc, CrowdfundingCampaignApp.vote, suggested_params=params(1), milestone_app=app_id, vote=1
+        )
+        return execute(atc)
+
+    opt_in = VotingCost("opt_in", num_voters)
+    plain = VotingCost("vote", num_voters)
+    for backer in backers:
+        before = ledger.min_balance(backer.address)
+        _add(opt_in, opt_in_vote(backer, opt_in_app_id))
+        opt_in.min_balance += ledger.min_balance(backer.address) - before
+
+        before = ledger.min_balance(backer.address)
+        _add(plain, campaign_vote(backer, app_client, milestone_app_id))
+        plain.min_balance += ledger.min_balance(backer.address) - before
+
+    # the milestone app of the campaign rejects the opt_in ballots
+    errors = []
+    voter = backers[0]
+    try:
+        opt_in_vote(voter, milestone_app_id)
+        errors.append("opt_in ballot accepted by the milestone app of the campaign")
+    except Exception:
+        pass
+    approve_votes = ledger.global_get(milestone_app_id, b"approve_votes")
+    if approve_votes != num_voters * voter.amount:
+        errors.append(f"{approve_votes} approve votes, {num_voters * voter.amount} cast through the campaign")
+
+    # the opt-in design keeps the min balance locked until the voter leaves the milestone app
+    for backer in backers:
+        atc = AtomicTransactionComposer()
+        atc.add_transaction(TransactionWithSigner(
+            txn=transaction.ApplicationClearStateTxn(backer.address, params(), opt_in_app_id),
+            signer=backer.signer,
+        ))
+        for txn in execute(atc):
+            opt_in.release_txns += 1
+            opt_in.release_fees += txn.fee
+    return opt_in, plain, campaign_min_balance, errors
+
+
+def _add(cost: VotingCost, txns: list):
+    for txn in txns:
+        cost.txns += 1
+        cost.fees += txn.fee
+        cost.opcodes += txn.cost + sum(inner.cost for inner in txn.inner_txns)
+
+
+def report(opt_in: VotingCost, plain: VotingCost, campaign_min_balance: int):
+    algo = consts.algo
+    rows = [
+        ("vote txns", lambda c: f"{c.per(c.txns):.0f}"),
+        ("vote fees (Algo)", lambda c: f"{c.per(c.fees) / algo:.3f}"),
+        ("min balance locked (Algo)", lambda c: f"{c.per(c.min_balance) / algo:.3f}"),
+        ("txns to unlock it", lambda c: f"{c.per(c.release_txns):.0f}"),
+        ("fees to unlock it (Algo)", lambda c: f"{c.per(c.release_fees) / algo:.3f}"),
+        ("total txns", lambda c: f"{c.per(c.txns + c.release_txns):.0f}"),
+        ("total fees (Algo)", lambda c: f"{c.per(c.fees + c.release_fees) / algo:.3f}"),
+        ("opcodes per vote", lambda c: f"{c.opcodes / c.voters:.0f}"),
+    ]
+    print(f"per {PER_VOTERS} voters and milestone ({opt_in.voters} voters measured)\n")
+    print(f"{'':<30}{'opt_in':>12}{'vote':>12}")
+    for name, fmt in rows:
+        print(f"{name:<30}{fmt(opt_in):>12}{fmt(plain):>12}")
+    print(f"\nmin balance of a campaign opt-in, once per backer: {campaign_min_balance / algo:.4f} Algo "
+          f"({SCHEMA_UINT_MIN_BALANCE / algo:.4f} of it for the voted_submission used by vote)")
+
+
+def main(argv: list[str] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--voters", type=int, default=PER_VOTERS, help="backers voting on the milestone")
+    args = parser.parse_args(argv)
+    opt_in, plain, campaign_min_balance, errors = measure(args.voters)
+    report(opt_in, plain, campaign_min_balance)
+    for error in errors:
+        print(f"  {error}")
+    print(f"\nonly the votes cast through the campaign counted by its milestone app: {'ok' if not errors else 'FAILED'}")
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
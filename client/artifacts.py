@@ -0,0 +1,595 @@
+"""
+Clients of the crowdfunding contracts built from the artifacts in build/, without PyTeal.
+
+Importing the contract modules pulls in PyTeal, beaker (and its sandbox
+helpers) and builds the Application before the first call, a startup cost
+paid again by every short-lived process. The artifacts written by
+`python contracts/crowdfunding/<contract>.py` (or `build`) hold all a
+client needs: application.json (TEAL sources, ABI contract, state schema,
+method hints, events) and the assembled approval.bin/clear.bin. This module
+only imports algosdk; PyTeal is imported lazily when the artifacts are
+missing or a rebuild is requested. The other runtime modules (event stream,
+state cache, scheduler, exports) decode events and state through it too:
+
+    campaign = CampaignClient.load(algod_client, app_id, signer=signer)
+    campaign.claim_funds([funds_receiver])
+
+The artifacts are checked against build/manifest.json (`python -m
+contracts.build`), which records the hash of every source file of each
+contract: if a source file present changed since, or the programs are not
+those of that build, the artifacts are rebuilt with the algod client given,
+or the load fails without one. Artifacts without a manifest entry (dumped by
+a contract script) are not checked.
+"""
+import base64
+import copy
+import hashlib
+import json
+import os
+from dataclasses import dataclass, field
+from typing import Any, Optional
+
+from algosdk import abi, encoding
+from algosdk.atomic_transaction_composer import (
+    ABIResult,
+    AtomicTransactionComposer,
+    TransactionSigner,
+    TransactionWithSigner,
+)
+from algosdk.future import transaction
+from algosdk.logic import get_application_address
+from algosdk.v2client.algod import AlgodClient
+
+from client.fees import FeePlanner, method_inner_txns, method_inner_txns_vary, pooled_params
+from client.metrics import CallMetrics
+
+DEFAULT_BUILD_DIR = "./build"
+MANIFEST = "manifest.json" # written by contracts/build.py
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__))) # the source paths of the manifest are relative to it
+PROGRAM_PAGE_SIZE = 2048
+ABI_RETURN_PREFIX = bytes.fromhex("151f7c75")
+
+# artifacts directory -> (module, Application class) building it
+CONTRACTS = {
+    "crowdfundingCampaign": ("contracts.crowdfunding.crowdfundingCampaign", "CrowdfundingCampaignApp"),
+    "packedCrowdfundingCampaign": ("contracts.crowdfunding.packedCrowdfundingCampaign", "PackedCrowdfundingCampaignApp"),
+    "milestoneApproval": ("contracts.crowdfunding.milestoneApproval", "MilestoneApprovalApp"),
+    "campaignFactory": ("contracts.crowdfunding.campaignFactory", "CampaignFactoryApp"),
+}
+
+
+@dataclass
+class AppArtifacts:
+    """Programs, ABI contract and state schema of an Application, as dumped in build/<name>."""
+
+    name: str
+    approval_teal: str
+    clear_teal: str
+    approval_binary: bytes
+    clear_binary: bytes
+    contract: abi.Contract
+    global_schema: transaction.StateSchema
+    local_schema: transaction.StateSchema
+    hints: dict[str, Any]
+    packed: dict[str, list[str]] = field(default_factory=dict) # PackedState key -> uint64 fields
+    events: list["EventDefinition"] = field(default_factory=list) # logged by the app
+    state_schema: dict[str, Any] = field(default_factory=dict) # "schema" of application.json, with the value types
+
+    @property
+    def extra_pages(self) -> int:
+        return (len(self.approval_binary) + len(self.clear_binary) - 1) // PROGRAM_PAGE_SIZE
+
+    def method(self, name: str) -> abi.Method:
+        return self.contract.get_method_by_name(name)
+
+    def read_only(self, method: abi.Method) -> bool:
+        return self.hints.get(method.name, {}).get("read_only", False)
+
+    def state_keys(self, local: bool = False) -> list[str]:
+        """Keys of the global (or local) state decoded by decode_state: declared keys and paged reserved values."""
+        schema = self.state_schema.get("local" if local else "global", {})
+        keys = []
+        for entry in schema.get("declared", {}).values():
+            keys += entry.get("fields", [entry["key"]])
+        return keys + [name for name, entry in schema.get("reserved", {}).items() if "key_prefix" in entry]
+
+    def decode_state(self, raw: dict[bytes, Any], local: bool = False) -> dict[str, Any]:
+        """
+        Decode the raw global (or local) state {key: int or bytes} by the value types of the schema
+        (contracts/crowdfunding/state_types.py): PackedState entries are replaced by their uint64 fields, the
+        pages of a reserved value are joined under its name, an undeclared key keeps its raw value.
+        """
+        schema = self.state_schema.get("local" if local else "global", {})
+        declared = {entry["key"].encode(): entry for entry in schema.get("declared", {}).values()}
+        paged = {name: entry for name, entry in schema.get("reserved", {}).items() if "key_prefix" in entry}
+        state: dict[str, Any] = {}
+        pages: dict[str, dict[int, bytes]] = {}
+        for key, value in raw.items():
+            entry = declared.get(key)
+            if entry is not None and "fields" in entry and isinstance(value, bytes):
+                state.update(unpack(value, entry["fields"]))
+            elif entry is not None:
+                state[entry["key"]] = decode_value(value, entry.get("value_type"))
+            else:
+                name = _page_of(key, paged)
+                if name is not None:
+                    pages.setdefault(name, {})[key[-1]] = value
+                else:
+                    state[_str_or_hex(key)] = value
+        for name, values in pages.items():
+            state[name] = _join_pages(values, paged[name], state)
+        return state
+
+    @classmethod
+    def load(
+        cls, name: str, build_dir: str = DEFAULT_BUILD_DIR, client: AlgodClient = None, rebuild: bool = False
+    ) -> "AppArtifacts":
+        """
+        Load build/<name>, rebuilding it with PyTeal (and `client` to compile) if asked, if it is missing or
+        if it does not match its sources (see stale_sources).
+
+        The programs are assembled by `client` if the binaries were not dumped.
+        """
+        directory = os.path.join(build_dir, name)
+        missing = not os.path.exists(os.path.join(directory, "application.json"))
+        stale = [] if rebuild or missing else stale_sources(name, build_dir)
+        if rebuild or missing or stale:
+            if client is None and stale:
+                raise ValueError(
+                    f"artifacts in {directory} do not match {', '.join(stale)}, rebuild them (python -m contracts.build)"
+                )
+            if client is None:
+                raise ValueError(f"no artifacts in {directory}, an algod client is needed to build them")
+            build(name, build_dir, client)
+
+        with open(os.path.join(directory, "application.json")) as f:
+            spec = json.load(f)
+        approval_teal = base64.b64decode(spec["source"]["approval"]).decode("utf8")
+        clear_teal = base64.b64decode(spec["source"]["clear"]).decode("utf8")
+        return cls(
+            name=name,
+            approval_teal=approval_teal,
+            clear_teal=clear_teal,
+            approval_binary=_binary(directory, "approval", approval_teal, client),
+            clear_binary=_binary(directory, "clear", clear_teal, client),
+            contract=abi.Contract.undictify(spec["contract"]),
+            global_schema=_schema(spec["schema"]["global"]),
+            local_schema=_schema(spec["schema"]["local"]),
+            hints=spec.get("hints", {}),
+            packed={
+                entry["key"]: entry["fields"]
+                for entry in spec["schema"]["global"]["declared"].values() if "fields" in entry
+            },
+            events=[EventDefinition.from_spec(event) for event in spec.get("events", [])],
+            state_schema=spec["schema"],
+        )
+
+    @classmethod
+    def of(cls, app: Any, build_dir: str = DEFAULT_BUILD_DIR, client: AlgodClient = None) -> Optional["AppArtifacts"]:
+        """Artifacts of a contract of CONTRACTS given by its Application (class or instance), None for another app."""
+        app_cls = app if isinstance(app, type) else type(app)
+        for name, (_, class_name) in CONTRACTS.items():
+            if app_cls.__name__ == class_name:
+                return cls.load(name, build_dir, client)
+        return None
+
+
+class EventDefinition:
+    """
+    Event of the "events" of application.json (ARC-28): logged as the 4 bytes selector of its signature
+    followed by its ABI encoded fields, see contracts/crowdfunding/events.py.
+    """
+
+    def __init__(self, name: str, fields: list[tuple[str, str]]):
+        self.name = name
+        self.fields = fields
+        self.signature = f"{name}({','.join(t for _, t in fields)})"
+        self.selector = encoding.checksum(self.signature.encode())[:4]
+        self.abi_type = abi.ABIType.from_string(f"({','.join(t for _, t in fields)})")
+
+    @classmethod
+    def from_spec(cls, spec: dict[str, Any]) -> "EventDefinition":
+        return cls(spec["name"], [(arg["name"], arg["type"]) for arg in spec["args"]])
+
+    def decode(self, log: bytes) -> dict[str, Any]:
+        """Fields of a log starting with this event's selector."""
+        values = self.abi_type.decode(log[len(self.selector):])
+        return {field_name: value for (field_name, _), value in zip(self.fields, values)}
+
+    def __repr__(self) -> str:
+        return f"EventDefinition({self.signature})"
+
+
+def contract_events(build_dir: str = DEFAULT_BUILD_DIR, client: AlgodClient = None) -> dict[str, EventDefinition]:
+    """Events logged by the contracts of CONTRACTS, by name, from their artifacts (see AppArtifacts.load)."""
+    return {event.name: event for name in CONTRACTS for event in AppArtifacts.load(name, build_dir, client).events}
+
+
+def stale_sources(name: str, build_dir: str = DEFAULT_BUILD_DIR) -> list[str]:
+    """
+    What the artifacts build/<name> no longer match in the build manifest: the source files changed since
+    the build (those present, a deployment may ship the artifacts alone), or its approval.bin if the programs
+    were dumped after it. Empty if they match, or if the manifest has no entry for them.
+    """
+    try:
+        with open(os.path.join(build_dir, MANIFEST)) as f:
+            entry = json.load(f).get("contracts", {}).get(name)
+    except (OSError, ValueError):
+        return []
+    if entry is None or "sources" not in entry:
+        return []
+    stale = []
+    for path, digest in entry["sources"].items():
+        full_path = os.path.join(ROOT_DIR, path)
+        if os.path.exists(full_path):
+            with open(full_path, "rb") as f:
+                if hashlib.sha256(f.read()).hexdigest() != digest:
+                    stale.append(path)
+    approval = os.path.join(build_dir, name, "approval.bin")
+    if os.path.exists(approval) and os.path.getsize(approval) != entry.get("approval_size"):
+        stale.append(f"{name}/approval.bin")
+    return stale
+
+
+def build(name: str, build_dir: str = DEFAULT_BUILD_DIR, client: AlgodClient = None):
+    """
+    Build the contract `name` (see CONTRACTS) in the calling process and record it in the manifest, the only
+    place importing PyTeal.
+    """
+    from contracts.build import Builder
+    from localnet.algod import LocalAlgodClient
+
+    algod = None if client is None or isinstance(client, LocalAlgodClient) else (client.algod_address, client.algod_token)
+    entry = Builder(build_dir, algod, workers=0).build(force=True, only=[name])["contracts"][name]
+    if entry["status"] == "failed":
+        raise RuntimeError(f"build of {name} failed: {entry['error']}")
+
+
+class ArtifactAppClient:
+    """
+    Application client over AppArtifacts, the subset of beaker's ApplicationClient used by the repo.
+
+    Methods are given by name or abi.Method, their arguments as keyword arguments.
+
+    Args:
+    client: algod client.
+    artifacts: artifacts of the Application.
+    app_id: id of the deployed app, 0 before `create`.
+    signer: signer of the transactions.
+    sender: sender of the transactions, the address of the signer if omitted.
+    metrics: CallMetrics recording every call (phases, algod requests), not recorded if None.
+    """
+
+    ARTIFACTS: Optional[str] = None # name of the artifacts in build/ loaded by `load`
+
+    def __init__(
+        self,
+        client: AlgodClient,
+        artifacts: AppArtifacts,
+        app_id: int = 0,
+        signer: TransactionSigner = None,
+        sender: str = None,
+        metrics: CallMetrics = None,
+    ):
+        self.client = client if metrics is None else metrics.instrument(client)
+        self.artifacts = artifacts
+        self.app_id = app_id
+        self.signer = signer
+        self.sender = sender
+        self.metrics = metrics
+        self.fees = FeePlanner(self.client) # dryruns the calls of the methods whose inner transactions vary
+
+    @classmethod
+    def load(
+        cls,
+        client: AlgodClient,
+        app_id: int = 0,
+        signer: TransactionSigner = None,
+        build_dir: str = DEFAULT_BUILD_DIR,
+        rebuild: bool = False,
+        metrics: CallMetrics = None,
+    ) -> "ArtifactAppClient":
+        """Client of the app `app_id` from the artifacts of the class (see AppArtifacts.load)."""
+        artifacts = AppArtifacts.load(cls.ARTIFACTS, build_dir, client, rebuild)
+        return cls(client, artifacts, app_id, signer, metrics=metrics)
+
+    @property
+    def app_addr(self) -> str:
+        return get_application_address(self.app_id)
+
+    def prepare(self, signer: TransactionSigner = None, sender: str = None) -> "ArtifactAppClient":
+        """Copy of this client sending with `signer`."""
+        app_client = copy.copy(self)
+        app_client.signer = signer if signer is not None else self.signer
+        app_client.sender = sender
+        return app_client
+
+    def get_signer(self) -> TransactionSigner:
+        if self.signer is None:
+            raise ValueError("no signer")
+        return self.signer
+
+    def get_sender(self) -> str:
+        if self.sender is not None:
+            return self.sender
+        # AccountTransactionSigner, the only signer used in the repo
+        return encoding.encode_address(base64.b64decode(self.get_signer().private_key)[32:])
+
+    def add_method_call(
+        self,
+        atc: AtomicTransactionComposer,
+        method: "abi.Method | str",
+        suggested_params: transaction.SuggestedParams = None,
+        on_complete: transaction.OnComplete = transaction.OnComplete.NoOpOC,
+        **kwargs,
+    ) -> AtomicTransactionComposer:
+        """
+        Add a call of `method`, `kwargs` are its arguments and the transaction fields of ATC.add_method_call.
+
+        Without `suggested_params`, the call pays the fees of the inner transactions of `method` (client/fees.py):
+        their annotation, or a dryrun of this very call if they vary with it (claim_funds).
+        """
+        method = method if isinstance(method, abi.Method) else self.artifacts.method(method)
+        if suggested_params is None:
+            sp = self.client.suggested_params()
+            if method_inner_txns_vary(self, method):
+                suggested_params = self.fees.suggested_params(self, method, sp, **kwargs)
+            else:
+                suggested_params = pooled_params(sp, method_inner_txns(self, method) or 0)
+        fields = {k: kwargs.pop(k) for k in list(kwargs) if k not in {arg.name for arg in method.args}}
+        missing = [arg.name for arg in method.args if arg.name not in kwargs]
+        if missing:
+            raise TypeError(f"{method.name} missing arguments: {', '.join(missing)}")
+        atc.add_method_call(
+            app_id=self.app_id,
+            method=method,
+            sender=self.get_sender(),
+            sp=suggested_params,
+            signer=self.get_signer(),
+            method_args=[kwargs[arg.name] for arg in method.args],
+            on_complete=on_complete,
+            **fields,
+        )
+        return atc
+
+    def call(
+        self,
+        method: "abi.Method | str",
+        suggested_params: transaction.SuggestedParams = None,
+        atc: AtomicTransactionComposer = None,
+        **kwargs,
+    ) -> ABIResult:
+        """Call `method` and wait for its confirmation, read-only methods are evaluated with dryrun."""
+        method = method if isinstance(method, abi.Method) else self.artifacts.method(method)
+        atc = atc if atc is not None else self._composer(method.name)
+        self.add_method_call(atc, method, suggested_params, **kwargs)
+        if self.artifacts.read_only(method):
+            result = self.client.dryrun(transaction.create_dryrun(self.client, atc.gather_signatures()))
+            tx_info = result["txns"][-1]
+            return ABIResult(atc.tx_ids[-1], None, _abi_return(method, tx_info), None, tx_info, method)
+        return atc.execute(self.client, 4).abi_results[-1]
+
+    def create(self, suggested_params: transaction.SuggestedParams = None, **kwargs) -> tuple[int, str, str]:
+        """Create the app calling its `create` method, returns (app_id, app_addr, txid)."""
+        artifacts = self.artifacts
+        atc = self._composer("create")
+        self.add_method_call(
+            atc,
+            "create",
+            suggested_params,
+            approval_program=artifacts.approval_binary,
+            clear_program=artifacts.clear_binary,
+            global_schema=artifacts.global_schema,
+            local_schema=artifacts.local_schema,
+            extra_pages=artifacts.extra_pages,
+            **kwargs,
+        )
+        result = atc.execute(self.client, 4)
+        self.app_id = self.client.pending_transaction_info(result.tx_ids[0])["application-index"]
+        return self.app_id, self.app_addr, result.tx_ids[0]
+
+    def opt_in(self, suggested_params: transaction.SuggestedParams = None, **kwargs) -> str:
+        """Opt in, calling the ABI opt_in method with `kwargs` as arguments, with a bare call if there are none."""
+        atc = self._composer("opt_in")
+        if kwargs:
+            self.add_method_call(atc, "opt_in", suggested_params, transaction.OnComplete.OptInOC, **kwargs)
+        else:
+            sp = suggested_params if suggested_params is not None else self.client.suggested_params()
+            atc.add_transaction(TransactionWithSigner(
+                txn=transaction.ApplicationOptInTxn(self.get_sender(), sp, self.app_id),
+                signer=self.get_signer(),
+            ))
+        return atc.execute(self.client, 4).tx_ids[0]
+
+    def fund(self, amount: int) -> str:
+        """Pay `amount` microAlgos to the app account."""
+        atc = self._composer("pay")
+        atc.add_transaction(TransactionWithSigner(
+            txn=transaction.PaymentTxn(self.get_sender(), self.client.suggested_params(), self.app_addr, amount),
+            signer=self.get_signer(),
+        ))
+        return atc.execute(self.client, 4).tx_ids[0]
+
+    def _composer(self, method: str) -> AtomicTransactionComposer:
+        return AtomicTransactionComposer() if self.metrics is None else self.metrics.composer(method)
+
+    def get_application_state(self, raw: bool = False) -> dict[Any, Any]:
+        """Global state of the app decoded by AppArtifacts.decode_state, {key: int or bytes} as stored if `raw`."""
+        params = self.client.application_info(self.app_id).get("params", {})
+        state = raw_state(params.get("global-state", []))
+        return state if raw else self.artifacts.decode_state(state)
+
+    def get_account_state(self, account: str = None, raw: bool = False) -> dict[Any, Any]:
+        """Local state of `account` (the sender by default) in the app, see get_application_state."""
+        info = self.client.account_application_info(account or self.get_sender(), self.app_id)
+        state = raw_state(info.get("app-local-state", {}).get("key-value", []))
+        return state if raw else self.artifacts.decode_state(state, local=True)
+
+
+class CampaignClient(ArtifactAppClient):
+    """Client of a CrowdfundingCampaignApp, same calls as AsyncCampaignClient."""
+
+    ARTIFACTS = "crowdfundingCampaign"
+
+    def back(self, amount: int) -> ABIResult:
+        """Back the campaign with `amount` microAlgos, an ABI fund call (the sender must be opted in)."""
+        atc = self._composer("fund") # recorded from the suggested params request on
+        sp = self.client.suggested_params()
+        return self.call(
+            "fund",
+            suggested_params=sp,
+            atc=atc,
+            funding=TransactionWithSigner(
+                txn=transaction.PaymentTxn(self.get_sender(), sp, self.app_addr, amount),
+                signer=self.get_signer(),
+            ),
+        )
+
+    def set_payout_split(self, receivers: list[str], shares: list[int]) -> ABIResult:
+        """Split the milestone payouts between `receivers` (max 4, the first one is funds_receiver), shares in basis points."""
+        return self.call("set_payout_split", receivers=receivers, shares=shares)
+
+    def claim_funds(self, receivers: list[str], milestone_app_id: int = 0) -> ABIResult:
+        """
+        Close the funding window, paying the first milestone if successful, or claim the next milestone once
+        the vote of the MilestoneApprovalApp `milestone_app_id` is settled. `receivers`: funds_receiver and
+        its co-receivers of set_payout_split, one inner payment each when paid: the fees are those of a dryrun
+        of the call (none paid when the campaign fails, the milestone is rejected or already paid).
+        """
+        atc = self._composer("claim_funds")
+        return self.call(
+            "claim_funds",
+            atc=atc,
+            accounts=receivers,
+            foreign_apps=[milestone_app_id] if milestone_app_id else None,
+        )
+
+    def submit_milestone(
+        self, milestone: int, metadata: str, vote_end_date: int, reusable_app_id: int = 0
+    ) -> ABIResult:
+        """Open the vote on `milestone`, the return value is the id of the MilestoneApprovalApp."""
+        return self.call(
+            "submit_milestone",
+            milestone_to_approve=milestone,
+            milestone_metadata=metadata,
+            vote_end_date=vote_end_date,
+            foreign_apps=[reusable_app_id] if reusable_app_id else None,
+        )
+
+    def create_reusable_milestone_app(self) -> ABIResult:
+        """Create the MilestoneApprovalApp reset by every following submit_milestone, the return value is its id."""
+        return self.call("create_reusable_milestone_app")
+
+    def vote(self, milestone_app_id: int, approve: bool) -> ABIResult:
+        """Opt-in free vote of a backer on the milestone under validation, weighted by the amount backed."""
+        return self.call("vote", milestone_app=milestone_app_id, vote=1 if approve else 0)
+
+    def get_milestone_funds(self, milestone: int) -> int:
+        return self.call("get_milestone_funds", milestone=milestone).return_value
+
+
+class PackedCampaignClient(CampaignClient):
+    """Client of a PackedCrowdfundingCampaignApp, its packed global state decoded into the same fields."""
+
+    ARTIFACTS = "packedCrowdfundingCampaign"
+
+
+class MilestoneClient(ArtifactAppClient):
+    """Client of a MilestoneApprovalApp, same calls as AsyncMilestoneClient."""
+
+    ARTIFACTS = "milestoneApproval"
+
+    def vote(self, approve: bool) -> str:
+        """
+        Opt in casting the sender's vote, on a standalone milestone app: the apps created by a campaign
+        only count the votes cast through it (CampaignClient.vote).
+        """
+        return self.opt_in(vote=1 if approve else 0)
+
+    def vote_settling(self) -> ABIResult:
+        return self.call("vote_settling")
+
+
+def raw_state(key_values: list[dict[str, Any]]) -> dict[bytes, Any]:
+    """Raw keys and values (int or bytes) of algod's global-state / key-value list."""
+    raw = {}
+    for kv in key_values:
+        key = base64.b64decode(kv["key"])
+        value = kv["value"]
+        raw[key] = value["uint"] if value["type"] == 2 else base64.b64decode(value.get("bytes", ""))
+    return raw
+
+
+def unpack(value: bytes, fields: list[str]) -> dict[str, int]:
+    """uint64 fields of a PackedState value (contracts/crowdfunding/packed_state.py), in layout order."""
+    return {name: int.from_bytes(value[8 * i:8 * i + 8], "big") for i, name in enumerate(fields)}
+
+
+def decode_value(value: Any, value_type: Optional[str]) -> Any:
+    """
+    State value (int or bytes) decoded by its declared value type: an address (empty bytes while unset), a str,
+    a list of uint64, bytes if undeclared. uint64 values are returned as is.
+    """
+    if isinstance(value, int):
+        return value
+    if value_type == "address":
+        return encoding.encode_address(value) if len(value) == 32 else value
+    if value_type == "string":
+        return value.decode("utf-8")
+    if value_type == "uint64[]":
+        return [int.from_bytes(value[i:i + 8], "big") for i in range(0, len(value) - 7, 8)]
+    return value
+
+
+def _page_of(key: bytes, paged: dict[str, dict[str, Any]]) -> Optional[str]:
+    """Reserved value of which `key` is a page: its key prefix followed by one byte page index."""
+    for name, entry in paged.items():
+        prefix = entry["key_prefix"].encode()
+        if len(key) == len(prefix) + 1 and key.startswith(prefix):
+            return name
+    return None
+
+
+def _join_pages(pages: dict[int, bytes], entry: dict[str, Any], state: dict[str, Any]) -> Any:
+    """Value of the pages of a reserved entry, missing pages as zeros, a uint64[] cut to its `length` entry."""
+    page_size = entry.get("page_entries", 0) * 8
+    joined = b"".join(pages.get(page, b"").ljust(page_size, b"\0") for page in range(max(pages) + 1))
+    value = decode_value(joined, entry.get("value_type"))
+    length = state.get(entry.get("length"))
+    if isinstance(value, list) and isinstance(length, int):
+        value = value[:length]
+    return value
+
+
+def _str_or_hex(v: bytes) -> str:
+    try:
+        return v.decode("utf-8")
+    except UnicodeDecodeError:
+        return v.hex()
+
+
+def _schema(spec: dict[str, Any]) -> transaction.StateSchema:
+    values = list(spec["declared"].values()) + list(spec["reserved"].values())
+    return transaction.StateSchema(
+        num_uints=sum(v.get("max_keys", 1) for v in values if v["type"] == "uint64"),
+        num_byte_slices=sum(v.get("max_keys", 1) for v in values if v["type"] == "bytes"),
+    )
+
+
+def _binary(directory: str, program: str, teal: str, client: Optional[AlgodClient]) -> bytes:
+    path = os.path.join(directory, f"{program}.bin")
+    if os.path.exists(path):
+        with open(path, "rb") as f:
+            return f.read()
+    if client is None:
+        raise ValueError(f"no {path}, an algod client is needed to assemble {program}.teal")
+    return base64.b64decode(client.compile(teal)["result"])
+
+
+def _abi_return(method: abi.Method, tx_info: dict[str, Any]) -> Optional[Any]:
+    if method.returns.type == abi.Returns.VOID:
+        return None
+    logs = [base64.b64decode(log) for log in tx_info.get("logs", [])]
+    if not logs or not logs[-1].startswith(ABI_RETURN_PREFIX):
+        raise Exception(f"no ABI return value logged by {method.name}")
+    return method.returns.type.decode(logs[-1][len(ABI_RETURN_PREFIX):])
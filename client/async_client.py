@@ -0,0 +1,378 @@
+"""
+Asyncio client of the crowdfunding contracts.
+
+The beaker ApplicationClient makes one blocking algod request at a time, so
+driving many campaigns from one process means waiting for each confirmation
+in turn. AsyncAlgod speaks algod's REST API over a single pooled aiohttp
+session, with a semaphore bounding the requests in flight, and the app
+clients below build their transactions with the beaker ApplicationClient
+(same ABI encoding and argument handling) but submit and wait for them
+without blocking, so hundreds of calls can be confirmed concurrently:
+
+    async with AsyncAlgod("http://localhost:4001", token) as algod:
+        campaigns = [AsyncCampaignClient(algod, c) for c in app_clients]
+        await asyncio.gather(*(c.claim_funds([funds_receiver]) for c in campaigns))
+"""
+import asyncio
+import base64
+import json
+from dataclasses import dataclass, field
+from typing import Any, Optional
+
+import aiohttp
+from algosdk import encoding, error
+from algosdk.atomic_transaction_composer import (
+    AtomicTransactionComposer,
+    TransactionSigner,
+    TransactionWithSigner,
+)
+from algosdk.future import transaction
+
+from client.fees import method_inner_txns, method_name, pooled_params
+from client.metrics import CallMetrics, CallRecord, record_request
+
+API_VERSION = "/v2"
+DEFAULT_MAX_IN_FLIGHT = 64
+DEFAULT_WAIT_ROUNDS = 10
+ABI_RETURN_PREFIX = bytes.fromhex("151f7c75")
+
+
+class AsyncAlgod:
+    """
+    Minimal asyncio algod client over a pooled HTTP session.
+
+    Errors are raised as algosdk's AlgodHTTPError, like the sync AlgodClient,
+    so ApplicationClient.wrap_approval_exception still maps them to the TEAL source.
+
+    Args:
+    address: algod URL, e.g. http://localhost:4001.
+    token: algod API token.
+    session: aiohttp session to share, one is created (and closed) by the client if omitted.
+    max_in_flight: requests sent concurrently, the others wait on a semaphore.
+    headers: extra headers sent with every request.
+    """
+
+    def __init__(
+        self,
+        address: str,
+        token: str = "",
+        session: aiohttp.ClientSession = None,
+        max_in_flight: int = DEFAULT_MAX_IN_FLIGHT,
+        headers: dict[str, str] = None,
+    ):
+        self.address = address.rstrip("/")
+        self.headers = {"X-Algo-API-Token": token} if token else {}
+        self.headers.update(headers or {})
+        self.max_in_flight = max_in_flight
+        self._session = session
+        self._own_session = session is None
+        self._semaphore = asyncio.Semaphore(max_in_flight)
+
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        if self._session is None:
+            # one connection per request in flight, kept alive between requests
+            connector = aiohttp.TCPConnector(limit=self.max_in_flight)
+            self._session = aiohttp.ClientSession(connector=connector, headers=self.headers)
+        return self._session
+
+    async def close(self):
+        if self._own_session and self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def __aenter__(self) -> "AsyncAlgod":
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    async def request(self, method: str, path: str, params: dict = None, data: bytes = None) -> dict[str, Any]:
+        url = self.address + API_VERSION + path
+        headers = {"Content-Type": "application/x-binary"} if data is not None else None
+        record_request()
+        async with self._semaphore:
+            async with self.session.request(method, url, params=params, data=data, headers=headers) as resp:
+                body = await resp.read()
+        if resp.status != 200:
+            try:
+                message = json.loads(body)["message"]
+            except Exception:
+                message = body.decode(errors="replace")
+            raise error.AlgodHTTPError(message, resp.status)
+        return json.loads(body) if body else {}
+
+    async def status(self) -> dict[str, Any]:
+        return await self.request("GET", "/status")
+
+    async def status_after_block(self, round_num: int) -> dict[str, Any]:
+        return await self.request("GET", f"/status/wait-for-block-after/{round_num}")
+
+    async def suggested_params(self) -> transaction.SuggestedParams:
+        params = await self.request("GET", "/transactions/params")
+        return transaction.SuggestedParams(
+            params["fee"],
+            params["last-round"],
+            params["last-round"] + 1000,
+            params["genesis-hash"],
+            params["genesis-id"],
+            False,
+            params["consensus-version"],
+            params["min-fee"],
+        )
+
+    async def send_transactions(self, signed_txns: list[transaction.SignedTransaction]) -> str:
+        """Submit a signed group, returns the id of its first transaction."""
+        data = b"".join(base64.b64decode(encoding.msgpack_encode(t)) for t in signed_txns)
+        response = await self.request("POST", "/transactions", data=data)
+        return response["txId"]
+
+    async def pending_transaction_info(self, txid: str) -> dict[str, Any]:
+        return await self.request("GET", f"/transactions/pending/{txid}")
+
+    async def application_info(self, app_id: int) -> dict[str, Any]:
+        return await self.request("GET", f"/applications/{app_id}")
+
+    async def account_application_info(self, address: str, app_id: int) -> dict[str, Any]:
+        return await self.request("GET", f"/accounts/{address}/applications/{app_id}")
+
+    async def block_info(self, round_num: int) -> dict[str, Any]:
+        return await self.request("GET", f"/blocks/{round_num}")
+
+    async def wait_for_confirmation(self, txid: str, wait_rounds: int = DEFAULT_WAIT_ROUNDS) -> dict[str, Any]:
+        """Same contract as algosdk's transaction.wait_for_confirmation, without blocking the loop."""
+        last_round = (await self.status())["last-round"]
+        current_round = last_round + 1
+        while True:
+            if current_round > last_round + wait_rounds:
+                raise error.ConfirmationTimeoutError(f"Wait for transaction id {txid} timed out")
+            info = await self.pending_transaction_info(txid)
+            if info.get("pool-error"):
+                raise error.TransactionRejectedError("Transaction rejected: " + info["pool-error"])
+            if info.get("confirmed-round", 0) > 0:
+                return info
+            await self.status_after_block(current_round)
+            current_round += 1
+
+
+@dataclass
+class AsyncCallResult:
+    """Outcome of a confirmed group: txids, round, and the ABI return value of the last method call."""
+
+    tx_ids: list[str]
+    confirmed_round: int
+    return_value: Any = None
+    tx_info: dict[str, Any] = field(default_factory=dict) # pending info of the last method call
+
+
+class AsyncAppClient:
+    """
+    Asyncio wrapper of a beaker ApplicationClient.
+
+    Transactions are composed by `app_client` (signer, sender, ABI arguments),
+    only the network round trips go through `algod`.
+
+    Args:
+    algod: AsyncAlgod shared by all the clients of the process.
+    app_client: beaker ApplicationClient of the deployed app, the only one importing the contracts.
+    wait_rounds: rounds to wait for a confirmation.
+    metrics: CallMetrics recording every call (phases, algod requests), not recorded if None.
+    """
+
+    def __init__(
+        self,
+        algod: AsyncAlgod,
+        app_client: Any,
+        wait_rounds: int = DEFAULT_WAIT_ROUNDS,
+        metrics: CallMetrics = None,
+    ):
+        self.algod = algod
+        self.app_client = app_client
+        self.wait_rounds = wait_rounds
+        self.metrics = metrics
+
+    @property
+    def app_id(self) -> int:
+        return self.app_client.app_id
+
+    @property
+    def app_addr(self) -> str:
+        return self.app_client.app_addr
+
+    def prepare(self, signer: TransactionSigner) -> "AsyncAppClient":
+        """Copy of this client sending with `signer`."""
+        return type(self)(self.algod, self.app_client.prepare(signer=signer), self.wait_rounds, self.metrics)
+
+    async def call(
+        self,
+        method,
+        suggested_params: transaction.SuggestedParams = None,
+        atc: AtomicTransactionComposer = None,
+        record: CallRecord = None,
+        **kwargs,
+    ) -> AsyncCallResult:
+        """
+        Add a call of `method` (with the ApplicationClient.add_method_call arguments) to `atc` and execute it,
+        a method given by name is the handler of that name of the Application of `app_client`.
+
+        Without `suggested_params`, the call pays the fees of the inner transactions of `method` (client/fees.py).
+        With metrics, the call is recorded from its start, or in `record` if it was started before.
+        """
+        if isinstance(method, str):
+            method = getattr(type(self.app_client.app), method)
+        if record is None:
+            record = self._record(method_name(method))
+        sp = suggested_params
+        if sp is None:
+            sp = pooled_params(await self.algod.suggested_params(), method_inner_txns(self.app_client, method) or 0)
+        atc = atc if atc is not None else AtomicTransactionComposer()
+        self.app_client.add_method_call(atc, method, suggested_params=sp, **kwargs)
+        return await self.execute(atc, record)
+
+    async def opt_in(self, suggested_params: transaction.SuggestedParams = None, **kwargs) -> AsyncCallResult:
+        """Opt in, calling the ABI opt_in method with `kwargs` as arguments, with a bare call if there are none."""
+        if kwargs:
+            return await self.call("opt_in", suggested_params, on_complete=transaction.OnComplete.OptInOC, **kwargs)
+        record = self._record("opt_in")
+        sp = suggested_params if suggested_params is not None else await self.algod.suggested_params()
+        atc = AtomicTransactionComposer()
+        sender = self.app_client.get_sender()
+        atc.add_transaction(TransactionWithSigner(
+            txn=transaction.ApplicationOptInTxn(sender, sp, self.app_id),
+            signer=self.app_client.get_signer(),
+        ))
+        return await self.execute(atc, record)
+
+    async def execute(self, atc: AtomicTransactionComposer, record: CallRecord = None) -> AsyncCallResult:
+        """
+        Sign, submit and wait for the confirmation of `atc`.
+
+        With metrics, the phases are recorded in `record` (started before encoding `atc`),
+        or in a new record named after the last method call of `atc`.
+        """
+        metrics = self.metrics
+        if record is None:
+            record = self._record(atc.method_dict[max(atc.method_dict)].name if atc.method_dict else "execute")
+        try:
+            if record is not None:
+                metrics.phase(record, "encode")
+            signed = atc.gather_signatures()
+            if record is not None:
+                metrics.phase(record, "sign")
+            try:
+                await self.algod.send_transactions(signed)
+            except error.AlgodHTTPError as e:
+                raise self.app_client.wrap_approval_exception(e)
+            if record is not None:
+                metrics.phase(record, "send")
+            tx_ids = list(atc.tx_ids)
+            info = await self.algod.wait_for_confirmation(tx_ids[0], self.wait_rounds)
+            result = AsyncCallResult(tx_ids, info["confirmed-round"])
+
+            if atc.method_dict:
+                index = max(atc.method_dict)
+                info = info if index == 0 else await self.algod.pending_transaction_info(tx_ids[index])
+                result.tx_info = info
+                result.return_value = _abi_return(atc.method_dict[index], info)
+        except Exception:
+            if record is not None:
+                metrics.finish(record, ok=False)
+            raise
+        if record is not None:
+            metrics.phase(record, "confirm")
+            first_valid = atc.txn_list[0].txn.first_valid_round
+            metrics.finish(record, rounds=max(result.confirmed_round - first_valid, 0))
+        return result
+
+    def _record(self, method: str) -> Optional[CallRecord]:
+        return self.metrics.start(method) if self.metrics is not None else None
+
+
+class AsyncCampaignClient(AsyncAppClient):
+    """Asyncio client of a deployed CrowdfundingCampaignApp."""
+
+    async def back(self, amount: int) -> AsyncCallResult:
+        """Back the campaign with `amount` microAlgos, an ABI fund call (the sender must be opted in)."""
+        record = self._record("fund") # recorded from the suggested params request on
+        sp = await self.algod.suggested_params()
+        sender = self.app_client.get_sender()
+        return await self.call(
+            "fund",
+            suggested_params=sp,
+            record=record,
+            funding=TransactionWithSigner(
+                txn=transaction.PaymentTxn(sender, sp, self.app_addr, amount),
+                signer=self.app_client.get_signer(),
+            ),
+        )
+
+    async def set_payout_split(self, receivers: list[str], shares: list[int]) -> AsyncCallResult:
+        """Split the milestone payouts between `receivers` (max 4, the first one is funds_receiver), shares in basis points."""
+        return await self.call("set_payout_split", receivers=receivers, shares=shares)
+
+    async def claim_funds(self, receivers: list[str], milestone_app_id: int = 0) -> AsyncCallResult:
+        """
+        Close the funding window, paying the first milestone if successful, or claim the next milestone once
+        the vote of the MilestoneApprovalApp `milestone_app_id` is settled. `receivers`: funds_receiver and
+        its co-receivers of set_payout_split, one inner payment each.
+        """
+        record = self._record("claim_funds")
+        return await self.call(
+            "claim_funds",
+            suggested_params=pooled_params(await self.algod.suggested_params(), len(receivers)),
+            record=record,
+            accounts=receivers,
+            foreign_apps=[milestone_app_id] if milestone_app_id else None,
+        )
+
+    async def submit_milestone(
+        self, milestone: int, metadata: str, vote_end_date: int, reusable_app_id: int = 0
+    ) -> AsyncCallResult:
+        """
+        Open the vote on `milestone`, the return value is the id of the MilestoneApprovalApp.
+
+        `reusable_app_id` is the app created by create_reusable_milestone_app, if any: it is reset instead
+        of creating a new app.
+        """
+        return await self.call(
+            "submit_milestone",
+            milestone_to_approve=milestone,
+            milestone_metadata=metadata,
+            vote_end_date=vote_end_date,
+            foreign_apps=[reusable_app_id] if reusable_app_id else None,
+        )
+
+    async def create_reusable_milestone_app(self) -> AsyncCallResult:
+        """Create the MilestoneApprovalApp reset by every following submit_milestone, the return value is its id."""
+        return await self.call("create_reusable_milestone_app")
+
+    async def vote(self, milestone_app_id: int, approve: bool) -> AsyncCallResult:
+        """Opt-in free vote of a backer on the milestone under validation, weighted by the amount backed."""
+        return await self.call(
+            "vote",
+            milestone_app=milestone_app_id,
+            vote=1 if approve else 0,
+        )
+
+
+class AsyncMilestoneClient(AsyncAppClient):
+    """Asyncio client of a MilestoneApprovalApp."""
+
+    async def vote(self, approve: bool) -> AsyncCallResult:
+        """
+        Opt in, casting the sender's vote, on a standalone milestone app: the apps created by a campaign
+        only count the votes cast through it (AsyncCampaignClient.vote).
+        """
+        return await self.opt_in(vote=1 if approve else 0)
+
+    async def vote_settling(self) -> AsyncCallResult:
+        return await self.call("vote_settling")
+
+
+def _abi_return(method, info: dict[str, Any]) -> Optional[Any]:
+    if method.returns.type == "void":
+        return None
+    logs = [base64.b64decode(log) for log in info.get("logs", [])]
+    if not logs or not logs[-1].startswith(ABI_RETURN_PREFIX):
+        raise Exception(f"no ABI return value logged by {method.name}")
+    return method.returns.type.decode(logs[-1][len(ABI_RETURN_PREFIX):])
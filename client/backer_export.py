@@ -0,0 +1,230 @@
+"""
+Bulk export of the local state of every account opted in to a campaign (or milestone) app.
+
+Reading `amount_backed` with one get_account_state call per backer means one
+sequential algod request per address, and algod cannot list the accounts
+opted in to an app. BackerExporter finds them in the blocks instead (the
+opt-in calls to the app, top level and inner, from the creation round on),
+a window of blocks read concurrently, and fetches their local state over
+AsyncAlgod with the requests in flight bounded by its semaphore. Rows are
+written to a CSV file one page at a time, with one column per local state
+field declared by the app, so memory only grows with the set of exported
+addresses (to skip repeated opt-ins). After each page the ExportToken (next
+transaction to scan, rows and bytes written) is saved; an interrupted export
+resumes from it, dropping anything written after the last saved page:
+
+    async with AsyncAlgod(algod_address, token) as algod:
+        exporter = BackerExporter(algod, app_id)
+        result = await exporter.export("build/backers.csv", token_path="build/backers.token", start_round=created_round)
+
+An account opted in again after a clear state is exported once, at its first
+opt-in. Accounts opted out since are skipped.
+"""
+import asyncio
+import base64
+import csv
+import json
+import os
+from dataclasses import asdict, dataclass
+from typing import Any, AsyncIterator, Iterator, Optional
+
+from algosdk import encoding
+from algosdk.error import AlgodHTTPError
+from algosdk.future import transaction
+from client.artifacts import DEFAULT_BUILD_DIR, AppArtifacts, CampaignClient, raw_state
+from client.async_client import AsyncAlgod
+
+DEFAULT_PAGE_SIZE = 1000
+DEFAULT_BLOCK_WINDOW = 16
+FIXED_COLUMNS = ["address", "opt_in_round", "state_round"]
+
+
+@dataclass
+class ExportToken:
+    """Where an export resumes: next top level transaction to scan, rows and bytes of the output written so far."""
+
+    round: int = 0
+    txn_index: int = 0
+    rows: int = 0
+    offset: int = 0
+
+    def save(self, path: str):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, "w") as f:
+            json.dump(asdict(self), f)
+
+    @classmethod
+    def load(cls, path: str, default: "ExportToken" = None) -> Optional["ExportToken"]:
+        """Token saved at `path`, `default` if there is none."""
+        if not os.path.exists(path):
+            return default
+        with open(path) as f:
+            return cls(**json.load(f))
+
+
+@dataclass
+class ExportResult:
+    """Outcome of one export call, `token` is where the next call resumes."""
+
+    token: ExportToken
+    rows: int = 0 # written by this call
+    skipped: int = 0 # opted out since their opt-in
+    pages: int = 0
+    blocks_read: int = 0
+    complete: bool = False # every round up to the last one at the start of the call was scanned
+
+
+class BackerExporter:
+    """
+    Export the local state of the accounts opted in to `app_id`, page by page.
+
+    Args:
+    algod: AsyncAlgod serving the blocks and the local states, its max_in_flight bounds the requests.
+    app_id: campaign or milestone app.
+    artifacts: artifacts of the app declaring the local state (client/artifacts.py), the campaign's by default.
+    page_size: rows fetched and written between two saved tokens.
+    block_window: blocks requested concurrently while scanning for opt-ins.
+    """
+
+    def __init__(
+        self,
+        algod: AsyncAlgod,
+        app_id: int,
+        artifacts: AppArtifacts = None,
+        page_size: int = DEFAULT_PAGE_SIZE,
+        block_window: int = DEFAULT_BLOCK_WINDOW,
+    ):
+        self.algod = algod
+        self.app_id = app_id
+        self.artifacts = artifacts or AppArtifacts.load(CampaignClient.ARTIFACTS, DEFAULT_BUILD_DIR)
+        self.page_size = page_size
+        self.block_window = block_window
+        self.state_columns = self.artifacts.state_keys(local=True)
+        self.columns = FIXED_COLUMNS + self.state_columns
+        self.blocks_read = 0
+
+    async def export(
+        self, path: str, token_path: str = None, start_round: int = 0, max_pages: int = None
+    ) -> ExportResult:
+        """
+        Write the opted in accounts to the CSV file `path`, from the saved token (`start_round` if there is none).
+
+        The blocks are scanned up to the last round at the start of the call. With `max_pages`
+        the export stops after that many pages, the next call resumes from the saved token.
+        """
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        token = ExportToken(start_round)
+        if token_path is not None:
+            token = ExportToken.load(token_path, token)
+        seen = _truncate(path, token.offset)
+        last_round = (await self.algod.status())["last-round"]
+        result = ExportResult(token)
+        blocks_before = self.blocks_read
+
+        with open(path, "a", newline="") as f:
+            writer = csv.writer(f)
+            if token.offset == 0:
+                writer.writerow(self.columns)
+            page: list[tuple[int, str]] = []
+            opt_ins = self._opt_ins(token.round, token.txn_index, last_round)
+            async for round_num, txn_index, addresses in opt_ins:
+                for address in addresses:
+                    if address not in seen:
+                        seen.add(address)
+                        page.append((round_num, address))
+                position = (round_num, txn_index + 1)
+                if len(page) >= self.page_size:
+                    await self._write_page(f, writer, page, position, result, token_path)
+                    page = []
+                    if max_pages is not None and result.pages >= max_pages:
+                        await opt_ins.aclose()
+                        break
+            else:
+                await self._write_page(f, writer, page, (last_round + 1, 0), result, token_path)
+                result.complete = True
+        result.blocks_read = self.blocks_read - blocks_before
+        return result
+
+    async def _write_page(self, f, writer, page: list[tuple[int, str]], position: tuple[int, int], result, token_path):
+        states = await asyncio.gather(*(self._local_state(address) for _, address in page))
+        rows = 0
+        for (opt_in_round, address), state in zip(page, states):
+            if state is None:
+                result.skipped += 1
+                continue
+            state_round, values = state
+            writer.writerow([address, opt_in_round, state_round] + [_cell(values.get(c)) for c in self.state_columns])
+            rows += 1
+        f.flush()
+        result.rows += rows
+        result.pages += 1
+        result.token = ExportToken(*position, result.token.rows + rows, f.tell())
+        if token_path is not None:
+            result.token.save(token_path)
+
+    async def _local_state(self, address: str) -> Optional[tuple[int, dict[str, Any]]]:
+        """(round, decoded local state) of `address`, None if it is not opted in anymore."""
+        try:
+            info = await self.algod.account_application_info(address, self.app_id)
+        except AlgodHTTPError as e:
+            if e.code == 404:
+                return None
+            raise
+        if "app-local-state" not in info:
+            return None
+        raw = raw_state(info["app-local-state"].get("key-value", []))
+        return info.get("round", 0), self.artifacts.decode_state(raw, local=True)
+
+    async def _opt_ins(self, start_round: int, start_txn: int, last_round: int) -> AsyncIterator[tuple[int, int, list[str]]]:
+        """(round, top level txn index, accounts opted in by it) from the given position, in chain order."""
+        for first in range(start_round, last_round + 1, self.block_window):
+            rounds = range(first, min(first + self.block_window, last_round + 1))
+            blocks = await asyncio.gather(*(self._block(r) for r in rounds))
+            for round_num, block in zip(rounds, blocks):
+                for txn_index, stxn in enumerate(block.get("txns", [])):
+                    if round_num == start_round and txn_index < start_txn:
+                        continue # exported before the token was saved
+                    addresses = list(_opt_in_senders(stxn, self.app_id))
+                    if addresses:
+                        yield round_num, txn_index, addresses
+
+    async def _block(self, round_num: int) -> dict[str, Any]:
+        try:
+            block = (await self.algod.block_info(round_num))["block"]
+        except AlgodHTTPError as e:
+            if e.code == 404:
+                return {}
+            raise
+        self.blocks_read += 1
+        return block
+
+
+def _opt_in_senders(stxn: dict[str, Any], app_id: int) -> Iterator[str]:
+    """Senders of the opt-in calls to `app_id` of a block transaction and of its inner transactions."""
+    txn = stxn.get("txn", {})
+    apply_data = stxn.get("dt", stxn) # algod nests the apply data of block transactions under "dt"
+    if txn.get("type") == "appl" and txn.get("apid") == app_id and txn.get("apan") == transaction.OnComplete.OptInOC:
+        yield encoding.encode_address(base64.b64decode(txn["snd"]))
+    for inner in apply_data.get("itx", apply_data.get("inner-txns", [])):
+        yield from _opt_in_senders(inner, app_id)
+
+
+def _truncate(path: str, offset: int) -> set[str]:
+    """Cut `path` at `offset` (what was written after the last saved token), returns the addresses it holds."""
+    if offset == 0 or not os.path.exists(path):
+        open(path, "w").close()
+        return set()
+    with open(path, "r+", newline="") as f:
+        f.truncate(offset)
+        f.seek(0)
+        reader = csv.reader(f)
+        next(reader, None) # header
+        return {row[0] for row in reader if row}
+
+
+def _cell(value: Any) -> Any:
+    if value is None:
+        return ""
+    if isinstance(value, bytes):
+        return value.hex()
+    return value
@@ -0,0 +1,203 @@
+"""
+Bulk onboarding of backers into a CrowdfundingCampaignApp.
+
+Each backer needs an opt-in call, a payment to the campaign and a `fund` call
+referencing that payment. Instead of one confirmation round trip per call,
+BulkFunder packs the backers into atomic groups of up to 16 transactions,
+signs the groups in a thread pool and submits them back to back, only waiting
+for confirmations once `max_in_flight` groups are outstanding. Given a
+client/signing_pool.py SigningPool holding the keys of the backers, the groups
+are signed by its processes instead.
+"""
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Iterable, Optional
+
+from algosdk.atomic_transaction_composer import (
+    AtomicTransactionComposer,
+    TransactionSigner,
+    TransactionWithSigner,
+)
+from algosdk.future import transaction
+from beaker.client import ApplicationClient
+
+from client.signing_pool import SigningPool
+from contracts.crowdfunding.crowdfundingCampaign import CrowdfundingCampaignApp
+
+MAX_GROUP_SIZE = 16
+DEFAULT_WORKERS = 4
+DEFAULT_MAX_IN_FLIGHT = 8
+DEFAULT_WAIT_ROUNDS = 10
+
+
+@dataclass
+class Backer:
+    """A backer to onboard: account, signer and amount (microAlgos) to back."""
+
+    address: str
+    signer: TransactionSigner
+    amount: int
+    opted_in: bool = False # skip the opt-in call
+
+    @property
+    def num_txns(self) -> int:
+        return 2 if self.opted_in else 3
+
+
+@dataclass
+class GroupResult:
+    """Outcome of one atomic group: either all its backers are funded or none is."""
+
+    backers: list[str]
+    txids: list[str] = field(default_factory=list)
+    confirmed_round: int = 0
+    error: Optional[str] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None and self.confirmed_round > 0
+
+
+class BulkFunder:
+    """
+    Fund a campaign on behalf of many backers with grouped atomic transactions.
+
+    Args:
+    app_client: ApplicationClient of the deployed CrowdfundingCampaignApp.
+    workers: threads signing groups in parallel.
+    max_in_flight: groups submitted but not confirmed yet before blocking on the oldest.
+    wait_rounds: rounds to wait for the confirmation of a group.
+    signing_pool: pool signing the groups in place of the threads, it must hold the keys of the backers.
+    """
+
+    def __init__(
+        self,
+        app_client: ApplicationClient,
+        workers: int = DEFAULT_WORKERS,
+        max_in_flight: int = DEFAULT_MAX_IN_FLIGHT,
+        wait_rounds: int = DEFAULT_WAIT_ROUNDS,
+        signing_pool: SigningPool = None,
+    ):
+        self.app_client = app_client
+        self.client = app_client.client
+        self.workers = workers
+        self.max_in_flight = max_in_flight
+        self.wait_rounds = wait_rounds
+        self.signing_pool = signing_pool
+
+    def pack(self, backers: Iterable[Backer]) -> list[list[Backer]]:
+        """Split `backers` into groups of at most MAX_GROUP_SIZE transactions, preserving order."""
+        groups: list[list[Backer]] = []
+        current: list[Backer] = []
+        size = 0
+        seen: set[str] = set()
+        for backer in backers:
+            if backer.address in seen: # fund can only succeed once per backer
+                raise ValueError(f"backer {backer.address} listed more than once")
+            seen.add(backer.address)
+            if size + backer.num_txns > MAX_GROUP_SIZE:
+                groups.append(current)
+                current, size = [], 0
+            current.append(backer)
+            size += backer.num_txns
+        if current:
+            groups.append(current)
+        return groups
+
+    def fund(self, backers: Iterable[Backer]) -> list[GroupResult]:
+        """
+        Opt in (when needed) and fund every backer, returns one GroupResult per group.
+
+        A failing group (e.g. a payment under the 10 Algos minimum) does not affect the others.
+        """
+        groups = self.pack(backers)
+        sp = self.client.suggested_params()
+        composers = [self._compose(group, sp) for group in groups]
+        results = [GroupResult([b.address for b in group]) for group in groups]
+        if self.signing_pool is not None:
+            return self._fund_pooled(composers, results)
+
+        in_flight: deque[GroupResult] = deque()
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            # groups are submitted in order, each as soon as it is signed
+            futures = [executor.submit(atc.gather_signatures) for atc in composers]
+            for atc, future, result in zip(composers, futures, results):
+                try:
+                    signed = future.result()
+                except Exception as e:
+                    result.error = f"signing failed: {e}"
+                    continue
+                result.txids = list(atc.tx_ids)
+                try:
+                    self.client.send_transactions(signed)
+                except Exception as e:
+                    result.error = str(e)
+                    continue
+                in_flight.append(result)
+                if len(in_flight) >= self.max_in_flight:
+                    self._wait(in_flight.popleft())
+        while in_flight:
+            self._wait(in_flight.popleft())
+        return results
+
+    def _fund_pooled(self, composers: list[AtomicTransactionComposer], results: list[GroupResult]) -> list[GroupResult]:
+        """fund with the groups signed by the signing pool, submitted in order as its chunks are signed."""
+        pool = self.signing_pool
+        signable = []
+        for atc, result in zip(composers, results):
+            txns = [t.txn for t in atc.txn_list] # the group id is assigned by the pool
+            if pool.can_sign(txns):
+                signable.append((txns, result))
+            else:
+                result.error = "signing failed: no key for a backer in the signing pool"
+
+        in_flight: deque[GroupResult] = deque()
+        for (_, result), signed in zip(signable, pool.imap(txns for txns, _ in signable)):
+            result.txids = signed.txids
+            try:
+                self.client.send_raw_transaction(signed.b64())
+            except Exception as e:
+                result.error = str(e)
+                continue
+            in_flight.append(result)
+            if len(in_flight) >= self.max_in_flight:
+                self._wait(in_flight.popleft())
+        while in_flight:
+            self._wait(in_flight.popleft())
+        return results
+
+    def _compose(self, group: list[Backer], sp: transaction.SuggestedParams) -> AtomicTransactionComposer:
+        atc = AtomicTransactionComposer()
+        app_client = self.app_client
+        for backer in group:
+            if not backer.opted_in:
+                # opt_in is a bare call (no ABI method selector)
+                atc.add_transaction(TransactionWithSigner(
+                    txn=transaction.ApplicationOptInTxn(backer.address, sp, app_client.app_id),
+                    signer=backer.signer,
+                ))
+            app_client.add_method_call(
+                atc,
+                CrowdfundingCampaignApp.fund,
+                sender=backer.address,
+                signer=backer.signer,
+                suggested_params=sp,
+                funding=TransactionWithSigner(
+                    txn=transaction.PaymentTxn(
+                        sender=backer.address,
+                        sp=sp,
+                        receiver=app_client.app_addr,
+                        amt=backer.amount,
+                    ),
+                    signer=backer.signer,
+                ),
+            )
+        return atc
+
+    def _wait(self, result: GroupResult):
+        try:
+            info = transaction.wait_for_confirmation(self.client, result.txids[0], self.wait_rounds)
+            result.confirmed_round = info["confirmed-round"]
+        except Exception as e:
+            result.error = str(e)
@@ -0,0 +1,302 @@
+"""
+Precompiled ABI calls of the crowdfunding contracts, for the hot paths.
+
+Every ApplicationClient.call (or ArtifactAppClient.add_method_call) resolves
+its method, encodes the arguments through algosdk's generic ABI types and
+builds an ApplicationCallTxn, and the callers fetch suggested params before
+almost every call. With algod's suggested fee per byte (flat_fee unset, the
+default), algosdk also prices each transaction it builds by signing it with
+a throwaway key. A CallPlan does the per-method work once: selector, an
+encoder per argument, the fee of the call with its inner transactions, and a
+template ApplicationCallTxn; a call copies the template and fills in its
+rounds, arguments and references. SuggestedParamsCache serves the same
+suggested params, with the flat fee of client/fees.py, for `ttl` seconds.
+
+    plans = CallPlans.from_client(campaign_client, SuggestedParamsCache(algod_client, ttl=2))
+    atc = AtomicTransactionComposer()
+    plans.add(atc, "fund", funding=plans.payment(amount))
+    backer_plans = plans.prepare(backer_signer) # same plans, another sender
+
+The transactions are the ones ATC.add_method_call builds from the same
+suggested params (see benchmarks/call_plans.py).
+"""
+import base64
+import copy
+import functools
+import threading
+import time
+from typing import Any, Callable, Optional
+
+from algosdk import abi, encoding
+from algosdk.atomic_transaction_composer import AtomicTransactionComposer, TransactionSigner, TransactionWithSigner
+from algosdk.future import transaction
+from algosdk.logic import get_application_address
+from algosdk.v2client.algod import AlgodClient
+
+from client.fees import txn_fee
+
+DEFAULT_TTL = 2.0 # seconds, about half a round
+MAX_APP_ARGS = 16 # selector included, the arguments past the 15th are packed in a tuple
+
+Encoder = Callable[[Any], bytes]
+
+
+class SuggestedParamsCache:
+    """
+    Suggested params fetched at most once every `ttl` seconds, shared by the calls meanwhile.
+
+    The params have a flat fee (client/fees.py `txn_fee`), so that algosdk does not price each
+    transaction by signing it. They must not be modified: copy them first (e.g. pooled_params).
+
+    Args:
+    client: algod client.
+    ttl: seconds the params are reused. Their validity (first round to first + 1000) outlives it.
+    timer: monotonic clock in seconds.
+    """
+
+    def __init__(self, client: AlgodClient, ttl: float = DEFAULT_TTL, timer: Callable[[], float] = time.monotonic):
+        self.client = client
+        self.ttl = ttl
+        self.timer = timer
+        self.fetches = 0
+        self.hits = 0
+        self._sp: Optional[transaction.SuggestedParams] = None
+        self._expires = 0.0
+        self._lock = threading.Lock()
+
+    def get(self) -> transaction.SuggestedParams:
+        with self._lock:
+            now = self.timer()
+            if self._sp is not None and now < self._expires:
+                self.hits += 1
+                return self._sp
+        sp = self.client.suggested_params()
+        sp.fee = txn_fee(sp)
+        sp.flat_fee = True
+        with self._lock:
+            self.fetches += 1
+            self._sp = sp
+            self._expires = now + self.ttl
+        return sp
+
+    def invalidate(self):
+        """Fetch new params at the next `get`, e.g. after a rejection for a dead round range."""
+        with self._lock:
+            self._sp = None
+
+
+class CallPlan:
+    """
+    Precompiled call of the ABI method `method` of the app `app_id`.
+
+    Args:
+    method: ABI method, its transaction arguments are passed as TransactionWithSigner preceding the call.
+    app_id: id of the app.
+    inner_txns: inner transactions of the method, paid by the call (fee pooling).
+    on_complete: on-completion of the call.
+    """
+
+    def __init__(
+        self,
+        method: abi.Method,
+        app_id: int,
+        inner_txns: int = 0,
+        on_complete: transaction.OnComplete = transaction.OnComplete.NoOpOC,
+    ):
+        self.method = method
+        self.app_id = app_id
+        self.inner_txns = inner_txns
+        self.selector = method.get_selector()
+        # (name, kind, encoder): kind is the transaction or reference type, None for an ABI value
+        self.args: list[tuple[str, Optional[str], Optional[Encoder]]] = []
+        for arg in method.args:
+            if abi.is_abi_transaction_type(arg.type) or abi.is_abi_reference_type(arg.type):
+                self.args.append((arg.name, arg.type, None))
+            else:
+                self.args.append((arg.name, None, _encoder(arg.type)))
+        # the ABI values and references, encoded as uint8 indexes, past the 15th go in a tuple
+        value_types = [
+            abi.UintType(8) if abi.is_abi_reference_type(arg.type) else arg.type
+            for arg in method.args if not abi.is_abi_transaction_type(arg.type)
+        ]
+        self._packed_from = MAX_APP_ARGS - 2 if len(value_types) > MAX_APP_ARGS - 1 else None
+        if self._packed_from is not None:
+            self._tuple = abi.TupleType(value_types[self._packed_from:])
+        self._template = transaction.ApplicationCallTxn(None, _TEMPLATE_PARAMS, app_id, on_complete)
+
+    def fee(self, sp: transaction.SuggestedParams, inner_txns: int = None) -> int:
+        inner_txns = self.inner_txns if inner_txns is None else inner_txns
+        return txn_fee(sp) + inner_txns * sp.min_fee
+
+    def transactions(
+        self,
+        sp: transaction.SuggestedParams,
+        sender: str,
+        signer: TransactionSigner,
+        accounts: list[str] = None,
+        foreign_apps: list[int] = None,
+        foreign_assets: list[int] = None,
+        note: bytes = None,
+        inner_txns: int = None,
+        **kwargs,
+    ) -> list[TransactionWithSigner]:
+        """
+        Transactions of a call with the arguments `kwargs`: the transaction arguments, then the app call.
+
+        `inner_txns` overrides the inner transactions paid, e.g. the payout receivers of claim_funds.
+        """
+        accounts = list(accounts) if accounts else []
+        foreign_apps = list(foreign_apps) if foreign_apps else []
+        foreign_assets = list(foreign_assets) if foreign_assets else []
+        txns = []
+        values = []
+        for name, kind, encode in self.args:
+            try:
+                value = kwargs[name]
+            except KeyError:
+                raise TypeError(f"{self.method.name} missing argument {name}") from None
+            if kind is None:
+                values.append((encode, value))
+            elif kind == abi.ABIReferenceType.ACCOUNT:
+                values.append((None, _foreign_index(value, accounts, sender)))
+            elif kind == abi.ABIReferenceType.APPLICATION:
+                values.append((None, _foreign_index(int(value), foreign_apps, self.app_id)))
+            elif kind == abi.ABIReferenceType.ASSET:
+                values.append((None, _foreign_index(int(value), foreign_assets)))
+            else:
+                if not isinstance(value, TransactionWithSigner):
+                    raise TypeError(f"{self.method.name} argument {name}: expected a TransactionWithSigner")
+                txns.append(value)
+
+        app_args = [self.selector]
+        if self._packed_from is None:
+            app_args += [bytes([v]) if encode is None else encode(v) for encode, v in values]
+        else:
+            app_args += [bytes([v]) if encode is None else encode(v) for encode, v in values[:self._packed_from]]
+            app_args.append(self._tuple.encode([v for _, v in values[self._packed_from:]]))
+
+        txn = copy.copy(self._template)
+        txn.sender = sender
+        txn.fee = self.fee(sp, inner_txns)
+        txn.first_valid_round = sp.first
+        txn.last_valid_round = sp.last
+        txn.genesis_id = sp.gen
+        txn.genesis_hash = sp.gh
+        txn.app_args = app_args
+        txn.accounts = accounts or None
+        txn.foreign_apps = foreign_apps or None
+        txn.foreign_assets = foreign_assets or None
+        txn.note = transaction.Transaction.as_note(note)
+        txns.append(TransactionWithSigner(txn, signer))
+        return txns
+
+    def add(
+        self, atc: AtomicTransactionComposer, sp: transaction.SuggestedParams, sender: str, signer: TransactionSigner, **kwargs
+    ) -> AtomicTransactionComposer:
+        """Add the call to `atc`, its ABI return value is decoded by atc.execute like for atc.add_method_call."""
+        for txn in self.transactions(sp, sender, signer, **kwargs):
+            atc.add_transaction(txn)
+        atc.method_dict[len(atc.txn_list) - 1] = self.method
+        return atc
+
+
+class CallPlans:
+    """
+    CallPlan of every method of an app (but create), calls sent by `sender` signed with `signer`.
+
+    Args:
+    artifacts: client/artifacts.py AppArtifacts of the app, the inner transactions are taken from its hints.
+    app_id: id of the app.
+    signer: signer of the calls.
+    sender: sender of the calls, the address of the signer if omitted.
+    params: suggested params of the calls.
+    """
+
+    def __init__(
+        self,
+        artifacts: Any,
+        app_id: int,
+        signer: TransactionSigner,
+        params: SuggestedParamsCache,
+        sender: str = None,
+    ):
+        self.app_id = app_id
+        self.app_addr = get_application_address(app_id)
+        self.signer = signer
+        self.sender = sender if sender is not None else _signer_address(signer)
+        self.params = params
+        self.plans: dict[str, CallPlan] = {
+            method.name: CallPlan(method, app_id, artifacts.hints.get(method.name, {}).get("inner_txns") or 0)
+            for method in artifacts.contract.methods if method.name != "create"
+        }
+
+    @classmethod
+    def from_client(cls, app_client: Any, params: SuggestedParamsCache = None) -> "CallPlans":
+        """Plans of the app, signer and sender of a client/artifacts.py ArtifactAppClient."""
+        params = params if params is not None else SuggestedParamsCache(app_client.client)
+        return cls(app_client.artifacts, app_client.app_id, app_client.get_signer(), params, app_client.get_sender())
+
+    def __getitem__(self, method: str) -> CallPlan:
+        return self.plans[method]
+
+    def prepare(self, signer: TransactionSigner, sender: str = None) -> "CallPlans":
+        """Copy of these plans (shared) sending with `signer`."""
+        plans = copy.copy(self)
+        plans.signer = signer
+        plans.sender = sender if sender is not None else _signer_address(signer)
+        return plans
+
+    def add(
+        self, atc: AtomicTransactionComposer, method: str, sp: transaction.SuggestedParams = None, **kwargs
+    ) -> AtomicTransactionComposer:
+        """Add the call of `method` with the arguments and transaction fields `kwargs` (see CallPlan.transactions)."""
+        sp = sp if sp is not None else self.params.get()
+        return self.plans[method].add(atc, sp, self.sender, self.signer, **kwargs)
+
+    def payment(self, amount: int, sp: transaction.SuggestedParams = None) -> TransactionWithSigner:
+        """Payment of `amount` microAlgos from the sender to the app account, e.g. the `funding` of fund."""
+        sp = sp if sp is not None else self.params.get()
+        return TransactionWithSigner(transaction.PaymentTxn(self.sender, sp, self.app_addr, amount), self.signer)
+
+
+# placeholder of the templates, the fields taken from the params are set by every call
+_TEMPLATE_PARAMS = transaction.SuggestedParams(0, 0, 0, "", flat_fee=True)
+
+
+def _encoder(abi_type: abi.ABIType) -> Encoder:
+    """Encoder of the values of `abi_type`, specialized for the static types of the contracts."""
+    if isinstance(abi_type, abi.UintType):
+        size = abi_type.bit_size // 8
+        return lambda v: int(v).to_bytes(size, "big")
+    if isinstance(abi_type, abi.AddressType):
+        return lambda v: _decode_address(v) if isinstance(v, str) else bytes(v)
+    if isinstance(abi_type, abi.StringType):
+        def encode_string(v: str) -> bytes:
+            b = v.encode("utf-8")
+            return len(b).to_bytes(2, "big") + b
+        return encode_string
+    return abi_type.encode
+
+
+@functools.lru_cache(maxsize=4096)
+def _decode_address(address: str) -> bytes:
+    # base32 decoding and checksum of an address, cached: backers and receivers are addressed again and again
+    return encoding.decode_address(address)
+
+
+def _foreign_index(value: Any, array: list, implicit: Any = None) -> int:
+    """Index of `value` in a foreign array of the call, appended if missing; `implicit` (sender, app) is 0."""
+    if implicit is not None:
+        if value == implicit:
+            return 0
+        offset = 1
+    else:
+        offset = 0
+    if value not in array:
+        array.append(value)
+    return array.index(value) + offset
+
+
+def _signer_address(signer: TransactionSigner) -> str:
+    # AccountTransactionSigner, the only signer used in the repo
+    return encoding.encode_address(base64.b64decode(signer.private_key)[32:])
@@ -0,0 +1,191 @@
+"""
+Batch deployment of campaigns through CampaignFactoryApp.
+
+Deploying a campaign directly sends its full approval program (and the
+embedded MilestoneApprovalApp) in a create transaction. Through the factory,
+a campaign is one small payment (the min balance deposit) plus one
+create_campaign call carrying only the ABI arguments, so 8 campaigns fit in
+an atomic group. CampaignDeployer packs the campaigns into groups, submits
+them back to back and waits for the confirmations once `max_in_flight`
+groups are outstanding, like BulkFunder.
+"""
+import base64
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Iterable, Optional
+
+from algosdk.atomic_transaction_composer import AtomicTransactionComposer, TransactionWithSigner
+from algosdk.future import transaction
+from beaker.client import ApplicationClient
+
+from client.fees import pooled_params
+from contracts.compile_cache import CompileCache, default_cache
+from contracts.crowdfunding.campaignFactory import (
+    CampaignFactoryApp,
+    INDEX_PAGE_ENTRIES,
+    campaign_deposit,
+)
+from contracts.crowdfunding.crowdfundingCampaign import CrowdfundingCampaignApp
+from contracts.fees import declared_inner_txns
+
+MAX_GROUP_SIZE = 16
+TXNS_PER_CAMPAIGN = 2 # deposit payment + create_campaign call
+INNER_TXNS_PER_CAMPAIGN = declared_inner_txns(CampaignFactoryApp.create_campaign) # campaign create + min balance payment
+DEFAULT_MAX_IN_FLIGHT = 8
+DEFAULT_WAIT_ROUNDS = 10
+
+
+@dataclass
+class CampaignSpec:
+    """Arguments of CrowdfundingCampaignApp.create, total_milestones is len(funds_per_milestone)."""
+
+    campaign_goal: int
+    funds_receiver: str
+    fund_start_date: int
+    fund_end_date: int
+    reward_metadata: str
+    funds_per_milestone: list[int]
+
+    def create_args(self) -> dict:
+        return {
+            "campaign_goal": self.campaign_goal,
+            "funds_receiver": self.funds_receiver,
+            "fund_start_date": self.fund_start_date,
+            "fund_end_date": self.fund_end_date,
+            "reward_metadata": self.reward_metadata,
+            "total_milestones": len(self.funds_per_milestone),
+            "funds_per_milestone": self.funds_per_milestone,
+        }
+
+
+@dataclass
+class DeployResult:
+    """Outcome of one atomic group: either all its campaigns are created or none is."""
+
+    specs: list[CampaignSpec]
+    app_ids: list[int] = field(default_factory=list)
+    txids: list[str] = field(default_factory=list) # create_campaign calls
+    confirmed_round: int = 0
+    error: Optional[str] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None and self.confirmed_round > 0
+
+
+class CampaignDeployer:
+    """
+    Create many campaigns with grouped create_campaign calls.
+
+    Args:
+    factory_client: ApplicationClient of the deployed CampaignFactoryApp, its signer is
+        the creator of the campaigns and must be opted in to the factory.
+    cache: compile cache giving the campaign program sizes (for the deposit).
+    max_in_flight: groups submitted but not confirmed yet before blocking on the oldest.
+    wait_rounds: rounds to wait for the confirmation of a group.
+    """
+
+    def __init__(
+        self,
+        factory_client: ApplicationClient,
+        cache: CompileCache = None,
+        max_in_flight: int = DEFAULT_MAX_IN_FLIGHT,
+        wait_rounds: int = DEFAULT_WAIT_ROUNDS,
+    ):
+        self.factory_client = factory_client
+        self.client = factory_client.client
+        self.max_in_flight = max_in_flight
+        self.wait_rounds = wait_rounds
+        compiled = (cache if cache is not None else default_cache()).build(CrowdfundingCampaignApp, self.client)
+        self.deposit = campaign_deposit(len(compiled.approval.binary), len(compiled.clear.binary))
+
+    def pack(self, specs: Iterable[CampaignSpec]) -> list[list[CampaignSpec]]:
+        """Split `specs` into groups of at most MAX_GROUP_SIZE transactions, preserving order."""
+        specs = list(specs)
+        per_group = MAX_GROUP_SIZE // TXNS_PER_CAMPAIGN
+        return [specs[i:i + per_group] for i in range(0, len(specs), per_group)]
+
+    def deploy(self, specs: Iterable[CampaignSpec]) -> list[DeployResult]:
+        """Create a campaign per spec, returns one DeployResult per group (app ids in spec order)."""
+        sp = self.client.suggested_params()
+        call_sp = pooled_params(sp, INNER_TXNS_PER_CAMPAIGN)
+
+        results = []
+        in_flight: deque[DeployResult] = deque()
+        first = 0
+        for group in self.pack(specs):
+            result = DeployResult(group)
+            results.append(result)
+            atc = self._compose(group, first, sp, call_sp)
+            first += len(group)
+            try:
+                signed = atc.gather_signatures()
+                # every other transaction is a create_campaign call
+                result.txids = [txid for i, txid in enumerate(atc.tx_ids) if i % TXNS_PER_CAMPAIGN == 1]
+                self.client.send_transactions(signed)
+            except Exception as e:
+                result.error = str(e)
+                continue
+            in_flight.append(result)
+            if len(in_flight) >= self.max_in_flight:
+                self._wait(in_flight.popleft())
+        while in_flight:
+            self._wait(in_flight.popleft())
+        return results
+
+    def campaigns_of(self, creator: str) -> list[int]:
+        """App ids of the campaigns created by `creator` through the factory, in creation order."""
+        state = self.client.account_application_info(creator, self.factory_client.app_id)
+        key_values = state.get("app-local-state", {}).get("key-value", [])
+        return decode_index(key_values)
+
+    def _compose(
+        self,
+        group: list[CampaignSpec],
+        first: int,
+        sp: transaction.SuggestedParams,
+        call_sp: transaction.SuggestedParams,
+    ) -> AtomicTransactionComposer:
+        atc = AtomicTransactionComposer()
+        factory = self.factory_client
+        sender = factory.get_sender()
+        for i, spec in enumerate(group):
+            factory.add_method_call(
+                atc,
+                CampaignFactoryApp.create_campaign,
+                suggested_params=call_sp,
+                deposit=TransactionWithSigner(
+                    # numbered, identical specs would give identical transactions (rejected as already in ledger)
+                    txn=transaction.PaymentTxn(
+                        sender, sp, factory.app_addr, self.deposit, note=(first + i).to_bytes(8, "big")
+                    ),
+                    signer=factory.get_signer(),
+                ),
+                **spec.create_args(),
+            )
+        atc.build_group()
+        return atc
+
+    def _wait(self, result: DeployResult):
+        try:
+            transaction.wait_for_confirmation(self.client, result.txids[0], self.wait_rounds)
+            for txid in result.txids:
+                info = self.client.pending_transaction_info(txid)
+                result.confirmed_round = info["confirmed-round"]
+                result.app_ids.append(info["inner-txns"][0]["application-index"])
+        except Exception as e:
+            result.error = str(e)
+
+
+def decode_index(key_values: list[dict]) -> list[int]:
+    """Campaign app ids from the local state of a creator in the factory (algod key-value list)."""
+    count = 0
+    pages: dict[int, bytes] = {}
+    for kv in key_values:
+        key = base64.b64decode(kv["key"])
+        if key == b"campaigns_count":
+            count = kv["value"]["uint"]
+        elif key.startswith(b"ids_") and len(key) == 5:
+            pages[key[4]] = base64.b64decode(kv["value"].get("bytes", ""))
+    packed = b"".join(pages.get(p, b"").ljust(INDEX_PAGE_ENTRIES * 8, b"\0") for p in range(max(pages, default=-1) + 1))
+    return [int.from_bytes(packed[i * 8:i * 8 + 8], "big") for i in range(count)]
@@ -0,0 +1,400 @@
+"""
+Deadline scheduler of the campaigns: claim_funds and vote_settling called as soon as they are valid.
+
+A campaign moves on only when its creator calls claim_funds after the
+funding window (fund_end_date) and vote_settling on the milestone app after
+the vote window (vote_end_date), then claim_funds again. DeadlineScheduler
+keeps the next deadline of every campaign of the creators it signs for in a
+priority queue (a heap ordered by due timestamp). The index is built once
+from the global state of the known campaigns, then kept up to date from the
+contract events of each block, read in a single pass by an EventStream:
+CampaignCreated of the watched factories adds a campaign, MilestoneSubmitted
+schedules vote_settling, VoteSettled schedules claim_funds at once, Claim and
+Refund retire the claim (and the campaign once ended). Campaigns are never
+polled: a round costs the status and block requests of the stream, whatever
+the number of campaigns.
+
+Every round, the deadlines due before the chain timestamp (of the last block
+read) are fired together, with one suggested params request, and stay in
+flight until their event confirms them. A call rejected or left unconfirmed
+past its last valid round is fired again at the next round, up to
+`max_attempts` times.
+
+    scheduler = DeadlineScheduler(client, {creator.address: creator.signer}, campaign_ids, factory_ids=[factory_id])
+    scheduler.run(stop) # until the threading.Event `stop` is set
+
+`tick` runs a single pass, e.g. offline against the virtual clock of
+localnet after each block (see benchmarks/deadline_scheduler.py). After a
+restart, the cursor of the stream of the previous scheduler (saved after its
+ticks) lists the apps it watched: the campaigns found from the factory events
+are indexed again from their global state, milestone apps included.
+
+    scheduler.stream.cursor.save("build/scheduler.cursor")
+    scheduler = DeadlineScheduler(client, signers, cursor=Cursor.load("build/scheduler.cursor"))
+"""
+import heapq
+import threading
+from dataclasses import dataclass, field
+from typing import Any, Iterable, Optional
+
+from algosdk import encoding
+from algosdk.atomic_transaction_composer import AtomicTransactionComposer, TransactionSigner
+from algosdk.future import transaction
+from algosdk.v2client.algod import AlgodClient
+
+from client.artifacts import DEFAULT_BUILD_DIR, AppArtifacts, CampaignClient, MilestoneClient, raw_state
+from client.event_stream import ContractEvent, Cursor, EventStream
+
+CLAIM = "claim_funds"
+SETTLE = "vote_settling"
+DEFAULT_VALIDITY = 10 # rounds a fired call stays valid before it is fired again
+DEFAULT_MAX_ATTEMPTS = 3
+ENDED = 3 # campaign_state of an ended campaign
+
+
+@dataclass(order=True)
+class Deadline:
+    """Call of `action` on `app_id` (the campaign, or its milestone app for vote_settling), valid once `due` < chain time."""
+
+    due: int
+    seq: int
+    action: str = field(compare=False)
+    app_id: int = field(compare=False)
+    campaign_id: int = field(compare=False)
+    attempts: int = field(default=0, compare=False)
+    trigger_round: int = field(default=0, compare=False) # round of the event making it due at once, 0 for a timestamp
+
+    @property
+    def key(self) -> tuple[str, int]:
+        return self.action, self.app_id
+
+
+@dataclass
+class ScheduledCall:
+    """Deadline fired at `fired_round`, confirmed by its event at `confirmed_round`."""
+
+    deadline: Deadline
+    txid: str
+    fired_round: int
+    last_valid: int
+    confirmed_round: int = 0
+
+
+@dataclass
+class SchedulerStats:
+    rounds: int = 0 # blocks read
+    fired: int = 0 # calls sent
+    confirmed: int = 0
+    refired: int = 0 # calls sent again after a rejection or expiry
+    failed: int = 0 # deadlines given up after max_attempts
+    state_reads: int = 0 # global state requests
+
+
+class DeadlineQueue:
+    """
+    Min-heap of deadlines by due timestamp, at most one per (action, app_id).
+
+    Pushing a deadline replaces the previous one of the same key, cancelled entries stay in the heap
+    until they reach its top (or the heap is compacted).
+    """
+
+    def __init__(self):
+        self._heap: list[Deadline] = []
+        self._live: dict[tuple[str, int], Deadline] = {}
+        self._seq = 0
+
+    def __len__(self) -> int:
+        return len(self._live)
+
+    def __contains__(self, key: tuple[str, int]) -> bool:
+        return key in self._live
+
+    def push(self, action: str, app_id: int, campaign_id: int, due: int, **kwargs) -> Deadline:
+        self._seq += 1
+        deadline = Deadline(due, self._seq, action, app_id, campaign_id, **kwargs)
+        self._live[deadline.key] = deadline
+        heapq.heappush(self._heap, deadline)
+        if len(self._heap) > 2 * len(self._live) + 64:
+            self._heap = list(self._live.values())
+            heapq.heapify(self._heap)
+        return deadline
+
+    def cancel(self, action: str, app_id: int) -> Optional[Deadline]:
+        return self._live.pop((action, app_id), None)
+
+    def next_due(self) -> Optional[int]:
+        self._discard_cancelled()
+        return self._heap[0].due if self._heap else None
+
+    def pop_due(self, now: int) -> list[Deadline]:
+        """Deadlines due before the timestamp `now`, earliest first."""
+        due = []
+        while self._heap and self._heap[0].due < now:
+            deadline = heapq.heappop(self._heap)
+            if self._live.get(deadline.key) is deadline:
+                del self._live[deadline.key]
+                due.append(deadline)
+        return due
+
+    def _discard_cancelled(self):
+        while self._heap and self._live.get(self._heap[0].key) is not self._heap[0]:
+            heapq.heappop(self._heap)
+
+
+@dataclass
+class _Campaign:
+    creator: str
+    milestone_app_id: int = 0
+
+
+class DeadlineScheduler:
+    """
+    Fire claim_funds and vote_settling of the campaigns of `signers` as their deadlines pass.
+
+    Args:
+    client: algod client.
+    signers: creator address -> signer, campaigns of other creators are not scheduled.
+    campaign_ids: campaigns to index at start.
+    factory_ids: CampaignFactoryApp whose new campaigns are indexed from their CampaignCreated event.
+    campaign_artifacts: artifacts of the campaigns (client/artifacts.py), e.g. packedCrowdfundingCampaign,
+        crowdfundingCampaign from `build_dir` by default.
+    build_dir: directory of the artifacts.
+    validity: rounds a fired call stays valid.
+    max_attempts: calls of a deadline before it is given up (see `failures`).
+    cursor: cursor of the stream of a previous scheduler, its campaigns and factories are watched again. The
+        index is read from the current state, the events before the current round are not replayed.
+    """
+
+    def __init__(
+        self,
+        client: AlgodClient,
+        signers: dict[str, TransactionSigner],
+        campaign_ids: Iterable[int] = (),
+        factory_ids: Iterable[int] = (),
+        campaign_artifacts: AppArtifacts = None,
+        build_dir: str = DEFAULT_BUILD_DIR,
+        validity: int = DEFAULT_VALIDITY,
+        max_attempts: int = DEFAULT_MAX_ATTEMPTS,
+        cursor: Cursor = None,
+    ):
+        self.client = client
+        self.signers = dict(signers)
+        self.campaign_artifacts = campaign_artifacts or AppArtifacts.load(CampaignClient.ARTIFACTS, build_dir, client)
+        self.milestone_artifacts = AppArtifacts.load(MilestoneClient.ARTIFACTS, build_dir, client)
+        self.validity = validity
+        self.max_attempts = max_attempts
+        self.queue = DeadlineQueue()
+        self.stats = SchedulerStats()
+        self.failures: list[tuple[Deadline, str]] = []
+        self.campaigns: dict[int, _Campaign] = {}
+        self._campaign_of: dict[int, int] = {} # milestone app -> campaign
+        self._in_flight: dict[tuple[str, int], ScheduledCall] = {}
+        self._completed: list[ScheduledCall] = []
+
+        self.round = client.status()["last-round"]
+        self.timestamp = client.block_info(self.round)["block"].get("ts", 0)
+        # the index is read at `round`, the events are followed from the next one
+        self.stream = EventStream(
+            client,
+            factory_ids,
+            events=["CampaignCreated", "Claim", "MilestoneSubmitted", "Refund", "VoteSettled"],
+            cursor=Cursor(self.round + 1),
+            follow_children=False,
+            build_dir=build_dir,
+        )
+        self.stream.timestamp = self.timestamp
+        campaign_ids = list(campaign_ids)
+        for app_id in campaign_ids:
+            self.add_campaign(app_id)
+        if cursor is not None:
+            for app_id in set(cursor.app_ids) - set(campaign_ids) - self.stream.app_ids:
+                self._resume(app_id)
+
+    @property
+    def pending(self) -> int:
+        """Deadlines scheduled or fired and not confirmed yet."""
+        return len(self.queue) + len(self._in_flight)
+
+    # ------------------------------------------------------------ index
+
+    def add_campaign(self, app_id: int) -> bool:
+        """Index the campaign `app_id` from its global state, False if its creator has no signer or it has ended."""
+        return self._index(app_id, self._global_state(app_id, self.campaign_artifacts))
+
+    def _index(self, app_id: int, state: dict[str, Any]) -> bool:
+        creator = state["creator"]
+        if creator not in self.signers or state["campaign_state"] == ENDED:
+            return False
+        self.campaigns[app_id] = _Campaign(creator)
+        self.stream.watch(app_id)
+        match state["campaign_state"]:
+            case 0: # funding
+                self.queue.push(CLAIM, app_id, app_id, state["fund_end_date"])
+            case 2: # milestone under validation
+                milestone_app_id = state["milestone_approval_app_id"]
+                self._watch_milestone(app_id, milestone_app_id)
+                milestone = self._global_state(milestone_app_id, self.milestone_artifacts)
+                if milestone["approval_state"] == 0:
+                    self.queue.push(SETTLE, milestone_app_id, app_id, milestone["vote_end_date"])
+                else:
+                    self.queue.push(CLAIM, app_id, app_id, 0, trigger_round=self.round)
+        return True
+
+    def _resume(self, app_id: int):
+        """Watch again an app of a previous scheduler: index a campaign, watch a factory (a milestone app comes with its campaign)."""
+        state = self._global_state(app_id, self.campaign_artifacts)
+        if "campaign_state" in state:
+            self._index(app_id, state)
+        elif "approval_state" not in state:
+            self.stream.watch(app_id)
+
+    def remove_campaign(self, app_id: int):
+        campaign = self.campaigns.pop(app_id, None)
+        if campaign is None:
+            return
+        self._retire(CLAIM, app_id)
+        self.stream.unwatch(app_id)
+        if campaign.milestone_app_id:
+            self._retire(SETTLE, campaign.milestone_app_id)
+            self._campaign_of.pop(campaign.milestone_app_id, None)
+            self.stream.unwatch(campaign.milestone_app_id)
+
+    def _watch_milestone(self, campaign_id: int, milestone_app_id: int):
+        campaign = self.campaigns[campaign_id]
+        if campaign.milestone_app_id and campaign.milestone_app_id != milestone_app_id:
+            self._campaign_of.pop(campaign.milestone_app_id, None)
+            self.stream.unwatch(campaign.milestone_app_id)
+        campaign.milestone_app_id = milestone_app_id
+        self._campaign_of[milestone_app_id] = campaign_id
+        self.stream.watch(milestone_app_id)
+
+    def _global_state(self, app_id: int, artifacts: AppArtifacts) -> dict[str, Any]:
+        """Global state of `app_id` decoded by `artifacts` (AppArtifacts.decode_state)."""
+        self.stats.state_reads += 1
+        key_values = self.client.application_info(app_id).get("params", {}).get("global-state", [])
+        return artifacts.decode_state(raw_state(key_values))
+
+    # ------------------------------------------------------------ events
+
+    def _apply(self, event: ContractEvent):
+        match event.name:
+            case "CampaignCreated":
+                if event["creator"] in self.signers and event["campaign_app_id"] not in self.campaigns:
+                    self.add_campaign(event["campaign_app_id"])
+            case "MilestoneSubmitted":
+                if event.app_id in self.campaigns:
+                    milestone_app_id = event["milestone_app_id"]
+                    self._watch_milestone(event.app_id, milestone_app_id)
+                    self._retire(SETTLE, milestone_app_id)
+                    self.queue.push(SETTLE, milestone_app_id, event.app_id, event["vote_end_date"])
+            case "VoteSettled":
+                campaign_id = self._campaign_of.get(event.app_id)
+                if campaign_id is not None:
+                    self._retire(SETTLE, event.app_id, event.round)
+                    self.queue.push(CLAIM, campaign_id, campaign_id, 0, trigger_round=event.round)
+            case "Claim":
+                self._retire(CLAIM, event.app_id, event.round)
+                if event["campaign_state"] == ENDED:
+                    self.remove_campaign(event.app_id)
+            case "Refund": # only once the campaign has failed
+                self.remove_campaign(event.app_id)
+
+    def _retire(self, action: str, app_id: int, confirmed_round: int = 0):
+        """Cancel the deadline of (action, app_id), its call in flight is confirmed at `confirmed_round` if given."""
+        self.queue.cancel(action, app_id)
+        call = self._in_flight.pop((action, app_id), None)
+        if call is not None and confirmed_round:
+            call.confirmed_round = confirmed_round
+            self.stats.confirmed += 1
+            self._completed.append(call)
+
+    # ------------------------------------------------------------ scheduling
+
+    def tick(self) -> list[ScheduledCall]:
+        """
+        Read the blocks committed since the last tick, then fire the deadlines passed.
+
+        Returns the calls confirmed by the events of these blocks.
+        """
+        before = self.stream.blocks_read
+        for event in self.stream.events():
+            self._apply(event)
+        self.stats.rounds += self.stream.blocks_read - before
+        self.round = self.stream.cursor.round - 1
+        self.timestamp = self.stream.timestamp
+
+        for key, call in list(self._in_flight.items()):
+            if call.last_valid <= self.round: # every block it could be in has been read
+                del self._in_flight[key]
+                self._retry(call.deadline, f"not confirmed by round {call.last_valid}")
+
+        due = self.queue.pop_due(self.timestamp)
+        if due:
+            self._fire(due)
+        completed, self._completed = self._completed, []
+        return completed
+
+    def run(self, stop: threading.Event):
+        """Tick after every block until `stop` is set."""
+        while not stop.is_set():
+            self.tick()
+            self.client.status_after_block(self.round)
+
+    def _fire(self, deadlines: list[Deadline]):
+        """Send the calls of `deadlines`, due in the same round, with the same suggested params."""
+        sp = self.client.suggested_params()
+        sp.first = self.round
+        sp.last = self.round + self.validity
+        for deadline in deadlines:
+            deadline.attempts += 1
+            try:
+                atc = self._compose(deadline, sp)
+                self.client.send_transactions(atc.gather_signatures())
+            except Exception as e:
+                self._retry(deadline, str(e))
+                continue
+            self.stats.fired += 1
+            self._in_flight[deadline.key] = ScheduledCall(deadline, atc.tx_ids[0], self.round, sp.last)
+
+    def _compose(self, deadline: Deadline, sp: transaction.SuggestedParams) -> AtomicTransactionComposer:
+        atc = AtomicTransactionComposer()
+        signer = self.signers[self.campaigns[deadline.campaign_id].creator]
+        if deadline.action == SETTLE:
+            milestone = MilestoneClient(self.client, self.milestone_artifacts, deadline.app_id, signer)
+            return milestone.add_method_call(atc, SETTLE, suggested_params=sp)
+        # the receivers and milestone app are read when firing: set_payout_split logs no event
+        state = self._global_state(deadline.app_id, self.campaign_artifacts)
+        receivers = payout_receivers(state["funds_receiver"], state.get("payout_split", b""))
+        milestone_app_id = state["milestone_approval_app_id"]
+        campaign = CampaignClient(self.client, self.campaign_artifacts, deadline.app_id, signer)
+        call = dict(accounts=receivers, foreign_apps=[milestone_app_id] if milestone_app_id else None)
+        # priced from a dryrun: no inner payment when the campaign failed or the milestone was rejected
+        call_sp = campaign.fees.suggested_params(campaign, CLAIM, sp, **call)
+        return campaign.add_method_call(atc, CLAIM, suggested_params=call_sp, **call)
+
+    def _retry(self, deadline: Deadline, error: str):
+        if deadline.attempts >= self.max_attempts:
+            self.stats.failed += 1
+            self.failures.append((deadline, error))
+            return
+        self.stats.refired += 1
+        self.queue.push(
+            deadline.action,
+            deadline.app_id,
+            deadline.campaign_id,
+            deadline.due,
+            attempts=deadline.attempts,
+            trigger_round=deadline.trigger_round,
+        )
+
+
+def payout_receivers(funds_receiver: str, payout_split: bytes) -> list[str]:
+    """Addresses paid by claim_funds: funds_receiver, then the co-receivers packed in payout_split."""
+    receivers = [funds_receiver]
+    if payout_split:
+        count = (len(payout_split) + 32) // 34 # uint16 share per receiver, 32 bytes address per co-receiver
+        start = 2 * count
+        receivers += [
+            encoding.encode_address(payout_split[start + 32 * i:start + 32 * i + 32]) for i in range(count - 1)
+        ]
+    return receivers
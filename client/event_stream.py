@@ -0,0 +1,192 @@
+"""
+Streaming consumer of the crowdfunding contract events.
+
+Instead of polling the global state of every campaign, EventStream reads each
+block once, picks the application calls (top level and inner) of all the
+watched apps in a single pass and decodes their logs with the events of the
+contract artifacts (client/artifacts.py, as defined by
+contracts/crowdfunding/events.py). Events are yielded in chain
+order together with the Cursor to resume from, which can be saved and handed
+to a new stream after a restart, with the apps the stream watched (the
+milestone apps it followed included):
+
+    stream = EventStream(client, campaign_ids, cursor=Cursor.load("build/events.cursor"))
+    for event in stream.events(follow=True):
+        handle(event)
+        stream.cursor.save("build/events.cursor")
+"""
+import base64
+import json
+import os
+from dataclasses import asdict, dataclass, field
+from typing import Any, Iterable, Iterator, Optional
+
+from algosdk import encoding
+from algosdk.error import AlgodHTTPError
+from algosdk.v2client.algod import AlgodClient
+
+from client.artifacts import DEFAULT_BUILD_DIR, contract_events
+
+
+@dataclass(frozen=True)
+class ContractEvent:
+    """Decoded event, `txn_index` and `log_index` locate it in its block."""
+
+    name: str
+    app_id: int
+    round: int
+    txn_index: int # top level transaction of the block
+    log_index: int # log of that transaction, then of its inner transactions
+    sender: str
+    fields: dict[str, Any] = field(default_factory=dict)
+    txid: Optional[str] = None # only known when the node returns it with the block
+
+    def __getitem__(self, key: str) -> Any:
+        return self.fields[key]
+
+
+@dataclass
+class Cursor:
+    """Position of the next event to read: (round, txn_index, log_index), and the apps watched there."""
+
+    round: int = 0
+    txn_index: int = 0
+    log_index: int = 0
+    app_ids: list[int] = field(default_factory=list) # watched by the stream, the children it followed included
+
+    def after(self, event: ContractEvent, app_ids: list[int] = None) -> "Cursor":
+        return Cursor(event.round, event.txn_index, event.log_index + 1, self.app_ids if app_ids is None else app_ids)
+
+    def save(self, path: str):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, "w") as f:
+            json.dump(asdict(self), f)
+
+    @classmethod
+    def load(cls, path: str, default: "Cursor" = None) -> Optional["Cursor"]:
+        """Cursor saved at `path`, `default` if there is none."""
+        if not os.path.exists(path):
+            return default
+        with open(path) as f:
+            return cls(**json.load(f))
+
+
+class EventStream:
+    """
+    Decode the events of many apps from a single scan of the blocks.
+
+    Args:
+    client: AlgodClient serving the blocks.
+    app_ids: apps to watch, more can be added with `watch`.
+    events: names of the events to decode (all the events of the contracts by default), logs with another
+        selector are skipped.
+    cursor: where to start (or resume), by default at the next block. The apps of the cursor are watched too.
+    follow_children: also watch the MilestoneApprovalApp created by a watched campaign
+        (from its MilestoneSubmitted event), so that its votes are streamed too.
+    build_dir: directory of the artifacts holding the events, built with `client` if missing.
+    """
+
+    def __init__(
+        self,
+        client: AlgodClient,
+        app_ids: Iterable[int] = (),
+        events: Iterable[str] = None,
+        cursor: Cursor = None,
+        follow_children: bool = True,
+        build_dir: str = DEFAULT_BUILD_DIR,
+    ):
+        self.client = client
+        self.app_ids: set[int] = set(app_ids) | set(cursor.app_ids if cursor is not None else ())
+        self._watched = sorted(self.app_ids) # app_ids of the cursors, a new list on every change
+        definitions = contract_events(build_dir, client)
+        names = definitions if events is None else events
+        self.events_by_selector = {definitions[name].selector: definitions[name] for name in names}
+        self.cursor = cursor
+        self.follow_children = follow_children
+        self.blocks_read = 0
+        self.timestamp = 0 # of the last block read, the chain time seen by the stream
+
+    def watch(self, app_id: int):
+        if app_id not in self.app_ids:
+            self.app_ids.add(app_id)
+            self._watched = sorted(self.app_ids)
+
+    def unwatch(self, app_id: int):
+        if app_id in self.app_ids:
+            self.app_ids.discard(app_id)
+            self._watched = sorted(self.app_ids)
+
+    def __iter__(self) -> Iterator[ContractEvent]:
+        return self.events()
+
+    def events(self, follow: bool = False, to_round: int = None) -> Iterator[ContractEvent]:
+        """
+        Yield the events from the cursor on, moving the cursor past each one.
+
+        Stops after the last committed round (or `to_round`), unless `follow` is set,
+        in which case it waits for the next blocks.
+        """
+        if self.cursor is None:
+            self.cursor = Cursor(self.client.status()["last-round"] + 1, app_ids=self._watched)
+        last_round = self.client.status()["last-round"]
+        while to_round is None or self.cursor.round <= to_round:
+            if self.cursor.round > last_round:
+                if not follow:
+                    return
+                last_round = self.client.status_after_block(last_round)["last-round"]
+                continue
+
+            start = self.cursor
+            for event in self.read_block(start.round):
+                if (event.txn_index, event.log_index) < (start.txn_index, start.log_index):
+                    continue # consumed before the cursor was saved
+                self.cursor = self.cursor.after(event, self._watched)
+                yield event
+            self.cursor = Cursor(start.round + 1, app_ids=self._watched)
+
+    def read_block(self, round_num: int) -> list[ContractEvent]:
+        """Events of the watched apps in block `round_num`."""
+        try:
+            block = self.client.block_info(round_num)["block"]
+        except AlgodHTTPError as e:
+            if e.code == 404:
+                return []
+            raise
+        self.blocks_read += 1
+        self.timestamp = max(self.timestamp, block.get("ts", 0))
+        events = []
+        for txn_index, stxn in enumerate(block.get("txns", [])):
+            log_index = 0
+            for app_id, sender, logs, txid in _app_calls(stxn):
+                for log in logs:
+                    if app_id in self.app_ids:
+                        event = self._decode(log, app_id, round_num, txn_index, log_index, sender, txid)
+                        if event is not None:
+                            events.append(event)
+                    log_index += 1
+        return events
+
+    def _decode(self, log: bytes, app_id, round_num, txn_index, log_index, sender, txid) -> Optional[ContractEvent]:
+        definition = self.events_by_selector.get(log[:4])
+        if definition is None:
+            return None # e.g. an ABI return value
+        try:
+            fields = definition.decode(log)
+        except Exception:
+            return None
+        if definition.name == "MilestoneSubmitted" and self.follow_children:
+            self.watch(fields["milestone_app_id"])
+        return ContractEvent(definition.name, app_id, round_num, txn_index, log_index, sender, fields, txid)
+
+
+def _app_calls(stxn: dict[str, Any]) -> Iterator[tuple[int, str, list[bytes], Optional[str]]]:
+    """(app id, sender, logs, txid) of an application call and of its inner calls, in execution order."""
+    txn = stxn.get("txn", {})
+    apply_data = stxn.get("dt", stxn) # algod nests the apply data of block transactions under "dt"
+    if txn.get("type") == "appl":
+        app_id = txn.get("apid") or stxn.get("apid") or stxn.get("application-index", 0)
+        logs = [base64.b64decode(log) for log in apply_data.get("lg", apply_data.get("logs", []))]
+        sender = encoding.encode_address(base64.b64decode(txn["snd"]))
+        yield app_id, sender, logs, stxn.get("txid")
+    for inner in apply_data.get("itx", apply_data.get("inner-txns", [])):
+        yield from _app_calls(inner)
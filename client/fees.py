@@ -0,0 +1,155 @@
+"""
+Pooled fees of the app calls issuing inner transactions.
+
+The contracts set the fee of their inner transactions to 0, the caller pays
+them on the outer app call (fee pooling). The inner transactions of a method
+are taken from its @inner_txns annotation (contracts/fees.py): on the method
+handler for beaker's ApplicationClient, in the hints of application.json for
+the clients of client/artifacts.py. FeePlanner falls back, for a method
+without annotation, to a dryrun of the call: the inner transactions reported
+by the dryrun are counted once and cached per approval program and method.
+A method annotated as varying with the call (claim_funds pays one inner
+payment per payout receiver, none when the campaign fails or a milestone is
+rejected) is dryrun by FeePlanner on every call, as by the clients of
+client/artifacts.py; its annotation is only the bound paid by the asyncio
+client, which makes no blocking request.
+
+The fee is priced from the suggested params of the call: the outer app call
+pays the min fee, or under congestion (algod suggesting a fee per byte) the
+fee per byte of a typical app call, whichever is higher; every inner
+transaction adds the min fee.
+"""
+import copy
+import hashlib
+from typing import Any, Optional
+
+from algosdk import abi
+from algosdk.atomic_transaction_composer import ABIResult, AtomicTransactionComposer
+from algosdk.future import transaction
+from algosdk.v2client.algod import AlgodClient
+
+from contracts.fees import declared_inner_txns, inner_txns_vary
+
+APP_CALL_SIZE = 400 # bytes, signed app call with its ABI arguments and references
+MAX_INNER_TXNS = 16 # per app call, fees prepaid by the dryrun of a method without annotation
+
+
+def txn_fee(sp: transaction.SuggestedParams) -> int:
+    """Fee of one app call for the suggested params: min fee, or the fee per byte of APP_CALL_SIZE under congestion."""
+    if sp.flat_fee:
+        return max(sp.min_fee, sp.fee)
+    return max(sp.min_fee, sp.fee * APP_CALL_SIZE)
+
+
+def pooled_params(sp: transaction.SuggestedParams, inner_txns: int) -> transaction.SuggestedParams:
+    """Copy of `sp` with the flat fee of an app call paying for `inner_txns` inner transactions."""
+    pooled = copy.copy(sp)
+    pooled.fee = txn_fee(sp) + inner_txns * sp.min_fee
+    pooled.flat_fee = True
+    return pooled
+
+
+def method_inner_txns(app_client: Any, method: Any) -> Optional[int]:
+    """
+    Inner transactions annotated on `method` (handler, abi.Method or name) of the app of `app_client`
+    (beaker ApplicationClient or client/artifacts.py ArtifactAppClient), None if not annotated.
+    """
+    artifacts = getattr(app_client, "artifacts", None)
+    if artifacts is not None:
+        return artifacts.hints.get(method_name(method), {}).get("inner_txns")
+    if not callable(method):
+        method = getattr(type(app_client.app), method_name(method), None)
+    return declared_inner_txns(method)
+
+
+def method_inner_txns_vary(app_client: Any, method: Any) -> bool:
+    """Whether the inner transactions annotated on `method` depend on the call (see method_inner_txns)."""
+    artifacts = getattr(app_client, "artifacts", None)
+    if artifacts is not None:
+        return artifacts.hints.get(method_name(method), {}).get("inner_txns_vary", False)
+    if not callable(method):
+        method = getattr(type(app_client.app), method_name(method), None)
+    return inner_txns_vary(method)
+
+
+class FeePlanner:
+    """
+    Suggested params pooling the fees of the inner transactions of a call.
+
+    Args:
+    client: algod client, for the suggested params and the dryruns.
+    """
+
+    def __init__(self, client: AlgodClient):
+        self.client = client
+        self.dryruns = 0
+        # (approval program hash, method name) -> inner transactions, methods without annotation
+        self._probed: dict[tuple[str, str], int] = {}
+
+    def inner_txns(self, app_client: Any, method: Any, **kwargs) -> int:
+        """
+        Inner transactions of `method`: its annotation, else a dryrun of the call with `kwargs` (cached).
+        A varying annotation is replaced by the dryrun of this very call (not cached).
+        """
+        declared = method_inner_txns(app_client, method)
+        if declared is not None:
+            if not method_inner_txns_vary(app_client, method):
+                return declared
+            count = self._dryrun(app_client, method, **kwargs)
+            return declared if count is None else count
+        key = (_program_hash(app_client), method_name(method))
+        if key not in self._probed:
+            count = self._dryrun(app_client, method, **kwargs)
+            if count is None: # rejected, the call will report why
+                return 0
+            self._probed[key] = count
+        return self._probed[key]
+
+    def suggested_params(
+        self, app_client: Any, method: Any, sp: transaction.SuggestedParams = None, **kwargs
+    ) -> transaction.SuggestedParams:
+        """Suggested params (`sp` or fresh ones) of a call of `method` with `kwargs`, with pooled fees."""
+        sp = sp if sp is not None else self.client.suggested_params()
+        return pooled_params(sp, self.inner_txns(app_client, method, **kwargs))
+
+    def call(self, app_client: Any, method: Any, **kwargs) -> ABIResult:
+        """app_client.call(method, **kwargs) paying the fees of the inner transactions."""
+        sp = self.suggested_params(app_client, method, **kwargs)
+        return app_client.call(method, suggested_params=sp, **kwargs)
+
+    def _dryrun(self, app_client: Any, method: Any, **kwargs) -> Optional[int]:
+        sp = self.client.suggested_params()
+        sp.fee = sp.min_fee * (1 + MAX_INNER_TXNS)
+        sp.flat_fee = True
+        atc = AtomicTransactionComposer()
+        app_client.add_method_call(atc, method, suggested_params=sp, **kwargs)
+        self.dryruns += 1
+        result = self.client.dryrun(transaction.create_dryrun(self.client, atc.gather_signatures()))
+        tx_info = result["txns"][-1]
+        if "REJECT" in tx_info.get("app-call-messages", []):
+            return None
+        return _count_inner(tx_info.get("inner-txns", []))
+
+
+def _count_inner(inner_txns: list[dict[str, Any]]) -> int:
+    return sum(1 + _count_inner(t.get("inner-txns", [])) for t in inner_txns)
+
+
+def method_name(method: Any) -> str:
+    """Name of a method given as handler, abi.Method or name."""
+    if isinstance(method, str):
+        return method
+    if isinstance(method, abi.Method):
+        return method.name
+    return method.__name__
+
+
+def _program_hash(app_client: Any) -> str:
+    artifacts = getattr(app_client, "artifacts", None)
+    if artifacts is not None:
+        program = artifacts.approval_binary
+    else:
+        if app_client.approval_binary is None:
+            app_client.build()
+        program = app_client.approval_binary
+    return hashlib.sha256(program).hexdigest()
@@ -0,0 +1,266 @@
+"""
+Per-call latency of the contract calls, split into phases, with algod request counts.
+
+A slow `fund` or `submit_milestone` is spent building the transactions (ABI
+encoding and the suggested params request), signing them, submitting them
+or waiting for their confirmation, which the ApplicationClient.call path
+does in one opaque `atc.execute`. CallMetrics records every phase of a call
+in fixed bucket histograms, labelled by method, together with the algod
+requests the call made and the rounds between its first valid round and its
+confirmation:
+
+    metrics = CallMetrics()
+    metrics.instrument(algod_client) # count the algod requests of the calls
+    metrics.call(app_client, CrowdfundingCampaignApp.fund, funding=...) # beaker or artifacts client
+    campaign = CampaignClient.load(algod_client, app_id, signer=signer, metrics=metrics) # every call recorded
+    metrics.dump("build/metrics.prom") # Prometheus text format, e.g. for node_exporter's textfile collector
+
+The phases are timed by InstrumentedComposer, an AtomicTransactionComposer
+that any `call(..., atc=...)` accepts: encode runs from its creation to
+signing. Recording a phase is a clock read and a histogram bucket increment
+under a lock, a few microseconds per call, so the metrics can stay on.
+"""
+import bisect
+import os
+import threading
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Any, Optional
+
+from algosdk.atomic_transaction_composer import (
+    AtomicTransactionComposer,
+    AtomicTransactionComposerStatus,
+    AtomicTransactionResponse,
+)
+from algosdk.v2client.algod import AlgodClient
+
+from client.fees import method_name
+
+PHASES = ("encode", "sign", "send", "confirm")
+# seconds, from an in-process ledger to a congested node
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+REQUEST_BUCKETS = (1, 2, 3, 4, 5, 6, 8, 12, 16, 32)
+ROUND_BUCKETS = (0, 1, 2, 3, 4, 5, 10, 20)
+PREFIX = "crowdfunding_call"
+
+
+class Histogram:
+    """Cumulative bucket histogram, as Prometheus exposes it: counts of observations <= each bound."""
+
+    __slots__ = ("bounds", "counts", "sum", "count")
+
+    def __init__(self, bounds: tuple[float, ...]):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1) # last one is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q: float) -> float:
+        """Upper bound of the bucket holding the q-quantile (0 < q <= 1), inf if it is above the last bound."""
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.bounds, self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return float("inf")
+
+    @property
+    def mean(self) -> float:
+        return self.sum / self.count if self.count else 0.0
+
+
+@dataclass
+class CallRecord:
+    """A call in progress: `mark` is when its current phase started."""
+
+    method: str
+    mark: float
+    requests: int = 0
+
+
+_current_call: ContextVar[Optional[CallRecord]] = ContextVar("current_call", default=None)
+
+
+def record_request():
+    """Count an algod request for the call in progress in this thread or task, if any."""
+    record = _current_call.get()
+    if record is not None:
+        record.requests += 1
+
+
+class CallMetrics:
+    """
+    Histograms of the contract calls, by method: seconds per phase, algod requests and confirmation rounds.
+
+    Thread safe. Calls running concurrently (threads or asyncio tasks) are told apart by a ContextVar.
+
+    Args:
+    buckets: latency histogram bounds in seconds.
+    """
+
+    def __init__(self, buckets: tuple[float, ...] = LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.phases: dict[tuple[str, str], Histogram] = {} # (method, phase) -> seconds
+        self.requests: dict[str, Histogram] = {}
+        self.rounds: dict[str, Histogram] = {}
+        self.calls: dict[tuple[str, str], int] = {} # (method, "ok" | "error") -> calls
+        self._lock = threading.Lock()
+
+    # ------------------------------------------------------------ recording
+
+    def start(self, method: str) -> CallRecord:
+        """Start recording a call of `method`, its algod requests are counted from now on."""
+        record = CallRecord(method, time.perf_counter())
+        _current_call.set(record)
+        return record
+
+    def phase(self, record: CallRecord, phase: str):
+        """End the current phase of `record` (one of PHASES), the next one starts now."""
+        now = time.perf_counter()
+        seconds = now - record.mark
+        record.mark = now
+        key = (record.method, phase)
+        with self._lock:
+            histogram = self.phases.get(key)
+            if histogram is None:
+                histogram = self.phases[key] = Histogram(self.buckets)
+            histogram.observe(seconds)
+
+    def finish(self, record: CallRecord, rounds: int = None, ok: bool = True):
+        """End the call, `rounds`: rounds from its first valid round to its confirmation."""
+        if _current_call.get() is record:
+            _current_call.set(None)
+        method = record.method
+        with self._lock:
+            if method not in self.requests:
+                self.requests[method] = Histogram(REQUEST_BUCKETS)
+                self.rounds[method] = Histogram(ROUND_BUCKETS)
+            self.requests[method].observe(record.requests)
+            if rounds is not None:
+                self.rounds[method].observe(rounds)
+            key = (method, "ok" if ok else "error")
+            self.calls[key] = self.calls.get(key, 0) + 1
+
+    def composer(self, method: str) -> "InstrumentedComposer":
+        """Composer recording the call of `method` it is executed for."""
+        return InstrumentedComposer(self, method)
+
+    def call(self, app_client: Any, method: Any, **kwargs) -> Any:
+        """`app_client.call(method, **kwargs)` recorded (beaker ApplicationClient or client/artifacts.py client)."""
+        return app_client.call(method, atc=self.composer(method_name(method)), **kwargs)
+
+    def instrument(self, client: AlgodClient) -> AlgodClient:
+        """Count the requests of the sync algod `client` made by the calls in progress, returns `client`."""
+        if not getattr(client, "_metrics_instrumented", False):
+            request = client.algod_request
+
+            def algod_request(*args, **kwargs):
+                record_request()
+                return request(*args, **kwargs)
+
+            client.algod_request = algod_request
+            client._metrics_instrumented = True
+        return client
+
+    # ------------------------------------------------------------ reading
+
+    def methods(self) -> list[str]:
+        return sorted({method for method, _ in self.calls})
+
+    def render(self) -> str:
+        """Prometheus text exposition format of all the metrics."""
+        with self._lock:
+            lines = [
+                f"# HELP {PREFIX}_phase_seconds Time spent in each phase of a contract call.",
+                f"# TYPE {PREFIX}_phase_seconds histogram",
+            ]
+            for (method, phase), histogram in sorted(self.phases.items()):
+                lines += _histogram_lines(f"{PREFIX}_phase_seconds", f'method="{method}",phase="{phase}"', histogram)
+            lines += [
+                f"# HELP {PREFIX}_algod_requests algod requests made by a contract call.",
+                f"# TYPE {PREFIX}_algod_requests histogram",
+            ]
+            for method, histogram in sorted(self.requests.items()):
+                lines += _histogram_lines(f"{PREFIX}_algod_requests", f'method="{method}"', histogram)
+            lines += [
+                f"# HELP {PREFIX}_confirmation_rounds Rounds from the first valid round of a call to its confirmation.",
+                f"# TYPE {PREFIX}_confirmation_rounds histogram",
+            ]
+            for method, histogram in sorted(self.rounds.items()):
+                lines += _histogram_lines(f"{PREFIX}_confirmation_rounds", f'method="{method}"', histogram)
+            lines += [
+                f"# HELP {PREFIX}s_total Contract calls by outcome.",
+                f"# TYPE {PREFIX}s_total counter",
+            ]
+            for (method, outcome), calls in sorted(self.calls.items()):
+                lines.append(f'{PREFIX}s_total{{method="{method}",outcome="{outcome}"}} {calls}')
+        return "\n".join(lines) + "\n"
+
+    def dump(self, path: str):
+        """Write `render()` to `path` atomically, so a scraper never reads a partial file."""
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "w") as f:
+            f.write(self.render())
+        os.replace(tmp, path)
+
+
+class InstrumentedComposer(AtomicTransactionComposer):
+    """
+    AtomicTransactionComposer recording the phases of its execution in `metrics`.
+
+    encode: from the creation of the composer to signing (suggested params, ABI encoding),
+    sign: gather_signatures, send: the submission, confirm: waiting for the confirmation
+    and reading the results. A composer only signed (e.g. for the dryrun of a read-only
+    method) records its encode and sign phases, but no call.
+    """
+
+    def __init__(self, metrics: CallMetrics, method: str):
+        super().__init__()
+        self.metrics = metrics
+        self.record = metrics.start(method)
+
+    def gather_signatures(self) -> list:
+        if self.status >= AtomicTransactionComposerStatus.SIGNED:
+            return super().gather_signatures()
+        self.metrics.phase(self.record, "encode")
+        signed = super().gather_signatures()
+        self.metrics.phase(self.record, "sign")
+        return signed
+
+    def submit(self, client: AlgodClient) -> list:
+        self.gather_signatures()
+        tx_ids = super().submit(client)
+        self.metrics.phase(self.record, "send")
+        return tx_ids
+
+    def execute(self, client: AlgodClient, wait_rounds: int) -> AtomicTransactionResponse:
+        try:
+            response = super().execute(client, wait_rounds)
+        except Exception:
+            self.metrics.finish(self.record, ok=False)
+            raise
+        self.metrics.phase(self.record, "confirm")
+        first_valid = self.txn_list[0].txn.first_valid_round
+        self.metrics.finish(self.record, rounds=max(response.confirmed_round - first_valid, 0))
+        return response
+
+
+def _histogram_lines(name: str, labels: str, histogram: Histogram) -> list[str]:
+    lines = []
+    cumulative = 0
+    for bound, count in zip(histogram.bounds, histogram.counts):
+        cumulative += count
+        lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+    lines.append(f'{name}_bucket{{{labels},le="+Inf"}} {histogram.count}')
+    lines.append(f"{name}_sum{{{labels}}} {histogram.sum}")
+    lines.append(f"{name}_count{{{labels}}} {histogram.count}")
+    return lines
+
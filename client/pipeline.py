@@ -0,0 +1,276 @@
+"""
+Pipelined submission of campaign and milestone operations.
+
+ApplicationClient.call submits one group and polls until it is confirmed,
+so a process gets about one transaction per round trip. SubmissionPipeline
+signs and sends the groups back to back, up to `max_in_flight` unconfirmed,
+and returns a Future per operation. A single watcher thread follows the
+chain (status after block) and resolves every pending group of a round in
+one pass, from the txids of its block (GET /v2/blocks/{round}/txids, one
+request per round; nodes without that endpoint fall back to a pending
+transaction request per group). A group still unconfirmed once its last
+valid round has passed can never be confirmed: it is built again with fresh
+suggested params and resent, up to `max_attempts` times.
+
+    with SubmissionPipeline(client) as pipeline:
+        futures = [pipeline.call(app_client.prepare(signer=s), CrowdfundingCampaignApp.vote,
+                                 milestone_app=milestone_app_id, vote=1) for s in signers]
+    results = [f.result() for f in futures] # confirmed, or the exception of the operation
+
+Operations are built by a function of the suggested params (`submit`), so a
+resubmission signs new transactions rather than replaying expired ones.
+"""
+import base64
+import copy
+import threading
+from concurrent.futures import Future
+from dataclasses import dataclass
+from typing import Any, Callable, Optional
+
+from algosdk import abi
+from algosdk.atomic_transaction_composer import AtomicTransactionComposer
+from algosdk.error import AlgodHTTPError
+from algosdk.future import transaction
+from algosdk.v2client.algod import AlgodClient
+
+from client.fees import method_inner_txns, pooled_params
+
+DEFAULT_MAX_IN_FLIGHT = 256
+DEFAULT_VALIDITY = 1000 # rounds, the max transaction life
+DEFAULT_MAX_ATTEMPTS = 3
+ABI_RETURN_PREFIX = bytes.fromhex("151f7c75")
+
+Build = Callable[[transaction.SuggestedParams], AtomicTransactionComposer]
+
+
+class ExpiredError(Exception):
+    """A group was not confirmed before its last valid round, at every attempt."""
+
+
+@dataclass
+class PipelineResult:
+    """Confirmed operation: txids of its last attempt, and the ABI return value of its last method call."""
+
+    tx_ids: list[str]
+    confirmed_round: int
+    attempts: int
+    return_value: Any = None
+
+
+@dataclass
+class _Operation:
+    build: Build
+    future: Future
+    atc: Optional[AtomicTransactionComposer] = None
+    attempts: int = 0
+    last_valid: int = 0
+
+    @property
+    def txid(self) -> str:
+        return self.atc.tx_ids[0] # a group is confirmed with its first transaction
+
+
+class SubmissionPipeline:
+    """
+    Send operations back to back, their confirmations followed by one watcher thread.
+
+    Args:
+    client: algod client, shared by the submitting threads and the watcher.
+    max_in_flight: operations sent and not confirmed yet before `submit` blocks.
+    validity: rounds each group stays valid, from the last round seen.
+    max_attempts: submissions of an operation before it fails with ExpiredError.
+    """
+
+    def __init__(
+        self,
+        client: AlgodClient,
+        max_in_flight: int = DEFAULT_MAX_IN_FLIGHT,
+        validity: int = DEFAULT_VALIDITY,
+        max_attempts: int = DEFAULT_MAX_ATTEMPTS,
+    ):
+        self.client = client
+        self.validity = validity
+        self.max_attempts = max_attempts
+        self.resubmitted = 0
+        self.rounds_watched = 0
+        self._slots = threading.BoundedSemaphore(max_in_flight)
+        self._lock = threading.Lock()
+        self._changed = threading.Condition(self._lock)
+        self._pending: dict[str, _Operation] = {} # first txid -> operation
+        self._sp: Optional[transaction.SuggestedParams] = None
+        self._round = 0 # last round checked by the watcher
+        self._block_txids = True # node serves /blocks/{round}/txids
+        self._watcher: Optional[threading.Thread] = None
+        self._closed = False
+
+    def __enter__(self) -> "SubmissionPipeline":
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # ------------------------------------------------------------ submission
+
+    def submit(self, build: Build) -> Future:
+        """
+        Send the group built by `build(sp)` now, the Future resolves to a PipelineResult once it is confirmed.
+
+        Blocks while `max_in_flight` operations are unconfirmed. A rejected group fails its Future.
+        """
+        if self._closed:
+            raise RuntimeError("pipeline closed")
+        self._slots.acquire()
+        op = _Operation(build, Future())
+        op.future.add_done_callback(lambda _: self._slots.release())
+        self._send(op)
+        return op.future
+
+    def call(self, app_client: Any, method: Any, **kwargs) -> Future:
+        """
+        Submit `app_client`'s call of `method` (beaker ApplicationClient or client/artifacts.py client).
+
+        The call pays the fees of the inner transactions of `method` (client/fees.py). Arguments holding
+        transactions are signed once only: build those groups with `submit`.
+        """
+        inner_txns = method_inner_txns(app_client, method) or 0
+
+        def build(sp: transaction.SuggestedParams) -> AtomicTransactionComposer:
+            atc = AtomicTransactionComposer()
+            app_client.add_method_call(atc, method, suggested_params=pooled_params(sp, inner_txns), **kwargs)
+            return atc
+
+        return self.submit(build)
+
+    def drain(self):
+        """Wait until every operation submitted so far is resolved."""
+        with self._changed:
+            self._changed.wait_for(lambda: not self._pending)
+
+    def close(self):
+        """Drain, then stop the watcher."""
+        self.drain()
+        with self._changed:
+            self._closed = True
+            self._changed.notify_all()
+        if self._watcher is not None:
+            self._watcher.join()
+
+    def _send(self, op: _Operation):
+        try:
+            op.atc = op.build(self._params())
+            signed = op.atc.gather_signatures()
+            op.attempts += 1
+            op.last_valid = min(stxn.transaction.last_valid_round for stxn in signed)
+            with self._changed:
+                self._pending[op.txid] = op
+                self._start_watcher()
+            self.client.send_transactions(signed)
+        except Exception as e:
+            self._resolve(op, error=e)
+
+    def _params(self) -> transaction.SuggestedParams:
+        """Suggested params valid from the last round seen, fetched again only while nothing is pending."""
+        with self._lock:
+            sp = self._sp if self._pending else None
+        if sp is None:
+            sp = self.client.suggested_params()
+        with self._lock:
+            self._sp = sp
+            if not self._pending:
+                # nothing sent before this round is left to find in its blocks
+                self._round = max(self._round, sp.first)
+            sp = copy.copy(sp)
+            sp.first = self._round
+            sp.last = self._round + self.validity
+        return sp
+
+    # ------------------------------------------------------------ watcher
+
+    def _start_watcher(self):
+        if self._watcher is None or not self._watcher.is_alive():
+            self._watcher = threading.Thread(target=self._watch, daemon=True)
+            self._watcher.start()
+
+    def _watch(self):
+        while True:
+            with self._changed:
+                self._changed.wait_for(lambda: self._pending or self._closed)
+                if not self._pending:
+                    return
+                checked = self._round
+            last_round = self.client.status_after_block(checked)["last-round"]
+            for round_num in range(checked + 1, last_round + 1):
+                self._check_round(round_num)
+                with self._lock:
+                    self._round = max(self._round, round_num)
+
+    def _check_round(self, round_num: int):
+        """Resolve the pending operations confirmed in `round_num`, resubmit or fail the expired ones."""
+        self.rounds_watched += 1
+        with self._lock:
+            pending = dict(self._pending)
+        if not pending:
+            return
+        for txid in self._confirmed(round_num, pending):
+            self._resolve(pending.pop(txid), confirmed_round=round_num)
+        for op in pending.values():
+            if op.last_valid > round_num:
+                continue
+            with self._lock:
+                self._pending.pop(op.txid, None)
+            if op.attempts >= self.max_attempts:
+                self._resolve(op, error=ExpiredError(
+                    f"group {op.txid} not confirmed by its last valid round {op.last_valid}, {op.attempts} attempts"
+                ))
+            else:
+                self.resubmitted += 1
+                self._send(op)
+
+    def _confirmed(self, round_num: int, pending: dict[str, _Operation]) -> list[str]:
+        """Pending txids confirmed in `round_num`."""
+        if self._block_txids:
+            try:
+                txids = self.client.algod_request("GET", f"/blocks/{round_num}/txids")["blockTxids"]
+                return [txid for txid in txids if txid in pending]
+            except AlgodHTTPError as e:
+                if e.code != 404:
+                    raise
+                self._block_txids = False # older node, one request per pending group
+        confirmed = []
+        for txid, op in pending.items():
+            info = self.client.pending_transaction_info(txid)
+            if info.get("pool-error"):
+                op.last_valid = 0 # dropped from the pool: resubmit now
+            elif 0 < info.get("confirmed-round", 0) <= round_num:
+                confirmed.append(txid)
+        return confirmed
+
+    def _resolve(self, op: _Operation, confirmed_round: int = 0, error: Exception = None):
+        with self._changed:
+            if op.atc is not None:
+                self._pending.pop(op.txid, None)
+            self._changed.notify_all()
+        if error is not None:
+            op.future.set_exception(error)
+            return
+        result = PipelineResult(list(op.atc.tx_ids), confirmed_round, op.attempts)
+        try:
+            result.return_value = self._return_value(op.atc)
+        except Exception as e:
+            op.future.set_exception(e)
+            return
+        op.future.set_result(result)
+
+    def _return_value(self, atc: AtomicTransactionComposer) -> Any:
+        """ABI return value of the last method call of `atc`, read only when the method returns one."""
+        if not atc.method_dict:
+            return None
+        index = max(atc.method_dict)
+        method = atc.method_dict[index]
+        if method.returns.type == abi.Returns.VOID:
+            return None
+        info = self.client.pending_transaction_info(atc.tx_ids[index])
+        log = base64.b64decode(info["logs"][-1])
+        if log[:4] != ABI_RETURN_PREFIX:
+            raise ValueError(f"{method.name} did not log a return value")
+        return method.returns.type.decode(log[4:])
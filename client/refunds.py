@@ -0,0 +1,144 @@
+"""
+Batch refunds of an unsuccessful campaign.
+
+CrowdfundingCampaignApp.refund pays back every backer in the foreign
+accounts of the call, MAX_REFUNDS_PER_CALL of them, so an atomic group of 16
+calls refunds 64 backers in one round, instead of one call sent by each
+backer. The backers are not enumerable on chain, so RefundDriver
+reads them from the Fund events of the campaign (client/event_stream.py).
+It submits the groups back to back, like BulkFunder, and saves the event
+Cursor after each group confirmed in order. A drain interrupted by a restart
+or a failed group resumes from the last saved cursor:
+
+    driver = RefundDriver(app_client, cursor_path="build/refunds_<app_id>.cursor")
+    results = driver.refund(start=Cursor(created_round))
+
+Already refunded backers are skipped by the contract, so resubmitting a batch
+is harmless.
+"""
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Iterator, Optional
+
+from algosdk.atomic_transaction_composer import AtomicTransactionComposer
+from algosdk.future import transaction
+from beaker.client import ApplicationClient
+
+from client.event_stream import Cursor, EventStream
+from client.fees import pooled_params
+from contracts.crowdfunding.crowdfundingCampaign import CrowdfundingCampaignApp, MAX_REFUNDS_PER_CALL
+
+MAX_GROUP_SIZE = 16
+DEFAULT_MAX_IN_FLIGHT = 8
+DEFAULT_WAIT_ROUNDS = 10
+
+
+@dataclass
+class RefundBatch:
+    """One atomic group of refund calls, `cursor` is where to resume once it is confirmed."""
+
+    backers: list[str]
+    cursor: Cursor
+    txids: list[str] = field(default_factory=list)
+    confirmed_round: int = 0
+    error: Optional[str] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None and self.confirmed_round > 0
+
+
+class RefundDriver:
+    """
+    Refund all the backers of an unsuccessful campaign with grouped refund calls.
+
+    Args:
+    app_client: ApplicationClient of the campaign. Its signer pays the fees, since anyone can call refund.
+    cursor_path: file the resume Cursor is saved to after every confirmed group, not saved if None.
+    max_in_flight: groups submitted but not confirmed yet before blocking on the oldest.
+    wait_rounds: rounds to wait for the confirmation of a group.
+    """
+
+    def __init__(
+        self,
+        app_client: ApplicationClient,
+        cursor_path: str = None,
+        max_in_flight: int = DEFAULT_MAX_IN_FLIGHT,
+        wait_rounds: int = DEFAULT_WAIT_ROUNDS,
+    ):
+        self.app_client = app_client
+        self.client = app_client.client
+        self.cursor_path = cursor_path
+        self.max_in_flight = max_in_flight
+        self.wait_rounds = wait_rounds
+        self._failed = False
+
+    def batches(self, cursor: Cursor) -> Iterator[RefundBatch]:
+        """Backers funded after `cursor` (up to the last round), MAX_GROUP_SIZE * MAX_REFUNDS_PER_CALL per batch."""
+        stream = EventStream(self.client, [self.app_client.app_id], events=["Fund"], cursor=cursor, follow_children=False)
+        backers: list[str] = []
+        for event in stream.events():
+            backers.append(event["backer"])
+            if len(backers) == MAX_GROUP_SIZE * MAX_REFUNDS_PER_CALL:
+                yield RefundBatch(backers, stream.cursor)
+                backers = []
+        if backers:
+            yield RefundBatch(backers, stream.cursor)
+
+    def refund(self, start: Cursor = None) -> list[RefundBatch]:
+        """
+        Refund the backers funded after the saved cursor (`start` if there is none, round 0 by default).
+
+        The cursor only moves past confirmed groups. After a failed group the drain stops submitting,
+        the groups in flight are awaited and the next call resumes from the failed group.
+        """
+        cursor = start if start is not None else Cursor()
+        if self.cursor_path is not None:
+            cursor = Cursor.load(self.cursor_path, cursor)
+
+        results = []
+        in_flight: deque[RefundBatch] = deque()
+        self._failed = False
+        for batch in self.batches(cursor):
+            results.append(batch)
+            # fresh params per group: a long drain outlives the validity window of the first ones
+            atc = self._compose(batch.backers, self.client.suggested_params())
+            try:
+                signed = atc.gather_signatures()
+                batch.txids = list(atc.tx_ids)
+                self.client.send_transactions(signed)
+            except Exception as e:
+                batch.error = str(e)
+                self._failed = True
+                break
+            in_flight.append(batch)
+            if len(in_flight) >= self.max_in_flight:
+                self._wait(in_flight.popleft())
+            if self._failed:
+                break
+        while in_flight:
+            self._wait(in_flight.popleft())
+        return results
+
+    def _compose(self, backers: list[str], sp: transaction.SuggestedParams) -> AtomicTransactionComposer:
+        atc = AtomicTransactionComposer()
+        for i in range(0, len(backers), MAX_REFUNDS_PER_CALL):
+            accounts = backers[i:i + MAX_REFUNDS_PER_CALL]
+            self.app_client.add_method_call(
+                atc,
+                CrowdfundingCampaignApp.refund,
+                suggested_params=pooled_params(sp, len(accounts)),
+                accounts=accounts,
+            )
+        return atc
+
+    def _wait(self, batch: RefundBatch):
+        try:
+            info = transaction.wait_for_confirmation(self.client, batch.txids[0], self.wait_rounds)
+            batch.confirmed_round = info["confirmed-round"]
+        except Exception as e:
+            batch.error = str(e)
+            self._failed = True
+            return
+        if self.cursor_path is not None and not self._failed: # every earlier group is confirmed too
+            batch.cursor.save(self.cursor_path)
@@ -0,0 +1,178 @@
+"""
+Signing of many transactions across processes, for the bulk operations.
+
+algosdk signs a transaction by encoding it to canonical msgpack (dictify,
+base32 decoding of every address, recursive key sort), signing the bytes and
+encoding the signed transaction again when it is sent; assigning a group id
+encodes every transaction once more. All of it is pure Python holding the
+GIL, so a thread pool (BulkFunder) signs no faster than a single thread.
+SigningPool shards the work across processes: the private keys are handed
+once to every worker, which keeps them, and the parent only ships the
+unsigned transactions. A worker encodes each transaction once, computes the
+group id of the groups without one, signs and lays out the signed msgpack
+around the encoded transaction, and returns a chunk of signed transactions as
+one buffer (with the ends and txids of its items) instead of objects.
+
+    with SigningPool.from_signers(backer.signer for backer in backers) as pool:
+        for signed in pool.imap(groups):
+            algod_client.send_raw_transaction(signed.b64())
+
+The signed bytes are those of algosdk's txn.sign and assign_group_id (see
+benchmarks/signing_pool.py).
+"""
+import base64
+import multiprocessing
+import os
+from dataclasses import dataclass
+from typing import Iterable, Iterator, Optional, Union
+
+import msgpack
+from algosdk import account, constants, encoding, error
+from algosdk.atomic_transaction_composer import TransactionSigner
+from algosdk.future import transaction
+from nacl.signing import SigningKey
+
+DEFAULT_CHUNK_SIZE = 64 # items per task sent to a worker
+
+Item = Union[transaction.Transaction, list[transaction.Transaction]]
+
+# msgpack of a signed transaction, {"sig": <64 bytes>, "txn": <transaction map>}, keys in canonical order
+_SIGNED_HEAD = b"\x82\xa3sig\xc4\x40"
+_SIGNED_TXN = b"\xa3txn"
+
+
+@dataclass
+class SignedItem:
+    """Signed transaction, or group, of a batch."""
+
+    txids: list[str]
+    data: bytes # signed transactions concatenated, in the order of the group
+
+    def b64(self) -> str:
+        """The body of algod's send_raw_transaction."""
+        return base64.b64encode(self.data).decode()
+
+
+class SigningPool:
+    """
+    Pool of `processes` processes signing batches of transactions and groups with `private_keys`.
+
+    A transaction is signed with the key of its sender. A group (a list of transactions) whose
+    transactions have no group id gets the one of transaction.assign_group_id; a group id already
+    assigned (e.g. by ATC.build_group) is kept.
+
+    Args:
+    private_keys: keys of the senders, kept by the workers.
+    processes: worker processes, os.cpu_count() if None; 0 signs in the calling process.
+    chunk_size: transactions or groups per task, fewer tasks means fewer round trips to the workers.
+    """
+
+    def __init__(
+        self, private_keys: Iterable[str], processes: Optional[int] = None, chunk_size: int = DEFAULT_CHUNK_SIZE
+    ):
+        private_keys = list(private_keys)
+        self.addresses = {account.address_from_private_key(key) for key in private_keys}
+        self.processes = os.cpu_count() if processes is None else processes
+        self.chunk_size = chunk_size
+        self._pool = None
+        self._signer = None
+        if self.processes:
+            self._pool = multiprocessing.Pool(self.processes, _init_worker, (private_keys,))
+        else:
+            self._signer = _ChunkSigner(private_keys)
+
+    @classmethod
+    def from_signers(cls, signers: Iterable[TransactionSigner], **kwargs) -> "SigningPool":
+        """Pool of the keys of AccountTransactionSigners, e.g. the signers of the backers."""
+        return cls({signer.private_key for signer in signers}, **kwargs)
+
+    def __enter__(self) -> "SigningPool":
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.close()
+            self._pool.join()
+            self._pool = None
+
+    def can_sign(self, item: Item) -> bool:
+        """Whether the pool holds the key of every sender of `item`."""
+        txns = item if isinstance(item, list) else [item]
+        return all(txn.sender in self.addresses for txn in txns)
+
+    def imap(self, items: Iterable[Item]) -> Iterator[SignedItem]:
+        """Sign `items`, yielding them in order as soon as their chunk is signed."""
+        chunks = list(self._chunks(items)) # checked before any is sent
+        if self._pool is None:
+            signed = map(self._signer.sign, chunks)
+        else:
+            signed = self._pool.imap(_sign_chunk, chunks)
+        for data, items_signed in signed:
+            view = memoryview(data)
+            start = 0
+            for end, txids in items_signed:
+                yield SignedItem(txids, bytes(view[start:end]))
+                start = end
+
+    def sign(self, items: Iterable[Item]) -> list[SignedItem]:
+        """Sign `items`, in order."""
+        return list(self.imap(items))
+
+    def _chunks(self, items: Iterable[Item]) -> Iterator[list[Item]]:
+        chunk = []
+        for item in items:
+            if isinstance(item, list) and len(item) > constants.tx_group_limit:
+                raise error.TransactionGroupSizeError
+            for txn in item if isinstance(item, list) else [item]:
+                if txn.sender not in self.addresses:
+                    raise ValueError(f"no key for the sender {txn.sender}")
+            chunk.append(item)
+            if len(chunk) == self.chunk_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+
+class _ChunkSigner:
+    """The keys of a worker and the signing of a chunk: (signed transactions buffer, [(end, txids)] per item)."""
+
+    def __init__(self, private_keys: list[str]):
+        self.keys = {
+            account.address_from_private_key(key): SigningKey(base64.b64decode(key)[:32]) for key in private_keys
+        }
+
+    def sign(self, chunk: list[Item]) -> tuple[bytes, list[tuple[int, list[str]]]]:
+        buffer = bytearray()
+        items = []
+        for item in chunk:
+            txns = item if isinstance(item, list) else [item]
+            encoded = [encoding._sort_dict(txn.dictify()) for txn in txns]
+            raws = [msgpack.packb(d, use_bin_type=True) for d in encoded]
+            if isinstance(item, list) and all(txn.group is None for txn in txns):
+                txids = [encoding.checksum(constants.txid_prefix + raw) for raw in raws]
+                group = msgpack.packb({"txlist": txids}, use_bin_type=True)
+                gid = encoding.checksum(constants.tgid_prefix + group)
+                raws = [msgpack.packb(dict(sorted({**d, "grp": gid}.items())), use_bin_type=True) for d in encoded]
+            ids = []
+            for txn, raw in zip(txns, raws):
+                message = constants.txid_prefix + raw
+                buffer += _SIGNED_HEAD + self.keys[txn.sender].sign(message).signature + _SIGNED_TXN + raw
+                ids.append(encoding._undo_padding(base64.b32encode(encoding.checksum(message)).decode()))
+            items.append((len(buffer), ids))
+        return bytes(buffer), items
+
+
+_worker: Optional[_ChunkSigner] = None
+
+
+def _init_worker(private_keys: list[str]):
+    global _worker
+    _worker = _ChunkSigner(private_keys)
+
+
+def _sign_chunk(chunk: list[Item]) -> tuple[bytes, list[tuple[int, list[str]]]]:
+    return _worker.sign(chunk)
@@ -0,0 +1,200 @@
+"""
+Round-aware cache of application global/local state.
+
+State only changes when a block is committed, so a snapshot taken at round R
+can be served again until a later round is observed. StateCache keys
+snapshots by (app_id, account, round): repeated reads within the same round
+cost no algod request, and `delta` / `poll` tell which keys changed between
+two snapshots. The state of an app is decoded by the value types declared in
+its contract artifacts (client/artifacts.py), without importing the contracts.
+"""
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Optional
+
+from algosdk.v2client.algod import AlgodClient
+
+from client.artifacts import AppArtifacts, raw_state
+
+DEFAULT_MAX_SNAPSHOTS = 1024
+DEFAULT_ROUND_INTERVAL = 1.0 # seconds, below the ~3.3s block time
+
+
+@dataclass(frozen=True)
+class StateSnapshot:
+    """Decoded global (account is None) or local state of an app at a given round."""
+
+    app_id: int
+    account: Optional[str]
+    round: int
+    state: dict[str, Any]
+
+    def __getitem__(self, key: str) -> Any:
+        return self.state[key]
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return self.state.get(key, default)
+
+
+@dataclass
+class StateDelta:
+    """Keys that differ between two snapshots of the same state."""
+
+    from_round: int
+    to_round: int
+    changed: dict[str, tuple[Any, Any]] = field(default_factory=dict) # key -> (old, new), old is None if added
+    removed: dict[str, Any] = field(default_factory=dict) # key -> old value
+
+    def __bool__(self) -> bool:
+        return bool(self.changed or self.removed)
+
+
+def diff(old: StateSnapshot, new: StateSnapshot) -> StateDelta:
+    """Changes needed to go from `old` to `new`."""
+    delta = StateDelta(old.round, new.round)
+    for key, value in new.state.items():
+        if old.state.get(key) != value or key not in old.state:
+            delta.changed[key] = (old.state.get(key), value)
+    for key, value in old.state.items():
+        if key not in new.state:
+            delta.removed[key] = value
+    return delta
+
+
+class StateCache:
+    """
+    Cache of application state snapshots, invalidated by new blocks.
+
+    The current round is read from algod at most once every `round_interval`
+    seconds (set it to 0 to check on every read), or pushed with `observe_round`,
+    e.g. after a transaction is confirmed, so that callers see their own writes.
+
+    Args:
+    client: AlgodClient used to fetch state and status.
+    max_snapshots: snapshots kept, least recently used are dropped first.
+    round_interval: minimum seconds between two status requests.
+    """
+
+    def __init__(
+        self,
+        client: AlgodClient,
+        max_snapshots: int = DEFAULT_MAX_SNAPSHOTS,
+        round_interval: float = DEFAULT_ROUND_INTERVAL,
+    ):
+        self.client = client
+        self.max_snapshots = max_snapshots
+        self.round_interval = round_interval
+        self.hits = 0
+        self.misses = 0
+
+        self._snapshots: OrderedDict[tuple[int, Optional[str], int], StateSnapshot] = OrderedDict()
+        self._latest: dict[tuple[int, Optional[str]], StateSnapshot] = {} # last snapshot returned by poll
+        self._artifacts: dict[int, AppArtifacts] = {}
+        self._round = 0
+        self._round_checked = float("-inf")
+
+    # ------------------------------------------------------------ rounds
+
+    def current_round(self) -> int:
+        """Last round known to the cache, refreshed from algod if older than round_interval."""
+        now = time.monotonic()
+        if now - self._round_checked >= self.round_interval:
+            self.observe_round(self.client.status()["last-round"])
+            self._round_checked = now
+        return self._round
+
+    def observe_round(self, round_num: int):
+        """Tell the cache that block `round_num` was committed."""
+        if round_num > self._round:
+            self._round = round_num
+
+    # ------------------------------------------------------------ snapshots
+
+    def register(self, app_id: int, artifacts: AppArtifacts):
+        """Decode the state of `app_id` by the types declared in `artifacts` (see AppArtifacts.decode_state)."""
+        self._artifacts[app_id] = artifacts
+
+    def snapshot(self, app: Any, account: str = None) -> StateSnapshot:
+        """Global state of `app`, or local state of `account`, at the current round."""
+        app_id = self._app_id(app)
+        round_num = self.current_round()
+        key = (app_id, account, round_num)
+        snapshot = self._snapshots.get(key)
+        if snapshot is not None:
+            self.hits += 1
+            self._snapshots.move_to_end(key)
+            return snapshot
+
+        self.misses += 1
+        if account is None:
+            info = self.client.application_info(app_id)
+            raw = raw_state(info.get("params", {}).get("global-state", []))
+        else:
+            info = self.client.account_application_info(account, app_id)
+            raw = raw_state(info.get("app-local-state", {}).get("key-value", []))
+            if "round" in info: # free, more recent information
+                self.observe_round(info["round"])
+                round_num = max(round_num, info["round"])
+
+        artifacts = self._artifacts.get(app_id)
+        state = _decode_raw(raw) if artifacts is None else artifacts.decode_state(raw, local=account is not None)
+        snapshot = StateSnapshot(app_id, account, round_num, state)
+        self._snapshots[(app_id, account, round_num)] = snapshot
+        while len(self._snapshots) > self.max_snapshots:
+            self._snapshots.popitem(last=False)
+        return snapshot
+
+    def get(self, app: Any, key: str, account: str = None, default: Any = None) -> Any:
+        """Single decoded value, see snapshot."""
+        return self.snapshot(app, account).get(key, default)
+
+    def delta(self, app: Any, from_round: int, to_round: int = None, account: str = None) -> StateDelta:
+        """
+        Changes between the cached snapshots at `from_round` and `to_round` (current round by default).
+
+        Raises KeyError if no snapshot of `from_round` is cached.
+        """
+        app_id = self._app_id(app)
+        old = self._snapshots[(app_id, account, from_round)]
+        new = self.snapshot(app_id, account) if to_round is None else self._snapshots[(app_id, account, to_round)]
+        return diff(old, new)
+
+    def poll(self, app: Any, account: str = None) -> StateDelta:
+        """
+        Changes since the previous poll of the same state (everything on the first poll).
+
+        An empty delta is returned, without any request, while no new block is observed.
+        """
+        app_id = self._app_id(app)
+        new = self.snapshot(app_id, account)
+        old = self._latest.get((app_id, account), StateSnapshot(app_id, account, 0, {}))
+        self._latest[(app_id, account)] = new
+        return diff(old, new)
+
+    def clear(self):
+        self._snapshots.clear()
+        self._latest.clear()
+
+    def _app_id(self, app: Any) -> int:
+        """Id of `app`: an id, or a client (client/artifacts.py or beaker) whose app is registered on first use."""
+        if isinstance(app, int):
+            return app
+        if app.app_id not in self._artifacts:
+            artifacts = getattr(app, "artifacts", None) or AppArtifacts.of(app.app, client=self.client)
+            if artifacts is not None:
+                self.register(app.app_id, artifacts)
+        return app.app_id
+
+
+def _decode_raw(raw: dict[bytes, Any]) -> dict[str, Any]:
+    """State of an app without artifacts: keys as utf-8 (or hex) strings, values raw."""
+    return {_str_or_hex(k): v for k, v in raw.items()}
+
+
+def _str_or_hex(v: bytes) -> str:
+    try:
+        return v.decode("utf-8")
+    except UnicodeDecodeError:
+        return v.hex()
+
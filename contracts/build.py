@@ -0,0 +1,300 @@
+"""
+Incremental build of every contract under contracts/.
+
+Finds the Application subclasses defined in the modules of contracts/ and
+dumps each one in build/<module> (TEAL, ABI contract, application.json and
+the assembled approval.bin/clear.bin loaded by client/artifacts.py), through
+the shared compile cache. A contract is only rebuilt when its source key
+(hash of its sources, of its precompiled children and of the PyTeal/beaker
+versions, see CompileCache.source_key) differs from the one recorded in the
+build manifest, or when its artifacts are missing. Contracts are built in a
+process pool, a contract is started once its precompiled children are built
+so that it finds them in the compile cache.
+
+The manifest (build/manifest.json) records the source key, status, build time
+and program sizes of every contract, and the hash of each of its source files:
+client/artifacts.py checks the artifacts against them without PyTeal.
+
+    python -m contracts.build                 # sandbox algod
+    python -m contracts.build --local         # assembled by the in-process localnet
+    python -m contracts.build --force --workers 4
+"""
+import argparse
+import hashlib
+import importlib
+import inspect
+import json
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from dataclasses import asdict, dataclass, field
+from typing import Any, Optional
+
+from algosdk.v2client.algod import AlgodClient
+from beaker.application import Application
+from beaker.precompile import AppPrecompile
+
+from contracts.compile_cache import CachedAppPrecompile, CompileCache, DEFAULT_CACHE_DIR, source_files
+
+DEFAULT_BUILD_DIR = "./build"
+MANIFEST = "manifest.json"
+# Bump when the layout of the manifest changes
+MANIFEST_FORMAT = 2
+ARTIFACTS = ("approval.teal", "clear.teal", "contract.json", "application.json", "approval.bin", "clear.bin")
+CONTRACTS_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(CONTRACTS_DIR) # the source paths of the manifest are relative to it
+# modules of contracts/ that do not define contracts
+SKIPPED_MODULES = {"contracts.build", "contracts.compile_cache"}
+
+
+@dataclass
+class BuildTarget:
+    """An Application subclass of contracts/ and the folder it is dumped in."""
+
+    name: str # folder in the build directory
+    module: str
+    class_name: str
+    source_key: str
+    dependencies: list[str] = field(default_factory=list) # names of the precompiled children
+    sources: dict[str, str] = field(default_factory=dict) # source file -> sha256, the tool versions left out
+
+
+@dataclass
+class BuildResult:
+    """Manifest entry of a contract."""
+
+    name: str
+    module: str
+    class_name: str
+    source_key: str
+    dependencies: list[str]
+    sources: dict[str, str]
+    status: str # built, up to date, failed
+    seconds: float = 0.0 # build time in the worker process (0 when up to date)
+    approval_size: int = 0
+    clear_size: int = 0
+    cache_hits: int = 0
+    cache_misses: int = 0
+    error: str = ""
+
+
+def discover(cache: CompileCache) -> dict[str, BuildTarget]:
+    """Build targets of every Application subclass defined in the modules of contracts/, by name."""
+    classes: dict[type, str] = {}
+    for module_name in _contract_modules():
+        module = importlib.import_module(module_name)
+        defined = [
+            cls for _, cls in inspect.getmembers(module, inspect.isclass)
+            if issubclass(cls, Application) and cls is not Application and cls.__module__ == module_name
+        ]
+        stem = module_name.rsplit(".", 1)[-1]
+        for cls in defined:
+            classes[cls] = stem if len(defined) == 1 else cls.__name__
+
+    targets = {}
+    for cls, name in classes.items():
+        targets[name] = BuildTarget(
+            name=name,
+            module=cls.__module__,
+            class_name=cls.__name__,
+            source_key=cache.source_key(cls),
+            dependencies=sorted(classes[dep] for dep in _precompiled(cls) if dep in classes),
+            sources=_source_hashes(cls),
+        )
+    return targets
+
+
+def load_manifest(build_dir: str) -> dict[str, Any]:
+    """Manifest of the last build in `build_dir`, empty if missing or of another format."""
+    try:
+        with open(os.path.join(build_dir, MANIFEST)) as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return manifest if manifest.get("format") == MANIFEST_FORMAT else {}
+
+
+def is_up_to_date(target: BuildTarget, manifest: dict[str, Any], build_dir: str) -> bool:
+    entry = manifest.get("contracts", {}).get(target.name)
+    if entry is None or entry["source_key"] != target.source_key or entry["status"] == "failed":
+        return False
+    return all(os.path.exists(os.path.join(build_dir, target.name, f)) for f in ARTIFACTS)
+
+
+def build_one(target: BuildTarget, build_dir: str, cache_dir: str, algod: Optional[tuple[str, str]]) -> BuildResult:
+    """Dump `target` in build_dir/<name> (worker process). `algod`: (url, token), None for the localnet assembler."""
+    result = BuildResult(**asdict(target), status="built")
+    start = time.perf_counter()
+    try:
+        app_cls = getattr(importlib.import_module(target.module), target.class_name)
+        cache = CompileCache(cache_dir)
+        client = _algod_client(algod)
+        directory = os.path.join(build_dir, target.name)
+        os.makedirs(directory, exist_ok=True)
+        cache.dump(app_cls(), directory, client)
+        result.approval_size = os.path.getsize(os.path.join(directory, "approval.bin"))
+        result.clear_size = os.path.getsize(os.path.join(directory, "clear.bin"))
+        result.cache_hits = cache.stats.hits
+        result.cache_misses = cache.stats.misses
+    except Exception as e:
+        result.status = "failed"
+        result.error = str(e)
+    result.seconds = time.perf_counter() - start
+    return result
+
+
+class Builder:
+    """
+    Incremental parallel build of the contracts of contracts/.
+
+    Args:
+    build_dir: folder of the artifacts and of the manifest.
+    algod: (url, token) of the algod compiling the TEAL, None for the localnet assembler.
+    workers: size of the process pool, 0 builds in the calling process.
+    cache_dir: compile cache shared by the workers.
+    """
+
+    def __init__(self, build_dir: str = DEFAULT_BUILD_DIR, algod: Optional[tuple[str, str]] = None,
+                 workers: int = None, cache_dir: str = DEFAULT_CACHE_DIR):
+        self.build_dir = build_dir
+        self.algod = algod
+        self.workers = (os.cpu_count() or 1) if workers is None else workers
+        self.cache_dir = cache_dir
+
+    def build(self, force: bool = False, only: list[str] = None) -> dict[str, Any]:
+        """Rebuild the stale contracts (all of them with `force`, `only` restricts to some names), return the manifest."""
+        start = time.perf_counter()
+        targets = discover(CompileCache(self.cache_dir))
+        unknown = set(only or []) - targets.keys()
+        if unknown:
+            raise ValueError(f"unknown contracts {sorted(unknown)}, found {sorted(targets)}")
+        previous = load_manifest(self.build_dir)
+        results: dict[str, BuildResult] = {}
+        pending = {}
+        for name, target in targets.items():
+            entry = previous.get("contracts", {}).get(name)
+            if only and name not in only:
+                if entry is not None: # not requested, kept as it is
+                    results[name] = BuildResult(**entry)
+            elif not force and is_up_to_date(target, previous, self.build_dir):
+                results[name] = BuildResult(**{**entry, "status": "up to date", "seconds": 0.0})
+            else:
+                pending[name] = target
+
+        os.makedirs(self.build_dir, exist_ok=True)
+        if pending:
+            results.update(self._run(pending))
+
+        manifest = {
+            "format": MANIFEST_FORMAT,
+            "algod": self.algod[0] if self.algod else "localnet",
+            "workers": self.workers,
+            "seconds": time.perf_counter() - start,
+            "contracts": {name: asdict(results[name]) for name in sorted(results)},
+        }
+        path = os.path.join(self.build_dir, MANIFEST)
+        tmp_path = "{}.{}.tmp".format(path, os.getpid())
+        with open(tmp_path, "w") as f:
+            json.dump(manifest, f, indent=2)
+            f.write("\n")
+        os.replace(tmp_path, path)
+        return manifest
+
+    def _run(self, pending: dict[str, BuildTarget]) -> dict[str, BuildResult]:
+        """Build `pending` in the pool, every target after its (pending) dependencies."""
+        results: dict[str, BuildResult] = {}
+        if not self.workers:
+            while pending:
+                name = next(n for n, t in pending.items() if not set(t.dependencies) & pending.keys())
+                results[name] = build_one(pending.pop(name), self.build_dir, self.cache_dir, self.algod)
+            return results
+        running: dict[Future, str] = {}
+        ctx = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(min(self.workers, len(pending)), mp_context=ctx) as pool:
+            while pending or running:
+                for name in [n for n, t in pending.items() if not set(t.dependencies) & (pending.keys() | set(running.values()))]:
+                    target = pending.pop(name)
+                    running[pool.submit(build_one, target, self.build_dir, self.cache_dir, self.algod)] = name
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    result = future.result()
+                    results[running.pop(future)] = result
+        return results
+
+
+def report(manifest: dict[str, Any]):
+    print(f"{'contract':<28}{'status':<12}{'seconds':>9}{'approval B':>12}{'cache hits':>12}{'misses':>8}")
+    for name, entry in manifest["contracts"].items():
+        print(f"{name:<28}{entry['status']:<12}{entry['seconds']:>9.2f}{entry['approval_size']:>12}{entry['cache_hits']:>12}{entry['cache_misses']:>8}")
+        if entry["error"]:
+            print(f"    {entry['error']}")
+    print(f"\n{len(manifest['contracts'])} contracts in {manifest['seconds']:.2f}s ({manifest['workers']} workers)")
+
+
+def _contract_modules() -> list[str]:
+    modules = []
+    for root, dirs, files in os.walk(CONTRACTS_DIR):
+        dirs[:] = sorted(d for d in dirs if not d.startswith((".", "_")))
+        for f in sorted(files):
+            if f.endswith(".py") and not f.startswith("_"):
+                path = os.path.relpath(os.path.join(root, f[:-3]), os.path.dirname(CONTRACTS_DIR))
+                module_name = path.replace(os.sep, ".")
+                if module_name not in SKIPPED_MODULES:
+                    modules.append(module_name)
+    return modules
+
+
+def _precompiled(app_cls: type) -> set[type]:
+    """Application classes precompiled by `app_cls` (its children)."""
+    children = set()
+    for cls in app_cls.__mro__:
+        for value in vars(cls).values():
+            if isinstance(value, CachedAppPrecompile):
+                children.add(value.app_cls)
+            elif isinstance(value, AppPrecompile):
+                children.add(type(value.app))
+    return children
+
+
+def _source_hashes(app_cls: type) -> dict[str, str]:
+    hashes = {}
+    for path in sorted(source_files(app_cls)):
+        with open(path, "rb") as f:
+            hashes[os.path.relpath(path, ROOT_DIR).replace(os.sep, "/")] = hashlib.sha256(f.read()).hexdigest()
+    return hashes
+
+
+def _algod_client(algod: Optional[tuple[str, str]]) -> AlgodClient:
+    if algod is None:
+        from localnet.algod import LocalAlgodClient
+
+        return LocalAlgodClient()
+    url, token = algod
+    return AlgodClient(token, url)
+
+
+def main(argv: list[str] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("contracts", nargs="*", help="names of the contracts to build (default: all)")
+    parser.add_argument("--build-dir", default=DEFAULT_BUILD_DIR, help="folder of the artifacts and of the manifest")
+    parser.add_argument("--workers", type=int, default=None, help="build processes (default: CPU count)")
+    parser.add_argument("--force", action="store_true", help="rebuild the up to date contracts too")
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR, help="compile cache shared by the build processes")
+    parser.add_argument("--local", action="store_true", help="assemble with the in-process localnet instead of algod")
+    parser.add_argument("--algod", default="http://localhost:4001", help="algod URL (default: the sandbox)")
+    parser.add_argument("--token", default="a" * 64, help="algod API token")
+    args = parser.parse_args(argv)
+
+    builder = Builder(args.build_dir, None if args.local else (args.algod, args.token), args.workers, args.cache_dir)
+    try:
+        manifest = builder.build(force=args.force, only=args.contracts)
+    except ValueError as e:
+        parser.error(str(e))
+    report(manifest)
+    return 1 if any(e["status"] == "failed" for e in manifest["contracts"].values()) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
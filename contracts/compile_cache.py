@@ -0,0 +1,440 @@
+import base64
+import hashlib
+import json
+import os
+import sys
+from dataclasses import dataclass, field
+from importlib import metadata
+from types import ModuleType
+from typing import Any, Optional
+
+from pyteal import Bytes, MAX_TEAL_VERSION
+from algosdk.abi import Contract
+from algosdk.source_map import SourceMap
+from algosdk.v2client.algod import AlgodClient
+
+from beaker.application import Application
+from beaker.client import ApplicationClient
+from beaker.client.application_client import _gather_asserts
+from beaker.precompile import AppPrecompile, Precompile
+
+from contracts.crowdfunding.packed_state import packed_layouts
+from contracts.fees import method_inner_txns
+from contracts.crowdfunding.state_types import state_value_types
+
+DEFAULT_CACHE_DIR = "./build/.compile_cache"
+DEFAULT_MAX_BYTES = 32 * 1024 * 1024 # 32 MiB
+
+# Bump when the layout of the cache entries changes
+CACHE_FORMAT = 1
+
+# the contract modules hashed into the source keys, but this one
+_THIS_FILE = os.path.abspath(__file__)
+_CONTRACTS_DIR = os.path.dirname(_THIS_FILE) + os.sep
+
+
+@dataclass
+class CacheStats:
+    """Hit/miss counters of a CompileCache (per process)."""
+
+    app_hits: int = 0  # PyTeal generation skipped
+    app_misses: int = 0
+    program_hits: int = 0  # algod compile skipped
+    program_misses: int = 0
+    evictions: int = 0
+
+    @property
+    def hits(self) -> int:
+        return self.app_hits + self.program_hits
+
+    @property
+    def misses(self) -> int:
+        return self.app_misses + self.program_misses
+
+
+@dataclass
+class CompiledProgram:
+    """A TEAL program assembled by algod, together with its source map."""
+
+    teal: str
+    binary: bytes
+    program_hash: str
+    source_map: dict[str, Any]
+
+    def precompile(self) -> Precompile:
+        """Rebuild a beaker Precompile without calling algod again."""
+        p = Precompile(self.teal)
+        p._binary = self.binary
+        p._program_hash = self.program_hash
+        p._map = SourceMap(self.source_map)
+        p.binary = Bytes(self.binary)
+        for tv in p._template_values:
+            # +1 to account for the pushbytes/pushint op, as in Precompile.assemble
+            tv.pc = p._map.get_pcs_for_line(tv.line)[0] + 1
+        return p
+
+
+@dataclass
+class CompiledApp:
+    """Everything ApplicationClient and Application.dump need from a build."""
+
+    approval: CompiledProgram
+    clear: CompiledProgram
+    contract: dict[str, Any]
+    source_key: str = field(default="")
+
+
+class CompileCache:
+    """
+    Persistent, content-addressed cache of compiled beaker Applications.
+
+    The cache has two layers stored under `directory`:
+    - programs/<key>.json: approval/clear binaries and source maps, keyed by a hash
+      of the TEAL source and the compiler options. Skips the algod compile round trip.
+    - apps/<key>.json: the generated TEAL and ABI contract of an Application, keyed by
+      a hash of the contract sources (including precompiled children) and of the
+      PyTeal/beaker versions. Skips PyTeal generation.
+
+    Entries are written atomically so the cache can be shared across processes.
+    The total size is bounded by `max_bytes`, least recently used entries are evicted first.
+
+    Args:
+    directory: folder holding the cache entries.
+    max_bytes: maximum size on disk of the cache.
+    """
+
+    def __init__(self, directory: str = DEFAULT_CACHE_DIR, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.stats = CacheStats()
+
+        os.makedirs(os.path.join(directory, "programs"), exist_ok=True)
+        os.makedirs(os.path.join(directory, "apps"), exist_ok=True)
+
+    # ------------------------------------------------------------------ keys
+
+    def program_key(self, teal: str, **options) -> str:
+        """Key of a TEAL program for the given compiler options."""
+        h = hashlib.sha256()
+        h.update(json.dumps({"format": CACHE_FORMAT, **options}, sort_keys=True).encode())
+        h.update(teal.encode())
+        return h.hexdigest()
+
+    def source_key(self, app_cls: type, teal_version: int = MAX_TEAL_VERSION) -> str:
+        """
+        Key of an Application class: hash of the source files defining it and all its
+        precompiled children, plus the versions of the tools generating the TEAL.
+        """
+        h = hashlib.sha256()
+        h.update(json.dumps({
+            "format": CACHE_FORMAT,
+            "class": app_cls.__qualname__,
+            "teal_version": teal_version,
+            "pyteal": _version("pyteal"),
+            "beaker": _version("beaker-pyteal"),
+        }, sort_keys=True).encode())
+        for path in sorted(source_files(app_cls)):
+            with open(path, "rb") as f:
+                h.update(f.read())
+        return h.hexdigest()
+
+    # -------------------------------------------------------------- programs
+
+    def compile_teal(self, client: AlgodClient, teal: str) -> CompiledProgram:
+        """Assemble `teal` with algod, unless an identical program was already compiled."""
+        key = self.program_key(teal, source_map=True)
+        entry = self._read("programs", key)
+        if entry is not None:
+            self.stats.program_hits += 1
+            return _program_from_entry(entry)
+
+        self.stats.program_misses += 1
+        result = client.compile(teal, source_map=True)
+        program = CompiledProgram(
+            teal=teal,
+            binary=base64.b64decode(result["result"]),
+            program_hash=result["hash"],
+            source_map=result["sourcemap"],
+        )
+        self._write("programs", key, {
+            "teal": program.teal,
+            "binary": base64.b64encode(program.binary).decode("utf8"),
+            "hash": program.program_hash,
+            "sourcemap": program.source_map,
+        })
+        return program
+
+    # ------------------------------------------------------------------ apps
+
+    def build(self, app: "Application | type", client: AlgodClient) -> CompiledApp:
+        """
+        Fully build an Application (class or instance), compiling precompiled children first.
+
+        On a warm cache neither PyTeal nor algod are invoked. If `app` is an instance,
+        its approval/clear programs and contract are populated from the cache.
+        """
+        app_cls = app if isinstance(app, type) else type(app)
+        teal_version = MAX_TEAL_VERSION if isinstance(app, type) else app.teal_version
+        source_key = self.source_key(app_cls, teal_version)
+
+        compiled = self._load_app(source_key)
+        if compiled is not None:
+            self.stats.app_hits += 1
+        else:
+            self.stats.app_misses += 1
+            instance = app_cls() if isinstance(app, type) else app
+            for p in instance.precompiles.values():
+                if isinstance(p, CachedAppPrecompile):
+                    p.compile(client, cache=self)
+                else:
+                    p.compile(client)
+            approval, clear = instance.compile()
+            # Precompile replaces template variables, compile what algod would get
+            compiled = CompiledApp(
+                approval=self.compile_teal(client, Precompile(approval)._program),
+                clear=self.compile_teal(client, Precompile(clear)._program),
+                contract=instance.contract.dictify(),
+                source_key=source_key,
+            )
+            compiled.approval.teal = approval
+            compiled.clear.teal = clear
+            self._write("apps", source_key, {
+                "approval": self.program_key(Precompile(approval)._program, source_map=True),
+                "clear": self.program_key(Precompile(clear)._program, source_map=True),
+                "approval_teal": approval,
+                "clear_teal": clear,
+                "contract": compiled.contract,
+            })
+
+        if not isinstance(app, type):
+            app.approval_program = compiled.approval.teal
+            app.clear_program = compiled.clear.teal
+            app.contract = Contract.undictify(compiled.contract)
+        return compiled
+
+    def application_client(self, client: AlgodClient, app: Application, **kwargs) -> ApplicationClient:
+        """Create an ApplicationClient whose programs are taken from the cache (see ApplicationClient.build)."""
+        compiled = self.build(app, client)
+
+        app_client = ApplicationClient(client, app, **kwargs)
+        app_client.approval_binary = compiled.approval.binary
+        app_client.approval_src_map = SourceMap(compiled.approval.source_map)
+        app_client.clear_binary = compiled.clear.binary
+        app_client.clear_src_map = SourceMap(compiled.clear.source_map)
+        app_client.approval_asserts = _gather_asserts(app.approval_program, app_client.approval_src_map)
+        app_client.clear_asserts = _gather_asserts(app.clear_program, app_client.clear_src_map)
+        return app_client
+
+    def dump(self, app: Application, directory: str, client: AlgodClient):
+        """
+        Cached equivalent of Application.dump(directory, client), also writing the assembled
+        programs (approval.bin, clear.bin) loaded by client/artifacts.py, the inner
+        transactions declared by @inner_txns in the hints of application.json, the
+        fields of its PackedState entries and the value types of its state values
+        (contracts/crowdfunding/state_types.py) in its schema and the events listed in the EVENTS
+        of the Application class (ARC-28 "events").
+        """
+        compiled = self.build(app, client)
+        app.dump(directory)
+        declared = method_inner_txns(type(app))
+        layouts = packed_layouts(app)
+        events = getattr(type(app), "EVENTS", [])
+        value_types = state_value_types(app)
+        if declared or layouts or events or any(value_types.values()):
+            spec_path = os.path.join(directory, "application.json")
+            with open(spec_path) as f:
+                spec = json.load(f)
+            for name, (count, varies) in declared.items():
+                hints = spec["hints"].setdefault(name, {})
+                hints["inner_txns"] = count
+                if varies:
+                    hints["inner_txns_vary"] = True
+            for entry in spec["schema"]["global"]["declared"].values():
+                if entry["key"] in layouts:
+                    entry["fields"] = layouts[entry["key"]]
+            for (scope, kind), types in value_types.items():
+                for name, value_type in types.items():
+                    spec["schema"][scope][kind][name].update(value_type)
+            if events:
+                spec["events"] = [event.spec() for event in events]
+            with open(spec_path, "w") as f:
+                f.write(json.dumps(spec, indent=4))
+        for name, program in (("approval", compiled.approval), ("clear", compiled.clear)):
+            with open(os.path.join(directory, name + ".bin"), "wb") as f:
+                f.write(program.binary)
+
+    def clear(self):
+        """Remove every entry from the cache."""
+        for path, _, _ in self._entries():
+            os.remove(path)
+
+    # ------------------------------------------------------------- internals
+
+    def _load_app(self, source_key: str) -> Optional[CompiledApp]:
+        entry = self._read("apps", source_key)
+        if entry is None:
+            return None
+        approval = self._read("programs", entry["approval"])
+        clear = self._read("programs", entry["clear"])
+        if approval is None or clear is None: # programs evicted, rebuild
+            return None
+
+        compiled = CompiledApp(
+            approval=_program_from_entry(approval),
+            clear=_program_from_entry(clear),
+            contract=entry["contract"],
+            source_key=source_key,
+        )
+        compiled.approval.teal = entry["approval_teal"]
+        compiled.clear.teal = entry["clear_teal"]
+        return compiled
+
+    def _path(self, layer: str, key: str) -> str:
+        return os.path.join(self.directory, layer, key + ".json")
+
+    def _read(self, layer: str, key: str) -> Optional[dict[str, Any]]:
+        path = self._path(layer, key)
+        try:
+            with open(path, "r") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        try:
+            os.utime(path) # mark as recently used
+        except OSError:
+            pass
+        return entry
+
+    def _write(self, layer: str, key: str, entry: dict[str, Any]):
+        path = self._path(layer, key)
+        tmp_path = "{}.{}.tmp".format(path, os.getpid())
+        with open(tmp_path, "w") as f:
+            json.dump(entry, f)
+        os.replace(tmp_path, path)
+        self._evict()
+
+    def _entries(self) -> list[tuple[str, int, float]]:
+        entries = []
+        for layer in ("programs", "apps"):
+            layer_dir = os.path.join(self.directory, layer)
+            for name in os.listdir(layer_dir):
+                path = os.path.join(layer_dir, name)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((path, st.st_size, st.st_mtime))
+        return entries
+
+    def _evict(self):
+        entries = self._entries()
+        total = sum(size for _, size, _ in entries)
+        for path, size, _ in sorted(entries, key=lambda e: e[2]):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            self.stats.evictions += 1
+
+
+class CachedAppPrecompile(AppPrecompile):
+    """
+    AppPrecompile backed by a CompileCache.
+
+    Takes the Application class instead of an instance: the child app is only
+    instantiated (and its TEAL generated) on a cache miss.
+    """
+
+    def __init__(self, app_cls: type, cache: Optional[CompileCache] = None):
+        self.app_cls = app_cls
+        self._cache = cache
+        self._app: Optional[Application] = None
+        self.approval: Precompile = Precompile("")
+        self.clear: Precompile = Precompile("")
+
+    @property
+    def app(self) -> Application:
+        if self._app is None:
+            self._app = self.app_cls()
+        return self._app
+
+    @app.setter
+    def app(self, app: Application):
+        self._app = app
+
+    @property
+    def cache(self) -> CompileCache:
+        return self._cache if self._cache is not None else default_cache()
+
+    def compile(self, client: AlgodClient, cache: Optional[CompileCache] = None):
+        cache = cache if cache is not None else self.cache
+        compiled = cache.build(self._app if self._app is not None else self.app_cls, client)
+        self.approval = compiled.approval.precompile()
+        self.clear = compiled.clear.precompile()
+
+
+_default_cache: Optional[CompileCache] = None
+
+
+def default_cache() -> CompileCache:
+    """Process wide CompileCache in DEFAULT_CACHE_DIR."""
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = CompileCache()
+    return _default_cache
+
+
+def _program_from_entry(entry: dict[str, Any]) -> CompiledProgram:
+    return CompiledProgram(
+        teal=entry["teal"],
+        binary=base64.b64decode(entry["binary"]),
+        program_hash=entry["hash"],
+        source_map=entry["sourcemap"],
+    )
+
+
+def _version(dist: str) -> str:
+    try:
+        return metadata.version(dist)
+    except metadata.PackageNotFoundError:
+        return "unknown"
+
+
+def source_files(app_cls: type) -> set[str]:
+    """
+    Source files of an Application class, its bases and its precompiled children, together
+    with the contract modules they import (helpers such as events.py shape the generated TEAL too).
+    """
+    files: set[str] = set()
+    for cls in app_cls.__mro__:
+        if cls is Application or cls is object:
+            continue
+        _module_files(sys.modules.get(cls.__module__), files)
+        for value in vars(cls).values():
+            if isinstance(value, CachedAppPrecompile):
+                files |= source_files(value.app_cls)
+            elif isinstance(value, AppPrecompile):
+                files |= source_files(type(value.app))
+    return files
+
+
+def _module_files(module: Optional[ModuleType], files: set[str]) -> set[str]:
+    """Add to `files` the file of `module` and of the modules under contracts/ it takes names from, transitively."""
+    path = getattr(module, "__file__", None)
+    if path is None:
+        return files
+    path = os.path.abspath(path)
+    if not path.startswith(_CONTRACTS_DIR) or path == _THIS_FILE or path in files:
+        return files
+    files.add(path)
+    for value in list(vars(module).values()):
+        if isinstance(value, ModuleType):
+            _module_files(value, files)
+        else:
+            name = getattr(value, "__module__", None)
+            if isinstance(name, str):
+                _module_files(sys.modules.get(name), files)
+    return files
@@ -0,0 +1,213 @@
+import os
+import sys
+from typing import Final
+
+from pyteal import (
+    abi,
+    TealType,
+    Global,
+    Int,
+    Seq,
+    Txn,
+    Assert,
+    If,
+    And,
+    Subroutine,
+    InnerTxnBuilder,
+    TxnField,
+    TxnType,
+    InnerTxn,
+    Bytes,
+    Itob,
+    Concat,
+    Extract,
+    Len,
+    ScratchVar,
+    Sha512_256,
+    MethodSignature,
+)
+
+from beaker.application import Application, get_method_signature
+from beaker.state import (
+    ApplicationStateValue,
+    AccountStateValue,
+    ReservedAccountStateValue,
+)
+from beaker.decorators import (
+    external,
+    create,
+    opt_in,
+    Authorize,
+)
+from beaker import sandbox
+
+try:
+    from contracts.compile_cache import CachedAppPrecompile, default_cache
+except ModuleNotFoundError: # executed as a script, make the project root importable
+    sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+    from contracts.compile_cache import CachedAppPrecompile, default_cache
+
+from contracts.crowdfunding.crowdfundingCampaign import CrowdfundingCampaignApp
+from contracts.crowdfunding.events import CampaignCreated, FACTORY_EVENTS
+from contracts.crowdfunding.state_types import UINT64_ARRAY, value_type
+from contracts.fees import inner_txns
+
+# Min balance the factory account must hold for every campaign it creates (the creator of an
+# app pays for it), plus the min balance of the new campaign account, forwarded to it.
+APP_PAGE_MIN_BALANCE = 100_000 # per program page (2048 bytes)
+SCHEMA_UINT_MIN_BALANCE = 28_500
+SCHEMA_BYTES_MIN_BALANCE = 50_000
+ACCOUNT_MIN_BALANCE = 100_000
+PROGRAM_PAGE_SIZE = 2048
+
+# Index of the campaigns of a creator: packed uint64 app ids in local state pages
+# (5 bytes key, 120 bytes value), 15 pages cover 225 campaigns per creator.
+INDEX_PAGE_ENTRIES = 15
+INDEX_PAGES = 15
+INDEX_KEY_PREFIX = "ids_"
+MAX_CAMPAIGNS_PER_CREATOR = INDEX_PAGE_ENTRIES * INDEX_PAGES
+
+
+def campaign_deposit(approval_size: int, clear_size: int) -> int:
+    """microAlgos to pay to the factory with create_campaign for programs of the given sizes."""
+    schema = CrowdfundingCampaignApp().app_state.schema() # cheap, the campaign has precompiles: no TEAL is generated
+    extra_pages = (approval_size + clear_size - 1) // PROGRAM_PAGE_SIZE
+    return (
+        APP_PAGE_MIN_BALANCE * (1 + extra_pages)
+        + SCHEMA_UINT_MIN_BALANCE * schema.num_uints
+        + SCHEMA_BYTES_MIN_BALANCE * schema.num_byte_slices
+        + ACCOUNT_MIN_BALANCE
+    )
+
+
+@Subroutine(TealType.bytes)
+def index_page_key(page):
+    return Concat(Bytes(INDEX_KEY_PREFIX), Extract(Itob(page), Int(7), Int(1)))
+
+
+class CampaignFactoryApp(Application):
+
+    # CrowdfundingCampaignApp (and its MilestoneApprovalApp) is only built on a compile cache miss
+    campaign_app: CachedAppPrecompile = CachedAppPrecompile(CrowdfundingCampaignApp)
+
+    EVENTS = FACTORY_EVENTS # written in application.json, decoded by the clients
+
+    # global states
+    total_campaigns: Final[ApplicationStateValue] = ApplicationStateValue(
+        stack_type=TealType.uint64,
+        descr="Total number of campaigns created by the factory.",
+    )
+
+    # local states
+    campaigns_count: Final[AccountStateValue] = AccountStateValue(
+        stack_type=TealType.uint64,
+        descr="Number of campaigns created through the factory by the account.",
+    )
+
+    campaign_ids: Final[ReservedAccountStateValue] = value_type(ReservedAccountStateValue(
+        stack_type=TealType.bytes,
+        max_keys=INDEX_PAGES,
+        key_gen=index_page_key,
+        descr="App ids of the campaigns of the account, packed uint64 array: campaign i at page i / 15, offset (i % 15) * 8.",
+    ), UINT64_ARRAY, key_prefix=INDEX_KEY_PREFIX, page_entries=INDEX_PAGE_ENTRIES, length="campaigns_count")
+
+    @create
+    def create(self):
+        return self.initialize_application_state()
+
+    @opt_in
+    def opt_in(self):
+        return self.initialize_account_state()
+
+    @inner_txns(2) # campaign create + payment of its min balance
+    @external(authorize=Authorize.opted_in(Global.current_application_id()))
+    def create_campaign(self,
+        deposit: abi.PaymentTransaction,
+        campaign_goal: abi.Uint64,
+        funds_receiver: abi.Address,
+        fund_start_date: abi.Uint64,
+        fund_end_date: abi.Uint64,
+        reward_metadata: abi.String,
+        total_milestones: abi.Uint64,
+        funds_per_milestone: abi.DynamicArray[abi.Uint64],
+        *,
+        output: abi.Uint64 # campaign app id
+    ):
+        approval = self.campaign_app.approval.binary
+        clear = self.campaign_app.clear.binary
+        schema = self.campaign_app.app.app_state.schema()
+        extra_pages = ScratchVar(TealType.uint64)
+        campaign_id = ScratchVar(TealType.uint64)
+        count = self.campaigns_count[Txn.sender()]
+        page = self.campaign_ids[count.get() / Int(INDEX_PAGE_ENTRIES)][Txn.sender()]
+        return Seq(
+            Assert(count.get() < Int(MAX_CAMPAIGNS_PER_CREATOR), comment="campaign index of the creator is full"),
+            extra_pages.store((Len(approval) + Len(clear) - Int(1)) / Int(PROGRAM_PAGE_SIZE)),
+            Assert(
+                And(
+                    deposit.get().receiver() == self.address,
+                    deposit.get().sender() == Txn.sender(),
+                    deposit.get().amount() >= (
+                        Int(APP_PAGE_MIN_BALANCE) * (Int(1) + extra_pages.load())
+                        + Int(SCHEMA_UINT_MIN_BALANCE * schema.num_uints
+                            + SCHEMA_BYTES_MIN_BALANCE * schema.num_byte_slices
+                            + ACCOUNT_MIN_BALANCE)
+                    ),
+                ),
+                comment="must deposit the min balance of the campaign"
+            ),
+            # Create the CrowdfundingCampaignApp, the sender is passed as its creator (inner fees paid by the caller)
+            InnerTxnBuilder.Execute(
+                {
+                    TxnField.type_enum: TxnType.ApplicationCall,
+                    TxnField.approval_program: approval,
+                    TxnField.clear_state_program: clear,
+                    TxnField.global_num_uints: Int(schema.num_uints),
+                    TxnField.global_num_byte_slices: Int(schema.num_byte_slices),
+                    TxnField.local_num_uints: Int(self.campaign_app.app.acct_state.schema().num_uints),
+                    TxnField.local_num_byte_slices: Int(self.campaign_app.app.acct_state.schema().num_byte_slices),
+                    TxnField.extra_program_pages: extra_pages.load(),
+                    TxnField.accounts: [Txn.sender()],
+                    TxnField.fee: Int(0),
+                    TxnField.application_args: [
+                        MethodSignature(get_method_signature(CrowdfundingCampaignApp.create)),
+                        campaign_goal.encode(),
+                        funds_receiver.encode(),
+                        fund_start_date.encode(),
+                        fund_end_date.encode(),
+                        reward_metadata.encode(),
+                        total_milestones.encode(),
+                        funds_per_milestone.encode(),
+                    ],
+                }
+            ),
+            campaign_id.store(InnerTxn.created_application_id()),
+            # min balance of the campaign account, so that it can pay out before the first backer
+            InnerTxnBuilder.Execute(
+                {
+                    TxnField.type_enum: TxnType.Payment,
+                    TxnField.receiver: Sha512_256(Concat(Bytes("appID"), Itob(campaign_id.load()))),
+                    TxnField.amount: Int(ACCOUNT_MIN_BALANCE),
+                    TxnField.fee: Int(0),
+                }
+            ),
+
+            # index the campaign by creator
+            If(count.get() % Int(INDEX_PAGE_ENTRIES) == Int(0))
+            .Then(page.set(Itob(campaign_id.load())))
+            .Else(page.set(Concat(page.get(), Itob(campaign_id.load())))),
+            count.increment(Int(1)),
+            self.total_campaigns.increment(Int(1)),
+            CampaignCreated.log(Txn.sender(), campaign_id.load()),
+            output.set(campaign_id.load()),
+        )
+
+
+if __name__ == "__main__":
+
+    app = CampaignFactoryApp()
+    try:
+        default_cache().dump(app, "./build/campaignFactory", client=sandbox.get_algod_client())
+        print('\n------------TEAL generation completed!------------\n')
+    except Exception as err:
+        print('Error: {}'.format(err))
@@ -1,3 +1,5 @@
+import os
+import sys
 from typing import Final
 from webbrowser import get
 
@@ -14,6 +16,7 @@ from pyteal import (
     Reject,
     If,
     And,
+    Or,
     Subroutine,
     InnerTxnBuilder,
     TxnField,
@@ -21,6 +24,17 @@ from pyteal import (
     InnerTxn,
     Bytes,
     Itob,
+    Concat,
+    Extract,
+    ExtractUint16,
+    ExtractUint64,
+    For,
+    Len,
+    ScratchVar,
+    Suffix,
+    Add,
+    BytesZero,
+    WideRatio,
     MethodSignature
 )
 
@@ -29,11 +43,12 @@ from beaker.application import (
 )
 from beaker.state import (
     ApplicationStateValue,
-    #DynamicApplicationStateValue,
+    ReservedApplicationStateValue,
     AccountStateValue
 )
 from beaker.decorators import (
     external,
+    internal,
     create,
     opt_in,
     Authorize
@@ -52,15 +67,48 @@ try:
 except ModuleNotFoundError:
     print('Absolute import failed')
 
+try:
+    from contracts.compile_cache import CachedAppPrecompile, default_cache
+except ModuleNotFoundError: # executed as a script, make the project root importable
+    sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+    from contracts.compile_cache import CachedAppPrecompile, default_cache
+
+from contracts.crowdfunding.events import CAMPAIGN_EVENTS, Claim, Fund, MilestoneSubmitted, Payout, Refund
+from contracts.crowdfunding.state_types import ADDRESS, BYTES, STRING, UINT64_ARRAY, value_type
+from contracts.fees import inner_txns
+
+# The fund schedule is a packed uint64 array split over pages of global state:
+# a page (7 bytes key, 120 bytes value) holds 15 amounts, 5 pages cover 64 milestones.
+# Trade-off: the 5 pages are reserved byte slices of the global schema, 3 to 8 byte slices before
+# payout_split (+0.25 Algo of min balance per campaign), even for a campaign of 1 to 15 milestones.
+MAX_MILESTONES = 64
+SCHEDULE_PAGE_ENTRIES = 15
+SCHEDULE_PAGE_SIZE = SCHEDULE_PAGE_ENTRIES * 8
+SCHEDULE_PAGES = (MAX_MILESTONES + SCHEDULE_PAGE_ENTRIES - 1) // SCHEDULE_PAGE_ENTRIES
+SCHEDULE_KEY_PREFIX = "funds_"
+# refund pays the backers in the foreign accounts of the call (max 4 per app call)
+MAX_REFUNDS_PER_CALL = 4
+# a milestone payout is split between funds_receiver and up to 3 co-receivers, all passed as
+# foreign accounts of claim_funds, with shares in basis points (one inner payment each)
+MAX_PAYOUT_RECEIVERS = 4
+SHARES_DENOMINATOR = 10_000
+
+@Subroutine(TealType.bytes)
+def schedule_page_key(page):
+    return Concat(Bytes(SCHEDULE_KEY_PREFIX), Extract(Itob(page), Int(7), Int(1)))
+
 class CrowdfundingCampaignApp(Application):
 
-    milestone_app: AppPrecompile = AppPrecompile(MilestoneApprovalApp())
+    # MilestoneApprovalApp is only built (PyTeal + algod compile) on a compile cache miss
+    milestone_app: AppPrecompile = CachedAppPrecompile(MilestoneApprovalApp)
+
+    EVENTS = CAMPAIGN_EVENTS # written in application.json, decoded by the clients
 
     # global states
-    creator: Final[ApplicationStateValue] = ApplicationStateValue( # TODO: Is it really necessary?
+    creator: Final[ApplicationStateValue] = value_type(ApplicationStateValue(
         stack_type=TealType.bytes,
-        descr="Creator of the crowdfunding campaign.",
-    )
+        descr="Creator of the crowdfunding campaign (not the app creator when deployed by CampaignFactoryApp).",
+    ), ADDRESS)
 
     campaign_goal: Final[ApplicationStateValue] = ApplicationStateValue(
         stack_type=TealType.uint64,
@@ -72,10 +120,16 @@ class CrowdfundingCampaignApp(Application):
         descr="Minimum ALGO amount to be collect by the crowdfunding campaign.",
     )
 
-    funds_receiver: Final[ApplicationStateValue] = ApplicationStateValue(
+    funds_receiver: Final[ApplicationStateValue] = value_type(ApplicationStateValue(
         stack_type=TealType.bytes,
         descr="Address of the funds receiver (address specified by the Creator).",
-    )
+    ), ADDRESS)
+
+    payout_split: Final[ApplicationStateValue] = value_type(ApplicationStateValue(
+        stack_type=TealType.bytes,
+        descr="Split of the milestone payouts, empty: all to funds_receiver. Packed uint16 shares (basis points) \
+        of funds_receiver and of each co-receiver, followed by the 32 bytes co-receivers addresses.",
+    ), BYTES)
 
     total_backers: Final[ApplicationStateValue] = ApplicationStateValue( # TODO: Is it really necessary?
         stack_type=TealType.uint64,
@@ -94,7 +148,7 @@ class CrowdfundingCampaignApp(Application):
 
     total_milestones: Final[ApplicationStateValue] = ApplicationStateValue(
         stack_type=TealType.uint64,
-        descr="Crowdfunding campaign's total milestones (max 10 milestones).",
+        descr=f"Crowdfunding campaign's total milestones (max {MAX_MILESTONES} milestones).",
     )
 
     reached_milestone: Final[ApplicationStateValue] = ApplicationStateValue(
@@ -103,22 +157,12 @@ class CrowdfundingCampaignApp(Application):
         descr="Current number of milestones reached.",
     )
 
-    # TODO: use funds_per_milestone for storing the values
-    # funds_per_milestone: Final[DynamicApplicationStateValue] = DynamicApplicationStateValue(
-    #     stack_type=TealType.uint64,
-    #     max_keys=10,
-    #     descr="List of funds divided for each milestone (max 10 milestones)",
-    # )
-
-    funds_0_milestone: Final[ApplicationStateValue] = ApplicationStateValue(
-        stack_type=TealType.uint64,
-        descr="Funds for 0 milestone",
-    )
-    
-    funds_1_milestone: Final[ApplicationStateValue] = ApplicationStateValue(
-        stack_type=TealType.uint64,
-        descr="Funds for 1st milestone",
-    )
+    funds_per_milestone: Final[ReservedApplicationStateValue] = value_type(ReservedApplicationStateValue(
+        stack_type=TealType.bytes,
+        max_keys=SCHEDULE_PAGES,
+        key_gen=schedule_page_key,
+        descr="Funds for each milestone, packed uint64 array: milestone i at page i / 15, offset (i % 15) * 8.",
+    ), UINT64_ARRAY, key_prefix=SCHEDULE_KEY_PREFIX, page_entries=SCHEDULE_PAGE_ENTRIES, length="total_milestones")
 
     campaign_state: Final[ApplicationStateValue] = ApplicationStateValue(
         stack_type=TealType.uint64,
@@ -131,15 +175,30 @@ class CrowdfundingCampaignApp(Application):
         descr="Application ID for the current milestone approval app.",
     )
 
+    reusable_milestone_app_id: Final[ApplicationStateValue] = ApplicationStateValue(
+        stack_type=TealType.uint64,
+        descr="MilestoneApprovalApp reset by every submit_milestone, 0: a new app is created for each milestone.",
+    )
+
+    milestone_submissions: Final[ApplicationStateValue] = ApplicationStateValue(
+        stack_type=TealType.uint64,
+        descr="Number of milestones submitted, identifies the vote in progress.",
+    )
+
+    refunded_backers: Final[ApplicationStateValue] = ApplicationStateValue(
+        stack_type=TealType.uint64,
+        descr="Backers refunded by `refund` after an unsuccessful campaign.",
+    )
+
     RNFT_id: Final[ApplicationStateValue] = ApplicationStateValue(
         stack_type=TealType.uint64,
         descr="ID for the R-NFT (Reward-NFT).",
     )
 
-    reward_metadata: Final[ApplicationStateValue] = ApplicationStateValue(
+    reward_metadata: Final[ApplicationStateValue] = value_type(ApplicationStateValue(
         stack_type=TealType.bytes,
         descr="IPFS metadata link about the reward (R-NFT) to be claimed by the user.",
-    )
+    ), STRING)
 
     # local states
     amount_backed: Final[AccountStateValue] = AccountStateValue(
@@ -147,6 +206,11 @@ class CrowdfundingCampaignApp(Application):
         descr="Total amount of ALGO backed to the campaign by single backer.",
     )
 
+    voted_submission: Final[AccountStateValue] = AccountStateValue(
+        stack_type=TealType.uint64,
+        descr="milestone_submissions of the last milestone the backer voted on with `vote` (no opt-in to the milestone app).",
+    )
+
     @create
     def create(self,
         campaign_goal: abi.Uint64,
@@ -155,24 +219,27 @@ class CrowdfundingCampaignApp(Application):
         fund_end_date: abi.Uint64,
         reward_metadata: abi.String,
         total_milestones: abi.Uint64,
-        funds_0_milestone: abi.Uint64,
-        funds_1_milestone: abi.Uint64,
+        funds_per_milestone: abi.DynamicArray[abi.Uint64],
     ):
         return Seq(
+            Assert(
+                And(
+                    total_milestones.get() > Int(0),
+                    total_milestones.get() <= Int(MAX_MILESTONES),
+                    funds_per_milestone.length() == total_milestones.get(),
+                ),
+                comment="must have one fund amount per milestone (max 64 milestones)"
+            ),
             self.initialize_application_state(),
-            self.creator.set(Txn.sender()),
+            # deployed by CampaignFactoryApp: the creator is passed as first foreign account
+            self.creator.set(If(Global.caller_app_id() == Int(0), Txn.sender(), Txn.accounts[1])),
             self.campaign_goal.set(campaign_goal.get()),
             self.funds_receiver.set(funds_receiver.get()),
             self.fund_start_date.set(fund_start_date.get()),
             self.fund_end_date.set(fund_end_date.get()),
             self.reward_metadata.set(reward_metadata.get()),
             self.total_milestones.set(total_milestones.get()),
-
-            # TODO: use funds_per_milestone for storing the values
-            # self.set_funds_per_milestone_val(k=Int(0), v=funds_0_milestone.get()),
-            # self.set_funds_per_milestone_val(k=Int(1), v=funds_0_milestone.get()), 
-            self.funds_0_milestone.set(funds_0_milestone.get()),    
-            self.funds_1_milestone.set(funds_1_milestone.get()),
+            self.set_schedule(funds_per_milestone),
         )
 
     @opt_in
@@ -191,63 +258,118 @@ class CrowdfundingCampaignApp(Application):
                     funding.get().amount() >= consts.Algos(10), comment="must be greater then 10 algos"
             ),
             Assert(funding.get().receiver() == self.address, comment="must be to me"),
+            # in a bulk group every payment must be credited to the backer who sent it
+            Assert(funding.get().sender() == Txn.sender(), comment="must be paid by the backer"),
+            Assert(funding.get().close_remainder_to() == Global.zero_address(), comment="must not close the account"),
             Assert(self.amount_backed[Txn.sender()].get() == Int(0), comment="must have not yet funded"),
 
             self.amount_backed[Txn.sender()].set(funding.get().amount()),
             self.collected_funds.increment(self.amount_backed[Txn.sender()].get()),
             self.total_backers.increment(Int(1)),
+            Fund.log(Txn.sender(), funding.get().amount(), self.collected_funds.get()),
             Approve(),
         )
 
-    @external(authorize=Authorize.only(Global.creator_address()))
-    def claim_funds(self):
+    @external(authorize=Authorize.only(creator))
+    def set_payout_split(self, receivers: abi.DynamicArray[abi.Address], shares: abi.DynamicArray[abi.Uint16]):
+        # Split every milestone payout: receivers[0] becomes the funds_receiver, the others its co-receivers.
+        # Fixed before the first backer funds, so the backers know where the funds go.
+        i = ScratchVar(TealType.uint64)
+        total = ScratchVar(TealType.uint64)
+        packed_shares = ScratchVar(TealType.bytes)
         return Seq(
-            If(
+            Assert(
+                And(self.campaign_state.get() == Int(0), self.total_backers.get() == Int(0)),
+                comment="must be set before the first backer funds"
+            ),
+            Assert(
                 And(
-                    self.campaign_state.get() == Int(0), # in funding phase
-                    self.fund_end_date.get() < Global.latest_timestamp(), # funding window ended
-                    self.collected_funds.get() < self.campaign_goal.get() # campaign unsuccessful
+                    receivers.length() > Int(0),
+                    receivers.length() <= Int(MAX_PAYOUT_RECEIVERS),
+                    shares.length() == receivers.length(),
+                ),
+                comment="must have one share per receiver (max 4 receivers)"
+            ),
+            # address[] and uint16[] are ABI encoded as a uint16 length followed by the packed elements
+            packed_shares.store(Suffix(shares.encode(), Int(2))),
+            total.store(Int(0)),
+            For(i.store(Int(0)), i.load() < shares.length(), i.store(i.load() + Int(1))).Do(
+                Seq(
+                    Assert(ExtractUint16(packed_shares.load(), i.load() * Int(2)) > Int(0), comment="share must not be 0"),
+                    total.store(total.load() + ExtractUint16(packed_shares.load(), i.load() * Int(2))),
                 )
-            )
-            .Then(self.campaign_state.set(Int(3))) # campaign ended unsuccessfully
-            .ElseIf(
+            ),
+            Assert(total.load() == Int(SHARES_DENOMINATOR), comment="shares must add up to 10000 basis points"),
+            self.funds_receiver.set(Extract(receivers.encode(), Int(2), Int(32))),
+            self.payout_split.set(
+                If(receivers.length() == Int(1))
+                .Then(Bytes("")) # all to funds_receiver
+                .Else(Concat(packed_shares.load(), Suffix(receivers.encode(), Int(2 + 32))))
+            ),
+        )
+
+    @inner_txns(MAX_PAYOUT_RECEIVERS, varies=True) # one payment per payout receiver, none without payout
+    @external(authorize=Authorize.only(creator))
+    def claim_funds(self):
+        # The payout receivers (funds_receiver and its co-receivers, see set_payout_split) and, after a
+        # milestone vote, the milestone app must be in the foreign accounts and apps of the call.
+        approval_state = App.globalGetEx(self.milestone_approval_app_id.get(), Bytes("approval_state"))
+        return Seq(
+            If(
                 And(
                     self.campaign_state.get() == Int(0), # in funding phase
                     self.fund_end_date.get() < Global.latest_timestamp(), # funding window ended
-                    self.collected_funds.get() >= self.campaign_goal.get(), # campaign successful
                 )
             )
             .Then(
-                Seq( # campaign funded successfully, mint R-NFT and transfer first funds
-                    self.RNFT_id.set(self.mint_RNFT()), 
-                    self.reached_milestone.set(Int(0)),
-                    #Transfer funds_per_milestone[reached_milestone] to funds_receiver
-                    #TODO: implement
+                If(self.collected_funds.get() < self.campaign_goal.get()) # campaign unsuccessful
+                .Then(self.campaign_state.set(Int(3))) # campaign ended unsuccessfully
+                .Else(
+                    Seq( # campaign funded successfully, mint R-NFT and transfer first funds
+                        self.RNFT_id.set(self.mint_RNFT()), 
+                        self.reached_milestone.set(Int(0)),
+                        self.pay_milestone(self.reached_milestone.get()),
+                    )
                 )
             )
             .ElseIf(
                 self.campaign_state.get() == Int(2) # Campaign already funded. Milestone submitted
             )
             .Then(
-                # Reject if the voting is in progress
-                #TODO: implement -> Assert (MilestoneApprovalApp.approval_state == pending_approval)
-                # If(MilestoneApprovalApp.approval_state == approved) # Milestone approved.
-                # .Then(self.reached_milestone.increment(Int(1)))
-                # Transfer funds_per_milestone[reached_milestone] to funds_receiver
-
-                self.milestone_approval_app_id.set(Int(0)),
-                #TODO: MilestoneApprovalApp.delete()
+                Seq(
+                    approval_state,
+                    Assert(approval_state.hasValue(), comment="milestone app must be in the foreign apps"),
+                    # Reject if the voting is in progress
+                    Assert(approval_state.value() != Int(0), comment="milestone vote must be settled"),
+                    If(approval_state.value() == Int(1)) # Milestone approved
+                    .Then(
+                        Seq(
+                            self.reached_milestone.increment(Int(1)),
+                            self.pay_milestone(self.reached_milestone.get()),
+                        )
+                    ),
+                    # Milestone rejected: nothing paid, the creator can submit it again
+                    self.milestone_approval_app_id.set(Int(0)),
+                    #TODO: MilestoneApprovalApp.delete()
+                )
             )
             .Else(Reject()),
 
-            # Check that all the milestones have been completed
-            If(self.reached_milestone.get() == (self.total_milestones.get() - Int(1)))
+            # Check that all the milestones have been completed (or the campaign failed)
+            If(
+                Or(
+                    self.campaign_state.get() == Int(3),
+                    self.reached_milestone.get() == (self.total_milestones.get() - Int(1)),
+                )
+            )
             .Then(self.campaign_state.set(Int(3))) # campaign: ended
             .Else(self.campaign_state.set(Int(1))), # campaign: waiting for next milestone
+            Claim.log(self.campaign_state.get(), self.reached_milestone.get()),
             Approve()
         )
 
-    @external(authorize=Authorize.only(Global.creator_address()))
+    @inner_txns(1)
+    @external(authorize=Authorize.only(creator))
     def submit_milestone(self,
         milestone_to_approve: abi.Uint64,
         milestone_metadata: abi.String,
@@ -257,58 +379,271 @@ class CrowdfundingCampaignApp(Application):
     ):
         return Seq(
             Assert(self.campaign_state.get() == Int(1), comment="must be in waiting_for_next_milestone state"),
-            # Create the MilestoneApprovalApp
-            # creator: abi.Address,
-            # crowdfunding_address: abi.Address,
-            # milestone_to_approve: abi.Uint64,
-            # vote_end_date: abi.Uint64,
-            # milestone_metadata: abi.String,
-            InnerTxnBuilder.Begin(),
-            InnerTxnBuilder.SetFields(
+            Assert(
+                milestone_to_approve.get() == self.reached_milestone.get() + Int(1),
+                comment="must submit the next milestone"
+            ),
+            If(self.reusable_milestone_app_id.get() == Int(0))
+            .Then(
+                self.milestone_approval_app_id.set(
+                    self.create_milestone_app(milestone_to_approve.encode(), vote_end_date.encode(), milestone_metadata.encode())
+                )
+            )
+            .Else(
+                Seq(
+                    # Reset the reusable MilestoneApprovalApp (must be in the foreign apps of the call)
+                    InnerTxnBuilder.Execute(
+                        {
+                            TxnField.type_enum: TxnType.ApplicationCall,
+                            TxnField.application_id: self.reusable_milestone_app_id.get(),
+                            TxnField.fee: Int(0),
+                            TxnField.application_args: [
+                                MethodSignature("reset(uint64,uint64,string)void"),
+                                milestone_to_approve.encode(),
+                                vote_end_date.encode(),
+                                milestone_metadata.encode(),
+                            ],
+                        }
+                    ),
+                    self.milestone_approval_app_id.set(self.reusable_milestone_app_id.get()),
+                )
+            ),
+            self.milestone_submissions.increment(Int(1)),
+            self.campaign_state.set(Int(2)), # in milestone_validation phase
+            MilestoneSubmitted.log(
+                milestone_to_approve.get(), self.milestone_approval_app_id.get(), vote_end_date.get()
+            ),
+            output.set(self.milestone_approval_app_id.get())
+        )
+
+    @inner_txns(1)
+    @external(authorize=Authorize.only(creator))
+    def create_reusable_milestone_app(self, *, output: abi.Uint64): # reusable_milestone_app_id
+        # Opt in to one MilestoneApprovalApp for the whole campaign: created once here, reset by
+        # every submit_milestone instead of creating (and paying the min balance of) a new app.
+        return Seq(
+            Assert(
+                And(self.reusable_milestone_app_id.get() == Int(0), self.campaign_state.get() < Int(2)),
+                comment="must not have a reusable milestone app nor a milestone under validation"
+            ),
+            # placeholder milestone, closed vote: the first submit_milestone resets it
+            self.reusable_milestone_app_id.set(self.create_milestone_app(Itob(Int(0)), Itob(Int(0)), Bytes(b"\x00\x00"))),
+            output.set(self.reusable_milestone_app_id.get()),
+        )
+
+    @inner_txns(1)
+    @external(authorize=Authorize.opted_in(Global.current_application_id()))
+    def vote(self, milestone_app: abi.Application, vote: abi.Uint8): # vote {0: reject, 1: approve}
+        # The backer votes through the campaign: the double vote check lives in the local state
+        # the backer already has here, so no opt-in to (and no min balance for) each milestone app.
+        # The milestone apps created or reset by the campaign only count these votes (MilestoneApprovalApp.vote_mode).
+        return Seq(
+            Assert(self.campaign_state.get() == Int(2), comment="must be in milestone_validation state"),
+            Assert(
+                milestone_app.application_id() == self.milestone_approval_app_id.get(),
+                comment="must be the milestone app under validation"
+            ),
+            Assert(self.amount_backed[Txn.sender()].get() > Int(0), comment="must be a backer"),
+            Assert(
+                self.voted_submission[Txn.sender()].get() != self.milestone_submissions.get(),
+                comment="must have not yet voted"
+            ),
+            self.voted_submission[Txn.sender()].set(self.milestone_submissions.get()),
+            # the milestone app counts the vote, weighted by the amount backed (inner fee paid by the caller)
+            InnerTxnBuilder.Execute(
+                {
+                    TxnField.type_enum: TxnType.ApplicationCall,
+                    TxnField.application_id: milestone_app.application_id(),
+                    TxnField.application_args: [
+                        MethodSignature("cast_vote(address,uint8,uint64)void"),
+                        Txn.sender(),
+                        vote.encode(),
+                        Itob(self.amount_backed[Txn.sender()].get()),
+                    ],
+                    TxnField.fee: Int(0),
+                }
+            ),
+        )
+
+    @inner_txns(MAX_REFUNDS_PER_CALL)
+    @external
+    def refund(self, *, output: abi.Uint64): # refunded_backers
+        # Anyone can drain an unsuccessful campaign: every backer in the foreign accounts of the call
+        # gets its amount_backed back (inner fees paid by the caller). Backers already refunded are
+        # skipped, so a batch can be safely resubmitted.
+        i = ScratchVar(TealType.uint64)
+        backer = ScratchVar(TealType.bytes)
+        return Seq(
+            Assert(
+                And(
+                    Or(self.campaign_state.get() == Int(0), self.campaign_state.get() == Int(3)),
+                    self.fund_end_date.get() < Global.latest_timestamp(), # funding window ended
+                    self.collected_funds.get() < self.campaign_goal.get(), # campaign unsuccessful
+                ),
+                comment="campaign must be unsuccessful"
+            ),
+            self.campaign_state.set(Int(3)), # campaign ended unsuccessfully, in case claim_funds was not called
+            For(i.store(Int(1)), i.load() <= Txn.accounts.length(), i.store(i.load() + Int(1))).Do(
+                Seq(
+                    backer.store(Txn.accounts[i.load()]),
+                    If(App.optedIn(backer.load(), Global.current_application_id()))
+                    .Then(
+                        If(self.amount_backed[backer.load()].get() > Int(0))
+                        .Then(
+                            Seq(
+                                InnerTxnBuilder.Execute(
+                                    {
+                                        TxnField.type_enum: TxnType.Payment,
+                                        TxnField.receiver: backer.load(),
+                                        TxnField.amount: self.amount_backed[backer.load()].get(),
+                                        TxnField.fee: Int(0),
+                                    }
+                                ),
+                                self.amount_backed[backer.load()].set(Int(0)),
+                                self.refunded_backers.increment(Int(1)),
+                                Refund.log(backer.load(), InnerTxn.amount(), self.refunded_backers.get()),
+                            )
+                        )
+                    )
+                )
+            ),
+            output.set(self.refunded_backers.get()),
+        )
+
+    @internal(TealType.uint64)
+    def create_milestone_app(self, milestone_to_approve, vote_end_date, milestone_metadata): # ABI encoded arguments
+        app_schema = self.milestone_app.app.app_state.schema()
+        acct_schema = self.milestone_app.app.acct_state.schema()
+        return Seq(
+            # Create the MilestoneApprovalApp (inner fee paid by the caller)
+            InnerTxnBuilder.Execute(
                 {
                     TxnField.type_enum: TxnType.ApplicationCall,
                     TxnField.approval_program: self.milestone_app.approval.binary,
                     TxnField.clear_state_program: self.milestone_app.clear.binary,
-                    TxnField.global_num_uints: Int(5),
-                    TxnField.global_num_byte_slices: Int(3),
-                    TxnField.local_num_uints: Int(1),
-                    TxnField.local_num_byte_slices: Int(0),
+                    TxnField.global_num_uints: Int(app_schema.num_uints),
+                    TxnField.global_num_byte_slices: Int(app_schema.num_byte_slices),
+                    TxnField.local_num_uints: Int(acct_schema.num_uints),
+                    TxnField.local_num_byte_slices: Int(acct_schema.num_byte_slices),
                     TxnField.fee: Int(0),
                     TxnField.application_args: [
-                            MethodSignature("create(address,address,uint64,uint64,string)void"),
-                            Global.creator_address(),
-                            Global.current_application_address(),
-                            milestone_to_approve.encode(),
-                            vote_end_date.encode(),
-                            milestone_metadata.encode()
-                        ],
+                        MethodSignature("create(address,address,uint64,uint64,string)void"),
+                        self.creator.get(),
+                        Global.current_application_address(),
+                        milestone_to_approve,
+                        vote_end_date,
+                        milestone_metadata,
+                    ],
                 }
             ),
-            InnerTxnBuilder.Submit(),
-
-            # Set milestone_approval_app_id
-            self.milestone_approval_app_id.set(InnerTxn.created_application_id()),
-            
-            self.campaign_state.set(Int(2)), # in milestone_validation phase
-            output.set(self.milestone_approval_app_id.get())
+            InnerTxn.created_application_id(),
         )
 
     @Subroutine(TealType.uint64) 
     def mint_RNFT(): # output: RNFT ID
         return Int(1) #TODO: implementation
 
-    # def set_funds_per_milestone_val(self, k: abi.Uint8, v: abi.Uint64):
-    #     return self.funds_per_milestone[k].set(v.get())
+    @internal(TealType.none)
+    def set_schedule(self, funds_per_milestone: abi.DynamicArray[abi.Uint64]):
+        # uint64[] is ABI encoded as a uint16 length followed by the packed uint64s. Each page is summed
+        # from a zero padded copy, 15 unrolled reads (a loop over the 64 entries would exceed the opcode
+        # budget of create): the schedule cannot pay out more than the campaign goal.
+        packed = ScratchVar(TealType.bytes)
+        padded = ScratchVar(TealType.bytes)
+        chunk = ScratchVar(TealType.bytes)
+        page = ScratchVar(TealType.uint64)
+        start = ScratchVar(TealType.uint64)
+        total = ScratchVar(TealType.uint64)
+        return Seq(
+            packed.store(Suffix(funds_per_milestone.encode(), Int(2))),
+            padded.store(Concat(packed.load(), BytesZero(Int(SCHEDULE_PAGE_SIZE)))),
+            total.store(Int(0)),
+            For(
+                Seq(page.store(Int(0)), start.store(Int(0))),
+                start.load() < Len(packed.load()),
+                Seq(page.store(page.load() + Int(1)), start.store(start.load() + Int(SCHEDULE_PAGE_SIZE))),
+            ).Do(
+                self.funds_per_milestone[page.load()].set(
+                    Extract(
+                        packed.load(),
+                        start.load(),
+                        If(Len(packed.load()) - start.load() > Int(SCHEDULE_PAGE_SIZE))
+                        .Then(Int(SCHEDULE_PAGE_SIZE))
+                        .Else(Len(packed.load()) - start.load()),
+                    )
+                ),
+                chunk.store(Extract(padded.load(), start.load(), Int(SCHEDULE_PAGE_SIZE))),
+                total.store(Add(total.load(), *[
+                    ExtractUint64(chunk.load(), Int(8 * i)) for i in range(SCHEDULE_PAGE_ENTRIES)
+                ])),
+            ),
+            Assert(total.load() <= self.campaign_goal.get(), comment="the milestone funds exceed the campaign goal"),
+        )
+
+    @internal(TealType.uint64)
+    def milestone_funds(self, milestone):
+        return ExtractUint64(
+            self.funds_per_milestone[milestone / Int(SCHEDULE_PAGE_ENTRIES)].get(),
+            (milestone % Int(SCHEDULE_PAGE_ENTRIES)) * Int(8),
+        )
 
-    # @internal(read_only=True)
-    # def get_funds_per_milestone_val(self, k: abi.Uint8, *, output: abi.Uint64):
-    #     return output.set(self.funds_per_milestone[k])
+    @internal(TealType.none)
+    def pay_milestone(self, milestone):
+        # Transfer funds_per_milestone[milestone] in one group of inner payments (inner fees paid by the caller):
+        # share / 10000 of it to each receiver (128-bit product), the last one gets the rounding remainder.
+        split = ScratchVar(TealType.bytes)
+        receivers = ScratchVar(TealType.uint64)
+        amount = ScratchVar(TealType.uint64)
+        paid = ScratchVar(TealType.uint64)
+        i = ScratchVar(TealType.uint64)
+        receiver = ScratchVar(TealType.bytes)
+        share = ScratchVar(TealType.uint64)
+        return Seq(
+            split.store(self.payout_split.get()),
+            receivers.store(If(Len(split.load()) == Int(0)).Then(Int(1)).Else((Len(split.load()) + Int(32)) / Int(34))),
+            amount.store(self.milestone_funds(milestone)),
+            paid.store(Int(0)),
+            InnerTxnBuilder.Begin(),
+            For(i.store(Int(0)), i.load() < receivers.load(), i.store(i.load() + Int(1))).Do(
+                Seq(
+                    receiver.store(
+                        If(i.load() == Int(0))
+                        .Then(self.funds_receiver.get())
+                        .Else(Extract(split.load(), receivers.load() * Int(2) + (i.load() - Int(1)) * Int(32), Int(32)))
+                    ),
+                    share.store(
+                        If(i.load() == receivers.load() - Int(1))
+                        .Then(amount.load() - paid.load())
+                        .Else(WideRatio([amount.load(), ExtractUint16(split.load(), i.load() * Int(2))], [Int(SHARES_DENOMINATOR)]))
+                    ),
+                    paid.store(paid.load() + share.load()),
+                    If(i.load() > Int(0)).Then(InnerTxnBuilder.Next()),
+                    InnerTxnBuilder.SetFields(
+                        {
+                            TxnField.type_enum: TxnType.Payment,
+                            TxnField.receiver: receiver.load(),
+                            TxnField.amount: share.load(),
+                            TxnField.fee: Int(0),
+                        }
+                    ),
+                    Payout.log(milestone, receiver.load(), share.load()),
+                )
+            ),
+            InnerTxnBuilder.Submit(),
+        )
+
+    @external(read_only=True)
+    def get_milestone_funds(self, milestone: abi.Uint64, *, output: abi.Uint64):
+        return Seq(
+            Assert(milestone.get() < self.total_milestones.get(), comment="milestone out of range"),
+            output.set(self.milestone_funds(milestone.get())),
+        )
 
 if __name__ == "__main__":
 
     app = CrowdfundingCampaignApp()
     try:
-        app.dump("./build/crowdfundingCampaign", client=sandbox.get_algod_client())
+        default_cache().dump(app, "./build/crowdfundingCampaign", client=sandbox.get_algod_client())
         print('\n------------TEAL generation completed!------------\n')
     except Exception as err:
         print('Error: {}'.format(err))
\ No newline at end of file
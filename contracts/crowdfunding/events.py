@@ -0,0 +1,78 @@
+"""
+ARC-28 style events of the crowdfunding contracts.
+
+An event is logged as the 4 bytes selector of its signature followed by its
+ABI encoded fields, e.g. Fund(address,uint64,uint64). The same definitions
+build the PyTeal `Log` in the contracts and are written in the "events" of
+application.json (ARC-28, see CompileCache.dump) for each contract listing
+them in its EVENTS, the logs are decoded off-chain from the artifacts (see
+client/artifacts.py and client/event_stream.py), without PyTeal.
+"""
+from typing import Any
+
+from algosdk import encoding
+from pyteal import Bytes, Concat, Expr, Extract, Int, Itob, Log
+
+
+class Event:
+    """
+    Typed log event.
+
+    Args:
+    name: event name, e.g. "Fund".
+    fields: (name, ABI type) of each field. Only static types are supported:
+        uint64, uint8 and address (32 raw bytes).
+    """
+
+    ENCODERS = {
+        "uint64": lambda e: Itob(e),
+        "uint8": lambda e: Extract(Itob(e), Int(7), Int(1)),
+        "address": lambda e: e,
+    }
+
+    def __init__(self, name: str, fields: list[tuple[str, str]]):
+        for field_name, field_type in fields:
+            if field_type not in self.ENCODERS:
+                raise ValueError(f"unsupported type {field_type} of {name}.{field_name}")
+        self.name = name
+        self.fields = fields
+        self.signature = f"{name}({','.join(t for _, t in fields)})"
+        self.selector = encoding.checksum(self.signature.encode())[:4]
+
+    def log(self, *values: Expr) -> Expr:
+        """PyTeal expression logging the event, `values` are uint64 (uint64, uint8) or bytes (address) expressions."""
+        if len(values) != len(self.fields):
+            raise ValueError(f"{self.signature} takes {len(self.fields)} values, got {len(values)}")
+        encoded = [self.ENCODERS[t](v) for (_, t), v in zip(self.fields, values)]
+        return Log(Concat(Bytes(self.selector), *encoded))
+
+    def spec(self) -> dict[str, Any]:
+        """ARC-28 description of the event, as written in application.json."""
+        return {"name": self.name, "args": [{"type": t, "name": field_name} for field_name, t in self.fields]}
+
+    def __repr__(self) -> str:
+        return f"Event({self.signature})"
+
+
+# CrowdfundingCampaignApp
+Fund = Event("Fund", [("backer", "address"), ("amount", "uint64"), ("collected_funds", "uint64")])
+Claim = Event("Claim", [("campaign_state", "uint64"), ("reached_milestone", "uint64")])
+Payout = Event("Payout", [("milestone", "uint64"), ("receiver", "address"), ("amount", "uint64")])
+MilestoneSubmitted = Event(
+    "MilestoneSubmitted", [("milestone", "uint64"), ("milestone_app_id", "uint64"), ("vote_end_date", "uint64")]
+)
+Refund = Event("Refund", [("backer", "address"), ("amount", "uint64"), ("refunded_backers", "uint64")])
+
+# MilestoneApprovalApp
+Vote = Event("Vote", [("voter", "address"), ("vote", "uint8"), ("weight", "uint64")])
+VoteSettled = Event(
+    "VoteSettled", [("approval_state", "uint8"), ("approve_votes", "uint64"), ("reject_votes", "uint64")]
+)
+
+# CampaignFactoryApp
+CampaignCreated = Event("CampaignCreated", [("creator", "address"), ("campaign_app_id", "uint64")])
+
+CAMPAIGN_EVENTS = [Fund, Claim, Payout, MilestoneSubmitted, Refund]
+MILESTONE_EVENTS = [Vote, VoteSettled]
+FACTORY_EVENTS = [CampaignCreated]
+ALL_EVENTS = CAMPAIGN_EVENTS + MILESTONE_EVENTS + FACTORY_EVENTS
@@ -11,6 +11,7 @@ from pyteal import (
     Reject,
     If,
     And,
+    Expr,
 )
 
 from beaker.application import Application
@@ -21,33 +22,44 @@ from beaker.state import (
 
 from beaker.decorators import (
     external,
+    internal,
     create,
     opt_in,
+    Authorize,
 )
 
+try:
+    from contracts.crowdfunding.events import MILESTONE_EVENTS, Vote, VoteSettled
+    from contracts.crowdfunding.state_types import ADDRESS, STRING, value_type
+except ModuleNotFoundError: # executed as a script
+    from events import MILESTONE_EVENTS, Vote, VoteSettled
+    from state_types import ADDRESS, STRING, value_type
+
 
 class MilestoneApprovalApp(Application):
 
+    EVENTS = MILESTONE_EVENTS # written in application.json, decoded by the clients
+
     # global states
-    creator: Final[ApplicationStateValue] = ApplicationStateValue(
+    creator: Final[ApplicationStateValue] = value_type(ApplicationStateValue(
         stack_type=TealType.bytes,
         descr="Creator of the crowdfunding campaign.",
-    )
+    ), ADDRESS)
     
-    crowdfunding_address: Final[ApplicationStateValue] = ApplicationStateValue(
+    crowdfunding_address: Final[ApplicationStateValue] = value_type(ApplicationStateValue(
         stack_type=TealType.bytes,
         descr="Crowdfunding campaign application address.",
-    )
+    ), ADDRESS)
 
     milestone_to_approve: Final[ApplicationStateValue] = ApplicationStateValue(
         stack_type=TealType.uint64,
         descr="Milestone number to be approved.",
     )
     
-    milestone_metadata: Final[ApplicationStateValue] = ApplicationStateValue(
+    milestone_metadata: Final[ApplicationStateValue] = value_type(ApplicationStateValue(
         stack_type=TealType.bytes,
         descr="IPFS metadata link providing evidence about the reached milestone.",
-    )
+    ), STRING)
     
     vote_end_date: Final[ApplicationStateValue] = ApplicationStateValue(
         stack_type=TealType.uint64,
@@ -70,12 +82,28 @@ class MilestoneApprovalApp(Application):
             [pending_approval:0, approved:1, rejected:2].",
     )
 
+    vote_round: Final[ApplicationStateValue] = ApplicationStateValue(
+        stack_type=TealType.uint64,
+        descr="Number of resets by the crowdfunding campaign (reusable milestone app), namespaces the votes.",
+    )
+
+    vote_mode: Final[ApplicationStateValue] = ApplicationStateValue(
+        stack_type=TealType.uint64,
+        descr="How the votes of the milestone are counted, fixed by create and reset: \
+            [opt_in and vote ballots of a standalone app:1, cast_vote of the crowdfunding campaign owning the app:2].",
+    )
+
     # local states
     account_votes: Final[AccountStateValue] = AccountStateValue(
         stack_type=TealType.uint64,
         descr="Total amount of Lymph used to weight the user vote.",
     )
 
+    voted_round: Final[AccountStateValue] = AccountStateValue(
+        stack_type=TealType.uint64,
+        descr="vote_round of the last vote of the account.",
+    )
+
     @create
     def create(self,
         creator: abi.Address,
@@ -91,33 +119,111 @@ class MilestoneApprovalApp(Application):
             self.milestone_to_approve.set(milestone_to_approve.get()),
             self.vote_end_date.set(vote_end_date.get()),
             self.milestone_metadata.set(milestone_metadata.get()),
-            self.approval_state.set(Int(0))
+            self.approval_state.set(Int(0)),
+            # Created by the crowdfunding campaign (submit_milestone, create_reusable_milestone_app): only the
+            # weighted votes it casts count. Fixed here, so that no ballot can choose the mode of the milestone.
+            self.vote_mode.set(
+                If(
+                    And(
+                        Global.caller_app_id() != Int(0),
+                        Global.caller_app_address() == crowdfunding_address.get(),
+                    ),
+                    Int(2),
+                    Int(1),
+                )
+            ),
         )
 
     @opt_in
     def opt_in(self, vote: abi.Uint8): # vote {0: reject, 1: approve}
+        # The votes of a milestone app owned by a campaign are cast through the campaign (weighted by the
+        # amount backed): no ballot by opt-in, a backer must not vote both ways, in two units.
         return Seq(
+            Assert(self.vote_mode.get() == Int(1), comment="votes of this milestone are cast through the campaign"),
             self.initialize_account_state(),
             If(Txn.sender() != self.creator.get())
             .Then(
                 Seq(
                     #TODO: check amount of Lymph and set account votes accordingly
-                    # If zero Reject()
+                    # If zero Reject()
                     self.account_votes.set(Int(1)),
-                    # cast the vote
-                    If(vote.get() == Int(0)) # reject the milestone
-                    .Then(
-                        self.reject_votes.increment(self.account_votes.get())
-                    )
-                    .ElseIf(vote.get() == Int(1)) # approve the milestone
-                    .Then(
-                        self.approve_votes.increment(self.account_votes.get())
-                    )
-                    .Else(Reject())
+                    self.voted_round.set(self.vote_round.get()),
+                    self.count_vote(Txn.sender(), vote.get(), self.account_votes.get()),
                 )
             )
         )
 
+    @external(authorize=Authorize.opted_in(Global.current_application_id()))
+    def vote(self, vote: abi.Uint8): # vote {0: reject, 1: approve}
+        # Vote of an account still opted in since a previous milestone (reusable milestone app)
+        return Seq(
+            Assert(Txn.sender() != self.creator.get(), comment="creator must not vote"),
+            Assert(self.voted_round.get() != self.vote_round.get(), comment="must have not yet voted"),
+            Assert(
+                And(
+                    Global.latest_timestamp() <= self.vote_end_date.get(),
+                    self.approval_state.get() == Int(0) # pending_approval
+                ),
+                comment="vote window must be open"
+            ),
+            Assert(self.vote_mode.get() == Int(1), comment="votes of this milestone are cast through the campaign"),
+            self.voted_round.set(self.vote_round.get()),
+            self.count_vote(Txn.sender(), vote.get(), self.account_votes.get()),
+        )
+
+    @external
+    def cast_vote(self, voter: abi.Address, vote: abi.Uint8, weight: abi.Uint64): # vote {0: reject, 1: approve}
+        # Opt-in free vote, forwarded by CrowdfundingCampaignApp.vote which checks double votes and the weight
+        return Seq(
+            Assert(
+                Global.caller_app_address() == self.crowdfunding_address.get(),
+                comment="must be called by the crowdfunding campaign"
+            ),
+            Assert(
+                And(
+                    Global.latest_timestamp() <= self.vote_end_date.get(),
+                    self.approval_state.get() == Int(0) # pending_approval
+                ),
+                comment="vote window must be open"
+            ),
+            Assert(self.vote_mode.get() == Int(2), comment="votes of this milestone are counted by opt_in and vote"),
+            self.count_vote(voter.get(), vote.get(), weight.get()),
+        )
+
+    @external
+    def reset(self,
+        milestone_to_approve: abi.Uint64,
+        vote_end_date: abi.Uint64,
+        milestone_metadata: abi.String,
+    ):
+        # Reusable milestone app: the crowdfunding campaign submits its next milestone to the same app,
+        # the votes of the previous one are dropped (and the accounts opted in can vote again).
+        return Seq(
+            Assert(
+                Global.caller_app_address() == self.crowdfunding_address.get(),
+                comment="must be called by the crowdfunding campaign"
+            ),
+            self.milestone_to_approve.set(milestone_to_approve.get()),
+            self.vote_end_date.set(vote_end_date.get()),
+            self.milestone_metadata.set(milestone_metadata.get()),
+            self.approve_votes.set(Int(0)),
+            self.reject_votes.set(Int(0)),
+            self.approval_state.set(Int(0)),
+            self.vote_mode.set(Int(2)), # the votes of the campaign resetting the app, whoever created it
+            self.vote_round.increment(Int(1)),
+        )
+
+    @internal(TealType.none)
+    def count_vote(self, voter: Expr, vote: Expr, weight: Expr):
+        return Seq(
+            If(vote == Int(0)) # reject the milestone
+            .Then(self.reject_votes.increment(weight))
+            .ElseIf(vote == Int(1)) # approve the milestone
+            .Then(self.approve_votes.increment(weight))
+            .Else(Reject()),
+            Vote.log(voter, vote, weight),
+        )
+
     @external
     def vote_settling(self):
         return Seq(
@@ -136,7 +242,8 @@ class MilestoneApprovalApp(Application):
                     # TODO: Mint M-NFT and transfer it to parent CrowdfundingCampaingApp
                     self.approval_state.set(Int(1))
                 )
-            ).Else(self.approval_state.set(Int(2))) # milestone rejected
+            ).Else(self.approval_state.set(Int(2))), # milestone rejected
+            VoteSettled.log(self.approval_state.get(), self.approve_votes.get(), self.reject_votes.get()),
         )
 
 
@@ -0,0 +1,72 @@
+import os
+import sys
+from typing import Final
+
+from beaker import sandbox
+
+try:
+    from contracts.crowdfunding.crowdfundingCampaign import CrowdfundingCampaignApp
+except ModuleNotFoundError: # executed as a script, make the project root importable
+    sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+    from contracts.crowdfunding.crowdfundingCampaign import CrowdfundingCampaignApp
+
+from contracts.compile_cache import default_cache
+from contracts.crowdfunding.packed_state import PackedState
+
+NO_MILESTONE = 0xFFFFFFFFFFFFFFFF # reached_milestone before the funding succeeds
+
+
+class PackedCrowdfundingCampaignApp(CrowdfundingCampaignApp):
+    """
+    CrowdfundingCampaignApp with its uint64 global state packed in two byte slices (see packed_state.py).
+
+    Same methods and behaviour: the 13 uint64 entries become fields of `cfg`, set once by create, and of
+    `st`, updated by the campaign. The app takes 2 byte slices instead of 13 uints of global schema.
+    """
+
+    config: Final[PackedState] = PackedState(
+        "cfg",
+        [("campaign_goal", 0), ("fund_start_date", 0), ("fund_end_date", 0), ("total_milestones", 0)],
+        descr="Campaign parameters, set by create.",
+    )
+
+    progress: Final[PackedState] = PackedState(
+        "st",
+        [
+            ("collected_funds", 0),
+            ("total_backers", 0),
+            ("reached_milestone", NO_MILESTONE),
+            ("campaign_state", 0),
+            ("milestone_approval_app_id", 0),
+            ("reusable_milestone_app_id", 0),
+            ("milestone_submissions", 0),
+            ("refunded_backers", 0),
+            ("RNFT_id", 0),
+        ],
+        descr="Progress of the campaign.",
+    )
+
+    campaign_goal = config.field("campaign_goal")
+    fund_start_date = config.field("fund_start_date")
+    fund_end_date = config.field("fund_end_date")
+    total_milestones = config.field("total_milestones")
+
+    collected_funds = progress.field("collected_funds")
+    total_backers = progress.field("total_backers")
+    reached_milestone = progress.field("reached_milestone")
+    campaign_state = progress.field("campaign_state")
+    milestone_approval_app_id = progress.field("milestone_approval_app_id")
+    reusable_milestone_app_id = progress.field("reusable_milestone_app_id")
+    milestone_submissions = progress.field("milestone_submissions")
+    refunded_backers = progress.field("refunded_backers")
+    RNFT_id = progress.field("RNFT_id")
+
+
+if __name__ == "__main__":
+
+    app = PackedCrowdfundingCampaignApp()
+    try:
+        default_cache().dump(app, "./build/packedCrowdfundingCampaign", client=sandbox.get_algod_client())
+        print('\n------------TEAL generation completed!------------\n')
+    except Exception as err:
+        print('Error: {}'.format(err))
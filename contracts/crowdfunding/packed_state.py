@@ -0,0 +1,102 @@
+"""
+uint64 global state fields packed in fixed-layout byte slices.
+
+Every ApplicationStateValue takes a global state entry: its key is stored on
+chain and each uint64 entry adds 28,500 microAlgos to the min balance of the
+app. A PackedState is one byte slice entry (50,000 microAlgos) with a short
+key, holding up to 15 uint64 fields at fixed offsets: field i is the big
+endian uint64 at bytes [8 i, 8 i + 8). Its fields are typed accessors with
+the get / set / increment / decrement of an ApplicationStateValue, so the
+contract code reads the same:
+
+    progress: Final[PackedState] = PackedState("st", [("collected_funds", 0), ("campaign_state", 0)])
+    collected_funds = progress.field("collected_funds")
+    ...
+    self.collected_funds.increment(funding.get().amount())
+
+The same definition decodes the value off-chain (`decode`). The layout is
+also written in application.json (the "fields" of the entry in the global
+schema, see CompileCache.dump), for the clients of client/artifacts.py.
+"""
+from typing import Any
+
+from beaker.state import ApplicationStateValue
+from pyteal import Bytes, Expr, ExtractUint64, Int, Itob, Replace, TealType, TealTypeError
+
+MAX_FIELDS = 15 # 120 bytes of value, up to 8 bytes left for the key
+
+
+class PackedField:
+    """uint64 field of a PackedState, at byte `offset` of its value."""
+
+    def __init__(self, state: "PackedState", name: str, offset: int):
+        self.state = state
+        self.name = name
+        self.offset = offset
+
+    def get(self) -> Expr:
+        return ExtractUint64(self.state.get(), Int(self.offset))
+
+    def set(self, val: Expr) -> Expr:
+        if val.type_of() != TealType.uint64:
+            raise TealTypeError(val.type_of(), TealType.uint64)
+        return self.state.set(Replace(self.state.get(), Int(self.offset), Itob(val)))
+
+    def increment(self, cnt: Expr = Int(1)) -> Expr:
+        return self.set(self.get() + cnt)
+
+    def decrement(self, cnt: Expr = Int(1)) -> Expr:
+        return self.set(self.get() - cnt)
+
+    def __str__(self) -> str:
+        return f"PackedField {self.state.str_key()}.{self.name}"
+
+
+class PackedState(ApplicationStateValue):
+    """
+    Global byte slice holding uint64 fields at fixed offsets.
+
+    Args:
+    key: global state key, keep it short (key and value share 128 bytes).
+    fields: (name, default) of each field, in layout order.
+    descr: description of the entry, the field names are appended.
+    """
+
+    def __init__(self, key: str, fields: list[tuple[str, int]], descr: str = None):
+        if not 0 < len(fields) <= MAX_FIELDS:
+            raise ValueError(f"a PackedState holds 1 to {MAX_FIELDS} fields, got {len(fields)}")
+        if len(key) + 8 * len(fields) > 128:
+            raise ValueError(f"key {key!r} and {len(fields)} fields exceed the 128 bytes of a global state entry")
+        self.field_names = [name for name, _ in fields]
+        initial = b"".join(default.to_bytes(8, "big") for _, default in fields)
+        layout = f"Packed uint64 fields: {', '.join(self.field_names)}."
+        super().__init__(
+            stack_type=TealType.bytes,
+            key=Bytes(key),
+            default=Bytes(initial),
+            descr=f"{descr} {layout}" if descr else layout,
+        )
+
+    def field(self, name: str) -> PackedField:
+        """Accessor of the field `name`."""
+        return PackedField(self, name, 8 * self.field_names.index(name))
+
+    def decode(self, value: bytes) -> dict[str, int]:
+        """Fields of a value of this entry read off-chain."""
+        return unpack(value, self.field_names)
+
+
+def unpack(value: bytes, fields: list[str]) -> dict[str, int]:
+    """uint64 fields packed in `value`, in layout order."""
+    return {name: int.from_bytes(value[8 * i:8 * i + 8], "big") for i, name in enumerate(fields)}
+
+
+def packed_layouts(app: Any) -> dict[str, list[str]]:
+    """Packed entries of an Application (class or instance): global state key -> field names."""
+    app_cls = app if isinstance(app, type) else type(app)
+    layouts = {}
+    for cls in reversed(app_cls.__mro__):
+        for value in vars(cls).values():
+            if isinstance(value, PackedState):
+                layouts[value.str_key()] = value.field_names
+    return layouts
@@ -0,0 +1,66 @@
+"""
+Value types of the byte slice state entries.
+
+TEAL only knows uint64 and bytes: the schema of application.json tells that a
+value is bytes, not whether it holds an address, a text or packed integers.
+A state value wrapped in value_type declares what its bytes hold, the type is
+written next to the entry in the schema of application.json (see
+CompileCache.dump) and client/artifacts.py decodes the state by it:
+- "address": 32 bytes public key, decoded to its address;
+- "string": utf-8 text;
+- "bytes": opaque bytes, also the type of an undeclared byte slice;
+- "uint64[]": big endian uint64 array. A reserved value is paged over the keys
+  `key_prefix` + one byte page index, `page_entries` uint64 per page, and
+  `length` names the uint64 entry of the same state holding the array length.
+"""
+from typing import Any, Optional
+
+ADDRESS = "address"
+STRING = "string"
+BYTES = "bytes"
+UINT64_ARRAY = "uint64[]"
+VALUE_TYPES = (ADDRESS, STRING, BYTES, UINT64_ARRAY)
+
+VALUE_TYPE_ATTR = "__value_type__"
+
+
+def value_type(
+    state_value: Any,
+    type_name: str,
+    key_prefix: str = None,
+    page_entries: int = None,
+    length: str = None,
+) -> Any:
+    """
+    Declare the type of the bytes held by a beaker state value, returned as is:
+
+        creator: Final[ApplicationStateValue] = value_type(
+            ApplicationStateValue(stack_type=TealType.bytes, descr="..."), ADDRESS
+        )
+    """
+    if type_name not in VALUE_TYPES:
+        raise ValueError(f"unknown value type {type_name}, expected one of {', '.join(VALUE_TYPES)}")
+    declared = {"value_type": type_name}
+    if key_prefix is not None:
+        declared["key_prefix"] = key_prefix
+    if page_entries is not None:
+        declared["page_entries"] = page_entries
+    if length is not None:
+        declared["length"] = length
+    setattr(state_value, VALUE_TYPE_ATTR, declared)
+    return state_value
+
+
+def declared_value_type(state_value: Any) -> Optional[dict[str, Any]]:
+    """Type declared by value_type on a state value ({"value_type": ..., layout}), None if not declared."""
+    return getattr(state_value, VALUE_TYPE_ATTR, None)
+
+
+def state_value_types(app: Any) -> dict[tuple[str, str], dict[str, dict[str, Any]]]:
+    """Declared types of the state values of an Application: (scope, kind) of its schema -> name -> type."""
+    declared = {}
+    for scope, state in (("global", app.app_state), ("local", app.acct_state)):
+        for kind, values in (("declared", state.declared_vals), ("reserved", state.reserved_vals)):
+            types = {name: declared_value_type(value) for name, value in values.items()}
+            declared[(scope, kind)] = {name: t for name, t in types.items() if t is not None}
+    return declared
@@ -0,0 +1,58 @@
+"""
+Static fee annotations of the ABI methods issuing inner transactions.
+
+The contracts set the fee of their inner transactions to 0: the caller pays
+them by pooling (1 + inner transactions) fees on the outer app call. A method
+annotated with @inner_txns(n) declares the most inner transactions it issues,
+client/fees.py prices its calls from it without a dryrun. A method whose
+inner transactions depend on the call (e.g. the payout receivers of
+claim_funds) is annotated with @inner_txns(n, varies=True): n is only its
+bound, FeePlanner dryruns each of its calls for the exact count. The
+annotations are also written in the "hints" of application.json (see
+CompileCache.dump), for the clients loaded from the artifacts.
+"""
+from typing import Any, Callable, Optional
+
+INNER_TXNS_ATTR = "__inner_txns__"
+INNER_TXNS_VARY_ATTR = "__inner_txns_vary__"
+
+
+def inner_txns(count: int, varies: bool = False) -> Callable:
+    """
+    Declare that the decorated method issues at most `count` inner transactions (all depths), above @external:
+
+        @inner_txns(1)
+        @external(authorize=Authorize.only(creator))
+        def submit_milestone(self, ...): ...
+
+    `varies` marks a count depending on the call, priced by a dryrun of each call (client/fees.py FeePlanner).
+    """
+
+    def _impl(fn):
+        setattr(fn, INNER_TXNS_ATTR, count)
+        if varies:
+            setattr(fn, INNER_TXNS_VARY_ATTR, True)
+        return fn
+
+    return _impl
+
+
+def declared_inner_txns(fn: Any) -> Optional[int]:
+    """Inner transactions declared by @inner_txns on a method handler, None if not annotated."""
+    return getattr(fn, INNER_TXNS_ATTR, None)
+
+
+def inner_txns_vary(fn: Any) -> bool:
+    """Whether the inner transactions declared on a method handler depend on the call."""
+    return getattr(fn, INNER_TXNS_VARY_ATTR, False)
+
+
+def method_inner_txns(app_cls: type) -> dict[str, tuple[int, bool]]:
+    """Annotated methods of an Application class: method name -> (inner transactions, whether they vary)."""
+    declared = {}
+    for cls in reversed(app_cls.__mro__):
+        for name, value in vars(cls).items():
+            count = declared_inner_txns(value)
+            if count is not None:
+                declared[name] = (count, inner_txns_vary(value))
+    return declared
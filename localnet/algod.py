@@ -0,0 +1,387 @@
+"""
+AlgodClient served by the in-memory Ledger instead of an algod node.
+
+`LocalAlgodClient` is a drop-in replacement for the sandbox client: beaker's
+ApplicationClient, the AtomicTransactionComposer and the demo scripts use it
+unchanged, every REST call is answered in-process.
+"""
+import base64
+from typing import Any, Optional
+
+import msgpack
+from algosdk import account, encoding
+from algosdk.atomic_transaction_composer import AccountTransactionSigner
+from algosdk.error import AlgodHTTPError
+from algosdk.future import transaction
+from algosdk.v2client.algod import AlgodClient
+from beaker.sandbox.kmd import SandboxAccount
+
+from localnet import teal
+from localnet.clock import VirtualClock
+from localnet.ledger import APP_BUDGET, Ledger, LedgerError, Txn, Block, AppParams
+
+CONSENSUS_VERSION = "https://github.com/algorandfoundation/specs/tree/d5ac876d7ede07367dbaa26e149aa42589aac1f7"
+DEFAULT_ACCOUNT_FUNDS = 100_000_000_000 # 100k Algos
+
+
+class LocalAlgodClient(AlgodClient):
+    """
+    AlgodClient answering requests from a local Ledger.
+
+    Args:
+    ledger: ledger to query and submit to, a new one (with a new VirtualClock) if omitted.
+    """
+
+    def __init__(self, ledger: Ledger = None):
+        super().__init__("", "http://localnet")
+        self.ledger = ledger if ledger is not None else Ledger()
+
+    @property
+    def clock(self) -> VirtualClock:
+        return self.ledger.clock
+
+    def algod_request(self, method, requrl, params=None, data=None, headers=None, response_format="json"):
+        parts = [p for p in requrl.split("/") if p]
+        try:
+            result = self._route(method, parts, params or {}, data)
+        except LedgerError as e:
+            raise AlgodHTTPError(e.algod_message(), 400)
+        except teal.TealAssemblyError as e:
+            raise AlgodHTTPError(str(e), 400)
+        if response_format == "msgpack":
+            return msgpack.packb(result, use_bin_type=True)
+        return result
+
+    # ------------------------------------------------------------ routing
+
+    def _route(self, method: str, parts: list[str], params: dict, data: Optional[bytes]) -> Any:
+        ledger = self.ledger
+        match method, parts:
+            case "POST", ["transactions"]:
+                return {"txId": self._send(data)}
+            case "GET", ["transactions", "params"]:
+                return {
+                    "consensus-version": CONSENSUS_VERSION,
+                    "fee": 0,
+                    "genesis-hash": ledger.genesis_hash,
+                    "genesis-id": ledger.genesis_id,
+                    "last-round": ledger.round,
+                    "min-fee": ledger.min_fee,
+                }
+            case "GET", ["transactions", "pending", txid]:
+                txn = ledger.txns.get(txid)
+                if txn is None:
+                    raise AlgodHTTPError("txn does not exist", 404)
+                return self._pending_info(txn)
+            case "GET", ["status"]:
+                return self._status()
+            case "GET", ["status", "wait-for-block-after", round_num]:
+                if not ledger.auto_commit and ledger.pending:
+                    ledger.commit_block()
+                elif ledger.round <= int(round_num):
+                    ledger.commit_block() # an empty block, as a dev mode node would not advance
+                return self._status()
+            case "GET", ["blocks", round_num]:
+                r = int(round_num)
+                if r > ledger.round:
+                    raise AlgodHTTPError(f"failed to retrieve information from the ledger: round {r} not available", 404)
+                return {"block": _block_dict(ledger, ledger.blocks[r])}
+            case "GET", ["blocks", round_num, "txids"]:
+                r = int(round_num)
+                if r > ledger.round:
+                    raise AlgodHTTPError(f"failed to retrieve information from the ledger: round {r} not available", 404)
+                return {"blockTxids": [txn.txid for txn in ledger.blocks[r].txns]}
+            case "GET", ["applications", app_id]:
+                app = ledger.apps.get(int(app_id))
+                if app is None:
+                    raise AlgodHTTPError("application does not exist", 404)
+                return _app_dict(app)
+            case "GET", ["accounts", address]:
+                return self._account_info(address)
+            case "GET", ["accounts", address, "applications", app_id]:
+                return self._account_app_info(address, int(app_id))
+            case "POST", ["teal", "dryrun"]:
+                return self._dryrun(data)
+            case "POST", ["teal", "compile"]:
+                return teal.compile_response(data.decode("utf-8"))
+            case "GET", ["health"]:
+                return None
+            case "GET", ["versions"]:
+                return {"genesis-id": ledger.genesis_id, "genesis-hash": ledger.genesis_hash, "versions": ["v2"]}
+        raise AlgodHTTPError(f"{method} {'/'.join(parts)} not supported by the local ledger", 404)
+
+    def _send(self, data: bytes) -> str:
+        unpacker = msgpack.Unpacker(raw=False)
+        unpacker.feed(data)
+        stxns = [encoding.future_msgpack_decode(d) for d in unpacker]
+        if not stxns:
+            raise LedgerError("empty transaction group")
+        txns = self.ledger.submit(stxns)
+        return txns[0].txid
+
+    def _dryrun(self, data: bytes) -> dict[str, Any]:
+        """
+        Evaluate the request transactions against the current ledger state without committing.
+
+        The accounts/apps snapshot of the request is ignored: clients build it from this
+        same ledger (see transaction.create_dryrun).
+        """
+        request = msgpack.unpackb(data, raw=False, strict_map_key=False)
+        txns = []
+        for d in request.get("txns", []):
+            sdk_txn = encoding.future_msgpack_decode(d)
+            if isinstance(sdk_txn, transaction.SignedTransaction):
+                sdk_txn = sdk_txn.transaction
+            txn = Txn.from_sdk(sdk_txn)
+            txn.txid = sdk_txn.get_txid()
+            txns.append(txn)
+        error = None
+        try:
+            self.ledger.simulate(txns)
+        except LedgerError as e:
+            error = e
+        results = []
+        for txn in txns:
+            result = _txn_apply_data(txn)
+            result["disassembly"] = []
+            if txn.type == "appl":
+                result["budget-consumed"] = txn.cost
+                result["budget-added"] = APP_BUDGET
+                if error is not None and error.txid == txn.txid:
+                    result["app-call-messages"] = ["ApprovalProgram", "REJECT", error.msg]
+                else:
+                    result["app-call-messages"] = ["ApprovalProgram", "PASS"]
+            results.append(result)
+        return {"error": "", "protocol-version": CONSENSUS_VERSION, "txns": results}
+
+    # ------------------------------------------------------------ responses
+
+    def _status(self) -> dict[str, Any]:
+        return {
+            "catchup-time": 0,
+            "last-round": self.ledger.round,
+            "last-version": CONSENSUS_VERSION,
+            "next-version": CONSENSUS_VERSION,
+            "next-version-round": self.ledger.round + 1,
+            "next-version-supported": True,
+            "stopped-at-unsupported-round": False,
+            "time-since-last-round": 0,
+        }
+
+    def _pending_info(self, txn: Txn) -> dict[str, Any]:
+        info = _txn_apply_data(txn)
+        info["txn"] = _signed_txn_dict(txn)
+        info["pool-error"] = ""
+        if txn.confirmed_round:
+            info["confirmed-round"] = txn.confirmed_round
+        return info
+
+    def _account_info(self, address: str) -> dict[str, Any]:
+        ledger = self.ledger
+        acct = ledger.accounts.get(address)
+        balance = acct.balance if acct is not None else 0
+        local_states = acct.local_states if acct is not None else {}
+        created = [ledger.apps[i] for i in acct.created_apps] if acct is not None else []
+        return {
+            "address": address,
+            "amount": balance,
+            "amount-without-pending-rewards": balance,
+            "min-balance": ledger.min_balance(address),
+            "apps-local-state": [_local_state_dict(ledger, app_id, kv) for app_id, kv in local_states.items()],
+            "apps-total-schema": {
+                "num-uint": sum(ledger.apps[i].local_num_uints for i in local_states if i in ledger.apps),
+                "num-byte-slice": sum(ledger.apps[i].local_num_byte_slices for i in local_states if i in ledger.apps),
+            },
+            "assets": [],
+            "created-apps": [_app_dict(app) for app in created],
+            "created-assets": [],
+            "pending-rewards": 0,
+            "reward-base": 0,
+            "rewards": 0,
+            "round": ledger.round,
+            "status": "Offline",
+            "total-apps-opted-in": len(local_states),
+            "total-created-apps": len(created),
+            "total-assets-opted-in": 0,
+            "total-created-assets": 0,
+        }
+
+    def _account_app_info(self, address: str, app_id: int) -> dict[str, Any]:
+        ledger = self.ledger
+        acct = ledger.accounts.get(address)
+        result: dict[str, Any] = {"round": ledger.round}
+        if acct is not None and app_id in acct.local_states:
+            result["app-local-state"] = _local_state_dict(ledger, app_id, acct.local_states[app_id])
+        if acct is not None and app_id in acct.created_apps:
+            result["created-app"] = _app_dict(ledger.apps[app_id])["params"]
+        if len(result) == 1:
+            raise AlgodHTTPError("account application info not found", 404)
+        return result
+
+
+def get_accounts(client: LocalAlgodClient, n: int = 3, amount: int = DEFAULT_ACCOUNT_FUNDS) -> list[SandboxAccount]:
+    """
+    Generate `n` accounts funded with `amount` microAlgos in the local ledger.
+
+    Counterpart of `beaker.sandbox.get_accounts` for LocalAlgodClient.
+    """
+    accounts = []
+    for _ in range(n):
+        private_key, address = account.generate_account()
+        client.ledger.fund(address, amount)
+        accounts.append(SandboxAccount(address, private_key, AccountTransactionSigner(private_key)))
+    return accounts
+
+
+# ---------------------------------------------------------------- encoding
+
+def _b64(b: bytes) -> str:
+    return base64.b64encode(b).decode("utf8")
+
+
+def _tealvalue(v: Any) -> dict[str, Any]:
+    if isinstance(v, int):
+        return {"type": 2, "bytes": "", "uint": v}
+    return {"type": 1, "bytes": _b64(v), "uint": 0}
+
+
+def _key_values(state: dict[bytes, Any]) -> list[dict[str, Any]]:
+    return [{"key": _b64(k), "value": _tealvalue(v)} for k, v in state.items()]
+
+
+def _app_dict(app: AppParams) -> dict[str, Any]:
+    params = {
+        "creator": app.creator,
+        "approval-program": _b64(app.approval_program),
+        "clear-state-program": _b64(app.clear_program),
+        "global-state-schema": {"num-uint": app.global_num_uints, "num-byte-slice": app.global_num_byte_slices},
+        "local-state-schema": {"num-uint": app.local_num_uints, "num-byte-slice": app.local_num_byte_slices},
+    }
+    if app.extra_pages:
+        params["extra-program-pages"] = app.extra_pages
+    if app.global_state:
+        params["global-state"] = _key_values(app.global_state)
+    return {"id": app.app_id, "params": params}
+
+
+def _local_state_dict(ledger: Ledger, app_id: int, state: dict[bytes, Any]) -> dict[str, Any]:
+    app = ledger.apps.get(app_id)
+    result = {
+        "id": app_id,
+        "schema": {
+            "num-uint": app.local_num_uints if app else 0,
+            "num-byte-slice": app.local_num_byte_slices if app else 0,
+        },
+    }
+    if state:
+        result["key-value"] = _key_values(state)
+    return result
+
+
+def _delta(delta: dict[bytes, Any]) -> list[dict[str, Any]]:
+    result = []
+    for k, v in delta.items():
+        if v is None:
+            value = {"action": 3}
+        elif isinstance(v, int):
+            value = {"action": 2, "uint": v}
+        else:
+            value = {"action": 1, "bytes": _b64(v)}
+        result.append({"key": _b64(k), "value": value})
+    return result
+
+
+def _signed_txn_dict(txn: Txn) -> dict[str, Any]:
+    if txn.signed is None:
+        return _inner_txn_dict(txn)
+    return _jsonable(txn.signed.dictify())
+
+
+def _inner_txn_dict(txn: Txn) -> dict[str, Any]:
+    """Msgpack-style dict of an inner transaction (no signature)."""
+    fields: dict[str, Any] = {
+        "type": txn.type,
+        "snd": encoding.decode_address(txn.sender),
+        "fee": txn.fee,
+        "fv": txn.first_valid,
+        "lv": txn.last_valid,
+    }
+    if txn.note:
+        fields["note"] = txn.note
+    if txn.type == "pay":
+        fields["rcv"] = encoding.decode_address(txn.receiver)
+        fields["amt"] = txn.amount
+        if txn.close_remainder_to:
+            fields["close"] = encoding.decode_address(txn.close_remainder_to)
+    else:
+        if txn.app_id:
+            fields["apid"] = txn.app_id
+        if txn.on_complete:
+            fields["apan"] = txn.on_complete
+        if txn.app_args:
+            fields["apaa"] = txn.app_args
+        if txn.accounts:
+            fields["apat"] = [encoding.decode_address(a) for a in txn.accounts]
+        if txn.foreign_apps:
+            fields["apfa"] = txn.foreign_apps
+        if txn.approval_program:
+            fields["apap"] = txn.approval_program
+        if txn.clear_program:
+            fields["apsu"] = txn.clear_program
+        if txn.global_num_uints or txn.global_num_byte_slices:
+            fields["apgs"] = {"nui": txn.global_num_uints, "nbs": txn.global_num_byte_slices}
+        if txn.local_num_uints or txn.local_num_byte_slices:
+            fields["apls"] = {"nui": txn.local_num_uints, "nbs": txn.local_num_byte_slices}
+    return {"txn": _jsonable(fields)}
+
+
+def _jsonable(v: Any) -> Any:
+    if isinstance(v, bytes):
+        return _b64(v)
+    if isinstance(v, dict):
+        return {k: _jsonable(x) for k, x in v.items()}
+    if isinstance(v, list):
+        return [_jsonable(x) for x in v]
+    return v
+
+
+def _txn_apply_data(txn: Txn) -> dict[str, Any]:
+    info: dict[str, Any] = {}
+    if txn.logs:
+        info["logs"] = [_b64(log) for log in txn.logs]
+    if txn.created_app_id:
+        info["application-index"] = txn.created_app_id
+    if txn.global_delta:
+        info["global-state-delta"] = _delta(txn.global_delta)
+    if txn.local_delta:
+        info["local-state-delta"] = [
+            {"address": addr, "delta": _delta(delta)} for addr, delta in txn.local_delta.items()
+        ]
+    if txn.closing_amount:
+        info["closing-amount"] = txn.closing_amount
+    if txn.inner_txns:
+        inner = []
+        for itxn in txn.inner_txns:
+            d = _txn_apply_data(itxn)
+            d.update(_inner_txn_dict(itxn))
+            d["pool-error"] = ""
+            d["confirmed-round"] = txn.confirmed_round
+            inner.append(d)
+        info["inner-txns"] = inner
+    return info
+
+
+def _block_dict(ledger: Ledger, block: Block) -> dict[str, Any]:
+    txns = []
+    for txn in block.txns:
+        d = _txn_apply_data(txn)
+        d["txid"] = txn.txid
+        d.update(_signed_txn_dict(txn))
+        txns.append(d)
+    return {
+        "gen": ledger.genesis_id,
+        "gh": ledger.genesis_hash,
+        "rnd": block.round,
+        "ts": block.timestamp,
+        "txns": txns,
+    }
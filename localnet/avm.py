@@ -0,0 +1,1313 @@
+"""
+AVM bytecode evaluator for the local ledger.
+
+Programs are decoded once (see `load_program`) into a pc-indexed table of
+handlers, then executed against a `Ledger` by `AppEvaluator`. Only application
+mode is supported (no logic signatures).
+"""
+import base64
+import functools
+import hashlib
+import json
+import math
+from dataclasses import dataclass
+from typing import Any, Callable, Optional, TYPE_CHECKING
+
+from Cryptodome.Hash import keccak
+from algosdk import encoding
+from algosdk.logic import get_application_address
+from nacl.exceptions import BadSignatureError
+from nacl.signing import VerifyKey
+
+from localnet import teal
+
+if TYPE_CHECKING:
+    from localnet.ledger import Ledger, Txn, GroupContext
+
+MAX_UINT64 = 2**64 - 1
+MAX_STACK_DEPTH = 1000
+MAX_BYTES_LEN = 4096
+MAX_LOGS = 32
+MAX_LOG_SIZE = 1024
+MAX_INNER_TXNS = 256
+MAX_CALLSTACK = 1024
+ZERO_ADDRESS = bytes(32)
+
+
+class LogicError(Exception):
+    """Failure of a program, reported like algod's `logic eval error`."""
+
+    def __init__(self, msg: str, pc: int = 0):
+        super().__init__(msg)
+        self.msg = msg
+        self.pc = pc
+
+
+@dataclass
+class LoadedProgram:
+    bytecode: bytes
+    version: int
+    # pc -> (handler, immediates, cost, next pc, op name)
+    ops: dict[int, tuple[Callable, tuple, int, int, str]]
+
+
+_program_cache: dict[bytes, LoadedProgram] = {}
+
+
+# The same few accounts are encoded/decoded by every program run, each time a
+# SHA-512/256 checksum and a base32 conversion: memoized.
+@functools.lru_cache(maxsize=65536)
+def decode_address(address: str) -> bytes:
+    return encoding.decode_address(address)
+
+
+@functools.lru_cache(maxsize=65536)
+def encode_address(raw: bytes) -> str:
+    return encoding.encode_address(raw)
+
+
+@functools.lru_cache(maxsize=65536)
+def app_address(app_id: int) -> str:
+    return get_application_address(app_id)
+
+
+def load_program(bytecode: bytes) -> LoadedProgram:
+    """Decode (once per distinct program) `bytecode` into an executable table."""
+    program = _program_cache.get(bytecode)
+    if program is None:
+        version, instructions = teal.decode(bytecode)
+        ops = {}
+        for ins in instructions:
+            handler = HANDLERS.get(ins.spec.name)
+            if handler is None:
+                raise LogicError(f"{ins.spec.name} not supported by the local ledger", ins.pc)
+            if ins.spec.version > version:
+                raise LogicError(f"{ins.spec.name} opcode was introduced in TEAL v{ins.spec.version}", ins.pc)
+            ops[ins.pc] = (handler, ins.args, ins.spec.cost, ins.next_pc, ins.spec.name)
+        program = LoadedProgram(bytecode, version, ops)
+        if len(_program_cache) > 1024:
+            _program_cache.clear()
+        _program_cache[bytecode] = program
+    return program
+
+
+class AppEvaluator:
+    """
+    State of one application program execution.
+
+    Args:
+    ledger: ledger the program reads and writes.
+    ctx: context of the (top-level or inner) transaction group being evaluated.
+    group_index: position of the application call in `ctx.txns`.
+    app_id: id of the application being executed.
+    program: bytecode to execute (approval or clear state program).
+    """
+
+    def __init__(self, ledger: "Ledger", ctx: "GroupContext", group_index: int, app_id: int, program: bytes):
+        self.ledger = ledger
+        self.ctx = ctx
+        self.group_index = group_index
+        self.txn: "Txn" = ctx.txns[group_index]
+        self.app_id = app_id
+        self.app_address = app_address(app_id)
+        self.program = load_program(program)
+        self.stack: list[Any] = []
+        self.scratch: list[Any] = [0] * 256
+        self.callstack: list[int] = []
+        self.intc: tuple = ()
+        self.bytec: tuple = ()
+        self.logs: list[bytes] = []
+        self.cost = 0
+        self.pc = 0
+        # inner transactions
+        self.inner_pending: Optional[list[dict[str, Any]]] = None
+        self.inner_last_group: list["Txn"] = []
+        self.inner_count = 0
+
+    # ------------------------------------------------------------ execution
+
+    def run(self) -> bool:
+        """Execute the program, returns whether it approved. Raises LogicError on failure."""
+        ops = self.program.ops
+        end = len(self.program.bytecode)
+        pc = teal.decode_uvarint(self.program.bytecode, 0)[1]
+        pool = self.ctx.pool
+        stack = self.stack
+        try:
+            while pc < end:
+                op = ops.get(pc)
+                if op is None:
+                    raise LogicError("branch to an invalid pc", pc)
+                handler, args, cost, next_pc, _ = op
+                self.pc = pc
+                self.cost += cost
+                pool.used += cost
+                if pool.used > pool.limit:
+                    raise LogicError("dynamic cost budget exceeded, executing {}: local program cost was {}".format(op[4], self.cost), pc)
+                result = handler(self, args, next_pc)
+                if result is None:
+                    pc = next_pc
+                elif result < 0: # return
+                    break
+                else:
+                    pc = result
+                if len(stack) > MAX_STACK_DEPTH:
+                    raise LogicError("stack overflow", pc)
+        except LogicError as e:
+            if e.pc == 0:
+                e.pc = self.pc
+            raise
+        except IndexError:
+            raise LogicError("stack underflow", self.pc)
+
+        if self.callstack:
+            raise LogicError("callsub without retsub at program end", self.pc)
+        if len(stack) != 1:
+            raise LogicError(f"stack len is {len(stack)} instead of 1", self.pc)
+        result = stack[0]
+        if not isinstance(result, int):
+            raise LogicError("stack finished with bytes not int", self.pc)
+        return result != 0
+
+    # ------------------------------------------------------------ helpers
+
+    def pop_int(self) -> int:
+        v = self.stack.pop()
+        if not isinstance(v, int):
+            raise LogicError("expected uint64 but got []byte")
+        return v
+
+    def pop_bytes(self) -> bytes:
+        v = self.stack.pop()
+        if not isinstance(v, bytes):
+            raise LogicError("expected []byte but got uint64")
+        return v
+
+    def push_bytes(self, v: bytes):
+        if len(v) > MAX_BYTES_LEN:
+            raise LogicError("bytes exceeds max length")
+        self.stack.append(v)
+
+    def resolve_account(self, v: Any) -> str:
+        """Account reference (index in txn.accounts or address) -> available address."""
+        txn = self.txn
+        if isinstance(v, int):
+            if v == 0:
+                return txn.sender
+            if v <= len(txn.accounts):
+                return txn.accounts[v - 1]
+            raise LogicError(f"invalid Account reference {v}")
+        if len(v) != 32:
+            raise LogicError("invalid Account reference")
+        addr = encode_address(v)
+        if addr == txn.sender or addr in txn.accounts or addr == self.app_address:
+            return addr
+        for app_id in txn.foreign_apps:
+            if addr == app_address(app_id):
+                return addr
+        for app_id in self.ctx.created_apps:
+            if addr == app_address(app_id):
+                return addr
+        raise LogicError(f"invalid Account reference {addr}")
+
+    def resolve_app(self, v: int) -> int:
+        """App reference (slot in txn.foreign_apps or app id) -> available app id."""
+        if not isinstance(v, int):
+            raise LogicError("expected uint64 app reference")
+        txn = self.txn
+        if v == 0:
+            return self.app_id
+        if v <= len(txn.foreign_apps):
+            return txn.foreign_apps[v - 1]
+        if v == self.app_id or v in txn.foreign_apps or v in self.ctx.created_apps:
+            return v
+        raise LogicError(f"unavailable App {v}")
+
+    def txn_field(self, txn: "Txn", field: str, index: Optional[int] = None, group_index: int = None) -> Any:
+        return txn_field(self, txn, field, index, group_index)
+
+
+# ---------------------------------------------------------------- txn fields
+
+_TYPE_ENUM = {"pay": 1, "keyreg": 2, "acfg": 3, "axfer": 4, "afrz": 5, "appl": 6}
+
+
+def txn_field(ev: AppEvaluator, txn: "Txn", field: str, index: Optional[int], group_index: Optional[int]) -> Any:
+    arrays = {
+        "ApplicationArgs": txn.app_args,
+        "Accounts": None,
+        "Applications": None,
+        "Assets": txn.foreign_assets,
+        "Logs": txn.logs,
+    }
+    if field in arrays:
+        if index is None:
+            raise LogicError(f"{field} requires an index")
+        if field == "Accounts":
+            values = [txn.sender] + list(txn.accounts)
+            if index >= len(values):
+                raise LogicError(f"invalid Accounts index {index}")
+            return decode_address(values[index])
+        if field == "Applications":
+            values = [txn.app_id] + list(txn.foreign_apps)
+            if index >= len(values):
+                raise LogicError(f"invalid Applications index {index}")
+            return values[index]
+        values = arrays[field]
+        if index >= len(values):
+            raise LogicError(f"invalid {field} index {index}")
+        return values[index]
+
+    match field:
+        case "Sender":
+            return decode_address(txn.sender)
+        case "Fee":
+            return txn.fee
+        case "FirstValid":
+            return txn.first_valid
+        case "LastValid":
+            return txn.last_valid
+        case "Note":
+            return txn.note
+        case "Lease":
+            return txn.lease or bytes(32)
+        case "Receiver":
+            return decode_address(txn.receiver) if txn.receiver else ZERO_ADDRESS
+        case "Amount":
+            return txn.amount
+        case "CloseRemainderTo":
+            return decode_address(txn.close_remainder_to) if txn.close_remainder_to else ZERO_ADDRESS
+        case "RekeyTo":
+            return decode_address(txn.rekey_to) if txn.rekey_to else ZERO_ADDRESS
+        case "Type":
+            return txn.type.encode()
+        case "TypeEnum":
+            return _TYPE_ENUM.get(txn.type, 0)
+        case "GroupIndex":
+            return txn.group_index
+        case "TxID":
+            return base64.b32decode(txn.txid + "=" * (-len(txn.txid) % 8)) if txn.txid else bytes(32)
+        case "ApplicationID":
+            return txn.app_id
+        case "OnCompletion":
+            return txn.on_complete
+        case "NumAppArgs":
+            return len(txn.app_args)
+        case "NumAccounts":
+            return len(txn.accounts)
+        case "NumApplications":
+            return len(txn.foreign_apps)
+        case "NumAssets":
+            return len(txn.foreign_assets)
+        case "ApprovalProgram":
+            return txn.approval_program
+        case "ClearStateProgram":
+            return txn.clear_program
+        case "GlobalNumUint":
+            return txn.global_num_uints
+        case "GlobalNumByteSlice":
+            return txn.global_num_byte_slices
+        case "LocalNumUint":
+            return txn.local_num_uints
+        case "LocalNumByteSlice":
+            return txn.local_num_byte_slices
+        case "ExtraProgramPages":
+            return txn.extra_pages
+        case "NumLogs":
+            return len(txn.logs)
+        case "LastLog":
+            return txn.logs[-1] if txn.logs else b""
+        case "CreatedApplicationID":
+            return txn.created_app_id
+        case "CreatedAssetID":
+            return 0
+        case "XferAsset" | "AssetAmount" | "ConfigAsset" | "FreezeAsset":
+            return 0
+        case "AssetSender" | "AssetReceiver" | "AssetCloseTo":
+            return ZERO_ADDRESS
+    raise LogicError(f"txn field {field} not supported by the local ledger")
+
+
+def _group_txn(ev: AppEvaluator, idx: int) -> "Txn":
+    if idx >= len(ev.ctx.txns):
+        raise LogicError(f"gtxn lookup TxnGroup[{idx}] but it only has {len(ev.ctx.txns)}")
+    return ev.ctx.txns[idx]
+
+
+# ---------------------------------------------------------------- handlers
+
+def _err(ev, args, nxt):
+    raise LogicError("err opcode executed")
+
+
+def _hash(fn):
+    def handler(ev, args, nxt):
+        ev.stack.append(fn(ev.pop_bytes()))
+    return handler
+
+
+def _keccak256(data: bytes) -> bytes:
+    return keccak.new(data=data, digest_bits=256).digest()
+
+
+def _arith(fn):
+    def handler(ev, args, nxt):
+        b = ev.pop_int()
+        a = ev.pop_int()
+        ev.stack.append(fn(a, b))
+    return handler
+
+
+def _add(a, b):
+    r = a + b
+    if r > MAX_UINT64:
+        raise LogicError("+ overflowed")
+    return r
+
+
+def _sub(a, b):
+    if b > a:
+        raise LogicError("- would result negative")
+    return a - b
+
+
+def _div(a, b):
+    if b == 0:
+        raise LogicError("/ 0")
+    return a // b
+
+
+def _mod(a, b):
+    if b == 0:
+        raise LogicError("% 0")
+    return a % b
+
+
+def _mul(a, b):
+    r = a * b
+    if r > MAX_UINT64:
+        raise LogicError("* overflowed")
+    return r
+
+
+def _exp(a, b):
+    if a == 0 and b == 0:
+        raise LogicError("0^0 is undefined")
+    r = a ** b if a > 1 and b < 64 or a <= 1 else MAX_UINT64 + 1
+    if r > MAX_UINT64:
+        raise LogicError(f"{a}^{b} overflow")
+    return r
+
+
+def _shl(a, b):
+    if b > 63:
+        raise LogicError(f"shl arg too big, ({b})")
+    return (a << b) & MAX_UINT64
+
+
+def _shr(a, b):
+    if b > 63:
+        raise LogicError(f"shr arg too big, ({b})")
+    return a >> b
+
+
+def _eq(ev, args, nxt):
+    b = ev.stack.pop()
+    a = ev.stack.pop()
+    if type(a) is not type(b):
+        raise LogicError("cannot compare uint64 to []byte")
+    ev.stack.append(1 if a == b else 0)
+
+
+def _neq(ev, args, nxt):
+    b = ev.stack.pop()
+    a = ev.stack.pop()
+    if type(a) is not type(b):
+        raise LogicError("cannot compare uint64 to []byte")
+    ev.stack.append(1 if a != b else 0)
+
+
+def _not(ev, args, nxt):
+    ev.stack.append(1 if ev.pop_int() == 0 else 0)
+
+
+def _bitnot(ev, args, nxt):
+    ev.stack.append(ev.pop_int() ^ MAX_UINT64)
+
+
+def _len(ev, args, nxt):
+    ev.stack.append(len(ev.pop_bytes()))
+
+
+def _itob(ev, args, nxt):
+    ev.stack.append(ev.pop_int().to_bytes(8, "big"))
+
+
+def _btoi(ev, args, nxt):
+    b = ev.pop_bytes()
+    if len(b) > 8:
+        raise LogicError(f"btoi arg too long, got [{len(b)}]bytes")
+    ev.stack.append(int.from_bytes(b, "big"))
+
+
+def _mulw(ev, args, nxt):
+    b = ev.pop_int()
+    a = ev.pop_int()
+    r = a * b
+    ev.stack += [r >> 64, r & MAX_UINT64]
+
+
+def _addw(ev, args, nxt):
+    b = ev.pop_int()
+    a = ev.pop_int()
+    r = a + b
+    ev.stack += [r >> 64, r & MAX_UINT64]
+
+
+def _divmodw(ev, args, nxt):
+    bl = ev.pop_int()
+    bh = ev.pop_int()
+    al = ev.pop_int()
+    ah = ev.pop_int()
+    a = (ah << 64) | al
+    b = (bh << 64) | bl
+    if b == 0:
+        raise LogicError("/ 0")
+    q, r = divmod(a, b)
+    ev.stack += [q >> 64, q & MAX_UINT64, r >> 64, r & MAX_UINT64]
+
+
+def _divw(ev, args, nxt):
+    c = ev.pop_int()
+    b = ev.pop_int()
+    a = ev.pop_int()
+    if c == 0:
+        raise LogicError("/ 0")
+    q = ((a << 64) | b) // c
+    if q > MAX_UINT64:
+        raise LogicError("divw overflow")
+    ev.stack.append(q)
+
+
+def _expw(ev, args, nxt):
+    b = ev.pop_int()
+    a = ev.pop_int()
+    if a == 0 and b == 0:
+        raise LogicError("0^0 is undefined")
+    r = a ** b if a <= 1 or b < 128 else 2**128
+    if r >= 2**128:
+        raise LogicError(f"{a}^{b} overflow")
+    ev.stack += [r >> 64, r & MAX_UINT64]
+
+
+def _sqrt(ev, args, nxt):
+    ev.stack.append(math.isqrt(ev.pop_int()))
+
+
+def _bitlen(ev, args, nxt):
+    v = ev.stack.pop()
+    ev.stack.append(v.bit_length() if isinstance(v, int) else int.from_bytes(v, "big").bit_length())
+
+
+def _intcblock(ev, args, nxt):
+    ev.intc = args[0]
+
+
+def _intc(ev, args, nxt):
+    _push_intc(ev, args[0])
+
+
+def _push_intc(ev, i):
+    if i >= len(ev.intc):
+        raise LogicError(f"intc {i} beyond {len(ev.intc)} constants")
+    ev.stack.append(ev.intc[i])
+
+
+def _bytecblock(ev, args, nxt):
+    ev.bytec = args[0]
+
+
+def _bytec(ev, args, nxt):
+    _push_bytec(ev, args[0])
+
+
+def _push_bytec(ev, i):
+    if i >= len(ev.bytec):
+        raise LogicError(f"bytec {i} beyond {len(ev.bytec)} constants")
+    ev.stack.append(ev.bytec[i])
+
+
+def _txn(ev, args, nxt):
+    ev.stack.append(txn_field(ev, ev.txn, args[0], None, ev.group_index))
+
+
+def _txna(ev, args, nxt):
+    ev.stack.append(txn_field(ev, ev.txn, args[0], args[1], ev.group_index))
+
+
+def _txnas(ev, args, nxt):
+    i = ev.pop_int()
+    ev.stack.append(txn_field(ev, ev.txn, args[0], i, ev.group_index))
+
+
+def _gtxn(ev, args, nxt):
+    ev.stack.append(txn_field(ev, _group_txn(ev, args[0]), args[1], None, args[0]))
+
+
+def _gtxna(ev, args, nxt):
+    ev.stack.append(txn_field(ev, _group_txn(ev, args[0]), args[1], args[2], args[0]))
+
+
+def _gtxnas(ev, args, nxt):
+    i = ev.pop_int()
+    ev.stack.append(txn_field(ev, _group_txn(ev, args[0]), args[1], i, args[0]))
+
+
+def _gtxns(ev, args, nxt):
+    g = ev.pop_int()
+    ev.stack.append(txn_field(ev, _group_txn(ev, g), args[0], None, g))
+
+
+def _gtxnsa(ev, args, nxt):
+    g = ev.pop_int()
+    ev.stack.append(txn_field(ev, _group_txn(ev, g), args[0], args[1], g))
+
+
+def _gtxnsas(ev, args, nxt):
+    i = ev.pop_int()
+    g = ev.pop_int()
+    ev.stack.append(txn_field(ev, _group_txn(ev, g), args[0], i, g))
+
+
+def _global(ev, args, nxt):
+    ledger = ev.ledger
+    match args[0]:
+        case "MinTxnFee":
+            v = ledger.min_fee
+        case "MinBalance":
+            v = ledger.min_balance_base
+        case "MaxTxnLife":
+            v = 1000
+        case "ZeroAddress":
+            v = ZERO_ADDRESS
+        case "GroupSize":
+            v = len(ev.ctx.txns)
+        case "LogicSigVersion":
+            v = teal.MAX_VERSION
+        case "Round":
+            v = ledger.round + 1
+        case "LatestTimestamp":
+            v = ledger.clock.now()
+        case "CurrentApplicationID":
+            v = ev.app_id
+        case "CreatorAddress":
+            v = decode_address(ledger.apps[ev.app_id].creator)
+        case "CurrentApplicationAddress":
+            v = decode_address(ev.app_address)
+        case "GroupID":
+            v = ev.txn.group or bytes(32)
+        case "OpcodeBudget":
+            v = ev.ctx.pool.limit - ev.ctx.pool.used
+        case "CallerApplicationID":
+            v = ev.ctx.caller_app_id
+        case "CallerApplicationAddress":
+            v = decode_address(app_address(ev.ctx.caller_app_id)) if ev.ctx.caller_app_id else ZERO_ADDRESS
+        case _:
+            raise LogicError(f"global field {args[0]} not supported")
+    ev.stack.append(v)
+
+
+def _load(ev, args, nxt):
+    ev.stack.append(ev.scratch[args[0]])
+
+
+def _store(ev, args, nxt):
+    ev.scratch[args[0]] = ev.stack.pop()
+
+
+def _loads(ev, args, nxt):
+    i = ev.pop_int()
+    if i > 255:
+        raise LogicError(f"invalid Scratch index {i}")
+    ev.stack.append(ev.scratch[i])
+
+
+def _stores(ev, args, nxt):
+    v = ev.stack.pop()
+    i = ev.pop_int()
+    if i > 255:
+        raise LogicError(f"invalid Scratch index {i}")
+    ev.scratch[i] = v
+
+
+def _gload_value(ev, g, i):
+    if g >= ev.group_index:
+        raise LogicError(f"can't use gload on txn {g} which has not been evaluated yet")
+    scratch = ev.ctx.scratch.get(g)
+    if scratch is None:
+        raise LogicError(f"can't use gload on non-app call txn with index {g}")
+    return scratch[i]
+
+
+def _gload(ev, args, nxt):
+    ev.stack.append(_gload_value(ev, args[0], args[1]))
+
+
+def _gloads(ev, args, nxt):
+    g = ev.pop_int()
+    ev.stack.append(_gload_value(ev, g, args[0]))
+
+
+def _gloadss(ev, args, nxt):
+    i = ev.pop_int()
+    g = ev.pop_int()
+    ev.stack.append(_gload_value(ev, g, i))
+
+
+def _gaid_value(ev, g):
+    if g >= ev.group_index:
+        raise LogicError("gaid can't get creatable ID of txn ahead of the current one")
+    created = ev.ctx.txns[g].created_app_id
+    if not created:
+        raise LogicError(f"gaid can't get creatable ID of txn {g}")
+    return created
+
+
+def _gaid(ev, args, nxt):
+    ev.stack.append(_gaid_value(ev, args[0]))
+
+
+def _gaids(ev, args, nxt):
+    ev.stack.append(_gaid_value(ev, ev.pop_int()))
+
+
+def _bnz(ev, args, nxt):
+    if ev.pop_int() != 0:
+        return args[0]
+
+
+def _bz(ev, args, nxt):
+    if ev.pop_int() == 0:
+        return args[0]
+
+
+def _b(ev, args, nxt):
+    return args[0]
+
+
+def _return(ev, args, nxt):
+    v = ev.pop_int()
+    ev.stack.clear()
+    ev.stack.append(v)
+    ev.callstack.clear()
+    return -1
+
+
+def _assert(ev, args, nxt):
+    if ev.pop_int() == 0:
+        raise LogicError("assert failed")
+
+
+def _pop(ev, args, nxt):
+    ev.stack.pop()
+
+
+def _dup(ev, args, nxt):
+    ev.stack.append(ev.stack[-1])
+
+
+def _dup2(ev, args, nxt):
+    if len(ev.stack) < 2:
+        raise LogicError("stack underflow")
+    ev.stack += ev.stack[-2:]
+
+
+def _dig(ev, args, nxt):
+    n = args[0]
+    if n >= len(ev.stack):
+        raise LogicError(f"dig {n} with stack size = {len(ev.stack)}")
+    ev.stack.append(ev.stack[-1 - n])
+
+
+def _swap(ev, args, nxt):
+    s = ev.stack
+    s[-1], s[-2] = s[-2], s[-1]
+
+
+def _select(ev, args, nxt):
+    c = ev.pop_int()
+    b = ev.stack.pop()
+    a = ev.stack.pop()
+    ev.stack.append(b if c != 0 else a)
+
+
+def _cover(ev, args, nxt):
+    n = args[0]
+    if n >= len(ev.stack):
+        raise LogicError(f"cover {n} with stack size = {len(ev.stack)}")
+    v = ev.stack.pop()
+    ev.stack.insert(len(ev.stack) - n, v)
+
+
+def _uncover(ev, args, nxt):
+    n = args[0]
+    if n >= len(ev.stack):
+        raise LogicError(f"uncover {n} with stack size = {len(ev.stack)}")
+    v = ev.stack.pop(len(ev.stack) - 1 - n)
+    ev.stack.append(v)
+
+
+def _concat(ev, args, nxt):
+    b = ev.pop_bytes()
+    a = ev.pop_bytes()
+    ev.push_bytes(a + b)
+
+
+def _substring_of(data: bytes, start: int, end: int) -> bytes:
+    if end < start:
+        raise LogicError("substring end before start")
+    if end > len(data):
+        raise LogicError("substring range beyond length of string")
+    return data[start:end]
+
+
+def _substring(ev, args, nxt):
+    ev.stack.append(_substring_of(ev.pop_bytes(), args[0], args[1]))
+
+
+def _substring3(ev, args, nxt):
+    end = ev.pop_int()
+    start = ev.pop_int()
+    ev.stack.append(_substring_of(ev.pop_bytes(), start, end))
+
+
+def _extract_of(data: bytes, start: int, length: int) -> bytes:
+    if start > len(data) or start + length > len(data):
+        raise LogicError("extract range beyond length of string")
+    return data[start:start + length]
+
+
+def _extract(ev, args, nxt):
+    data = ev.pop_bytes()
+    start, length = args
+    if length == 0: # extract to the end
+        if start > len(data):
+            raise LogicError("extract range beyond length of string")
+        ev.stack.append(data[start:])
+    else:
+        ev.stack.append(_extract_of(data, start, length))
+
+
+def _extract3(ev, args, nxt):
+    length = ev.pop_int()
+    start = ev.pop_int()
+    ev.stack.append(_extract_of(ev.pop_bytes(), start, length))
+
+
+def _extract_uint(size):
+    def handler(ev, args, nxt):
+        start = ev.pop_int()
+        ev.stack.append(int.from_bytes(_extract_of(ev.pop_bytes(), start, size), "big"))
+    return handler
+
+
+def _replace_at(data: bytes, start: int, value: bytes) -> bytes:
+    if start + len(value) > len(data):
+        raise LogicError("replacement end exceeds length of original string")
+    return data[:start] + value + data[start + len(value):]
+
+
+def _replace2(ev, args, nxt):
+    value = ev.pop_bytes()
+    ev.stack.append(_replace_at(ev.pop_bytes(), args[0], value))
+
+
+def _replace3(ev, args, nxt):
+    value = ev.pop_bytes()
+    start = ev.pop_int()
+    ev.stack.append(_replace_at(ev.pop_bytes(), start, value))
+
+
+def _getbit(ev, args, nxt):
+    i = ev.pop_int()
+    v = ev.stack.pop()
+    if isinstance(v, int):
+        if i > 63:
+            raise LogicError("getbit index > 63 with with Uint")
+        ev.stack.append((v >> i) & 1)
+    else:
+        if i // 8 >= len(v):
+            raise LogicError("getbit index beyond byteslice")
+        ev.stack.append((v[i // 8] >> (7 - i % 8)) & 1)
+
+
+def _setbit(ev, args, nxt):
+    bit = ev.pop_int()
+    i = ev.pop_int()
+    v = ev.stack.pop()
+    if bit > 1:
+        raise LogicError("setbit value > 1")
+    if isinstance(v, int):
+        if i > 63:
+            raise LogicError("setbit index > 63 with Uint")
+        ev.stack.append(v | (1 << i) if bit else v & ~(1 << i))
+    else:
+        if i // 8 >= len(v):
+            raise LogicError("setbit index beyond byteslice")
+        b = bytearray(v)
+        mask = 1 << (7 - i % 8)
+        b[i // 8] = b[i // 8] | mask if bit else b[i // 8] & ~mask
+        ev.stack.append(bytes(b))
+
+
+def _getbyte(ev, args, nxt):
+    i = ev.pop_int()
+    v = ev.pop_bytes()
+    if i >= len(v):
+        raise LogicError("getbyte index beyond array length")
+    ev.stack.append(v[i])
+
+
+def _setbyte(ev, args, nxt):
+    value = ev.pop_int()
+    i = ev.pop_int()
+    v = ev.pop_bytes()
+    if i >= len(v):
+        raise LogicError("setbyte index beyond array length")
+    if value > 255:
+        raise LogicError("setbyte value > 255")
+    b = bytearray(v)
+    b[i] = value
+    ev.stack.append(bytes(b))
+
+
+def _base64_decode(ev, args, nxt):
+    data = ev.pop_bytes()
+    try:
+        if args[0] == "URLEncoding":
+            out = base64.urlsafe_b64decode(data + b"=" * (-len(data) % 4))
+        else:
+            out = base64.b64decode(data, validate=True)
+    except Exception as e:
+        raise LogicError(f"base64_decode: {e}")
+    ev.cost += 1 + len(data) // 16
+    ev.stack.append(out)
+
+
+def _json_ref(ev, args, nxt):
+    key = ev.pop_bytes()
+    data = ev.pop_bytes()
+    try:
+        obj = json.loads(data)
+        value = obj[key.decode()]
+    except Exception as e:
+        raise LogicError(f"json_ref: {e}")
+    match args[0]:
+        case "JSONString":
+            if not isinstance(value, str):
+                raise LogicError("json_ref: value is not a string")
+            ev.stack.append(value.encode())
+        case "JSONUint64":
+            if not isinstance(value, int) or value < 0:
+                raise LogicError("json_ref: value is not an uint64")
+            ev.stack.append(value)
+        case _:
+            ev.stack.append(json.dumps(value, separators=(",", ":")).encode())
+
+
+def _ed25519verify_bare(ev, args, nxt):
+    pk = ev.pop_bytes()
+    sig = ev.pop_bytes()
+    data = ev.pop_bytes()
+    ev.stack.append(_verify(pk, sig, data))
+
+
+def _ed25519verify(ev, args, nxt):
+    pk = ev.pop_bytes()
+    sig = ev.pop_bytes()
+    data = ev.pop_bytes()
+    program_hash = encoding.checksum(b"Program" + ev.program.bytecode)
+    ev.stack.append(_verify(pk, sig, b"ProgData" + program_hash + data))
+
+
+def _verify(pk: bytes, sig: bytes, data: bytes) -> int:
+    try:
+        VerifyKey(pk).verify(data, sig)
+        return 1
+    except (BadSignatureError, ValueError):
+        return 0
+
+
+# state access
+
+def _balance(ev, args, nxt):
+    addr = ev.resolve_account(ev.stack.pop())
+    ev.stack.append(ev.ledger.balance(addr))
+
+
+def _min_balance(ev, args, nxt):
+    addr = ev.resolve_account(ev.stack.pop())
+    ev.stack.append(ev.ledger.min_balance(addr))
+
+
+def _app_opted_in(ev, args, nxt):
+    app_id = ev.resolve_app(ev.pop_int())
+    addr = ev.resolve_account(ev.stack.pop())
+    ev.stack.append(1 if ev.ledger.is_opted_in(addr, app_id) else 0)
+
+
+def _app_local_get(ev, args, nxt):
+    key = ev.pop_bytes()
+    addr = ev.resolve_account(ev.stack.pop())
+    ev.stack.append(ev.ledger.local_get(addr, ev.app_id, key, default=0))
+
+
+def _app_local_get_ex(ev, args, nxt):
+    key = ev.pop_bytes()
+    app_id = ev.resolve_app(ev.pop_int())
+    addr = ev.resolve_account(ev.stack.pop())
+    value = ev.ledger.local_get(addr, app_id, key, default=None)
+    ev.stack += [0, 0] if value is None else [value, 1]
+
+
+def _app_global_get(ev, args, nxt):
+    key = ev.pop_bytes()
+    ev.stack.append(ev.ledger.global_get(ev.app_id, key, default=0))
+
+
+def _app_global_get_ex(ev, args, nxt):
+    key = ev.pop_bytes()
+    app_id = ev.resolve_app(ev.pop_int())
+    value = ev.ledger.global_get(app_id, key, default=None)
+    ev.stack += [0, 0] if value is None else [value, 1]
+
+
+def _app_local_put(ev, args, nxt):
+    value = ev.stack.pop()
+    key = ev.pop_bytes()
+    addr = ev.resolve_account(ev.stack.pop())
+    ev.ledger.local_put(addr, ev.app_id, key, value)
+
+
+def _app_global_put(ev, args, nxt):
+    value = ev.stack.pop()
+    key = ev.pop_bytes()
+    ev.ledger.global_put(ev.app_id, key, value)
+
+
+def _app_local_del(ev, args, nxt):
+    key = ev.pop_bytes()
+    addr = ev.resolve_account(ev.stack.pop())
+    ev.ledger.local_del(addr, ev.app_id, key)
+
+
+def _app_global_del(ev, args, nxt):
+    key = ev.pop_bytes()
+    ev.ledger.global_del(ev.app_id, key)
+
+
+def _asset_unsupported(ev, args, nxt):
+    raise LogicError("assets are not supported by the local ledger")
+
+
+def _app_params_get(ev, args, nxt):
+    app_id = ev.resolve_app(ev.pop_int())
+    app = ev.ledger.apps.get(app_id)
+    if app is None:
+        ev.stack += [0, 0]
+        return
+    match args[0]:
+        case "AppApprovalProgram":
+            v = app.approval_program
+        case "AppClearStateProgram":
+            v = app.clear_program
+        case "AppGlobalNumUint":
+            v = app.global_num_uints
+        case "AppGlobalNumByteSlice":
+            v = app.global_num_byte_slices
+        case "AppLocalNumUint":
+            v = app.local_num_uints
+        case "AppLocalNumByteSlice":
+            v = app.local_num_byte_slices
+        case "AppExtraProgramPages":
+            v = app.extra_pages
+        case "AppCreator":
+            v = decode_address(app.creator)
+        case "AppAddress":
+            v = decode_address(app_address(app_id))
+    ev.stack += [v, 1]
+
+
+def _acct_params_get(ev, args, nxt):
+    addr = ev.resolve_account(ev.stack.pop())
+    acct = ev.ledger.accounts.get(addr)
+    if acct is None or (acct.balance == 0 and not acct.local_states and not acct.created_apps):
+        ev.stack += [ZERO_ADDRESS if args[0] == "AcctAuthAddr" else 0, 0]
+        return
+    match args[0]:
+        case "AcctBalance":
+            v = acct.balance
+        case "AcctMinBalance":
+            v = ev.ledger.min_balance(addr)
+        case "AcctAuthAddr":
+            v = decode_address(acct.auth_addr) if acct.auth_addr else ZERO_ADDRESS
+    ev.stack += [v, 1]
+
+
+def _pushbytes(ev, args, nxt):
+    ev.stack.append(args[0])
+
+
+def _pushint(ev, args, nxt):
+    ev.stack.append(args[0])
+
+
+def _callsub(ev, args, nxt):
+    if len(ev.callstack) >= MAX_CALLSTACK:
+        raise LogicError("callsub too deep")
+    ev.callstack.append(nxt)
+    return args[0]
+
+
+def _retsub(ev, args, nxt):
+    if not ev.callstack:
+        raise LogicError("retsub with empty callstack")
+    return ev.callstack.pop()
+
+
+# byte math
+
+def _bint(ev) -> int:
+    v = ev.pop_bytes()
+    if len(v) > 64:
+        raise LogicError("byte math input too long")
+    return int.from_bytes(v, "big")
+
+
+def _bout(value: int) -> bytes:
+    return value.to_bytes((value.bit_length() + 7) // 8, "big")
+
+
+def _bmath(fn):
+    def handler(ev, args, nxt):
+        b = _bint(ev)
+        a = _bint(ev)
+        ev.stack.append(fn(a, b))
+    return handler
+
+
+def _bdiv(a, b):
+    if b == 0:
+        raise LogicError("division by zero")
+    return _bout(a // b)
+
+
+def _bmod(a, b):
+    if b == 0:
+        raise LogicError("modulo by zero")
+    return _bout(a % b)
+
+
+def _bsub(a, b):
+    if b > a:
+        raise LogicError("byte math would have negative result")
+    return _bout(a - b)
+
+
+def _bbit(fn):
+    def handler(ev, args, nxt):
+        b = ev.pop_bytes()
+        a = ev.pop_bytes()
+        n = max(len(a), len(b))
+        a, b = a.rjust(n, b"\x00"), b.rjust(n, b"\x00")
+        ev.stack.append(bytes(fn(x, y) for x, y in zip(a, b)))
+    return handler
+
+
+def _binv(ev, args, nxt):
+    ev.stack.append(bytes(x ^ 0xff for x in ev.pop_bytes()))
+
+
+def _bzero(ev, args, nxt):
+    n = ev.pop_int()
+    if n > MAX_BYTES_LEN:
+        raise LogicError("bzero attempted to create a too large string")
+    ev.stack.append(bytes(n))
+
+
+def _bsqrt(ev, args, nxt):
+    ev.stack.append(_bout(math.isqrt(_bint(ev))))
+
+
+def _log(ev, args, nxt):
+    msg = ev.pop_bytes()
+    if len(ev.logs) >= MAX_LOGS:
+        raise LogicError(f"too many log calls in program. up to {MAX_LOGS} is allowed.")
+    if sum(len(l) for l in ev.logs) + len(msg) > MAX_LOG_SIZE:
+        raise LogicError(f"program logs too large. {MAX_LOG_SIZE} bytes is allowed.")
+    ev.logs.append(msg)
+
+
+# inner transactions
+
+def _itxn_begin(ev, args, nxt):
+    if ev.inner_pending is not None:
+        raise LogicError("itxn_begin without itxn_submit")
+    ev.inner_pending = [{}]
+
+
+def _itxn_next(ev, args, nxt):
+    if ev.inner_pending is None:
+        raise LogicError("itxn_next without itxn_begin")
+    ev.inner_pending.append({})
+
+
+_INNER_ARRAYS = {"ApplicationArgs", "Accounts", "Applications", "Assets"}
+
+
+def _itxn_field(ev, args, nxt):
+    if ev.inner_pending is None:
+        raise LogicError("itxn_field without itxn_begin")
+    value = ev.stack.pop()
+    field = args[0]
+    fields = ev.inner_pending[-1]
+    if field in _INNER_ARRAYS:
+        fields.setdefault(field, []).append(value)
+    else:
+        fields[field] = value
+
+
+def _itxn_submit(ev, args, nxt):
+    if ev.inner_pending is None:
+        raise LogicError("itxn_submit without itxn_begin")
+    pending = ev.inner_pending
+    ev.inner_pending = None
+    ev.inner_count += len(pending)
+    if ev.inner_count > MAX_INNER_TXNS:
+        raise LogicError(f"too many inner transactions {ev.inner_count} with {MAX_INNER_TXNS} left")
+    ev.inner_last_group = ev.ledger.submit_inner(ev, pending)
+
+
+def _last_inner(ev, idx: int = -1) -> "Txn":
+    if not ev.inner_last_group:
+        raise LogicError("no inner transaction available")
+    if idx != -1 and idx >= len(ev.inner_last_group):
+        raise LogicError(f"gitxn {idx} beyond the last inner group")
+    return ev.inner_last_group[idx]
+
+
+def _itxn(ev, args, nxt):
+    ev.stack.append(txn_field(ev, _last_inner(ev), args[0], None, None))
+
+
+def _itxna(ev, args, nxt):
+    ev.stack.append(txn_field(ev, _last_inner(ev), args[0], args[1], None))
+
+
+def _itxnas(ev, args, nxt):
+    i = ev.pop_int()
+    ev.stack.append(txn_field(ev, _last_inner(ev), args[0], i, None))
+
+
+def _gitxn(ev, args, nxt):
+    ev.stack.append(txn_field(ev, _last_inner(ev, args[0]), args[1], None, None))
+
+
+def _gitxna(ev, args, nxt):
+    ev.stack.append(txn_field(ev, _last_inner(ev, args[0]), args[1], args[2], None))
+
+
+def _gitxnas(ev, args, nxt):
+    i = ev.pop_int()
+    ev.stack.append(txn_field(ev, _last_inner(ev, args[0]), args[1], i, None))
+
+
+def _const(op, i):
+    def handler(ev, args, nxt):
+        op(ev, i)
+    return handler
+
+
+def _cmp(fn):
+    def handler(ev, args, nxt):
+        b = ev.pop_int()
+        a = ev.pop_int()
+        ev.stack.append(1 if fn(a, b) else 0)
+    return handler
+
+
+def _bcmp(fn):
+    def handler(ev, args, nxt):
+        b = _bint(ev)
+        a = _bint(ev)
+        ev.stack.append(1 if fn(a, b) else 0)
+    return handler
+
+
+HANDLERS: dict[str, Callable] = {
+    "err": _err,
+    "sha256": _hash(lambda d: hashlib.sha256(d).digest()),
+    "keccak256": _hash(_keccak256),
+    "sha512_256": _hash(encoding.checksum),
+    "sha3_256": _hash(lambda d: hashlib.sha3_256(d).digest()),
+    "ed25519verify": _ed25519verify,
+    "ed25519verify_bare": _ed25519verify_bare,
+    "+": _arith(_add), "-": _arith(_sub), "/": _arith(_div), "*": _arith(_mul),
+    "%": _arith(_mod),
+    "<": _cmp(lambda a, b: a < b), ">": _cmp(lambda a, b: a > b),
+    "<=": _cmp(lambda a, b: a <= b), ">=": _cmp(lambda a, b: a >= b),
+    "&&": _cmp(lambda a, b: a != 0 and b != 0), "||": _cmp(lambda a, b: a != 0 or b != 0),
+    "==": _eq, "!=": _neq, "!": _not,
+    "|": _arith(lambda a, b: a | b), "&": _arith(lambda a, b: a & b),
+    "^": _arith(lambda a, b: a ^ b), "~": _bitnot,
+    "len": _len, "itob": _itob, "btoi": _btoi,
+    "mulw": _mulw, "addw": _addw, "divmodw": _divmodw, "divw": _divw, "expw": _expw,
+    "shl": _arith(_shl), "shr": _arith(_shr), "sqrt": _sqrt, "bitlen": _bitlen,
+    "exp": _arith(_exp),
+    "intcblock": _intcblock, "intc": _intc,
+    "intc_0": _const(_push_intc, 0), "intc_1": _const(_push_intc, 1),
+    "intc_2": _const(_push_intc, 2), "intc_3": _const(_push_intc, 3),
+    "bytecblock": _bytecblock, "bytec": _bytec,
+    "bytec_0": _const(_push_bytec, 0), "bytec_1": _const(_push_bytec, 1),
+    "bytec_2": _const(_push_bytec, 2), "bytec_3": _const(_push_bytec, 3),
+    "txn": _txn, "txna": _txna, "txnas": _txnas,
+    "gtxn": _gtxn, "gtxna": _gtxna, "gtxnas": _gtxnas,
+    "gtxns": _gtxns, "gtxnsa": _gtxnsa, "gtxnsas": _gtxnsas,
+    "global": _global,
+    "load": _load, "store": _store, "loads": _loads, "stores": _stores,
+    "gload": _gload, "gloads": _gloads, "gloadss": _gloadss,
+    "gaid": _gaid, "gaids": _gaids,
+    "bnz": _bnz, "bz": _bz, "b": _b, "return": _return, "assert": _assert,
+    "pop": _pop, "dup": _dup, "dup2": _dup2, "dig": _dig, "swap": _swap,
+    "select": _select, "cover": _cover, "uncover": _uncover,
+    "concat": _concat, "substring": _substring, "substring3": _substring3,
+    "getbit": _getbit, "setbit": _setbit, "getbyte": _getbyte, "setbyte": _setbyte,
+    "extract": _extract, "extract3": _extract3,
+    "extract_uint16": _extract_uint(2), "extract_uint32": _extract_uint(4),
+    "extract_uint64": _extract_uint(8),
+    "replace2": _replace2, "replace3": _replace3,
+    "base64_decode": _base64_decode, "json_ref": _json_ref,
+    "balance": _balance, "min_balance": _min_balance,
+    "app_opted_in": _app_opted_in,
+    "app_local_get": _app_local_get, "app_local_get_ex": _app_local_get_ex,
+    "app_global_get": _app_global_get, "app_global_get_ex": _app_global_get_ex,
+    "app_local_put": _app_local_put, "app_global_put": _app_global_put,
+    "app_local_del": _app_local_del, "app_global_del": _app_global_del,
+    "asset_holding_get": _asset_unsupported, "asset_params_get": _asset_unsupported,
+    "app_params_get": _app_params_get, "acct_params_get": _acct_params_get,
+    "pushbytes": _pushbytes, "pushint": _pushint,
+    "callsub": _callsub, "retsub": _retsub,
+    "b+": _bmath(lambda a, b: _bout(a + b)), "b-": _bmath(_bsub),
+    "b/": _bmath(_bdiv), "b*": _bmath(lambda a, b: _bout(a * b)), "b%": _bmath(_bmod),
+    "b<": _bcmp(lambda a, b: a < b), "b>": _bcmp(lambda a, b: a > b),
+    "b<=": _bcmp(lambda a, b: a <= b), "b>=": _bcmp(lambda a, b: a >= b),
+    "b==": _bcmp(lambda a, b: a == b), "b!=": _bcmp(lambda a, b: a != b),
+    "b|": _bbit(lambda x, y: x | y), "b&": _bbit(lambda x, y: x & y),
+    "b^": _bbit(lambda x, y: x ^ y), "b~": _binv,
+    "bzero": _bzero, "bsqrt": _bsqrt,
+    "log": _log,
+    "itxn_begin": _itxn_begin, "itxn_next": _itxn_next, "itxn_field": _itxn_field,
+    "itxn_submit": _itxn_submit,
+    "itxn": _itxn, "itxna": _itxna, "itxnas": _itxnas,
+    "gitxn": _gitxn, "gitxna": _gitxna, "gitxnas": _gitxnas,
+}
@@ -0,0 +1,39 @@
+import time
+
+
+class VirtualClock:
+    """
+    Clock driving `Global.latest_timestamp()` in the local ledger.
+
+    Time only moves when told to, so a test can jump over `fund_end_date` or
+    `vote_end_date` instantly instead of sleeping.
+
+    Args:
+    start: initial UNIX timestamp, defaults to the current wall clock time.
+    """
+
+    def __init__(self, start: int = None):
+        self._now = int(time.time()) if start is None else int(start)
+
+    def now(self) -> int:
+        return self._now
+
+    def advance(self, seconds: int) -> int:
+        """Move the clock forward by `seconds`, returns the new timestamp."""
+        if seconds < 0:
+            raise ValueError("the clock can only move forward")
+        self._now += int(seconds)
+        return self._now
+
+    def set(self, timestamp: int) -> int:
+        """Move the clock to `timestamp` (not earlier than the current time)."""
+        return self.advance(int(timestamp) - self._now)
+
+    def rewind(self, timestamp: int) -> int:
+        """Move the clock back to `timestamp` (restoring a ledger snapshot), returns it."""
+        self._now = int(timestamp)
+        return self._now
+
+    def sleep(self, seconds: float):
+        """Drop-in replacement for time.sleep advancing the virtual time instead."""
+        self.advance(int(round(seconds)))
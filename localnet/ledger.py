@@ -0,0 +1,829 @@
+"""
+In-memory ledger evaluating payments and application calls.
+
+The ledger keeps balances, applications, global and local state and the list
+of committed blocks. Transaction groups are evaluated atomically: any failure
+rolls back every change made by the group.
+"""
+import base64
+import copy
+import dataclasses
+from dataclasses import dataclass, field
+from typing import Any, Optional
+
+from algosdk import encoding
+from algosdk.future import transaction
+from nacl.exceptions import BadSignatureError
+from nacl.signing import VerifyKey
+
+from localnet.avm import AppEvaluator, LogicError, MAX_UINT64, app_address, encode_address
+from localnet.clock import VirtualClock
+
+MIN_TXN_FEE = 1000
+MIN_BALANCE = 100_000
+APP_FLAT_MIN_BALANCE = 100_000
+APP_OPT_IN_MIN_BALANCE = 100_000
+SCHEMA_UINT_MIN_BALANCE = 28_500
+SCHEMA_BYTES_MIN_BALANCE = 50_000
+APP_BUDGET = 700
+MAX_APP_PROGRAM_LEN = 2048
+MAX_EXTRA_PAGES = 3
+MAX_APPS_OPTED_IN = 50
+MAX_APPS_CREATED = 50
+MAX_GROUP_SIZE = 16
+MAX_APP_TXN_ACCOUNTS = 4
+MAX_APP_TOTAL_TXN_REFERENCES = 8
+MAX_INNER_DEPTH = 8
+MAX_KEY_LEN = 64
+MAX_KEY_VALUE_LEN = 128
+MAX_TXN_LIFE = 1000
+
+_MISSING = object()
+
+
+class LedgerError(Exception):
+    """A transaction (group) was rejected by the ledger."""
+
+    def __init__(self, msg: str, txid: str = "", pc: Optional[int] = None):
+        super().__init__(msg)
+        self.msg = msg
+        self.txid = txid
+        self.pc = pc
+
+    def algod_message(self) -> str:
+        """Error message formatted like algod's, so beaker can map the pc back to TEAL."""
+        if self.pc is not None:
+            return "TransactionPool.Remember: transaction {}: logic eval error: {}. Details: pc={}, opcodes=".format(
+                self.txid, self.msg, self.pc
+            )
+        return "TransactionPool.Remember: transaction {}: {}".format(self.txid, self.msg)
+
+
+@dataclass
+class Txn:
+    """Transaction as seen by the evaluator, together with its apply data."""
+
+    type: str
+    sender: str
+    fee: int = 0
+    first_valid: int = 0
+    last_valid: int = 0
+    note: bytes = b""
+    lease: bytes = b""
+    group: bytes = b""
+    rekey_to: Optional[str] = None
+    # pay
+    receiver: Optional[str] = None
+    amount: int = 0
+    close_remainder_to: Optional[str] = None
+    # appl
+    app_id: int = 0
+    on_complete: int = 0
+    app_args: list[bytes] = field(default_factory=list)
+    accounts: list[str] = field(default_factory=list)
+    foreign_apps: list[int] = field(default_factory=list)
+    foreign_assets: list[int] = field(default_factory=list)
+    approval_program: bytes = b""
+    clear_program: bytes = b""
+    global_num_uints: int = 0
+    global_num_byte_slices: int = 0
+    local_num_uints: int = 0
+    local_num_byte_slices: int = 0
+    extra_pages: int = 0
+
+    # apply data
+    txid: str = ""
+    group_index: int = 0
+    signed: Any = None # SignedTransaction, None for inner transactions
+    logs: list[bytes] = field(default_factory=list)
+    created_app_id: int = 0
+    inner_txns: list["Txn"] = field(default_factory=list)
+    global_delta: dict[bytes, Any] = field(default_factory=dict) # None value: deleted
+    local_delta: dict[str, dict[bytes, Any]] = field(default_factory=dict)
+    cost: int = 0 # opcodes executed by the approval/clear program
+    confirmed_round: int = 0
+    closing_amount: int = 0
+
+    @staticmethod
+    def from_sdk(txn: transaction.Transaction) -> "Txn":
+        t = Txn(
+            type=txn.type,
+            sender=txn.sender,
+            fee=txn.fee,
+            first_valid=txn.first_valid_round,
+            last_valid=txn.last_valid_round,
+            note=txn.note or b"",
+            lease=txn.lease or b"",
+            group=txn.group or b"",
+            rekey_to=txn.rekey_to,
+        )
+        if isinstance(txn, transaction.PaymentTxn):
+            t.receiver = txn.receiver
+            t.amount = txn.amt or 0
+            t.close_remainder_to = txn.close_remainder_to
+        elif isinstance(txn, transaction.ApplicationCallTxn):
+            t.app_id = txn.index or 0
+            t.on_complete = int(txn.on_complete or 0)
+            t.app_args = list(txn.app_args or [])
+            t.accounts = list(txn.accounts or [])
+            t.foreign_apps = list(txn.foreign_apps or [])
+            t.foreign_assets = list(txn.foreign_assets or [])
+            t.approval_program = txn.approval_program or b""
+            t.clear_program = txn.clear_program or b""
+            if txn.global_schema is not None:
+                t.global_num_uints = txn.global_schema.num_uints or 0
+                t.global_num_byte_slices = txn.global_schema.num_byte_slices or 0
+            if txn.local_schema is not None:
+                t.local_num_uints = txn.local_schema.num_uints or 0
+                t.local_num_byte_slices = txn.local_schema.num_byte_slices or 0
+            t.extra_pages = txn.extra_pages or 0
+        else:
+            raise LedgerError(f"transaction type {txn.type} not supported by the local ledger")
+        return t
+
+
+@dataclass
+class Account:
+    address: str
+    balance: int = 0
+    auth_addr: Optional[str] = None
+    local_states: dict[int, dict[bytes, Any]] = field(default_factory=dict) # app id -> key/values
+    created_apps: dict[int, bool] = field(default_factory=dict)
+
+
+@dataclass
+class AppParams:
+    app_id: int
+    creator: str
+    approval_program: bytes
+    clear_program: bytes
+    global_num_uints: int = 0
+    global_num_byte_slices: int = 0
+    local_num_uints: int = 0
+    local_num_byte_slices: int = 0
+    extra_pages: int = 0
+    global_state: dict[bytes, Any] = field(default_factory=dict)
+
+    @property
+    def address(self) -> str:
+        return app_address(self.app_id)
+
+
+@dataclass
+class Block:
+    round: int
+    timestamp: int
+    txns: list[Txn] = field(default_factory=list)
+
+
+@dataclass
+class BudgetPool:
+    """Opcode budget and fee credit shared by a top-level group and its inner transactions."""
+
+    limit: int = 0
+    used: int = 0
+    fee_credit: int = 0
+
+
+@dataclass
+class GroupContext:
+    txns: list[Txn]
+    pool: BudgetPool
+    created_apps: list[int] = field(default_factory=list)
+    scratch: dict[int, list] = field(default_factory=dict)
+    caller_app_id: int = 0
+    depth: int = 0
+    touched: set = field(default_factory=set)
+
+
+@dataclass
+class LedgerSnapshot:
+    """Copy of the state of a Ledger, see Ledger.snapshot."""
+
+    accounts: dict[str, Account]
+    apps: dict[int, AppParams]
+    next_app_id: int
+    blocks: list[Block]
+    txns: dict[str, Txn]
+    timestamp: int
+
+
+class Ledger:
+    """
+    Local stand-in for the algod ledger.
+
+    Args:
+    clock: VirtualClock providing `Global.latest_timestamp()` and block timestamps.
+    min_fee: minimum transaction fee.
+    genesis_id: genesis id reported to clients.
+    verify_signatures: whether to check the ed25519 signature of submitted transactions.
+    auto_commit: commit a block for every submitted group (like a dev mode algod).
+        When False, groups are evaluated on submit but only confirmed by `commit_block`.
+    """
+
+    def __init__(
+        self,
+        clock: VirtualClock = None,
+        min_fee: int = MIN_TXN_FEE,
+        genesis_id: str = "localnet-v1",
+        verify_signatures: bool = True,
+        auto_commit: bool = True,
+    ):
+        self.clock = clock if clock is not None else VirtualClock()
+        self.min_fee = min_fee
+        self.min_balance_base = MIN_BALANCE
+        self.genesis_id = genesis_id
+        self.genesis_hash = base64.b64encode(encoding.checksum(genesis_id.encode())).decode("utf8")
+        self.verify_signatures = verify_signatures
+        self.auto_commit = auto_commit
+
+        self.accounts: dict[str, Account] = {}
+        self.apps: dict[int, AppParams] = {}
+        self.blocks: list[Block] = [Block(0, self.clock.now())]
+        self.pending: list[Txn] = []
+        self.txns: dict[str, Txn] = {} # txid -> evaluated top-level transaction
+        self.next_app_id = 1000
+
+        self._journal: Optional[list] = None
+        self._current: list[Txn] = [] # app calls being evaluated (innermost last)
+
+    @property
+    def round(self) -> int:
+        return self.blocks[-1].round
+
+    # ------------------------------------------------------------ accounts
+
+    def account(self, address: str) -> Account:
+        acct = self.accounts.get(address)
+        if acct is None:
+            acct = Account(address)
+            self._set(self.accounts, address, acct)
+        return acct
+
+    def fund(self, address: str, amount: int):
+        """Credit `amount` microAlgos to `address` out of thin air (genesis allocation)."""
+        acct = self.account(address)
+        acct.balance += amount
+
+    def balance(self, address: str) -> int:
+        acct = self.accounts.get(address)
+        return acct.balance if acct is not None else 0
+
+    def min_balance(self, address: str) -> int:
+        acct = self.accounts.get(address)
+        if acct is None:
+            return self.min_balance_base
+        mb = self.min_balance_base
+        for app_id in acct.created_apps:
+            app = self.apps[app_id]
+            mb += APP_FLAT_MIN_BALANCE * (1 + app.extra_pages)
+            mb += SCHEMA_UINT_MIN_BALANCE * app.global_num_uints
+            mb += SCHEMA_BYTES_MIN_BALANCE * app.global_num_byte_slices
+        for app_id in acct.local_states:
+            app = self.apps.get(app_id)
+            mb += APP_OPT_IN_MIN_BALANCE
+            if app is not None:
+                mb += SCHEMA_UINT_MIN_BALANCE * app.local_num_uints
+                mb += SCHEMA_BYTES_MIN_BALANCE * app.local_num_byte_slices
+        return mb
+
+    def is_opted_in(self, address: str, app_id: int) -> bool:
+        acct = self.accounts.get(address)
+        return acct is not None and app_id in acct.local_states
+
+    # ------------------------------------------------------------ state
+
+    def global_get(self, app_id: int, key: bytes, default: Any = 0) -> Any:
+        app = self.apps.get(app_id)
+        if app is None:
+            return default
+        return app.global_state.get(key, default)
+
+    def global_put(self, app_id: int, key: bytes, value: Any):
+        app = self.apps[app_id]
+        _check_key_value(key, value)
+        state = app.global_state
+        if key not in state or type(state[key]) is not type(value):
+            _check_schema(
+                state, key, value, app.global_num_uints, app.global_num_byte_slices, "global"
+            )
+        self._set(state, key, value)
+        self._current[-1].global_delta[key] = value
+
+    def global_del(self, app_id: int, key: bytes):
+        state = self.apps[app_id].global_state
+        if key in state:
+            self._del(state, key)
+        self._current[-1].global_delta[key] = None
+
+    def local_get(self, address: str, app_id: int, key: bytes, default: Any = 0) -> Any:
+        acct = self.accounts.get(address)
+        if acct is None or app_id not in acct.local_states:
+            return default
+        return acct.local_states[app_id].get(key, default)
+
+    def local_put(self, address: str, app_id: int, key: bytes, value: Any):
+        acct = self.accounts.get(address)
+        if acct is None or app_id not in acct.local_states:
+            raise LogicError(f"account {address} is not opted in to app {app_id}")
+        _check_key_value(key, value)
+        app = self.apps[app_id]
+        state = acct.local_states[app_id]
+        if key not in state or type(state[key]) is not type(value):
+            _check_schema(
+                state, key, value, app.local_num_uints, app.local_num_byte_slices, "local"
+            )
+        self._set(state, key, value)
+        self._current[-1].local_delta.setdefault(address, {})[key] = value
+
+    def local_del(self, address: str, app_id: int, key: bytes):
+        acct = self.accounts.get(address)
+        if acct is None or app_id not in acct.local_states:
+            raise LogicError(f"account {address} is not opted in to app {app_id}")
+        state = acct.local_states[app_id]
+        if key in state:
+            self._del(state, key)
+        self._current[-1].local_delta.setdefault(address, {})[key] = None
+
+    # ------------------------------------------------------------ snapshots
+
+    def snapshot(self) -> LedgerSnapshot:
+        """
+        Copy of the accounts, apps, blocks and clock, to `restore` later (e.g. the common setup of many runs).
+        Pending transactions are not part of it.
+        """
+        return LedgerSnapshot(
+            accounts=_copy_accounts(self.accounts),
+            apps=_copy_apps(self.apps),
+            next_app_id=self.next_app_id,
+            blocks=list(self.blocks),
+            txns=dict(self.txns),
+            timestamp=self.clock.now(),
+        )
+
+    def restore(self, snapshot: LedgerSnapshot):
+        """Go back to `snapshot`, which can be restored again: the ledger works on copies of its state."""
+        self.accounts = _copy_accounts(snapshot.accounts)
+        self.apps = _copy_apps(snapshot.apps)
+        self.next_app_id = snapshot.next_app_id
+        self.blocks = list(snapshot.blocks)
+        self.txns = dict(snapshot.txns)
+        self.pending = []
+        self.clock.rewind(snapshot.timestamp)
+
+    # ------------------------------------------------------------ submission
+
+    def submit(self, signed_txns: list) -> list[Txn]:
+        """
+        Validate and evaluate a group of signed transactions.
+
+        Raises LedgerError if the group is rejected, in that case no change is applied.
+        """
+        if not signed_txns:
+            raise LedgerError("empty transaction group")
+        if len(signed_txns) > MAX_GROUP_SIZE:
+            raise LedgerError(f"group size {len(signed_txns)} exceeds maximum value {MAX_GROUP_SIZE}")
+
+        txns = []
+        for stxn in signed_txns:
+            if not isinstance(stxn, transaction.SignedTransaction):
+                raise LedgerError("only single signature transactions are supported by the local ledger")
+            txn = Txn.from_sdk(stxn.transaction)
+            txn.txid = stxn.transaction.get_txid()
+            txn.signed = stxn
+            txns.append(txn)
+
+        for txn in txns:
+            self._check_well_formed(txn)
+        self._check_group(signed_txns, txns)
+        if self.verify_signatures:
+            for stxn, txn in zip(signed_txns, txns):
+                self._check_signature(stxn, txn)
+
+        self.evaluate(txns)
+        return txns
+
+    def evaluate(self, txns: list[Txn], commit: bool = True) -> list[Txn]:
+        """
+        Evaluate an already validated group. With commit=False changes are rolled
+        back afterwards (simulation), the returned transactions still carry their apply data.
+        """
+        fees = sum(t.fee for t in txns)
+        required = self.min_fee * len(txns)
+        if fees < required:
+            raise LedgerError(f"txgroup had {fees} in fees, which is less than the minimum {required}", txns[0].txid)
+
+        num_app_calls = sum(1 for t in txns if t.type == "appl")
+        pool = BudgetPool(limit=APP_BUDGET * num_app_calls, fee_credit=fees - required)
+        ctx = GroupContext(txns, pool)
+
+        self._journal = []
+        txn = txns[0]
+        try:
+            for i, txn in enumerate(txns):
+                txn.group_index = i
+                self._apply(ctx, i)
+                self._check_min_balances(ctx, txn)
+        except (LogicError, LedgerError) as e:
+            self._rollback()
+            raise _ledger_error(e, txn.txid)
+        finally:
+            journal, self._journal = self._journal, None
+
+        if not commit:
+            self._journal = journal
+            self._rollback()
+            self._journal = None
+            return txns
+
+        for txn in txns:
+            self.txns[txn.txid] = txn
+        self.pending += txns
+        if self.auto_commit:
+            self.commit_block()
+        return txns
+
+    def simulate(self, txns: list[Txn]) -> list[Txn]:
+        """Evaluate `txns` without keeping any change (see evaluate)."""
+        return self.evaluate(txns, commit=False)
+
+    def commit_block(self) -> Block:
+        """Confirm every pending transaction in a new block."""
+        block = Block(self.round + 1, self.clock.now(), self.pending)
+        for txn in block.txns:
+            txn.confirmed_round = block.round
+        self.pending = []
+        self.blocks.append(block)
+        return block
+
+    # ------------------------------------------------------------ validation
+
+    def _check_well_formed(self, txn: Txn):
+        next_round = self.round + 1
+        if txn.txid in self.txns:
+            raise LedgerError("transaction already in ledger: {}".format(txn.txid), txn.txid)
+        if txn.last_valid - txn.first_valid > MAX_TXN_LIFE:
+            raise LedgerError("transaction validity period exceeds maximum", txn.txid)
+        if not txn.first_valid <= next_round <= txn.last_valid:
+            raise LedgerError(
+                "txn dead: round {} outside of {}--{}".format(next_round, txn.first_valid, txn.last_valid), txn.txid
+            )
+        if txn.rekey_to is not None:
+            raise LedgerError("rekeying is not supported by the local ledger", txn.txid)
+        if txn.type == "appl":
+            if len(txn.accounts) > MAX_APP_TXN_ACCOUNTS:
+                raise LedgerError(f"tx.Accounts too long, max number of accounts is {MAX_APP_TXN_ACCOUNTS}", txn.txid)
+            if len(txn.accounts) + len(txn.foreign_apps) + len(txn.foreign_assets) > MAX_APP_TOTAL_TXN_REFERENCES:
+                raise LedgerError(
+                    f"tx references exceed MaxAppTotalTxnReferences = {MAX_APP_TOTAL_TXN_REFERENCES}", txn.txid
+                )
+
+    def _check_group(self, signed_txns: list, txns: list[Txn]):
+        if len(txns) == 1 and not txns[0].group:
+            return
+        ungrouped = []
+        for stxn in signed_txns: # the group id is computed over the txids without group
+            t = copy.copy(stxn.transaction)
+            t.group = None
+            ungrouped.append(t)
+        gid = transaction.calculate_group_id(ungrouped)
+        for txn in txns:
+            if txn.group != gid:
+                raise LedgerError("transactionGroup: incomplete group", txn.txid)
+
+    def _check_signature(self, stxn: transaction.SignedTransaction, txn: Txn):
+        signer = stxn.authorizing_address or txn.sender
+        acct = self.accounts.get(txn.sender)
+        expected = acct.auth_addr if acct is not None and acct.auth_addr else txn.sender
+        if signer != expected:
+            raise LedgerError("should have been authorized by {} but was actually authorized by {}".format(expected, signer), txn.txid)
+        if stxn.signature is None:
+            raise LedgerError("signedtxn has no sig", txn.txid)
+        msg = b"TX" + base64.b64decode(encoding.msgpack_encode(stxn.transaction))
+        try:
+            VerifyKey(encoding.decode_address(signer)).verify(msg, base64.b64decode(stxn.signature))
+        except BadSignatureError:
+            raise LedgerError("At least one signature didn't pass verification", txn.txid)
+
+    def _check_min_balances(self, ctx: GroupContext, txn: Txn):
+        for address in ctx.touched:
+            acct = self.accounts.get(address)
+            if acct is None:
+                continue
+            if acct.balance == 0 and not acct.local_states and not acct.created_apps:
+                continue # closed account
+            mb = self.min_balance(address)
+            if acct.balance < mb:
+                raise LedgerError(
+                    "account {} balance {} below min {} ({} assets)".format(address, acct.balance, mb, 0),
+                    txn.txid,
+                )
+        ctx.touched.clear()
+
+    # ------------------------------------------------------------ apply
+
+    def _apply(self, ctx: GroupContext, i: int):
+        txn = ctx.txns[i]
+        sender = self.account(txn.sender)
+        self._debit(sender, txn.fee, txn)
+        ctx.touched.add(txn.sender)
+
+        if txn.type == "pay":
+            self._apply_payment(ctx, txn, sender)
+        elif txn.type == "appl":
+            self._apply_app_call(ctx, i, txn)
+        else:
+            raise LedgerError(f"transaction type {txn.type} not supported by the local ledger", txn.txid)
+
+    def _debit(self, acct: Account, amount: int, txn: Txn):
+        if acct.balance < amount:
+            raise LedgerError(
+                "overspend (account {}, data {{_struct:{{}} Status:Offline MicroAlgos:{{Raw:{}}}}}, tried to spend {{{}}})".format(
+                    acct.address, acct.balance, amount
+                ),
+                txn.txid,
+            )
+        self._set(acct.__dict__, "balance", acct.balance - amount)
+
+    def _credit(self, acct: Account, amount: int):
+        if acct.balance + amount > MAX_UINT64:
+            raise LedgerError(f"balance overflow for {acct.address}")
+        self._set(acct.__dict__, "balance", acct.balance + amount)
+
+    def _apply_payment(self, ctx: GroupContext, txn: Txn, sender: Account):
+        receiver = self.account(txn.receiver)
+        self._debit(sender, txn.amount, txn)
+        self._credit(receiver, txn.amount)
+        ctx.touched.add(txn.receiver)
+
+        if txn.close_remainder_to is not None:
+            if sender.local_states or sender.created_apps:
+                raise LedgerError("cannot close account {} with active applications".format(txn.sender), txn.txid)
+            close_to = self.account(txn.close_remainder_to)
+            txn.closing_amount = sender.balance
+            self._credit(close_to, sender.balance)
+            self._set(sender.__dict__, "balance", 0)
+            ctx.touched.add(txn.close_remainder_to)
+
+    def _apply_app_call(self, ctx: GroupContext, i: int, txn: Txn):
+        oc = txn.on_complete
+        if txn.app_id == 0:
+            app_id = self._create_app(ctx, txn)
+        else:
+            app_id = txn.app_id
+            if app_id not in self.apps:
+                raise LedgerError(f"application {app_id} does not exist", txn.txid)
+        app = self.apps[app_id]
+        acct = self.account(txn.sender)
+
+        if oc == transaction.OnComplete.ClearStateOC:
+            if app_id not in acct.local_states:
+                raise LedgerError(f"{txn.sender} is not currently opted in to app {app_id}", txn.txid)
+            # clear state programs have their own budget and can't block the opt out
+            clear_ctx = GroupContext(ctx.txns, BudgetPool(limit=APP_BUDGET), ctx.created_apps, ctx.scratch,
+                                     ctx.caller_app_id, ctx.depth, ctx.touched)
+            self._current.append(txn)
+            try:
+                AppEvaluator(self, clear_ctx, i, app_id, app.clear_program).run()
+            except LogicError:
+                pass
+            finally:
+                self._current.pop()
+            self._del(acct.local_states, app_id)
+            return
+
+        if oc == transaction.OnComplete.OptInOC:
+            if app_id in acct.local_states:
+                raise LedgerError(f"account {txn.sender} has already opted in to app {app_id}", txn.txid)
+            if len(acct.local_states) >= MAX_APPS_OPTED_IN:
+                raise LedgerError(f"cannot opt in app {app_id} for {txn.sender}: max opted-in apps per acct exceeded", txn.txid)
+            self._set(acct.local_states, app_id, {})
+        elif oc == transaction.OnComplete.CloseOutOC:
+            if app_id not in acct.local_states:
+                raise LedgerError(f"{txn.sender} is not opted in to app {app_id}", txn.txid)
+
+        ev = AppEvaluator(self, ctx, i, app_id, app.approval_program)
+        self._current.append(txn)
+        try:
+            approved = ev.run()
+        except LogicError:
+            txn.cost = ev.cost
+            raise
+        finally:
+            self._current.pop()
+            ctx.scratch[i] = ev.scratch
+        txn.logs = ev.logs
+        txn.cost = ev.cost
+        if ev.inner_pending is not None:
+            raise LogicError("itxn_begin without itxn_submit", ev.pc)
+        if not approved:
+            raise LedgerError("transaction rejected by ApprovalProgram", txn.txid)
+
+        if oc == transaction.OnComplete.CloseOutOC:
+            self._del(acct.local_states, app_id)
+        elif oc == transaction.OnComplete.UpdateApplicationOC:
+            _check_program_size(txn)
+            self._set(app.__dict__, "approval_program", txn.approval_program)
+            self._set(app.__dict__, "clear_program", txn.clear_program)
+        elif oc == transaction.OnComplete.DeleteApplicationOC:
+            creator = self.account(app.creator)
+            self._del(creator.created_apps, app_id)
+            self._del(self.apps, app_id)
+            ctx.touched.add(app.creator)
+
+    def _create_app(self, ctx: GroupContext, txn: Txn) -> int:
+        _check_program_size(txn)
+        if txn.extra_pages > MAX_EXTRA_PAGES:
+            raise LedgerError(f"tx.ExtraProgramPages exceeds MaxExtraAppProgramPages = {MAX_EXTRA_PAGES}", txn.txid)
+        if txn.global_num_uints + txn.global_num_byte_slices > 64:
+            raise LedgerError("tx.GlobalStateSchema too large, max number of keys is 64", txn.txid)
+        if txn.local_num_uints + txn.local_num_byte_slices > 16:
+            raise LedgerError("tx.LocalStateSchema too large, max number of keys is 16", txn.txid)
+        creator = self.account(txn.sender)
+        if len(creator.created_apps) >= MAX_APPS_CREATED:
+            raise LedgerError(f"cannot create app for {txn.sender}: max created apps per acct exceeded", txn.txid)
+
+        app_id = self.next_app_id
+        self.next_app_id += 1
+        self._set(self.apps, app_id, AppParams(
+            app_id=app_id,
+            creator=txn.sender,
+            approval_program=txn.approval_program,
+            clear_program=txn.clear_program,
+            global_num_uints=txn.global_num_uints,
+            global_num_byte_slices=txn.global_num_byte_slices,
+            local_num_uints=txn.local_num_uints,
+            local_num_byte_slices=txn.local_num_byte_slices,
+            extra_pages=txn.extra_pages,
+        ))
+        self._set(creator.created_apps, app_id, True)
+        ctx.created_apps.append(app_id)
+        ctx.touched.add(txn.sender)
+        txn.created_app_id = app_id
+        return app_id
+
+    def submit_inner(self, ev: AppEvaluator, pending: list[dict[str, Any]]) -> list[Txn]:
+        """Evaluate the inner transaction group built by `ev` (itxn_begin ... itxn_submit)."""
+        if ev.ctx.depth + 1 > MAX_INNER_DEPTH:
+            raise LogicError("appl depth ({}) exceeded".format(ev.ctx.depth + 1))
+        pool = ev.ctx.pool
+        parent = ev.txn
+        txns = []
+        for idx, fields in enumerate(pending):
+            txn = self._inner_txn(ev, fields)
+            if "Fee" not in fields: # default: whatever is not covered by the fee credit
+                txn.fee = max(0, self.min_fee - pool.fee_credit)
+            pool.fee_credit += txn.fee - self.min_fee
+            if pool.fee_credit < 0:
+                raise LogicError("fee too small {}".format(txn.fee))
+            txn.txid = _inner_txid(parent.txid, len(parent.inner_txns) + idx)
+            if txn.type == "appl":
+                pool.limit += APP_BUDGET
+            txns.append(txn)
+
+        inner_ctx = GroupContext(txns, pool, ev.ctx.created_apps, {}, ev.app_id, ev.ctx.depth + 1, ev.ctx.touched)
+        for j, txn in enumerate(txns):
+            txn.group_index = j
+            try:
+                self._apply(inner_ctx, j)
+            except LedgerError as e:
+                raise LogicError("inner tx {} failed: {}".format(j, e.msg))
+            except LogicError as e:
+                raise LogicError("inner tx {} failed: {}".format(j, e.msg))
+        parent.inner_txns += txns
+        return txns
+
+    def _inner_txn(self, ev: AppEvaluator, fields: dict[str, Any]) -> Txn:
+        types = {1: "pay", 6: "appl"}
+        if "TypeEnum" in fields:
+            ttype = types.get(fields["TypeEnum"])
+        elif "Type" in fields:
+            ttype = fields["Type"].decode() if isinstance(fields["Type"], bytes) else None
+        else:
+            raise LogicError("itxn_submit: missing type")
+        if ttype not in ("pay", "appl"):
+            raise LogicError(f"inner transaction type {ttype} not supported by the local ledger")
+
+        sender = ev.app_address
+        if "Sender" in fields:
+            sender = encode_address(fields["Sender"])
+            acct = self.accounts.get(sender)
+            if sender != ev.app_address and (acct is None or acct.auth_addr != ev.app_address):
+                raise LogicError(f"unauthorized inner transaction sender {sender}")
+
+        next_round = self.round + 1
+        txn = Txn(
+            type=ttype,
+            sender=sender,
+            fee=fields.get("Fee", 0),
+            first_valid=next_round - 1 if next_round > 0 else 0,
+            last_valid=next_round + MAX_TXN_LIFE - 1,
+            note=fields.get("Note", b""),
+        )
+        if ttype == "pay":
+            if "Receiver" in fields:
+                txn.receiver = ev.resolve_account(fields["Receiver"])
+            else:
+                txn.receiver = encode_address(bytes(32))
+            txn.amount = fields.get("Amount", 0)
+            if "CloseRemainderTo" in fields:
+                txn.close_remainder_to = ev.resolve_account(fields["CloseRemainderTo"])
+        else:
+            txn.app_id = fields.get("ApplicationID", 0)
+            if txn.app_id:
+                txn.app_id = ev.resolve_app(txn.app_id)
+            txn.on_complete = fields.get("OnCompletion", 0)
+            txn.app_args = [_as_bytes(a) for a in fields.get("ApplicationArgs", [])]
+            txn.accounts = [ev.resolve_account(a) for a in fields.get("Accounts", [])]
+            txn.foreign_apps = [ev.resolve_app(a) for a in fields.get("Applications", [])]
+            txn.approval_program = fields.get("ApprovalProgram", b"")
+            txn.clear_program = fields.get("ClearStateProgram", b"")
+            txn.global_num_uints = fields.get("GlobalNumUint", 0)
+            txn.global_num_byte_slices = fields.get("GlobalNumByteSlice", 0)
+            txn.local_num_uints = fields.get("LocalNumUint", 0)
+            txn.local_num_byte_slices = fields.get("LocalNumByteSlice", 0)
+            txn.extra_pages = fields.get("ExtraProgramPages", 0)
+        return txn
+
+    # ------------------------------------------------------------ journal
+
+    def _set(self, d: dict, key: Any, value: Any):
+        if self._journal is not None:
+            self._journal.append((d, key, d.get(key, _MISSING)))
+        d[key] = value
+
+    def _del(self, d: dict, key: Any):
+        if self._journal is not None:
+            self._journal.append((d, key, d.get(key, _MISSING)))
+        d.pop(key, None)
+
+    def _rollback(self):
+        journal = self._journal or []
+        for d, key, old in reversed(journal):
+            if old is _MISSING:
+                d.pop(key, None)
+            else:
+                d[key] = old
+        journal.clear()
+
+
+def _copy_accounts(accounts: dict[str, Account]) -> dict[str, Account]:
+    # state values are immutable (int, bytes): copying the dicts is a deep copy, without copy.deepcopy's cost
+    return {
+        address: Account(
+            acct.address, acct.balance, acct.auth_addr,
+            {app_id: dict(kv) for app_id, kv in acct.local_states.items()}, dict(acct.created_apps),
+        )
+        for address, acct in accounts.items()
+    }
+
+
+def _copy_apps(apps: dict[int, AppParams]) -> dict[int, AppParams]:
+    return {app_id: dataclasses.replace(app, global_state=dict(app.global_state)) for app_id, app in apps.items()}
+
+
+def _as_bytes(v: Any) -> bytes:
+    return v if isinstance(v, bytes) else v.to_bytes(8, "big")
+
+
+def _inner_txid(parent_txid: str, index: int) -> str:
+    digest = encoding.checksum(parent_txid.encode() + index.to_bytes(8, "big"))
+    return base64.b32encode(digest).decode().strip("=")
+
+
+def _check_key_value(key: bytes, value: Any):
+    if len(key) > MAX_KEY_LEN:
+        raise LogicError(f"key too long: length was {len(key)}, maximum is {MAX_KEY_LEN}")
+    if isinstance(value, bytes) and len(key) + len(value) > MAX_KEY_VALUE_LEN:
+        raise LogicError(
+            f"key/value total too long for key {key!r}: length was {len(key) + len(value)}, maximum is {MAX_KEY_VALUE_LEN}"
+        )
+
+
+def _check_schema(state: dict, key: bytes, value: Any, num_uints: int, num_byte_slices: int, kind: str):
+    uints = sum(1 for k, v in state.items() if isinstance(v, int) and k != key)
+    byte_slices = sum(1 for k, v in state.items() if isinstance(v, bytes) and k != key)
+    if isinstance(value, int):
+        uints += 1
+    else:
+        byte_slices += 1
+    if uints > num_uints:
+        raise LogicError(f"store integer count {uints} exceeds schema integer count {num_uints}")
+    if byte_slices > num_byte_slices:
+        raise LogicError(f"store bytes count {byte_slices} exceeds schema bytes count {num_byte_slices}")
+
+
+def _check_program_size(txn: Txn):
+    max_len = MAX_APP_PROGRAM_LEN * (1 + txn.extra_pages)
+    if len(txn.approval_program) + len(txn.clear_program) > max_len:
+        raise LedgerError(
+            "app programs too long. max total len {} bytes".format(max_len), txn.txid
+        )
+
+
+def _ledger_error(e: Exception, txid: str) -> LedgerError:
+    if isinstance(e, LedgerError):
+        if not e.txid:
+            e.txid = txid
+        return e
+    return LedgerError(e.msg, txid, pc=e.pc)
@@ -0,0 +1,154 @@
+"""
+HTTP front-end of the local ledger, speaking algod's REST API.
+
+Lets any algod client (the sync AlgodClient, an asyncio client, other
+processes) talk to a Ledger over real sockets. Optional per-request latency
+and a block interval make it behave like a remote node for benchmarks.
+
+    python -m localnet.server --port 4001 --block-time 1 --latency 0.02
+"""
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+from urllib.parse import parse_qsl, urlsplit
+
+from algosdk.error import AlgodHTTPError
+
+from localnet.algod import LocalAlgodClient
+from localnet.ledger import Ledger
+
+API_PREFIX = "/v2"
+
+
+class LedgerServer(ThreadingHTTPServer):
+    """
+    Threaded HTTP server answering algod requests from a Ledger.
+
+    Args:
+    address: (host, port) to listen on, port 0 picks a free port.
+    ledger: ledger to serve, a new one if omitted.
+    latency: seconds slept before answering each request (simulated network round trip).
+    block_time: seconds between blocks. Transactions are confirmed when the next
+        block is committed. With 0 every group is confirmed immediately (dev mode).
+    """
+
+    daemon_threads = True
+    request_queue_size = 512
+
+    def __init__(self, address: tuple[str, int], ledger: Ledger = None, latency: float = 0.0, block_time: float = 0.0):
+        super().__init__(address, _Handler)
+        self.ledger = ledger if ledger is not None else Ledger()
+        self.ledger.auto_commit = block_time <= 0
+        self.algod = LocalAlgodClient(self.ledger)
+        self.latency = latency
+        self.block_time = block_time
+        self.lock = threading.Lock()
+        self.new_block = threading.Condition(self.lock)
+        self._background: list[threading.Thread] = []
+        self._stopped = threading.Event()
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "LedgerServer":
+        """Serve (and produce blocks) in background threads."""
+        self._background.append(threading.Thread(target=self.serve_forever, daemon=True))
+        if self.block_time > 0:
+            self._background.append(threading.Thread(target=self._produce_blocks, daemon=True))
+        for t in self._background:
+            t.start()
+        return self
+
+    def stop(self):
+        self._stopped.set()
+        self.shutdown()
+        self.server_close()
+
+    def __enter__(self) -> "LedgerServer":
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def handle(self, method: str, path: str, params: dict, data: Optional[bytes]):
+        """Answer one request, returns (status, content type, body)."""
+        if self.latency > 0:
+            time.sleep(self.latency)
+        if path.startswith(API_PREFIX):
+            path = path[len(API_PREFIX):]
+        response_format = params.get("format", "json")
+        parts = [p for p in path.split("/") if p]
+
+        if self.block_time > 0 and parts[:2] == ["status", "wait-for-block-after"]:
+            # blocks come from the producer thread, not from the request (as in dev mode)
+            with self.new_block:
+                self.new_block.wait_for(lambda: self.ledger.round > int(parts[2]), timeout=60)
+            path = "/status"
+        try:
+            with self.lock:
+                result = self.algod.algod_request(method, path, params, data, response_format=response_format)
+        except AlgodHTTPError as e:
+            return e.code or 400, "application/json", json.dumps({"message": str(e)}).encode()
+        if response_format == "msgpack":
+            return 200, "application/msgpack", result
+        return 200, "application/json", json.dumps(result).encode()
+
+    def _produce_blocks(self):
+        while not self._stopped.wait(self.block_time):
+            with self.new_block:
+                self.ledger.clock.set(max(self.ledger.clock.now(), int(time.time())))
+                self.ledger.commit_block()
+                self.new_block.notify_all()
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1" # keep-alive, so pooled clients reuse connections
+    server: LedgerServer
+
+    def _serve(self, method: str):
+        url = urlsplit(self.path)
+        params = dict(parse_qsl(url.query))
+        length = int(self.headers.get("Content-Length") or 0)
+        data = self.rfile.read(length) if length else None
+        status, content_type, body = self.server.handle(method, url.path, params, data)
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        self._serve("GET")
+
+    def do_POST(self):
+        self._serve("POST")
+
+    def log_message(self, format, *args):
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve an in-memory ledger over algod's REST API.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=4001)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every request")
+    parser.add_argument("--block-time", type=float, default=0.0, help="seconds between blocks, 0 for dev mode")
+    args = parser.parse_args()
+
+    server = LedgerServer((args.host, args.port), latency=args.latency, block_time=args.block_time)
+    print(f"Local algod listening on {server.url}")
+    server.start()
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
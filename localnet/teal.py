@@ -0,0 +1,608 @@
+"""
+TEAL assembler and bytecode decoder used by the local algod stand-in.
+
+Covers the AVM v7 opcodes (no logic signature specific ops), which is what
+PyTeal 0.18 emits for the applications in `contracts/`. The assembler output is
+byte compatible with `goal clitest assemble` for programs already using
+constant blocks (PyTeal is always invoked with assemble_constants=True), so
+program sizes and pcs reported by the stand-in match the real network.
+"""
+import base64
+import re
+from dataclasses import dataclass, field
+from typing import Any
+
+from algosdk import encoding
+from algosdk.abi import Method
+
+MAX_VERSION = 7
+
+
+class TealAssemblyError(Exception):
+    def __init__(self, line: int, msg: str):
+        super().__init__(f"{line}: {msg}")
+        self.line = line
+        self.msg = msg
+
+
+# ---------------------------------------------------------------- fields
+
+TXN_FIELDS = [
+    "Sender", "Fee", "FirstValid", "FirstValidTime", "LastValid", "Note", "Lease",
+    "Receiver", "Amount", "CloseRemainderTo", "VotePK", "SelectionPK", "VoteFirst",
+    "VoteLast", "VoteKeyDilution", "Type", "TypeEnum", "XferAsset", "AssetAmount",
+    "AssetSender", "AssetReceiver", "AssetCloseTo", "GroupIndex", "TxID",
+    "ApplicationID", "OnCompletion", "ApplicationArgs", "NumAppArgs", "Accounts",
+    "NumAccounts", "ApprovalProgram", "ClearStateProgram", "RekeyTo", "ConfigAsset",
+    "ConfigAssetTotal", "ConfigAssetDecimals", "ConfigAssetDefaultFrozen",
+    "ConfigAssetUnitName", "ConfigAssetName", "ConfigAssetURL",
+    "ConfigAssetMetadataHash", "ConfigAssetManager", "ConfigAssetReserve",
+    "ConfigAssetFreeze", "ConfigAssetClawback", "FreezeAsset", "FreezeAssetAccount",
+    "FreezeAssetFrozen", "Assets", "NumAssets", "Applications", "NumApplications",
+    "GlobalNumUint", "GlobalNumByteSlice", "LocalNumUint", "LocalNumByteSlice",
+    "ExtraProgramPages", "Nonparticipation", "Logs", "NumLogs", "CreatedAssetID",
+    "CreatedApplicationID", "LastLog", "StateProofPK", "ApprovalProgramPages",
+    "NumApprovalProgramPages", "ClearStateProgramPages", "NumClearStateProgramPages",
+]
+
+GLOBAL_FIELDS = [
+    "MinTxnFee", "MinBalance", "MaxTxnLife", "ZeroAddress", "GroupSize",
+    "LogicSigVersion", "Round", "LatestTimestamp", "CurrentApplicationID",
+    "CreatorAddress", "CurrentApplicationAddress", "GroupID", "OpcodeBudget",
+    "CallerApplicationID", "CallerApplicationAddress",
+]
+
+ASSET_HOLDING_FIELDS = ["AssetBalance", "AssetFrozen"]
+
+ASSET_PARAMS_FIELDS = [
+    "AssetTotal", "AssetDecimals", "AssetDefaultFrozen", "AssetUnitName", "AssetName",
+    "AssetURL", "AssetMetadataHash", "AssetManager", "AssetReserve", "AssetFreeze",
+    "AssetClawback", "AssetCreator",
+]
+
+APP_PARAMS_FIELDS = [
+    "AppApprovalProgram", "AppClearStateProgram", "AppGlobalNumUint",
+    "AppGlobalNumByteSlice", "AppLocalNumUint", "AppLocalNumByteSlice",
+    "AppExtraProgramPages", "AppCreator", "AppAddress",
+]
+
+ACCT_PARAMS_FIELDS = ["AcctBalance", "AcctMinBalance", "AcctAuthAddr"]
+
+BASE64_ENCODINGS = ["URLEncoding", "StdEncoding"]
+
+JSON_REF_TYPES = ["JSONString", "JSONUint64", "JSONObject"]
+
+# Named integer constants accepted by the `int` pseudo op
+NAMED_INTS = {
+    "NoOp": 0, "OptIn": 1, "CloseOut": 2, "ClearState": 3, "UpdateApplication": 4,
+    "DeleteApplication": 5,
+    "unknown": 0, "pay": 1, "keyreg": 2, "acfg": 3, "axfer": 4, "afrz": 5, "appl": 6,
+}
+
+
+# ---------------------------------------------------------------- opcodes
+
+@dataclass(frozen=True)
+class OpSpec:
+    name: str
+    opcode: int
+    # immediate kinds: "u8" (uint8), "i8" (int8), "label" (int16 branch offset),
+    # "varuint", "bytes", "ints" (intcblock), "byteses" (bytecblock) or the name of a
+    # field group ("txn", "global", ...) encoded as an uint8
+    immediates: tuple[str, ...] = ()
+    cost: int = 1
+    version: int = 1
+
+
+_OPS = [
+    OpSpec("err", 0x00),
+    OpSpec("sha256", 0x01, cost=35),
+    OpSpec("keccak256", 0x02, cost=130),
+    OpSpec("sha512_256", 0x03, cost=45),
+    OpSpec("ed25519verify", 0x04, cost=1900),
+    OpSpec("+", 0x08), OpSpec("-", 0x09), OpSpec("/", 0x0a), OpSpec("*", 0x0b),
+    OpSpec("<", 0x0c), OpSpec(">", 0x0d), OpSpec("<=", 0x0e), OpSpec(">=", 0x0f),
+    OpSpec("&&", 0x10), OpSpec("||", 0x11), OpSpec("==", 0x12), OpSpec("!=", 0x13),
+    OpSpec("!", 0x14), OpSpec("len", 0x15), OpSpec("itob", 0x16), OpSpec("btoi", 0x17),
+    OpSpec("%", 0x18), OpSpec("|", 0x19), OpSpec("&", 0x1a), OpSpec("^", 0x1b),
+    OpSpec("~", 0x1c), OpSpec("mulw", 0x1d), OpSpec("addw", 0x1e, version=2),
+    OpSpec("divmodw", 0x1f, cost=20, version=4),
+    OpSpec("intcblock", 0x20, ("ints",)),
+    OpSpec("intc", 0x21, ("u8",)),
+    OpSpec("intc_0", 0x22), OpSpec("intc_1", 0x23), OpSpec("intc_2", 0x24), OpSpec("intc_3", 0x25),
+    OpSpec("bytecblock", 0x26, ("byteses",)),
+    OpSpec("bytec", 0x27, ("u8",)),
+    OpSpec("bytec_0", 0x28), OpSpec("bytec_1", 0x29), OpSpec("bytec_2", 0x2a), OpSpec("bytec_3", 0x2b),
+    OpSpec("txn", 0x31, ("txn",)),
+    OpSpec("global", 0x32, ("global",)),
+    OpSpec("gtxn", 0x33, ("u8", "txn")),
+    OpSpec("load", 0x34, ("u8",)),
+    OpSpec("store", 0x35, ("u8",)),
+    OpSpec("txna", 0x36, ("txn", "u8"), version=2),
+    OpSpec("gtxna", 0x37, ("u8", "txn", "u8"), version=2),
+    OpSpec("gtxns", 0x38, ("txn",), version=3),
+    OpSpec("gtxnsa", 0x39, ("txn", "u8"), version=3),
+    OpSpec("gload", 0x3a, ("u8", "u8"), version=4),
+    OpSpec("gloads", 0x3b, ("u8",), version=4),
+    OpSpec("gaid", 0x3c, ("u8",), version=4),
+    OpSpec("gaids", 0x3d, version=4),
+    OpSpec("loads", 0x3e, version=5),
+    OpSpec("stores", 0x3f, version=5),
+    OpSpec("bnz", 0x40, ("label",)),
+    OpSpec("bz", 0x41, ("label",), version=2),
+    OpSpec("b", 0x42, ("label",), version=2),
+    OpSpec("return", 0x43, version=2),
+    OpSpec("assert", 0x44, version=3),
+    OpSpec("pop", 0x48), OpSpec("dup", 0x49), OpSpec("dup2", 0x4a, version=2),
+    OpSpec("dig", 0x4b, ("u8",), version=3),
+    OpSpec("swap", 0x4c, version=3),
+    OpSpec("select", 0x4d, version=3),
+    OpSpec("cover", 0x4e, ("u8",), version=5),
+    OpSpec("uncover", 0x4f, ("u8",), version=5),
+    OpSpec("concat", 0x50, version=2),
+    OpSpec("substring", 0x51, ("u8", "u8"), version=2),
+    OpSpec("substring3", 0x52, version=2),
+    OpSpec("getbit", 0x53, version=3), OpSpec("setbit", 0x54, version=3),
+    OpSpec("getbyte", 0x55, version=3), OpSpec("setbyte", 0x56, version=3),
+    OpSpec("extract", 0x57, ("u8", "u8"), version=5),
+    OpSpec("extract3", 0x58, version=5),
+    OpSpec("extract_uint16", 0x59, version=5),
+    OpSpec("extract_uint32", 0x5a, version=5),
+    OpSpec("extract_uint64", 0x5b, version=5),
+    OpSpec("replace2", 0x5c, ("u8",), version=7),
+    OpSpec("replace3", 0x5d, version=7),
+    OpSpec("base64_decode", 0x5e, ("base64",), version=7),
+    OpSpec("json_ref", 0x5f, ("json",), version=7),
+    OpSpec("balance", 0x60, version=2),
+    OpSpec("app_opted_in", 0x61, version=2),
+    OpSpec("app_local_get", 0x62, version=2),
+    OpSpec("app_local_get_ex", 0x63, version=2),
+    OpSpec("app_global_get", 0x64, version=2),
+    OpSpec("app_global_get_ex", 0x65, version=2),
+    OpSpec("app_local_put", 0x66, version=2),
+    OpSpec("app_global_put", 0x67, version=2),
+    OpSpec("app_local_del", 0x68, version=2),
+    OpSpec("app_global_del", 0x69, version=2),
+    OpSpec("asset_holding_get", 0x70, ("asset_holding",), version=2),
+    OpSpec("asset_params_get", 0x71, ("asset_params",), version=2),
+    OpSpec("app_params_get", 0x72, ("app_params",), version=5),
+    OpSpec("acct_params_get", 0x73, ("acct_params",), version=6),
+    OpSpec("min_balance", 0x78, version=3),
+    OpSpec("pushbytes", 0x80, ("bytes",), version=3),
+    OpSpec("pushint", 0x81, ("varuint",), version=3),
+    OpSpec("ed25519verify_bare", 0x84, cost=1900, version=7),
+    OpSpec("callsub", 0x88, ("label",), version=4),
+    OpSpec("retsub", 0x89, version=4),
+    OpSpec("shl", 0x90, version=4), OpSpec("shr", 0x91, version=4),
+    OpSpec("sqrt", 0x92, cost=4, version=4),
+    OpSpec("bitlen", 0x93, version=4),
+    OpSpec("exp", 0x94, version=4),
+    OpSpec("expw", 0x95, cost=10, version=4),
+    OpSpec("bsqrt", 0x96, cost=40, version=6),
+    OpSpec("divw", 0x97, version=6),
+    OpSpec("sha3_256", 0x98, cost=130, version=7),
+    OpSpec("b+", 0xa0, cost=10, version=4), OpSpec("b-", 0xa1, cost=10, version=4),
+    OpSpec("b/", 0xa2, cost=20, version=4), OpSpec("b*", 0xa3, cost=20, version=4),
+    OpSpec("b<", 0xa4, version=4), OpSpec("b>", 0xa5, version=4),
+    OpSpec("b<=", 0xa6, version=4), OpSpec("b>=", 0xa7, version=4),
+    OpSpec("b==", 0xa8, version=4), OpSpec("b!=", 0xa9, version=4),
+    OpSpec("b%", 0xaa, cost=20, version=4), OpSpec("b|", 0xab, cost=6, version=4),
+    OpSpec("b&", 0xac, cost=6, version=4), OpSpec("b^", 0xad, cost=6, version=4),
+    OpSpec("b~", 0xae, cost=4, version=4),
+    OpSpec("bzero", 0xaf, version=4),
+    OpSpec("log", 0xb0, version=5),
+    OpSpec("itxn_begin", 0xb1, version=5),
+    OpSpec("itxn_field", 0xb2, ("txn",), version=5),
+    OpSpec("itxn_submit", 0xb3, version=5),
+    OpSpec("itxn", 0xb4, ("txn",), version=5),
+    OpSpec("itxna", 0xb5, ("txn", "u8"), version=5),
+    OpSpec("itxn_next", 0xb6, version=6),
+    OpSpec("gitxn", 0xb7, ("u8", "txn"), version=6),
+    OpSpec("gitxna", 0xb8, ("u8", "txn", "u8"), version=6),
+    OpSpec("txnas", 0xc0, ("txn",), version=5),
+    OpSpec("gtxnas", 0xc1, ("u8", "txn"), version=5),
+    OpSpec("gtxnsas", 0xc2, ("txn",), version=5),
+    OpSpec("gloadss", 0xc4, version=6),
+    OpSpec("itxnas", 0xc5, ("txn",), version=6),
+    OpSpec("gitxnas", 0xc6, ("u8", "txn"), version=6),
+]
+
+OPS_BY_NAME: dict[str, OpSpec] = {op.name: op for op in _OPS}
+OPS_BY_CODE: dict[int, OpSpec] = {op.opcode: op for op in _OPS}
+
+FIELD_GROUPS: dict[str, list[str]] = {
+    "txn": TXN_FIELDS,
+    "global": GLOBAL_FIELDS,
+    "asset_holding": ASSET_HOLDING_FIELDS,
+    "asset_params": ASSET_PARAMS_FIELDS,
+    "app_params": APP_PARAMS_FIELDS,
+    "acct_params": ACCT_PARAMS_FIELDS,
+    "base64": BASE64_ENCODINGS,
+    "json": JSON_REF_TYPES,
+}
+
+
+# ---------------------------------------------------------------- encoding helpers
+
+def encode_uvarint(value: int) -> bytes:
+    out = bytearray()
+    while value >= 0x80:
+        out.append((value & 0x7f) | 0x80)
+        value >>= 7
+    out.append(value)
+    return bytes(out)
+
+
+def decode_uvarint(data: bytes, pos: int) -> tuple[int, int]:
+    """Decode an uvarint at `pos`, returns (value, next position)."""
+    value = shift = 0
+    while True:
+        if pos >= len(data):
+            raise ValueError("uvarint overflows program")
+        b = data[pos]
+        pos += 1
+        value |= (b & 0x7f) << shift
+        if b < 0x80:
+            return value, pos
+        shift += 7
+
+
+_VLQ_CHARS = "ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789+/"
+
+
+def _vlq(value: int) -> str:
+    value = ((-value) << 1) | 1 if value < 0 else value << 1
+    out = ""
+    while True:
+        digit = value & 0x1f
+        value >>= 5
+        if value:
+            digit |= 0x20
+        out += _VLQ_CHARS[digit]
+        if not value:
+            return out
+
+
+def program_hash(program: bytes) -> str:
+    """Address of the program (hash used by algod as compile `hash`)."""
+    return encoding.encode_address(encoding.checksum(b"Program" + program))
+
+
+# ---------------------------------------------------------------- assembler
+
+def _tokenize(line: str) -> list[str]:
+    """Split a TEAL line in tokens, dropping comments and keeping string literals."""
+    tokens = []
+    i, n = 0, len(line)
+    while i < n:
+        c = line[i]
+        if c in " \t":
+            i += 1
+        elif line.startswith("//", i):
+            break
+        elif c == '"':
+            j = i + 1
+            while j < n and line[j] != '"':
+                j += 2 if line[j] == "\\" else 1
+            tokens.append(line[i:j + 1])
+            i = j + 1
+        else:
+            j = i
+            while j < n and line[j] not in " \t":
+                if line[j] == '"': # e.g. base64("...") never happens, keep simple
+                    break
+                j += 1
+            tokens.append(line[i:j])
+            i = j
+    return tokens
+
+
+def _parse_string(token: str) -> bytes:
+    body = token[1:-1]
+    return body.encode("utf-8").decode("unicode_escape").encode("latin-1")
+
+
+def _parse_bytes(tokens: list[str], line: int) -> tuple[bytes, int]:
+    """Parse a byte constant, returns (value, number of tokens consumed)."""
+    if not tokens:
+        raise TealAssemblyError(line, "missing byte constant")
+    tok = tokens[0]
+    if tok.startswith("0x"):
+        try:
+            return bytes.fromhex(tok[2:]), 1
+        except ValueError:
+            raise TealAssemblyError(line, f"invalid hex constant {tok}")
+    if tok.startswith('"'):
+        return _parse_string(tok), 1
+    m = re.fullmatch(r"(base64|b64|base32|b32)\((.*)\)", tok)
+    if m:
+        enc, val = m.groups()
+        if enc.startswith("b") and "32" in enc:
+            return base64.b32decode(val + "=" * (-len(val) % 8)), 1
+        return base64.b64decode(val), 1
+    if tok in ("base64", "b64", "base32", "b32") and len(tokens) > 1:
+        val = tokens[1]
+        if "32" in tok:
+            return base64.b32decode(val + "=" * (-len(val) % 8)), 2
+        return base64.b64decode(val), 2
+    raise TealAssemblyError(line, f"unknown byte constant {tok}")
+
+
+def _parse_int(token: str, line: int) -> int:
+    if token in NAMED_INTS:
+        return NAMED_INTS[token]
+    try:
+        value = int(token, 0)
+    except ValueError:
+        raise TealAssemblyError(line, f"invalid integer {token}")
+    if not 0 <= value < 2**64:
+        raise TealAssemblyError(line, f"integer out of range {token}")
+    return value
+
+
+@dataclass
+class Program:
+    """Assembled program: bytecode plus the pc -> source line mapping."""
+
+    bytecode: bytes
+    version: int
+    pc_to_line: dict[int, int] = field(default_factory=dict)
+    num_lines: int = 0
+
+    def source_map(self) -> dict[str, Any]:
+        """Source map in the format returned by algod's /v2/teal/compile."""
+        mappings = []
+        prev = 0
+        for pc in range(len(self.bytecode)):
+            line = self.pc_to_line.get(pc)
+            if line is None:
+                mappings.append("")
+            else:
+                mappings.append("AA" + _vlq(line - prev) + "A")
+                prev = line
+        return {"version": 3, "sources": [], "names": [], "mapping": "", "mappings": ";".join(mappings)}
+
+
+def assemble(source: str) -> Program:
+    """Assemble TEAL `source` into AVM bytecode."""
+    lines = source.splitlines()
+    version = 1
+    out = bytearray()
+    pc_to_line: dict[int, int] = {}
+    labels: dict[str, int] = {}
+    fixups: list[tuple[int, str, int]] = []  # (position of the offset, label, line)
+    version_set = False
+
+    for idx, raw in enumerate(lines):
+        tokens = _tokenize(raw)
+        if not tokens:
+            continue
+        if tokens[0] == "#pragma":
+            if len(tokens) >= 3 and tokens[1] == "version":
+                if out:
+                    raise TealAssemblyError(idx, "#pragma version is only allowed before instructions")
+                version = _parse_int(tokens[2], idx)
+                if version > MAX_VERSION:
+                    raise TealAssemblyError(idx, f"unsupported version {version}")
+                version_set = True
+            continue
+        if tokens[0].endswith(":") and len(tokens) == 1:
+            label = tokens[0][:-1]
+            if label in labels:
+                raise TealAssemblyError(idx, f"duplicate label {label}")
+            if not out:
+                out += encode_uvarint(version)
+                if version_set:
+                    pc_to_line[0] = _pragma_line(lines)
+            labels[label] = len(out)
+            continue
+
+        if not out:
+            out += encode_uvarint(version)
+            if version_set:
+                pc_to_line[0] = _pragma_line(lines)
+
+        name, args = tokens[0], tokens[1:]
+        # pseudo ops
+        if name == "int":
+            name, args = "pushint", [str(_parse_int(args[0], idx))] if args else []
+        elif name == "byte":
+            value, _ = _parse_bytes(args, idx)
+            name, args = "pushbytes", ["0x" + value.hex()]
+        elif name == "addr":
+            if not args:
+                raise TealAssemblyError(idx, "addr needs an address")
+            name, args = "pushbytes", ["0x" + encoding.decode_address(args[0]).hex()]
+        elif name == "method":
+            if not args:
+                raise TealAssemblyError(idx, "method needs a signature")
+            selector = Method.from_signature(_parse_string(args[0]).decode()).get_selector()
+            name, args = "pushbytes", ["0x" + selector.hex()]
+
+        spec = OPS_BY_NAME.get(name)
+        if spec is None:
+            raise TealAssemblyError(idx, f"unknown opcode: {name}")
+        if spec.version > version:
+            raise TealAssemblyError(idx, f"{name} opcode was introduced in TEAL v{spec.version}")
+
+        pc_to_line[len(out)] = idx
+        out.append(spec.opcode)
+        pos = 0
+        for kind in spec.immediates:
+            if kind == "ints":
+                values = [_parse_int(a, idx) for a in args[pos:]]
+                out += encode_uvarint(len(values))
+                for v in values:
+                    out += encode_uvarint(v)
+                pos = len(args)
+            elif kind == "byteses":
+                values = []
+                rest = args[pos:]
+                while rest:
+                    value, used = _parse_bytes(rest, idx)
+                    values.append(value)
+                    rest = rest[used:]
+                out += encode_uvarint(len(values))
+                for v in values:
+                    out += encode_uvarint(len(v)) + v
+                pos = len(args)
+            elif kind == "bytes":
+                value, used = _parse_bytes(args[pos:], idx)
+                out += encode_uvarint(len(value)) + value
+                pos += used
+            elif kind == "varuint":
+                if pos >= len(args):
+                    raise TealAssemblyError(idx, f"{name} expects an immediate")
+                out += encode_uvarint(_parse_int(args[pos], idx))
+                pos += 1
+            elif kind == "label":
+                if pos >= len(args):
+                    raise TealAssemblyError(idx, f"{name} expects a label")
+                fixups.append((len(out), args[pos], idx))
+                out += b"\x00\x00"
+                pos += 1
+            else:
+                if pos >= len(args):
+                    raise TealAssemblyError(idx, f"{name} expects {len(spec.immediates)} immediate arguments")
+                if kind in ("u8", "i8"):
+                    value = _parse_int(args[pos], idx)
+                    if value > 255:
+                        raise TealAssemblyError(idx, f"{name} immediate out of range")
+                    out.append(value)
+                else:
+                    names = FIELD_GROUPS[kind]
+                    if args[pos] in names:
+                        out.append(names.index(args[pos]))
+                    else:
+                        raise TealAssemblyError(idx, f"{name} unknown field: {args[pos]}")
+                pos += 1
+        if pos != len(args):
+            raise TealAssemblyError(idx, f"{name} got too many immediate arguments")
+
+    if not out:
+        out += encode_uvarint(version)
+
+    for at, label, idx in fixups:
+        if label not in labels:
+            raise TealAssemblyError(idx, f"reference to undefined label {label}")
+        offset = labels[label] - (at + 2)
+        if not -0x8000 <= offset <= 0x7fff:
+            raise TealAssemblyError(idx, "branch offset too large")
+        out[at:at + 2] = (offset & 0xffff).to_bytes(2, "big")
+
+    return Program(bytes(out), version, pc_to_line, len(lines))
+
+
+def _pragma_line(lines: list[str]) -> int:
+    for idx, line in enumerate(lines):
+        if line.strip().startswith("#pragma"):
+            return idx
+    return 0
+
+
+# ---------------------------------------------------------------- decoder
+
+@dataclass(frozen=True)
+class Instruction:
+    pc: int
+    spec: OpSpec
+    # decoded immediates: ints, bytes, field names, lists (constant blocks) or absolute branch targets
+    args: tuple
+    next_pc: int
+
+
+def decode(program: bytes) -> tuple[int, list[Instruction]]:
+    """Decode AVM bytecode, returns (version, instructions)."""
+    if not program:
+        raise ValueError("invalid program (empty)")
+    version, pc = decode_uvarint(program, 0)
+    if version > MAX_VERSION:
+        raise ValueError(f"program version {version} greater than max supported version {MAX_VERSION}")
+    instructions: list[Instruction] = []
+    n = len(program)
+    while pc < n:
+        start = pc
+        spec = OPS_BY_CODE.get(program[pc])
+        if spec is None:
+            raise ValueError(f"invalid opcode {program[pc]:#x} at pc={pc}")
+        pc += 1
+        args: list[Any] = []
+        for kind in spec.immediates:
+            if kind == "ints":
+                count, pc = decode_uvarint(program, pc)
+                values = []
+                for _ in range(count):
+                    v, pc = decode_uvarint(program, pc)
+                    values.append(v)
+                args.append(tuple(values))
+            elif kind == "byteses":
+                count, pc = decode_uvarint(program, pc)
+                values = []
+                for _ in range(count):
+                    length, pc = decode_uvarint(program, pc)
+                    values.append(bytes(program[pc:pc + length]))
+                    pc += length
+                args.append(tuple(values))
+            elif kind == "bytes":
+                length, pc = decode_uvarint(program, pc)
+                if pc + length > n:
+                    raise ValueError(f"pushbytes overflows program at pc={start}")
+                args.append(bytes(program[pc:pc + length]))
+                pc += length
+            elif kind == "varuint":
+                v, pc = decode_uvarint(program, pc)
+                args.append(v)
+            elif kind == "label":
+                if pc + 2 > n:
+                    raise ValueError(f"branch target overflows program at pc={start}")
+                offset = int.from_bytes(program[pc:pc + 2], "big", signed=True)
+                pc += 2
+                args.append(pc + offset)
+            else:
+                if pc >= n:
+                    raise ValueError(f"immediate overflows program at pc={start}")
+                v = program[pc]
+                pc += 1
+                if kind in FIELD_GROUPS:
+                    names = FIELD_GROUPS[kind]
+                    if v >= len(names):
+                        raise ValueError(f"invalid {kind} field {v} at pc={start}")
+                    args.append(names[v])
+                else:
+                    args.append(v)
+        instructions.append(Instruction(start, spec, tuple(args), pc))
+    return version, instructions
+
+
+def disassemble(program: bytes) -> str:
+    """Best effort TEAL listing of `program`, mostly useful for debugging."""
+    version, instructions = decode(program)
+    targets = {a for ins in instructions if "label" in ins.spec.immediates for a in ins.args}
+    out = [f"#pragma version {version}"]
+    for ins in instructions:
+        if ins.pc in targets:
+            out.append(f"label{ins.pc}:")
+        parts = [ins.spec.name]
+        for kind, arg in zip(ins.spec.immediates, ins.args):
+            if kind == "label":
+                parts.append(f"label{arg}")
+            elif kind == "bytes":
+                parts.append("0x" + arg.hex())
+            elif kind == "byteses":
+                parts += ["0x" + b.hex() for b in arg]
+            elif kind == "ints":
+                parts += [str(i) for i in arg]
+            else:
+                parts.append(str(arg))
+        out.append(" ".join(parts))
+    return "\n".join(out)
+
+
+def compile_response(source: str) -> dict[str, Any]:
+    """Body of the algod /v2/teal/compile response for `source` (with source map)."""
+    program = assemble(source)
+    return {
+        "hash": program_hash(program.bytecode),
+        "result": base64.b64encode(program.bytecode).decode("utf8"),
+        "sourcemap": program.source_map(),
+    }
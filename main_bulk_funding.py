@@ -0,0 +1,80 @@
+import datetime
+import sys
+import time
+
+from algosdk import account
+from algosdk.atomic_transaction_composer import AccountTransactionSigner
+from algosdk.future import transaction
+from beaker import sandbox, consts
+
+from client.bulk_funding import Backer, BulkFunder
+from contracts.compile_cache import default_cache
+from contracts.crowdfunding.crowdfundingCampaign import CrowdfundingCampaignApp
+from localnet.algod import LocalAlgodClient, get_accounts
+
+def demo(num_backers=50, client=None, accts=None):
+    """
+    Onboard `num_backers` new backers into a fresh campaign with grouped transactions.
+
+    Args:
+    num_backers: number of backer accounts to generate, fund and onboard.
+    client: AlgodClient to use (e.g. LocalAlgodClient), defaults to the sandbox algod.
+    accts: funded accounts to use with `client`, defaults to the sandbox accounts.
+    """
+    if client is None:
+        client = sandbox.get_algod_client()
+        accts = sandbox.get_accounts()
+    creator_acct = accts[0]
+
+    app_client = default_cache().application_client(client, CrowdfundingCampaignApp(), signer=creator_acct.signer)
+    unix_timestamp = round(datetime.datetime.now(datetime.timezone.utc).timestamp())
+    app_id, app_addr, _ = app_client.create(
+        campaign_goal = 10 * consts.algo,
+        funds_receiver = creator_acct.address,
+        fund_start_date = unix_timestamp,
+        fund_end_date = unix_timestamp + 3600,
+        reward_metadata = "ipfs:/metadata/CID",
+        total_milestones = 2,
+        funds_per_milestone = [7 * consts.algo, 3 * consts.algo]
+    )
+    print(f"Created App with id: {app_id} and address addr: {app_addr}")
+
+    print(f"---------Create and fund {num_backers} backer accounts")
+    backers = []
+    for _ in range(num_backers):
+        private_key, address = account.generate_account()
+        backers.append(Backer(address, AccountTransactionSigner(private_key), 10 * consts.algo))
+    fund_accounts(client, creator_acct, [b.address for b in backers], 11 * consts.algo)
+
+    print(f"---------Bulk fund the campaign from {num_backers} backers")
+    start = time.perf_counter()
+    results = BulkFunder(app_client).fund(backers)
+    elapsed = time.perf_counter() - start
+
+    for i, result in enumerate(results):
+        status = f"confirmed in round {result.confirmed_round}" if result.ok else f"failed: {result.error}"
+        print(f"group {i}: {len(result.backers)} backers, {status}")
+    funded = sum(len(r.backers) for r in results if r.ok)
+    print(f"{funded}/{num_backers} backers funded in {len(results)} groups, {elapsed:.2f}s")
+
+    state = app_client.get_application_state()
+    print(f"collected_funds: {state['collected_funds']}, total_backers: {state['total_backers']}")
+
+def fund_accounts(client, sender, addresses, amount):
+    """Send `amount` microAlgos from `sender` to each of `addresses`, 16 payments per group."""
+    sp = client.suggested_params()
+    for i in range(0, len(addresses), 16):
+        txns = [transaction.PaymentTxn(sender.address, sp, addr, amount) for addr in addresses[i:i + 16]]
+        if len(txns) > 1:
+            transaction.assign_group_id(txns)
+        txid = client.send_transactions([t.sign(sender.private_key) for t in txns])
+        transaction.wait_for_confirmation(client, txid, 4)
+
+
+if __name__ == "__main__":
+    num_backers = int(sys.argv[sys.argv.index("--backers") + 1]) if "--backers" in sys.argv else 50
+    if "--local" in sys.argv: # in-process ledger, no sandbox needed
+        client = LocalAlgodClient()
+        demo(num_backers, client, get_accounts(client))
+    else:
+        demo(num_backers)
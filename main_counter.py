@@ -1,12 +1,15 @@
+import sys
+
 from beaker.client import ApplicationClient, LogicException
 from beaker import sandbox
 
 from contracts.counter.counter import CounterApp
+from localnet.algod import LocalAlgodClient, get_accounts
 
-def demo():
-    client = sandbox.get_algod_client()
-
-    accts = sandbox.get_accounts()
+def demo(client=None, accts=None):
+    if client is None:
+        client = sandbox.get_algod_client()
+        accts = sandbox.get_accounts()
     acct = accts.pop()
 
     # Create an Application client containing both an algod client and my app
@@ -38,4 +41,8 @@ def demo():
 
 if __name__ == "__main__":
     ca = CounterApp()
-    demo()
\ No newline at end of file
+    if "--local" in sys.argv: # in-process ledger, no sandbox needed
+        client = LocalAlgodClient()
+        demo(client, get_accounts(client))
+    else:
+        demo()
\ No newline at end of file
@@ -1,4 +1,5 @@
 import datetime
+import sys
 import time
 
 from beaker.client import ApplicationClient
@@ -7,24 +8,50 @@ from beaker import sandbox, consts
 from algosdk.future import transaction
 from algosdk.atomic_transaction_composer import TransactionWithSigner
 
+from contracts.compile_cache import default_cache
 from contracts.crowdfunding.crowdfundingCampaign import CrowdfundingCampaignApp
 from contracts.crowdfunding.milestoneApproval import MilestoneApprovalApp
+from client.event_stream import Cursor, EventStream
+from client.fees import FeePlanner
+from client.state_cache import StateCache
+from localnet.algod import LocalAlgodClient, get_accounts
 
-def demo():
-    client = sandbox.get_algod_client()
+def demo(app=None, client=None, accts=None, clock=None):
+    """
+    Run the campaign flow against the sandbox, or against `client` when given.
+
+    Args:
+    app: CrowdfundingCampaignApp to deploy, a new one if omitted.
+    client: AlgodClient to use (e.g. LocalAlgodClient), defaults to the sandbox algod.
+    accts: funded accounts to use with `client`, defaults to the sandbox accounts.
+    clock: VirtualClock of a local ledger, used instead of the wall clock and time.sleep.
+    """
+    if client is None:
+        client = sandbox.get_algod_client()
+        accts = sandbox.get_accounts()
+    now = clock.now if clock is not None else lambda: datetime.datetime.now(datetime.timezone.utc).timestamp()
+    sleep = clock.sleep if clock is not None else time.sleep
+    # every print follows a transaction: check the round on each read, state is only fetched once per round
+    state_cache = StateCache(client, round_interval=0)
 
-    accts = sandbox.get_accounts()
     creator_acct = accts[0]
     user_acct = accts[1]
 
-    # Create the Application client containing both an algod client and CrowdfundingCampaignApp
-    creator_app_client = ApplicationClient(client, CrowdfundingCampaignApp(), signer=creator_acct.signer)
-
-    current_time = datetime.datetime.now(datetime.timezone.utc)
-    unix_timestamp = current_time.timestamp()
+    # Create the Application client containing both an algod client and CrowdfundingCampaignApp.
+    # Programs come from the compile cache in build/, so a warm start skips PyTeal and algod compile.
+    if app is None:
+        app = CrowdfundingCampaignApp()
+    cache = default_cache()
+    creator_app_client = cache.application_client(client, app, signer=creator_acct.signer)
+    print(f"Compile cache: {cache.stats}")
+    # pays the fees of the inner transactions of claim_funds and submit_milestone (fee pooling)
+    fees = FeePlanner(client)
+
+    unix_timestamp = now()
     unix_timestamp_end = unix_timestamp + (1 * 30) # current + 30 seconds
 
     print("---------Deploy the contract from creator account")
+    first_round = client.status()["last-round"] + 1
     # Create the applicatiion on chain, set the app id for the app client. AppArgs:
     # campaign_goal: abi.Uint64,
     # funds_receiver: abi.Byte,
@@ -32,8 +59,7 @@ def demo():
     # fund_end_date: abi.Uint64,
     # reward_metadata: abi.Byte,
     # total_milestones: abi.Uint8,
-    # funds_0_milestone: abi.Uint64,
-    # funds_1_milestone: abi.Uint64,
+    # funds_per_milestone: abi.DynamicArray[abi.Uint64] (one amount per milestone),
     app_id, app_addr, txid = creator_app_client.create(
         campaign_goal = 10 * consts.algo,
         funds_receiver = creator_acct.address,
@@ -41,13 +67,12 @@ def demo():
         fund_end_date = round(unix_timestamp_end),
         reward_metadata = "ipfs:/metadata/CID",
         total_milestones = 2,
-        funds_0_milestone = 7 * consts.algo,
-        funds_1_milestone = 3 * consts.algo
+        funds_per_milestone = [7 * consts.algo, 3 * consts.algo]
     )
     print(f"Created App with id: {app_id} and address addr: {app_addr} in tx: {txid}")
 
     # Read app global state 
-    print_state(creator_app_client)
+    print_state(creator_app_client, state_cache=state_cache)
 
     # opt in from the creator_acct
     creator_app_client.opt_in()
@@ -57,7 +82,7 @@ def demo():
     user_app_client = creator_app_client.prepare(signer=user_acct.signer)
     user_app_client.opt_in()
     
-    print_state(user_app_client, account=user_acct)
+    print_state(user_app_client, account=user_acct, state_cache=state_cache)
 
     # fund the campaign from the user_acct
     print("---------Fund the campaign from user account")
@@ -76,53 +101,75 @@ def demo():
         )
     )
 
-    print_state(creator_app_client, ["campaign_state", "collected_funds", "total_backers"])
+    print_state(creator_app_client, ["campaign_state", "collected_funds", "total_backers"], state_cache=state_cache)
 
-    print_state(user_app_client, account=user_acct)
+    print_state(user_app_client, account=user_acct, state_cache=state_cache)
 
     # Wait for the funding time window to close
-    time.sleep(35)
+    sleep(35)
 
     # claim funds
     print("---------Claim funds 0 milestone from creator account")
-    result = creator_app_client.call(CrowdfundingCampaignApp.claim_funds)
+    result = fees.call(
+        creator_app_client,
+        CrowdfundingCampaignApp.claim_funds,
+        accounts=[creator_acct.address], # funds_receiver
+    )
+    result = creator_app_client.call(CrowdfundingCampaignApp.get_milestone_funds, milestone=0)
+    print(f"Funds transferred for milestone 0: {result.return_value}")
 
-    print_state(creator_app_client, ["campaign_state", "collected_funds", "total_backers", "milestone_approval_app_id"])
+    print_state(creator_app_client, ["campaign_state", "collected_funds", "total_backers", "milestone_approval_app_id"], state_cache=state_cache)
 
     # claim R-NFT
     #TODO: implement CrowdfundingCampaignApp.claim_reward() and test
 
     # submit milestone 
     print("---------Submit 1 milestone from creator account")
-    # raise the fees for paying the inner transactions
-    sp = creator_app_client.client.suggested_params()
-    sp.fee = sp.min_fee * 2
-    sp.flat_fee = True
     # milestone_to_approve: abi.Uint8,
     # milestone_metadata: abi.String,
     # vote_end_date: abi.Uint64,
-    result = creator_app_client.call(
+    result = fees.call(
+        creator_app_client,
         CrowdfundingCampaignApp.submit_milestone,
         milestone_to_approve=1,
         milestone_metadata="ipfs:/milestone_1_metadata/CID",
-        vote_end_date=10,#TODO: set an correct vote_end_date time
-        suggested_params=sp
+        vote_end_date=round(now()) + 30, # current + 30 seconds
     )
     print(result.return_value)
 
-    print_state(creator_app_client, ["campaign_state", "collected_funds", "total_backers", "milestone_approval_app_id"])
+    print_state(creator_app_client, ["campaign_state", "collected_funds", "total_backers", "milestone_approval_app_id"], state_cache=state_cache)
 
-    # TODO:
-    # 1. opt-in form creator and user
-    # 2. vote the approval of the milestone
-    # 3. settle voting
     milestone_app_client = ApplicationClient(client, MilestoneApprovalApp(), app_id=result.return_value, signer=creator_acct.signer)
-    print_state(milestone_app_client)
+    print_state(milestone_app_client, state_cache=state_cache)
+
+    # vote the approval of the milestone from the user_acct (through the campaign, no opt-in to the milestone app)
+    print("---------Vote milestone 1 from user account")
+    fees.call(user_app_client, CrowdfundingCampaignApp.vote, milestone_app=milestone_app_client.app_id, vote=1)
+
+    # Wait for the vote time window to close, then settle the vote
+    sleep(35)
+    print("---------Settle the vote of milestone 1 from creator account")
+    milestone_app_client.call(MilestoneApprovalApp.vote_settling)
+    print_state(milestone_app_client, ["approval_state", "approve_votes", "reject_votes"], state_cache=state_cache)
+
+    # claim funds, the milestone app holds the outcome of the vote
+    print("---------Claim funds 1 milestone from creator account")
+    result = fees.call(
+        creator_app_client,
+        CrowdfundingCampaignApp.claim_funds,
+        accounts=[creator_acct.address], # funds_receiver
+        foreign_apps=[milestone_app_client.app_id],
+    )
+    result = creator_app_client.call(CrowdfundingCampaignApp.get_milestone_funds, milestone=1)
+    print(f"Funds transferred for milestone 1: {result.return_value}")
 
-    # claim funds
-    # print("---------Claim funds 1 milestone from creator account")
+    print_state(creator_app_client, ["campaign_state", "reached_milestone", "milestone_approval_app_id"], state_cache=state_cache)
 
-def print_state(app_client, states=[], account=""):
+    print("---------Events logged by the campaign and its milestone apps")
+    for event in EventStream(client, [app_id], cursor=Cursor(first_round)).events():
+        print(f"round {event.round} [AppID: {event.app_id}] {event.name}: {event.fields}")
+
+def print_state(app_client, states=[], account="", state_cache=None):
     """
     Utility used to retrieve and print the global or local state of an Application/Account.
     
@@ -130,23 +177,36 @@ def print_state(app_client, states=[], account=""):
     app_client: ApplicationClient used to retrieve the global or local state for the specific Applicaiton
     states: list containing all the states to be printed. Empty for printing all states.
     account: SanboxAccount for retrieving the local state of the account of interest. Required only for local state.
+    state_cache: optional StateCache serving the state without a request if no block was committed since the last read.
     """
 
     state = {}
     if not account: # global state
         print(f"[AppID: {app_client.app_id}] Global State")
-        state = app_client.get_application_state()
+        state = app_client.get_application_state() if state_cache is None else state_cache.snapshot(app_client).state
     else:
         print(f"[AppID: {app_client.app_id}] Local State for {account.address}")
-        state = app_client.get_account_state(account=account.address)
+        if state_cache is None:
+            state = app_client.get_account_state(account=account.address)
+        else:
+            state = state_cache.snapshot(app_client, account.address).state
 
     if not states:
         states = state.keys()
     for key in states:
-        print(f"{key}: {state[key]}")
+        value = state[key]
+        if isinstance(value, str) and not value.isprintable(): # packed values, e.g. funds_per_milestone pages
+            value = value.encode().hex()
+        elif isinstance(value, bytes): # "bytes" values of the state cache, e.g. payout_split
+            value = value.hex()
+        print(f"{key!r}: {value}" if not key.isprintable() else f"{key}: {value}")
     print("\n")
 
 
 if __name__ == "__main__":
     app = CrowdfundingCampaignApp()
-    demo()
\ No newline at end of file
+    if "--local" in sys.argv: # in-process ledger, no sandbox needed
+        client = LocalAlgodClient()
+        demo(app, client, get_accounts(client), client.clock)
+    else:
+        demo(app)
\ No newline at end of file
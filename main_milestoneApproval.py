@@ -1,23 +1,38 @@
 import datetime
+import sys
 import time
 
 from beaker.client import ApplicationClient
 from beaker import sandbox
 
 from contracts.crowdfunding.milestoneApproval import MilestoneApprovalApp
+from client.state_cache import StateCache
+from localnet.algod import LocalAlgodClient, get_accounts
 
-def demo():
-    client = sandbox.get_algod_client()
+def demo(client=None, accts=None, clock=None):
+    """
+    Run the voting flow against the sandbox, or against `client` when given.
+
+    Args:
+    client: AlgodClient to use (e.g. LocalAlgodClient), defaults to the sandbox algod.
+    accts: funded accounts to use with `client`, defaults to the sandbox accounts.
+    clock: VirtualClock of a local ledger, used instead of the wall clock and time.sleep.
+    """
+    if client is None:
+        client = sandbox.get_algod_client()
+        accts = sandbox.get_accounts()
+    now = clock.now if clock is not None else lambda: datetime.datetime.now(datetime.timezone.utc).timestamp()
+    sleep = clock.sleep if clock is not None else time.sleep
+    # every print follows a transaction: check the round on each read, state is only fetched once per round
+    state_cache = StateCache(client, round_interval=0)
 
-    accts = sandbox.get_accounts()
     creator_acct = accts[0]
     user_acct = accts[1]
 
     # Create the Application client containing both an algod client and MilestoneApprovalApp
     creator_app_client = ApplicationClient(client, MilestoneApprovalApp(), signer=creator_acct.signer)
 
-    current_time = datetime.datetime.now(datetime.timezone.utc)
-    unix_timestamp = current_time.timestamp()
+    unix_timestamp = now()
     unix_timestamp_end = unix_timestamp + (1 * 30) # current + 30 seconds
 
     print("---------Deploy the contract from creator account")
@@ -37,7 +52,7 @@ def demo():
     print(f"Created App with id: {app_id} and address addr: {app_addr} in tx: {txid}")
 
     # Read app global state 
-    print_state(creator_app_client)
+    print_state(creator_app_client, state_cache=state_cache)
 
     # opt in from the creator_acct
     creator_app_client.opt_in(vote=1)
@@ -47,22 +62,22 @@ def demo():
     user_app_client = creator_app_client.prepare(signer=user_acct.signer)
     user_app_client.opt_in(vote=1)
     
-    print_state(creator_app_client, account=user_acct)
+    print_state(creator_app_client, account=user_acct, state_cache=state_cache)
 
     # Read app global state 
-    print_state(creator_app_client, states=["approval_state","approve_votes", "reject_votes"])
+    print_state(creator_app_client, states=["approval_state","approve_votes", "reject_votes"], state_cache=state_cache)
 
     # # Wait for the funding time window to close
-    time.sleep(35)
+    sleep(35)
 
     # settle the voting
     print(f"---------Settle the voting from creator account")
     result = creator_app_client.call(MilestoneApprovalApp.vote_settling)
 
     # Read app global state 
-    print_state(creator_app_client, states=["approval_state","approve_votes", "reject_votes"])
+    print_state(creator_app_client, states=["approval_state","approve_votes", "reject_votes"], state_cache=state_cache)
 
-def print_state(app_client, states=[], account=""):
+def print_state(app_client, states=[], account="", state_cache=None):
     """
     Utility used to retrieve and print the global or local state of an Application/Account.
     
@@ -70,15 +85,19 @@ def print_state(app_client, states=[], account=""):
     app_client: ApplicationClient used to retrieve the global or local state for the specific Applicaiton
     states: list containing all the states to be printed. Empty for printing all states.
     account: SanboxAccount for retrieving the local state of the account of interest. Required only for local state.
+    state_cache: optional StateCache serving the state without a request if no block was committed since the last read.
     """
 
     state = {}
     if not account: # global state
         print(f"[AppID: {app_client.app_id}] Global State")
-        state = app_client.get_application_state()
+        state = app_client.get_application_state() if state_cache is None else state_cache.snapshot(app_client).state
     else:
         print(f"[AppID: {app_client.app_id}] Local State for {account.address}")
-        state = app_client.get_account_state(account=account.address)
+        if state_cache is None:
+            state = app_client.get_account_state(account=account.address)
+        else:
+            state = state_cache.snapshot(app_client, account.address).state
 
     if not states:
         states = state.keys()
@@ -88,4 +107,8 @@ def print_state(app_client, states=[], account=""):
 
 if __name__ == "__main__":
     app = MilestoneApprovalApp()
-    demo()
\ No newline at end of file
+    if "--local" in sys.argv: # in-process ledger, no sandbox needed
+        client = LocalAlgodClient()
+        demo(client, get_accounts(client), client.clock)
+    else:
+        demo()
\ No newline at end of file
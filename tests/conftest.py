@@ -0,0 +1,81 @@
+"""
+Fixtures of the contract tests: campaigns deployed from the artifacts in build/ on the in-process ledger
+(localnet), no sandbox needed.
+
+    python -m pytest -q tests
+"""
+from typing import Callable
+
+import pytest
+from beaker import consts
+from beaker.sandbox.kmd import SandboxAccount
+
+from client.artifacts import CampaignClient, MilestoneClient
+from localnet.algod import LocalAlgodClient, get_accounts
+
+FUND_WINDOW = 60 # seconds from create to the end of the funding
+VOTE_WINDOW = 60 # seconds from submit_milestone to the end of the vote
+
+
+@pytest.fixture
+def client() -> LocalAlgodClient:
+    return LocalAlgodClient()
+
+
+@pytest.fixture
+def creator(client: LocalAlgodClient) -> SandboxAccount:
+    (creator,) = get_accounts(client, 1)
+    return creator
+
+
+@pytest.fixture
+def make_account(client: LocalAlgodClient) -> Callable[..., SandboxAccount]:
+    """Account funded with `amount` microAlgos (and the min balance of a campaign opt-in)."""
+
+    def make(amount: int = 0) -> SandboxAccount:
+        (acct,) = get_accounts(client, 1, amount + consts.algo)
+        return acct
+
+    return make
+
+
+@pytest.fixture
+def make_campaign(client: LocalAlgodClient, creator: SandboxAccount) -> Callable[..., CampaignClient]:
+    """CampaignClient of a new campaign of `creator`, its funding window open from now."""
+
+    def make(campaign_goal: int, funds_per_milestone: list[int], client_cls: type = CampaignClient) -> CampaignClient:
+        campaign = client_cls.load(client, signer=creator.signer)
+        now = client.clock.now()
+        campaign.create(
+            campaign_goal=campaign_goal,
+            funds_receiver=creator.address,
+            fund_start_date=now,
+            fund_end_date=now + FUND_WINDOW,
+            reward_metadata="ipfs:/metadata/CID",
+            total_milestones=len(funds_per_milestone),
+            funds_per_milestone=funds_per_milestone,
+        )
+        campaign.fund(consts.algo) # min balance of the app account and of its milestone apps
+        return campaign
+
+    return make
+
+
+@pytest.fixture
+def back(make_account: Callable[..., SandboxAccount]) -> Callable[..., SandboxAccount]:
+    """New backer of `campaign` with `amount` microAlgos."""
+
+    def make(campaign: CampaignClient, amount: int) -> SandboxAccount:
+        backer = make_account(amount)
+        backer_campaign = campaign.prepare(backer.signer)
+        backer_campaign.opt_in()
+        backer_campaign.back(amount)
+        return backer
+
+    return make
+
+
+@pytest.fixture
+def milestone_client(client: LocalAlgodClient, creator: SandboxAccount) -> Callable[[int], MilestoneClient]:
+    """MilestoneClient of the app `app_id`, sent by the creator."""
+    return lambda app_id: MilestoneClient.load(client, app_id, signer=creator.signer)
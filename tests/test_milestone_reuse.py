@@ -0,0 +1,66 @@
+"""Reusable milestone app: one MilestoneApprovalApp per campaign, reset by every submit_milestone."""
+import pytest
+from beaker import consts
+
+from tests.conftest import FUND_WINDOW, VOTE_WINDOW
+
+
+@pytest.fixture
+def funded_campaign(client, creator, make_campaign, back):
+    """Successful campaign of 3 milestones and its 50 Algo backer, first milestone paid: (campaign, backer)."""
+    campaign = make_campaign(50 * consts.algo, [20 * consts.algo, 20 * consts.algo, 10 * consts.algo])
+    backer = back(campaign, 50 * consts.algo)
+    client.clock.advance(FUND_WINDOW + 1)
+    campaign.claim_funds([creator.address])
+    return campaign, backer
+
+
+def submit(client, campaign, milestone: int, reusable_app_id: int) -> int:
+    return campaign.submit_milestone(
+        milestone, f"ipfs:/milestone_{milestone}_metadata/CID", client.clock.now() + VOTE_WINDOW, reusable_app_id
+    ).return_value
+
+
+def test_every_milestone_reuses_the_same_app(client, creator, milestone_client, funded_campaign):
+    campaign, backer = funded_campaign
+    reusable_app_id = campaign.create_reusable_milestone_app().return_value
+    min_balance = client.account_info(campaign.app_addr)["min-balance"]
+    reusable = milestone_client(reusable_app_id)
+    for milestone in (1, 2):
+        assert submit(client, campaign, milestone, reusable_app_id) == reusable_app_id
+        state = reusable.get_application_state()
+        assert (state["milestone_to_approve"], state["approval_state"]) == (milestone, 0)
+        assert (state["approve_votes"], state["reject_votes"]) == (0, 0) # votes of the previous milestone dropped
+        campaign.prepare(backer.signer).vote(reusable_app_id, approve=True) # the same backer votes again
+        client.clock.advance(VOTE_WINDOW + 1)
+        reusable.vote_settling()
+        campaign.claim_funds([creator.address], reusable_app_id)
+
+    # no milestone app created after the reusable one, no min balance added to the campaign account
+    info = client.account_info(campaign.app_addr)
+    assert [app["id"] for app in info["created-apps"]] == [reusable_app_id]
+    assert info["min-balance"] == min_balance
+    state = campaign.get_application_state()
+    assert (state["campaign_state"], state["reached_milestone"]) == (3, 2) # milestones 0 to 2 paid
+
+
+def test_without_reusable_app_each_milestone_creates_one(client, funded_campaign):
+    campaign, _ = funded_campaign
+    milestone_app_id = submit(client, campaign, 1, 0)
+    assert [app["id"] for app in client.account_info(campaign.app_addr)["created-apps"]] == [milestone_app_id]
+
+
+def test_reusable_app_created_once(funded_campaign):
+    campaign, _ = funded_campaign
+    campaign.create_reusable_milestone_app()
+    with pytest.raises(Exception, match="assert failed"):
+        campaign.create_reusable_milestone_app()
+
+
+def test_reset_only_by_the_campaign(client, milestone_client, funded_campaign):
+    campaign, _ = funded_campaign
+    reusable = milestone_client(campaign.create_reusable_milestone_app().return_value)
+    with pytest.raises(Exception, match="assert failed"):
+        reusable.call(
+            "reset", milestone_to_approve=1, vote_end_date=client.clock.now() + VOTE_WINDOW, milestone_metadata="x"
+        )
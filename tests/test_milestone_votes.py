@@ -0,0 +1,78 @@
+"""Votes of the milestone apps: weighted votes cast through the campaign, opt_in ballots of standalone apps."""
+import pytest
+from beaker import consts
+
+from client.artifacts import MilestoneClient
+from tests.conftest import FUND_WINDOW, VOTE_WINDOW
+
+
+@pytest.fixture
+def campaign_in_vote(client, make_campaign, back):
+    """Campaign of a 50 Algo backer with milestone 1 submitted: (campaign, backer, milestone app id)."""
+    campaign = make_campaign(50 * consts.algo, [30 * consts.algo, 20 * consts.algo])
+    backer = back(campaign, 50 * consts.algo)
+    client.clock.advance(FUND_WINDOW + 1)
+    campaign.claim_funds([campaign.get_sender()])
+    milestone_app_id = campaign.submit_milestone(1, "ipfs:/milestone_1_metadata/CID", client.clock.now() + VOTE_WINDOW)
+    return campaign, backer, milestone_app_id.return_value
+
+
+def test_outsider_ballot_does_not_block_the_backers(client, make_account, milestone_client, campaign_in_vote):
+    # A non-backer opting in to the milestone app of a campaign with a reject ballot must neither
+    # count nor turn off the weighted votes cast through the campaign.
+    campaign, backer, milestone_app_id = campaign_in_vote
+    milestone = milestone_client(milestone_app_id)
+    outsider = make_account()
+    with pytest.raises(Exception, match="assert failed"):
+        milestone.prepare(outsider.signer).vote(approve=False)
+
+    campaign.prepare(backer.signer).vote(milestone_app_id, approve=True)
+    client.clock.advance(VOTE_WINDOW + 1)
+    milestone.vote_settling()
+
+    state = milestone.get_application_state()
+    assert (state["approve_votes"], state["reject_votes"]) == (50 * consts.algo, 0)
+    assert state["approval_state"] == 1
+
+
+def test_reusable_app_counts_the_campaign_votes_only(client, creator, make_campaign, back, make_account, milestone_client):
+    campaign = make_campaign(50 * consts.algo, [20 * consts.algo, 20 * consts.algo, 10 * consts.algo])
+    backer = back(campaign, 50 * consts.algo)
+    client.clock.advance(FUND_WINDOW + 1)
+    campaign.claim_funds([creator.address])
+    reusable_app_id = campaign.create_reusable_milestone_app().return_value
+    outsider = make_account()
+    for milestone in (1, 2):
+        campaign.call(
+            "submit_milestone",
+            milestone_to_approve=milestone,
+            milestone_metadata=f"ipfs:/milestone_{milestone}_metadata/CID",
+            vote_end_date=client.clock.now() + VOTE_WINDOW,
+            foreign_apps=[reusable_app_id],
+        )
+        reusable = milestone_client(reusable_app_id)
+        assert reusable.get_application_state()["vote_mode"] == 2
+        with pytest.raises(Exception, match="assert failed"):
+            reusable.prepare(outsider.signer).vote(approve=False)
+        campaign.prepare(backer.signer).vote(reusable_app_id, approve=True)
+        client.clock.advance(VOTE_WINDOW + 1)
+        reusable.vote_settling()
+        assert reusable.get_application_state()["approval_state"] == 1
+        campaign.claim_funds([creator.address], reusable_app_id)
+    assert campaign.get_application_state()["campaign_state"] == 3
+
+
+def test_standalone_app_counts_opt_in_ballots(client, creator, make_account):
+    milestone = MilestoneClient.load(client, signer=creator.signer)
+    milestone.create(
+        creator=creator.address,
+        crowdfunding_address=creator.address,
+        milestone_to_approve=1,
+        vote_end_date=client.clock.now() + VOTE_WINDOW,
+        milestone_metadata="ipfs:/milestone_1_metadata/CID",
+    )
+    assert milestone.get_application_state()["vote_mode"] == 1
+    for approve in (True, True, False):
+        milestone.prepare(make_account().signer).vote(approve)
+    state = milestone.get_application_state()
+    assert (state["approve_votes"], state["reject_votes"]) == (2, 1)
@@ -0,0 +1,44 @@
+"""Split milestone payouts: share / 10000 of the amount to each receiver, the rounding remainder to the last one."""
+import pytest
+from beaker import consts
+
+from contracts.crowdfunding.crowdfundingCampaign import SHARES_DENOMINATOR
+from tests.conftest import FUND_WINDOW
+
+
+@pytest.fixture
+def claim_split(client, make_campaign, make_account, back):
+    """Receivers' balance increases once the first milestone of `amount` is paid split by `shares`."""
+
+    def claim(amount: int, shares: list[int]) -> list[int]:
+        campaign = make_campaign(amount, [amount])
+        receivers = [make_account().address for _ in shares]
+        campaign.set_payout_split(receivers, shares)
+        back(campaign, amount)
+        before = [client.account_info(r)["amount"] for r in receivers]
+        client.clock.advance(FUND_WINDOW + 1)
+        campaign.claim_funds(receivers)
+        return [client.account_info(r)["amount"] - b for r, b in zip(receivers, before)]
+
+    return claim
+
+
+def test_rounding_remainder_to_the_last_receiver(claim_split):
+    amount = 10 * consts.algo + 1
+    shares = [3333, 3333, 3334]
+    first = amount * 3333 // SHARES_DENOMINATOR
+    assert claim_split(amount, shares) == [first, first, amount - 2 * first]
+
+
+def test_share_product_above_uint64(claim_split):
+    # amount * share does not fit a uint64: the product is 128 bits wide
+    amount = 2**64 // 7000 + 3
+    paid = claim_split(amount, [7000, 3000])
+    assert paid == [amount * 7000 // SHARES_DENOMINATOR, amount - amount * 7000 // SHARES_DENOMINATOR]
+
+
+@pytest.mark.parametrize("shares", [[5000, 4999], [10_000, 0], [2500] * 5])
+def test_invalid_split_rejected(make_campaign, make_account, shares):
+    campaign = make_campaign(10 * consts.algo, [10 * consts.algo])
+    with pytest.raises(Exception, match="assert failed"):
+        campaign.set_payout_split([make_account().address for _ in shares], shares)
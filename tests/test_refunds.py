@@ -0,0 +1,69 @@
+"""Refunds of an unsuccessful campaign: pages of MAX_REFUNDS_PER_CALL backers, grouped by RefundDriver."""
+import pytest
+from beaker import consts
+from beaker.client import ApplicationClient
+
+from client.event_stream import Cursor
+from client.refunds import MAX_GROUP_SIZE, RefundDriver
+from contracts.crowdfunding.crowdfundingCampaign import MAX_REFUNDS_PER_CALL, CrowdfundingCampaignApp
+from tests.conftest import FUND_WINDOW
+
+AMOUNT_BACKED = 10 * consts.algo # the minimum of fund
+
+
+@pytest.fixture
+def failed_campaign(client, make_campaign, back):
+    """Campaign missing its goal, ended: (campaign, backers)."""
+
+    def make(num_backers: int):
+        goal = 2 * num_backers * AMOUNT_BACKED
+        campaign = make_campaign(goal, [goal // 2, goal // 2])
+        backers = [back(campaign, AMOUNT_BACKED).address for _ in range(num_backers)]
+        client.clock.advance(FUND_WINDOW + 1)
+        return campaign, backers
+
+    return make
+
+
+def balances(client, addresses: list[str]) -> list[int]:
+    return [client.account_info(address)["amount"] for address in addresses]
+
+
+def test_refund_pages_can_be_resubmitted(client, make_account, failed_campaign):
+    campaign, backers = failed_campaign(6)
+    before = balances(client, backers)
+    first_page = backers[:MAX_REFUNDS_PER_CALL]
+    assert campaign.call("refund", accounts=first_page).return_value == 4
+    assert campaign.call("refund", accounts=first_page).return_value == 4 # already refunded: skipped
+    # the last page, with a non-backer skipped too
+    assert campaign.call("refund", accounts=backers[MAX_REFUNDS_PER_CALL:] + [make_account().address]).return_value == 6
+
+    after = balances(client, backers)
+    assert [a - b for a, b in zip(after, before)] == [AMOUNT_BACKED] * 6
+    assert all(campaign.get_account_state(backer)["amount_backed"] == 0 for backer in backers)
+    assert campaign.get_application_state()["campaign_state"] == 3
+
+
+def test_refund_rejected_for_a_successful_campaign(client, make_campaign, back):
+    campaign = make_campaign(10 * consts.algo, [10 * consts.algo])
+    backer = back(campaign, 10 * consts.algo)
+    client.clock.advance(FUND_WINDOW + 1)
+    with pytest.raises(Exception, match="assert failed"):
+        campaign.call("refund", accounts=[backer.address])
+
+
+def test_driver_pages_the_backers_from_the_fund_events(client, creator, failed_campaign, tmp_path):
+    num_backers = MAX_GROUP_SIZE * MAX_REFUNDS_PER_CALL + 6
+    campaign, backers = failed_campaign(num_backers)
+    app_client = ApplicationClient(client, CrowdfundingCampaignApp(), app_id=campaign.app_id, signer=creator.signer)
+    cursor_path = str(tmp_path / "refunds.cursor")
+    driver = RefundDriver(app_client, cursor_path=cursor_path)
+
+    results = driver.refund(start=Cursor())
+    assert [len(batch.backers) for batch in results] == [MAX_GROUP_SIZE * MAX_REFUNDS_PER_CALL, 6]
+    assert all(batch.ok for batch in results)
+    assert [len(batch.txids) for batch in results] == [MAX_GROUP_SIZE, 2]
+    assert campaign.get_application_state()["refunded_backers"] == num_backers
+    # resumed from the saved cursor: nothing left to refund
+    assert Cursor.load(cursor_path) == results[-1].cursor
+    assert RefundDriver(app_client, cursor_path=cursor_path).refund() == []
@@ -0,0 +1,51 @@
+"""Fund schedule of a campaign: packed over the funds_ pages of global state, bounded by the campaign goal."""
+import pytest
+from beaker import consts
+
+from client.artifacts import CampaignClient
+from contracts.crowdfunding.crowdfundingCampaign import MAX_MILESTONES, SCHEDULE_KEY_PREFIX, SCHEDULE_PAGE_SIZE
+from tests.conftest import FUND_WINDOW
+
+
+def test_schedule_packed_over_the_pages(make_campaign):
+    # 64 milestones: 4 full pages of 15 amounts and a last one of 4, read back across the page boundaries
+    schedule = [(i + 1) * consts.milli_algo for i in range(MAX_MILESTONES)]
+    campaign = make_campaign(sum(schedule), schedule)
+
+    raw = campaign.get_application_state(raw=True)
+    pages = [raw[SCHEDULE_KEY_PREFIX.encode() + bytes([page])] for page in range(5)]
+    assert [len(page) for page in pages] == [SCHEDULE_PAGE_SIZE] * 4 + [4 * 8]
+    assert campaign.get_application_state()["funds_per_milestone"] == schedule
+    for milestone in (0, 14, 15, 44, 45, MAX_MILESTONES - 1):
+        assert campaign.get_milestone_funds(milestone) == schedule[milestone]
+
+
+def test_short_schedule_uses_one_page(make_campaign):
+    campaign = make_campaign(50 * consts.algo, [30 * consts.algo, 20 * consts.algo])
+    pages = [key for key in campaign.get_application_state(raw=True) if key[:-1] == SCHEDULE_KEY_PREFIX.encode()]
+    assert pages == [SCHEDULE_KEY_PREFIX.encode() + b"\0"]
+    assert campaign.get_application_state()["funds_per_milestone"] == [30 * consts.algo, 20 * consts.algo]
+
+
+@pytest.mark.parametrize("campaign_goal, schedule", [
+    (50 * consts.algo, [30 * consts.algo, 20 * consts.algo + 1]),
+    (50 * consts.algo, [consts.algo] * 49 + [consts.algo + 1]), # above the goal on the last page only
+])
+def test_schedule_above_the_goal_rejected(make_campaign, campaign_goal, schedule):
+    with pytest.raises(Exception, match="assert failed"):
+        make_campaign(campaign_goal, schedule)
+
+
+def test_schedule_length_must_match_the_milestones(client, creator):
+    campaign = CampaignClient.load(client, signer=creator.signer)
+    now = client.clock.now()
+    with pytest.raises(Exception, match="assert failed"):
+        campaign.create(
+            campaign_goal=50 * consts.algo,
+            funds_receiver=creator.address,
+            fund_start_date=now,
+            fund_end_date=now + FUND_WINDOW,
+            reward_metadata="ipfs:/metadata/CID",
+            total_milestones=3,
+            funds_per_milestone=[30 * consts.algo, 20 * consts.algo],
+        )